@@ -0,0 +1,111 @@
+"""
+Benchmark DeliverySerializer against the plain-dict DeliveryValuesSerializer.
+
+Seeds N deliveries (with customers, addresses, subscriptions and orders)
+inside a transaction, times both serializers over the full set, then rolls
+everything back.
+
+Usage:
+    python manage.py benchmark_delivery_serializers
+    python manage.py benchmark_delivery_serializers --rows 5000 --repeat 3
+"""
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.delivery.models import Delivery
+from apps.delivery.serializers import DeliverySerializer, DeliveryValuesSerializer
+from apps.driver.models import DeliveryDriver, Zone
+from apps.main.models import (
+    Address, CustomerProfile, MealPackage, MealSlot, Order, Subscription,
+)
+
+
+class Command(BaseCommand):
+    help = 'Time DeliverySerializer vs DeliveryValuesSerializer on seeded deliveries (rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000, help='Deliveries to seed.')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per serializer.')
+        parser.add_argument('--database', default='default', help='Database alias to use.')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        with transaction.atomic(using=using):
+            self._seed(options['rows'], using)
+            self._run(options['repeat'], using)
+            transaction.set_rollback(True, using=using)
+
+    def _seed(self, rows, using):
+        start = time.perf_counter()
+        today = timezone.now().date()
+        tag = f"bench{int(time.time())}"
+
+        zone = Zone.objects.using(using).create(name=f'{tag}-zone')
+        driver = DeliveryDriver.objects.using(using).create(name=f'{tag} driver', phone=tag)
+        driver.zones.add(zone)
+        slot = MealSlot.objects.using(using).create(name='Lunch', code=f'{tag}-lunch')
+        package = MealPackage.objects.using(using).create(name=tag, price=100)
+
+        users = User.objects.using(using).bulk_create([
+            User(username=f'{tag}-{i}', first_name='Bench', last_name=str(i))
+            for i in range(rows)
+        ])
+        profiles = CustomerProfile.objects.using(using).bulk_create([
+            CustomerProfile(user=user, phone=f'{tag}{i}') for i, user in enumerate(users)
+        ])
+        addresses = Address.objects.using(using).bulk_create([
+            Address(customer=p, zone=zone, street=f'{i} Bench St', building_name='Tower',
+                    floor_number=str(i % 20), status='active')
+            for i, p in enumerate(profiles)
+        ])
+        subs = Subscription.objects.using(using).bulk_create([
+            Subscription(customer=p, meal_package=package, time_slot=slot, lunch_address=a,
+                         start_date=today, end_date=today, status='active',
+                         selected_days=['Monday'])
+            for p, a in zip(profiles, addresses)
+        ])
+        orders = Order.objects.using(using).bulk_create([
+            Order(subscription=s, order_date=today, delivery_date=today, status='ready')
+            for s in subs
+        ])
+        Delivery.objects.using(using).bulk_create([
+            Delivery(order=o, driver=driver, status='pending') for o in orders
+        ])
+        self.stdout.write(f"Seeded {rows} deliveries in {time.perf_counter() - start:.2f}s")
+
+    def _run(self, repeat, using):
+        queryset = Delivery.objects.using(using).select_related(
+            'order__subscription__customer__user',
+            'order__subscription__lunch_address',
+            'order__subscription__dinner_address',
+            'driver', 'driver_user',
+        ).order_by('-created_at')
+        fast = DeliveryValuesSerializer()
+
+        def model_serializer():
+            return DeliverySerializer(queryset.all(), many=True).data
+
+        def values_serializer():
+            return fast.serialize(fast.values_queryset(queryset.all()))
+
+        results = {}
+        for label, func in (('DeliverySerializer', model_serializer),
+                            ('DeliveryValuesSerializer', values_serializer)):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                count = len(func())
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            results[label] = best
+            self.stdout.write(
+                f"  {label:<26} {count} rows  best {best * 1000:8.1f} ms  "
+                f"({count / best:,.0f} rows/s)"
+            )
+
+        speedup = results['DeliverySerializer'] / results['DeliveryValuesSerializer']
+        self.stdout.write(self.style.SUCCESS(f"Plain-dict path is {speedup:.1f}x faster."))
@@ -3,6 +3,8 @@ Delivery app serializers — for the Delivery model (order → delivery tracking
 """
 from rest_framework import serializers
 from apps.delivery.models import Delivery
+from apps.main.models import Address
+from core.utils.fast_serializers import ValuesSerializer
 
 
 class DeliverySerializer(serializers.ModelSerializer):
@@ -47,3 +49,64 @@ class DeliverySerializer(serializers.ModelSerializer):
             if addr:
                 return str(addr)
         return ''
+
+
+_ADDRESS_PARTS = ('street', 'city', 'building_name', 'floor_number', 'flat_number')
+
+
+class DeliveryValuesSerializer(ValuesSerializer):
+    """
+    Plain-dict twin of ``DeliverySerializer`` for list responses. Produces
+    the same keys and values from a single ``values()`` query.
+    """
+    fields = {
+        'id': 'id',
+        'order': 'order_id',
+        'order_id': 'order_id',
+        'driver': 'driver_id',
+        'driver_id': 'driver_id',
+        'pickup_time': 'pickup_time',
+        'delivery_time': 'delivery_time',
+        'status': 'status',
+        'notes': 'notes',
+        'created_at': 'created_at',
+        'updated_at': 'updated_at',
+    }
+    extra_lookups = (
+        'driver__name',
+        'driver_user__first_name', 'driver_user__last_name', 'driver_user__username',
+        'order__subscription_id',
+        'order__subscription__customer__user__first_name',
+        'order__subscription__customer__user__last_name',
+        'order__subscription__customer__user__username',
+        *(f'order__subscription__lunch_address__{part}' for part in _ADDRESS_PARTS),
+        'order__subscription__lunch_address_id',
+        *(f'order__subscription__dinner_address__{part}' for part in _ADDRESS_PARTS),
+        'order__subscription__dinner_address_id',
+    )
+    computed_fields = ('driver_name', 'customer_name', 'delivery_address')
+    field_order = DeliverySerializer.Meta.fields
+    # DeliverySerializer skips driver_id (source='driver.id') without a driver
+    omit_if_none = ('driver_id',)
+
+    def get_driver_name(self, row):
+        if row['driver_id']:
+            return row['driver__name']
+        if row['driver_user__username'] is not None:
+            name = f"{row['driver_user__first_name']} {row['driver_user__last_name']}".strip()
+            return name if name.strip() else row['driver_user__username']
+        return ''
+
+    def get_customer_name(self, row):
+        if row['order__subscription_id'] and row['order__subscription__customer__user__username'] is not None:
+            prefix = 'order__subscription__customer__user__'
+            name = f"{row[prefix + 'first_name']} {row[prefix + 'last_name']}".strip()
+            return name if name.strip() else row[prefix + 'username']
+        return ''
+
+    def get_delivery_address(self, row):
+        for kind in ('lunch', 'dinner'):
+            if row[f'order__subscription__{kind}_address_id']:
+                prefix = f'order__subscription__{kind}_address__'
+                return Address.format_display(*(row[prefix + part] for part in _ADDRESS_PARTS))
+        return ''
@@ -0,0 +1,12 @@
+import pytest
+from io import StringIO
+from django.core.management import call_command
+from apps.delivery.models import Delivery
+
+
+@pytest.mark.django_db
+def test_benchmark_delivery_serializers_rolls_back():
+    out = StringIO()
+    call_command('benchmark_delivery_serializers', rows=20, repeat=1, stdout=out)
+    assert 'DeliveryValuesSerializer' in out.getvalue()
+    assert Delivery.objects.count() == 0
@@ -90,3 +90,49 @@ class TestDeliveryViewSet:
         assert res.status_code == 200
         assert 'total' in res.data
         assert 'today' in res.data
+
+    def _add_deliveries(self, count):
+        from apps.main.models import Address
+        for i in range(count):
+            user = User.objects.create_user(username=f'bulk{i}', first_name='Bulk', last_name=str(i))
+            profile = CustomerProfile.objects.create(user=user)
+            address = Address.objects.create(
+                customer=profile, street=f'{i} Road', building_name='Tower',
+                floor_number='3', status='active',
+            )
+            sub = Subscription.objects.create(
+                customer=profile, meal_package=self.package,
+                start_date=timezone.now().date(),
+                end_date=timezone.now().date() + timezone.timedelta(days=30),
+                time_slot=self.slot, lunch_address=address,
+                selected_days=['Monday'],
+            )
+            order = Order.objects.create(
+                subscription=sub, order_date=timezone.now().date(),
+                delivery_date=timezone.now().date(), status='pending',
+            )
+            Delivery.objects.create(
+                order=order, status='in_transit', pickup_time=timezone.now(),
+                driver=self.driver_profile if i % 2 else None,
+            )
+
+    def test_list_matches_model_serializer(self):
+        from apps.delivery.serializers import DeliverySerializer
+        self._add_deliveries(3)
+        self.delivery.driver_user = self.driver_user
+        self.delivery.save(update_fields=['driver_user'])
+
+        res = self.client.get('/api/v1/delivery/deliveries/')
+        assert res.status_code == 200
+        expected = {
+            row['id']: row for row in DeliverySerializer(Delivery.objects.all(), many=True).data
+        }
+        assert len(res.data['results']) == 4
+        for row in res.data['results']:
+            assert row == dict(expected[row['id']])
+
+    def test_list_query_count_is_constant(self, django_assert_max_num_queries):
+        self._add_deliveries(8)
+        with django_assert_max_num_queries(4):
+            res = self.client.get('/api/v1/delivery/deliveries/')
+        assert len(res.data['results']) == 9
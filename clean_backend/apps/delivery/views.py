@@ -6,10 +6,11 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from apps.delivery.models import Delivery
-from apps.delivery.serializers import DeliverySerializer
+from apps.delivery.serializers import DeliverySerializer, DeliveryValuesSerializer
 
 
 from apps.driver.permissions import IsLogisticsAdmin
+from core.utils.export import ExportMixin
 
 
 def index(request):
@@ -20,7 +21,7 @@ def api_index(request):
     return JsonResponse({'message': 'delivery API endpoint'})
 
 
-class DeliveryViewSet(viewsets.ModelViewSet):
+class DeliveryViewSet(ExportMixin, viewsets.ModelViewSet):
     """
     Manage deliveries (admin view).
 
@@ -28,9 +29,24 @@ class DeliveryViewSet(viewsets.ModelViewSet):
     """
     serializer_class = DeliverySerializer
     # permission_classes determined by get_permissions
+    query_budget = {'list': 4, 'retrieve': 3, 'stats': 8}
     filterset_fields = ['status', 'driver']
     ordering = ['-created_at']
     search_fields = ['order__id', 'driver__name', 'driver_user__username']
+    export_columns = [
+        ('id', 'Delivery ID'),
+        ('order_id', 'Order ID'),
+        ('order__delivery_date', 'Delivery date'),
+        ('status', 'Status'),
+        ('order__subscription__customer__name', 'Customer'),
+        ('order__subscription__customer__phone', 'Phone'),
+        ('driver__name', 'Driver'),
+        ('driver_user__username', 'Driver user'),
+        ('pickup_time', 'Picked up at'),
+        ('delivery_time', 'Delivered at'),
+        ('notes', 'Notes'),
+        ('created_at', 'Created at'),
+    ]
 
     def get_permissions(self):
         """
@@ -43,7 +59,12 @@ class DeliveryViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
-        qs = Delivery.objects.select_related('order', 'driver', 'driver_user').all()
+        qs = Delivery.objects.select_related(
+            'order__subscription__customer__user',
+            'order__subscription__lunch_address',
+            'order__subscription__dinner_address',
+            'driver', 'driver_user',
+        ).all()
         
         # If user is a driver, only show their deliveries
         if hasattr(user, 'driver_profile'):
@@ -51,6 +72,18 @@ class DeliveryViewSet(viewsets.ModelViewSet):
             
         return qs
 
+    def list(self, request, *args, **kwargs):
+        """
+        List deliveries through ``DeliveryValuesSerializer``: one ``values()``
+        query per page, no model instances. Output matches DeliverySerializer.
+        """
+        fast = DeliveryValuesSerializer()
+        rows = fast.values_queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page))
+        return Response(fast.serialize(rows))
+
     @action(detail=True, methods=['post'])
     def assign_driver(self, request, pk=None):
         """Assign or change the driver for a delivery."""
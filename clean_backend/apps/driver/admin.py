@@ -1,7 +1,7 @@
 from django.contrib import admin
 from apps.driver.models import (
     Zone, Route, DeliveryDriver, DeliveryStatus,
-    DeliveryAssignment, DeliverySchedule, DeliveryNotification,
+    DeliveryAssignment, DeliverySchedule, DeliveryNotification, DriverSyncOperation,
 )
 
 
@@ -36,10 +36,16 @@ class DeliveryStatusAdmin(admin.ModelAdmin):
 
 @admin.register(DeliveryAssignment)
 class DeliveryAssignmentAdmin(admin.ModelAdmin):
-    list_display = ('delivery_status', 'driver', 'assigned_at')
+    list_display = ('delivery_status', 'driver', 'run_number', 'stop_number', 'assigned_at')
     list_filter = ('driver',)
 
 
+@admin.register(DriverSyncOperation)
+class DriverSyncOperationAdmin(admin.ModelAdmin):
+    list_display = ('driver', 'operation_id', 'assignment', 'status', 'result', 'client_timestamp', 'received_at')
+    list_filter = ('result', 'driver')
+
+
 @admin.register(DeliverySchedule)
 class DeliveryScheduleAdmin(admin.ModelAdmin):
     list_display = ('zone', 'day_of_week', 'start_time', 'end_time', 'max_deliveries', 'is_active')
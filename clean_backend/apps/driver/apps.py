@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DriverConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.driver'
+
+    def ready(self):
+        import apps.driver.signals  # noqa
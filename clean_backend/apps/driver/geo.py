@@ -0,0 +1,130 @@
+"""
+Coordinates of delivery addresses.
+
+An address is located by its own ``latitude``/``longitude`` if set, else
+by the customer's ``plus_code`` (Open Location Code). Only full codes
+(``8FVC9G8F+6X``) can be decoded on their own; short codes (``9G8F+6X``)
+need a reference location and are treated as unknown.
+
+``to_plane`` projects points onto a local plane in kilometres. Over a
+city this is accurate enough to compare distances, and cheap enough to
+evaluate millions of times.
+
+Zone boundaries are polygons given as a ring of ``[lat, lng]`` vertices
+(``Zone.boundary``). Over a city, treating degrees as planar coordinates
+is precise enough to test whether a point lies inside one.
+"""
+import math
+
+CODE_ALPHABET = '23456789CFGHJMPQRVWX'
+PAIR_RESOLUTIONS = (20.0, 1.0, 0.05, 0.0025, 0.000125)
+GRID_ROWS, GRID_COLUMNS = 5, 4
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def decode_plus_code(code):
+    """Centre ``(lat, lng)`` of a full plus code, or None if it is short or invalid."""
+    if not code:
+        return None
+    code = code.strip().upper()
+    head, separator, tail = code.partition('+')
+    if not separator or len(head) != 8 or '+' in tail:
+        return None
+    digits = head.rstrip('0') + tail
+    pairs = digits[:10]
+    if not pairs or len(pairs) % 2 or any(digit not in CODE_ALPHABET for digit in digits):
+        return None
+
+    lat, lng = -90.0, -180.0
+    lat_size = lng_size = PAIR_RESOLUTIONS[0]
+    for index in range(0, len(pairs), 2):
+        resolution = PAIR_RESOLUTIONS[index // 2]
+        lat += CODE_ALPHABET.index(pairs[index]) * resolution
+        lng += CODE_ALPHABET.index(pairs[index + 1]) * resolution
+        lat_size = lng_size = resolution
+    for digit in digits[10:15]:
+        lat_size /= GRID_ROWS
+        lng_size /= GRID_COLUMNS
+        row, column = divmod(CODE_ALPHABET.index(digit), GRID_COLUMNS)
+        lat += row * lat_size
+        lng += column * lng_size
+    return round(lat + lat_size / 2, 7), round(lng + lng_size / 2, 7)
+
+
+def address_point(address, customer=None):
+    """``(lat, lng)`` of ``address``, or of ``customer``'s plus code; None when unknown."""
+    if address is not None and address.latitude is not None and address.longitude is not None:
+        return float(address.latitude), float(address.longitude)
+    if customer is not None:
+        return decode_plus_code(customer.plus_code)
+    return None
+
+
+def haversine_km(a, b):
+    """Great-circle distance between two ``(lat, lng)`` points."""
+    lat1, lng1, lat2, lng2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+def to_plane(point, reference_lat):
+    """``(x, y)`` in km of ``(lat, lng)``, equirectangular around ``reference_lat``."""
+    return (
+        point[1] * KM_PER_DEGREE * math.cos(math.radians(reference_lat)),
+        point[0] * KM_PER_DEGREE,
+    )
+
+
+# ─── Polygons ─────────────────────────────────────────────────────────────────
+
+def validate_polygon(vertices):
+    """``vertices`` as a list of ``(lat, lng)`` tuples; ValueError if it is not a usable ring."""
+    if not isinstance(vertices, (list, tuple)):
+        raise ValueError('A boundary is a list of [lat, lng] points.')
+    ring = []
+    for vertex in vertices:
+        if not isinstance(vertex, (list, tuple)) or len(vertex) != 2:
+            raise ValueError('Each boundary point is a [lat, lng] pair.')
+        try:
+            lat, lng = float(vertex[0]), float(vertex[1])
+        except (TypeError, ValueError):
+            raise ValueError('Boundary coordinates must be numbers.')
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValueError('Boundary coordinates are out of range.')
+        ring.append((lat, lng))
+    if len(ring) > 1 and ring[0] == ring[-1]:
+        ring.pop()  # Closed rings repeat the first point
+    if len(ring) < 3 or polygon_area(ring) == 0:
+        raise ValueError('A boundary needs at least three points enclosing an area.')
+    return ring
+
+
+def polygon_bounds(ring):
+    """``(min_lat, min_lng, max_lat, max_lng)`` of ``ring``."""
+    lats = [vertex[0] for vertex in ring]
+    lngs = [vertex[1] for vertex in ring]
+    return min(lats), min(lngs), max(lats), max(lngs)
+
+
+def polygon_area(ring):
+    """Area of ``ring`` in square degrees (shoelace formula)."""
+    total = 0.0
+    for index, (lat, lng) in enumerate(ring):
+        next_lat, next_lng = ring[index - 1]
+        total += next_lng * lat - lng * next_lat
+    return abs(total) / 2
+
+
+def point_in_polygon(point, ring):
+    """Whether ``(lat, lng)`` lies inside ``ring`` (ray casting)."""
+    lat, lng = point
+    inside = False
+    previous_lat, previous_lng = ring[-1]
+    for vertex_lat, vertex_lng in ring:
+        if (vertex_lat > lat) != (previous_lat > lat):
+            crossing = vertex_lng + (lat - vertex_lat) * (previous_lng - vertex_lng) / (previous_lat - vertex_lat)
+            if lng < crossing:
+                inside = not inside
+        previous_lat, previous_lng = vertex_lat, vertex_lng
+    return inside
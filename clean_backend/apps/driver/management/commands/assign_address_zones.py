@@ -0,0 +1,91 @@
+"""
+Set the zone of existing addresses from their location (``latitude`` and
+``longitude``, or the customer's plus code) and the zone boundaries.
+
+Addresses without a zone are resolved by default. Pass ``--overwrite`` to
+re-resolve every address, e.g. after redrawing zones.
+
+Without ``--tenant`` or ``--all`` the default database is used. Tenant
+databases are registered and processed through ``core.db.fanout.TenantFanOut``.
+
+Usage:
+    python manage.py assign_address_zones
+    python manage.py assign_address_zones --overwrite --tenant=test_tenant
+    python manage.py assign_address_zones --all --workers=4
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.driver.zone_index import ASSIGN_CHUNK_SIZE, assign_address_zones, get_zone_index
+from apps.users.models import Tenant
+from core.db.fanout import TenantFanOut, active_tenants
+
+
+class Command(BaseCommand):
+    help = 'Assign zones to addresses from their coordinates or plus codes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', type=str, default=None, help='Tenant subdomain (e.g. test_tenant).')
+        parser.add_argument('--all', action='store_true', default=False, help='Run for all active tenants.')
+        parser.add_argument('--overwrite', action='store_true', help='Also re-resolve addresses that have a zone.')
+        parser.add_argument('--chunk-size', type=int, default=ASSIGN_CHUNK_SIZE, help='Addresses per UPDATE.')
+        parser.add_argument(
+            '--workers', type=int, default=settings.SCHEDULER_TENANT_CONCURRENCY,
+            help='Tenants processed in parallel.',
+        )
+        parser.add_argument(
+            '--statement-timeout', type=int, default=settings.TENANT_STATEMENT_TIMEOUT,
+            help='Per-statement timeout in seconds on tenant databases (0 = none).',
+        )
+
+    def handle(self, *args, **options):
+        if options['tenant'] and options['all']:
+            raise CommandError('Use either --tenant=SUBDOMAIN or --all, not both.')
+        self.options = options
+
+        if not options['tenant'] and not options['all']:
+            self._report('', self._assign(None, 'default'))
+            return
+
+        if options['tenant']:
+            tenants = list(Tenant.objects.using('default').filter(subdomain__iexact=options['tenant']))
+            if not tenants:
+                raise CommandError(f"Tenant '{options['tenant']}' not found.")
+        else:
+            tenants = list(active_tenants())
+            if not tenants:
+                self.stdout.write(self.style.WARNING('No active tenants.'))
+                return
+
+        work = TenantFanOut(
+            self._assign, max_workers=options['workers'], statement_timeout=options['statement_timeout'],
+        )
+        for result in work.stream(tenants):
+            if result.status == 'skipped':
+                self.stdout.write(self.style.WARNING(f'  SKIP  {result.tenant.subdomain} — {result.error}'))
+            elif not result.ok:
+                self.stderr.write(self.style.ERROR(f'  {result.tenant.subdomain}: failed — {result.error}'))
+            else:
+                self._report(f'  {result.tenant.subdomain}: ', result.result)
+        self.stdout.write(f'  {work.stats.format()}')
+
+    def _assign(self, tenant, alias):
+        """Counts and duration for one database, or None when no zone has a boundary."""
+        if not get_zone_index(alias).size:
+            return None
+        start = time.perf_counter()
+        counts = assign_address_zones(
+            overwrite=self.options['overwrite'], chunk_size=self.options['chunk_size'], using=alias,
+        )
+        return {**counts, 'seconds': round(time.perf_counter() - start, 2)}
+
+    def _report(self, prefix, counts):
+        if counts is None:
+            self.stdout.write(self.style.WARNING(f'{prefix}No active zone has a boundary; nothing to resolve against.'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Checked {counts['checked']} addresses in {counts['seconds']:.2f}s: "
+            f"{counts['assigned']} assigned, {counts['unresolved']} unresolved."
+        ))
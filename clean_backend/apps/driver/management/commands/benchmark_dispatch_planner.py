@@ -0,0 +1,136 @@
+"""
+Benchmark the dispatch planner (``apps.driver.planner``).
+
+Seeds a day of N deliveries spread over a few zones and routes, with
+schedules, drivers and address coordinates, inside a transaction. It then
+times planning and saving, compares the planned distance with driving the
+same runs in route order, and rolls everything back.
+
+Usage:
+    python manage.py benchmark_dispatch_planner
+    python manage.py benchmark_dispatch_planner --stops 5000 --repeat 5
+"""
+import datetime
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.test.utils import CaptureQueriesContext
+
+from apps.driver.models import DeliveryDriver, DeliverySchedule, DeliveryStatus, Route, Zone
+from apps.driver.planner import path_length, plan_deliveries, save_plan
+from apps.main.models import Address, CustomerProfile, Subscription
+
+CENTRE = (25.2048, 55.2708)
+ZONES = 4
+ROUTES_PER_ZONE = 3
+WINDOWS = [(datetime.time(11, 0), datetime.time(14, 0)), (datetime.time(18, 0), datetime.time(21, 0))]
+
+
+class Command(BaseCommand):
+    help = 'Time the dispatch planner on a seeded day of deliveries (rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stops', type=int, default=2000, help='Deliveries to seed.')
+        parser.add_argument('--max-deliveries', type=int, default=40, help='Run size of the seeded schedules.')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed planning runs.')
+        parser.add_argument('--database', default='default', help='Database alias to use.')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        day = datetime.date.today() + datetime.timedelta(days=1)
+        with transaction.atomic(using=using):
+            self._seed(day, options['stops'], options['max_deliveries'], using)
+            self._run(day, options['repeat'], using)
+            transaction.set_rollback(True, using=using)
+
+    def _seed(self, day, stops, max_deliveries, using):
+        start = time.perf_counter()
+        tag = f"bench{int(time.time())}"
+        rng = random.Random(stops)
+
+        zones = Zone.objects.using(using).bulk_create([Zone(name=f'{tag}-zone-{i}') for i in range(ZONES)])
+        routes = Route.objects.using(using).bulk_create([
+            Route(name=f'route-{j}', zone=zone) for zone in zones for j in range(ROUTES_PER_ZONE)
+        ])
+        DeliverySchedule.objects.using(using).bulk_create([
+            DeliverySchedule(zone=zone, day_of_week=day.weekday(), start_time=start_time,
+                             end_time=end_time, max_deliveries=max_deliveries)
+            for zone in zones for start_time, end_time in WINDOWS
+        ])
+        for index, route in enumerate(routes):
+            driver = DeliveryDriver.objects.using(using).create(name=f'{tag} driver {index}', phone=f'{tag}-{index}')
+            driver.routes.add(route)
+            driver.zones.add(route.zone)
+
+        users = User.objects.using(using).bulk_create(
+            [User(username=f'{tag}-{i}') for i in range(stops)], batch_size=5000,
+        )
+        customers = CustomerProfile.objects.using(using).bulk_create([
+            CustomerProfile(user=user, name=f'Customer {i}', route=rng.choice(routes))
+            for i, user in enumerate(users)
+        ], batch_size=2000)
+        zone_index = {zone.pk: index for index, zone in enumerate(zones)}
+        addresses = []
+        for customer in customers:
+            quadrant = zone_index[customer.route.zone_id]
+            # Each zone is a quadrant around the centre, about 10 km across
+            lat = CENTRE[0] + (quadrant // 2 - 0.5) * 0.09 + rng.uniform(-0.045, 0.045)
+            lng = CENTRE[1] + (quadrant % 2 - 0.5) * 0.1 + rng.uniform(-0.05, 0.05)
+            addresses.append(Address(
+                customer=customer, zone_id=customer.route.zone_id, status='active',
+                building_name=f'Building {rng.randint(1, 400)}', street=f'Street {rng.randint(1, 60)}',
+                latitude=Decimal(f'{lat:.6f}'), longitude=Decimal(f'{lng:.6f}'),
+            ))
+        Address.objects.using(using).bulk_create(addresses, batch_size=2000)
+        subscriptions = Subscription.objects.using(using).bulk_create([
+            Subscription(customer=address.customer, lunch_address=address, status='active',
+                         start_date=day, end_date=day + datetime.timedelta(days=30))
+            for address in addresses
+        ], batch_size=2000)
+        DeliveryStatus.objects.using(using).bulk_create([
+            DeliveryStatus(
+                subscription=subscription, date=day, delivery_address=subscription.lunch_address,
+                delivery_time=rng.choice([None, datetime.time(rng.choice([12, 19]), rng.randint(0, 59))]),
+            )
+            for subscription in subscriptions
+        ], batch_size=2000)
+
+        with connections[using].cursor() as cursor:
+            cursor.execute('ANALYZE driver_deliverystatus')
+            cursor.execute('ANALYZE main_address')
+        self.stdout.write(f"Seeded {stops} deliveries in {time.perf_counter() - start:.2f}s")
+
+    def _run(self, day, repeat, using):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            with CaptureQueriesContext(connections[using]) as queries:
+                plan = plan_deliveries(day, using=using)
+            timings.append(time.perf_counter() - start)
+        summary = plan.summary()
+        self.stdout.write(
+            f"  planned {summary['stops']} stops into {summary['runs']} runs "
+            f"in {min(timings) * 1000:.0f} ms ({len(queries)} queries)"
+        )
+
+        route_order = sum(
+            path_length([stop.xy for stop in sorted(run.stops, key=lambda stop: stop.route_key)])
+            for run in plan.runs
+        )
+        self.stdout.write(
+            f"  distance {summary['distance_km']:.1f} km planned vs {route_order:.1f} km in route order"
+        )
+
+        start = time.perf_counter()
+        with CaptureQueriesContext(connections[using]) as queries:
+            written = save_plan(plan, using=using)
+        self.stdout.write(
+            f"  saved {written['created']} assignments in {(time.perf_counter() - start) * 1000:.0f} ms "
+            f"({len(queries)} queries)"
+        )
+        saving = 1 - summary['distance_km'] / route_order if route_order else 0
+        self.stdout.write(self.style.SUCCESS(f"Planned runs are {saving:.0%} shorter than route order."))
@@ -0,0 +1,135 @@
+"""
+Benchmark zone resolution (``apps.driver.zone_index``).
+
+Seeds a grid of irregular zone polygons over the city and resolves random
+points with the grid index and with a scan of every polygon. It then seeds
+N addresses without a zone and times ``assign_address_zones`` over them.
+Everything runs inside a transaction and is rolled back.
+
+Usage:
+    python manage.py benchmark_zone_lookup
+    python manage.py benchmark_zone_lookup --zones 400 --rows 20000
+"""
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from apps.driver.geo import point_in_polygon, polygon_area
+from apps.driver.models import Zone
+from apps.driver.zone_index import assign_address_zones, get_zone_index, zone_polygons
+from apps.main.models import Address, CustomerProfile
+from core.utils.conditional import bump_model_version, invalidate_model
+
+ORIGIN = (24.95, 55.0)
+SPAN = 0.4  # degrees, about 45 km
+
+
+class Command(BaseCommand):
+    help = 'Time grid-index zone lookups vs scanning every polygon, and bulk zone assignment (rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--zones', type=int, default=100, help='Zones to seed (rounded down to a square).')
+        parser.add_argument('--points', type=int, default=100_000, help='Points to resolve.')
+        parser.add_argument('--rows', type=int, default=100_000, help='Addresses to seed for bulk assignment.')
+        parser.add_argument('--database', default='default', help='Database alias to use.')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        rng = random.Random(options['points'])
+        with transaction.atomic(using=using):
+            self._seed_zones(options['zones'], rng, using)
+            self._lookups(options['points'], rng, using)
+            if options['rows']:
+                self._assign(options['rows'], rng, using)
+            transaction.set_rollback(True, using=using)
+        # Indexes built from the rolled-back zones are stale
+        bump_model_version(Zone, using)
+
+    def _seed_zones(self, zones, rng, using):
+        """A ``side`` x ``side`` grid of 8-sided zones sharing jittered edges, so they tile the area."""
+        side = max(1, int(zones ** 0.5))
+        step = SPAN / side
+        jitter = step / 5
+
+        def lattice(row, column):
+            # Shared by neighbouring zones; the outer border stays straight
+            dx = 0 if row in (0, 2 * side) else jitters.setdefault(('lat', row, column), rng.uniform(-jitter, jitter))
+            dy = 0 if column in (0, 2 * side) else jitters.setdefault(('lng', row, column), rng.uniform(-jitter, jitter))
+            return [round(ORIGIN[0] + row * step / 2 + dx, 6), round(ORIGIN[1] + column * step / 2 + dy, 6)]
+
+        jitters = {}
+        tag = f"bench{int(time.time())}"
+        ring_offsets = [(0, 0), (0, 1), (0, 2), (1, 2), (2, 2), (2, 1), (2, 0), (1, 0)]
+        Zone.objects.using(using).bulk_create([
+            Zone(
+                name=f'{tag}-zone-{row}-{column}',
+                boundary=[lattice(2 * row + dr, 2 * column + dc) for dr, dc in ring_offsets],
+            )
+            for row in range(side) for column in range(side)
+        ])
+        invalidate_model(Zone, using)  # bulk_create sends no signals
+        self.stdout.write(f"Seeded {side * side} zones")
+
+    def _lookups(self, points, rng, using):
+        sample = [
+            (ORIGIN[0] + rng.uniform(-0.02, SPAN + 0.02), ORIGIN[1] + rng.uniform(-0.02, SPAN + 0.02))
+            for _ in range(points)
+        ]
+        start = time.perf_counter()
+        index = get_zone_index(using)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        indexed = [index.lookup(point) for point in sample]
+        indexed_time = time.perf_counter() - start
+
+        polygons = sorted(zone_polygons(using), key=lambda zone: polygon_area(zone[1]))
+        start = time.perf_counter()
+        scanned = [
+            next((zone_id for zone_id, ring in polygons if point_in_polygon(point, ring)), None)
+            for point in sample
+        ]
+        scan_time = time.perf_counter() - start
+
+        mismatches = sum(1 for a, b in zip(indexed, scanned) if a != b)
+        resolved = sum(1 for zone_id in indexed if zone_id is not None)
+        self.stdout.write(f"  index built in {build * 1000:.1f} ms ({len(index.cells)} cells)")
+        self.stdout.write(
+            f"  {points} lookups: index {indexed_time * 1000:8.1f} ms "
+            f"({indexed_time / points * 1e6:.2f} us each), scan {scan_time * 1000:8.1f} ms; "
+            f"{resolved} in a zone, {mismatches} mismatches"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Grid index is {scan_time / indexed_time:.1f}x faster than a scan."))
+
+    def _assign(self, rows, rng, using):
+        start = time.perf_counter()
+        tag = f"bench{int(time.time())}"
+        users = User.objects.using(using).bulk_create(
+            [User(username=f'{tag}-{i}') for i in range(rows)], batch_size=5000,
+        )
+        customers = CustomerProfile.objects.using(using).bulk_create(
+            [CustomerProfile(user=user, name=f'Customer {i}') for i, user in enumerate(users)], batch_size=5000,
+        )
+        Address.objects.using(using).bulk_create([
+            Address(
+                customer=customer, street='Bench St', status='active',
+                latitude=Decimal(f'{ORIGIN[0] + rng.uniform(0, SPAN):.6f}'),
+                longitude=Decimal(f'{ORIGIN[1] + rng.uniform(0, SPAN):.6f}'),
+            )
+            for customer in customers
+        ], batch_size=5000)
+        with connections[using].cursor() as cursor:
+            cursor.execute('ANALYZE main_address')
+        self.stdout.write(f"Seeded {rows} addresses in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        counts = assign_address_zones(using=using)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"  assigned {counts['assigned']} of {counts['checked']} addresses in {elapsed:.2f}s "
+            f"({counts['checked'] / elapsed:.0f} addresses/s)"
+        )
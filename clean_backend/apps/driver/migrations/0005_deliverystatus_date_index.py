@@ -0,0 +1,16 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("driver", "0004_deliverydriver_user"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="deliverystatus",
+            index=models.Index(fields=["date"], name="deliverystatus_date_idx"),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("driver", "0005_deliverystatus_date_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="deliveryassignment",
+            name="run_number",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Driver run within the day's plan", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="deliveryassignment",
+            name="stop_number",
+            field=models.PositiveIntegerField(
+                blank=True, help_text="Position of the stop within its run", null=True
+            ),
+        ),
+    ]
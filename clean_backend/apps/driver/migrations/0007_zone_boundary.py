@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("driver", "0006_assignment_run_stop"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="zone",
+            name="boundary",
+            field=models.JSONField(
+                blank=True,
+                help_text="Zone polygon as a list of [lat, lng] points; addresses inside it resolve to this zone",
+                null=True,
+            ),
+        ),
+    ]
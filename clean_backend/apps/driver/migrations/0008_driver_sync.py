@@ -0,0 +1,81 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("driver", "0007_zone_boundary"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="deliveryassignment",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.CreateModel(
+            name="DriverSyncOperation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "operation_id",
+                    models.CharField(
+                        help_text="Id the app generated for this change", max_length=64
+                    ),
+                ),
+                ("status", models.CharField(blank=True, max_length=20)),
+                ("note", models.TextField(blank=True)),
+                (
+                    "client_timestamp",
+                    models.DateTimeField(
+                        help_text="When the change was made on the device"
+                    ),
+                ),
+                (
+                    "result",
+                    models.CharField(
+                        choices=[
+                            ("applied", "Applied"),
+                            ("stale", "Stale"),
+                            ("rejected", "Rejected"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("error", models.CharField(blank=True, max_length=200)),
+                ("received_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "assignment",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="sync_operations",
+                        to="driver.deliveryassignment",
+                    ),
+                ),
+                (
+                    "driver",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sync_operations",
+                        to="driver.deliverydriver",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-received_at"],
+                "unique_together": {("driver", "operation_id")},
+            },
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.core.validators import MinValueValidator
 from decimal import Decimal
@@ -20,6 +20,11 @@ class Zone(models.Model):
         default=30,
         help_text="Estimated delivery time in minutes"
     )
+    boundary = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Zone polygon as a list of [lat, lng] points; addresses inside it resolve to this zone"
+    )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
@@ -98,11 +103,23 @@ class DeliveryStatus(models.Model):
     def process_payment(self):
         """
         Process payment for this delivery.
+
+        The row is claimed with a conditional UPDATE before the wallet is
+        charged, so a copy read before another path (driver sync, the
+        scheduled job) charged it is not charged again.
         """
-        if not self.payment_processed and self.payment_amount:
-            # Create wallet transaction for payment
-            from apps.main.models import WalletTransaction
-            
+        if self.payment_processed or not self.payment_amount:
+            return False
+        from apps.main.models import WalletTransaction
+
+        using = self._state.db or 'default'
+        with transaction.atomic(using=using):
+            claimed = DeliveryStatus.objects.using(using).filter(
+                pk=self.pk, payment_processed=False,
+            ).update(payment_processed=True)
+            self.payment_processed = True
+            if not claimed:
+                return False
             WalletTransaction.objects.create(
                 customer=self.subscription.customer,
                 amount=self.payment_amount,
@@ -110,11 +127,7 @@ class DeliveryStatus(models.Model):
                 description=f'Payment for delivery on {self.date}',
                 subscription=self.subscription
             )
-            
-            self.payment_processed = True
-            self.save(update_fields=['payment_processed'])
-            return True
-        return False
+        return True
     
     def mark_as_delivered(self, actual_time=None):
         """
@@ -125,7 +138,7 @@ class DeliveryStatus(models.Model):
             self.actual_delivery_time = actual_time
         else:
             self.actual_delivery_time = timezone.now().time()
-        self.save(update_fields=['status', 'actual_delivery_time'])
+        self.save(update_fields=['status', 'actual_delivery_time', 'updated_at'])
         
         # Process payment if not already processed
         if not self.payment_processed:
@@ -136,6 +149,9 @@ class DeliveryStatus(models.Model):
         verbose_name_plural = "Delivery Statuses"
         ordering = ['-date', '-created_at']
         unique_together = ['subscription', 'date']
+        indexes = [
+            models.Index(fields=['date'], name='deliverystatus_date_idx'),
+        ]
 
 
 class DeliveryDriver(models.Model):
@@ -195,7 +211,12 @@ class DeliveryAssignment(models.Model):
     assigned_at = models.DateTimeField(auto_now_add=True)
     estimated_pickup_time = models.TimeField(blank=True, null=True)
     estimated_delivery_time = models.TimeField(blank=True, null=True)
+    # Set by the dispatch planner (apps/driver/planner.py)
+    run_number = models.PositiveIntegerField(null=True, blank=True, help_text="Driver run within the day's plan")
+    stop_number = models.PositiveIntegerField(null=True, blank=True, help_text="Position of the stop within its run")
     notes = models.TextField(blank=True, null=True)
+    # Driver apps pull what changed since this (apps/driver/sync.py)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     def __str__(self):
         return f"{self.delivery_status} - {self.driver.name if self.driver else 'Unassigned'}"
@@ -205,6 +226,45 @@ class DeliveryAssignment(models.Model):
         verbose_name_plural = "Delivery Assignments"
 
 
+class DriverSyncOperation(models.Model):
+    """
+    A change uploaded by a driver app, recorded so that a retried upload
+    is not applied twice.
+    """
+    RESULT_CHOICES = [
+        ('applied', 'Applied'),
+        ('stale', 'Stale'),
+        ('rejected', 'Rejected'),
+    ]
+
+    driver = models.ForeignKey(
+        DeliveryDriver,
+        on_delete=models.CASCADE,
+        related_name='sync_operations'
+    )
+    operation_id = models.CharField(max_length=64, help_text="Id the app generated for this change")
+    assignment = models.ForeignKey(
+        DeliveryAssignment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='sync_operations'
+    )
+    status = models.CharField(max_length=20, blank=True)
+    note = models.TextField(blank=True)
+    client_timestamp = models.DateTimeField(help_text="When the change was made on the device")
+    result = models.CharField(max_length=10, choices=RESULT_CHOICES)
+    error = models.CharField(max_length=200, blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.driver} - {self.operation_id} ({self.result})"
+
+    class Meta:
+        ordering = ['-received_at']
+        unique_together = ['driver', 'operation_id']
+
+
 class DeliverySchedule(models.Model):
     """
     Model for managing delivery schedules and time slots.
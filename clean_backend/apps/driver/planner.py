@@ -0,0 +1,404 @@
+"""
+Dispatch planning: a day's deliveries into ordered driver runs.
+
+``plan_deliveries(day)`` loads the day's pending and preparing
+deliveries with one query. Each delivery goes to the address it is
+delivered to (``DeliveryStatus.delivery_address``, else the subscription's
+lunch or dinner address), which gives it a zone, resolved from the
+address's location when it has none (``apps.driver.zone_index``). The
+customer's ``route`` gives it a route. Deliveries without a zone are
+reported as unplanned.
+
+1. Group the stops by zone and route.
+2. Put each group into the zone's ``DeliverySchedule`` windows for that
+   weekday. A stop with a ``delivery_time`` goes to the window that
+   contains it, or the closest one. Stops without a time fill the windows
+   in order, ``max_deliveries`` each. Overflow goes to the last window.
+   A zone with no schedule that day gets one all-day window.
+3. Split each window into runs of at most ``max_deliveries`` stops. Stops
+   are cut by angle around their centre (a sweep), so each run covers one
+   sector.
+4. Order the stops of a run. Stops with coordinates are ordered nearest
+   neighbour first, from the depot if one is configured, then improved
+   with 2-opt. Stops without coordinates follow in route order (route,
+   then building and street).
+5. Give each run a driver: one who is free during the window, assigned
+   to the route rather than just the zone, and least loaded so far. A
+   driver with an overlapping run is taken only when there is no one else.
+
+``save_plan`` writes the plan as DeliveryAssignments. New ones are made
+with one ``bulk_create`` and existing ones are changed with one
+``bulk_update``. It sets the run, the stop number and estimated times:
+pickup at the window start, then each leg at ``SPEED_KMH`` plus
+``SERVICE_MINUTES`` per stop (``UNKNOWN_LEG_MINUTES`` when a leg has no
+coordinates).
+"""
+import datetime
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.driver.geo import address_point, to_plane
+from apps.driver.models import DeliveryAssignment, DeliveryDriver, DeliverySchedule, DeliveryStatus
+from apps.driver.zone_index import get_zone_index
+from apps.main.utils.delivery_utils import get_delivery_address_for_subscription
+from core.db.router import get_current_db_alias
+
+PLANNED_STATUSES = ('pending', 'preparing')
+
+DEFAULTS = {
+    'SPEED_KMH': 25,
+    'SERVICE_MINUTES': 4,
+    'UNKNOWN_LEG_MINUTES': 6,
+    'DEPOT': None,  # (lat, lng) the runs start from
+    'TWO_OPT_MAX_STOPS': 150,
+}
+
+
+def planner_settings():
+    return {**DEFAULTS, **getattr(settings, 'DISPATCH_PLANNER', {})}
+
+
+@dataclass
+class Stop:
+    delivery_status_id: int
+    zone_id: int
+    route_id: int = None
+    delivery_time: datetime.time = None
+    point: tuple = None  # (lat, lng)
+    xy: tuple = None  # projected, km
+    route_key: tuple = ()
+
+
+@dataclass
+class Window:
+    start: datetime.time
+    end: datetime.time
+    max_deliveries: int
+
+
+@dataclass
+class Run:
+    number: int
+    zone_id: int
+    route_id: int
+    window: Window
+    stops: list = field(default_factory=list)
+    driver_id: int = None
+    distance_km: float = 0.0
+
+
+@dataclass
+class DispatchPlan:
+    day: datetime.date
+    runs: list = field(default_factory=list)
+    unplanned: list = field(default_factory=list)  # DeliveryStatus ids without a zone
+    depot: tuple = None  # projected, km
+
+    def summary(self):
+        return {
+            'date': self.day.isoformat(),
+            'runs': len(self.runs),
+            'stops': sum(len(run.stops) for run in self.runs),
+            'unplanned': len(self.unplanned),
+            'without_driver': sum(len(run.stops) for run in self.runs if run.driver_id is None),
+            'distance_km': round(sum(run.distance_km for run in self.runs), 2),
+        }
+
+
+# ─── Sequencing ───────────────────────────────────────────────────────────────
+
+def _distance(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def path_length(points, start=None):
+    """Length of the open path through ``points`` (from ``start`` if given)."""
+    path = ([start] if start is not None else []) + list(points)
+    return sum(_distance(path[i], path[i + 1]) for i in range(len(path) - 1))
+
+
+def nearest_neighbour(points, start=None):
+    """Indexes of ``points`` in greedy nearest-neighbour order."""
+    remaining = list(range(len(points)))
+    if not remaining:
+        return []
+    if start is None:
+        order = [remaining.pop(0)]
+        current = points[order[0]]
+    else:
+        order, current = [], start
+    while remaining:
+        best = min(remaining, key=lambda index: _distance(current, points[index]))
+        remaining.remove(best)
+        order.append(best)
+        current = points[best]
+    return order
+
+
+def two_opt(order, points, start=None, max_passes=20):
+    """Improve the open path ``order`` by reversing segments while that shortens it."""
+    order = list(order)
+    n = len(order)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(n - 1):
+            before = points[order[i - 1]] if i else start
+            first = points[order[i]]
+            for j in range(i + 1, n):
+                last = points[order[j]]
+                after = points[order[j + 1]] if j + 1 < n else None
+                delta = 0.0
+                if before is not None:
+                    delta += _distance(before, last) - _distance(before, first)
+                if after is not None:
+                    delta += _distance(first, after) - _distance(last, after)
+                if delta < -1e-9:
+                    order[i:j + 1] = reversed(order[i:j + 1])
+                    first = points[order[i]]
+                    improved = True
+        if not improved:
+            break
+    return order
+
+
+def sequence_stops(stops, start=None, two_opt_max=DEFAULTS['TWO_OPT_MAX_STOPS']):
+    """
+    ``stops`` in driving order: located stops by nearest neighbour plus
+    2-opt (from ``start``, an ``(x, y)``), then the rest in route order.
+    """
+    located = [stop for stop in stops if stop.xy is not None]
+    unlocated = sorted((stop for stop in stops if stop.xy is None), key=lambda stop: stop.route_key)
+    located.sort(key=lambda stop: stop.route_key)
+    points = [stop.xy for stop in located]
+    order = nearest_neighbour(points, start)
+    if len(order) <= two_opt_max:
+        order = two_opt(order, points, start)
+    return [located[index] for index in order] + unlocated
+
+
+def _sweep(stops, size):
+    """Split ``stops`` into chunks of at most ``size``, by angle around their centre."""
+    if len(stops) <= size:
+        return [stops]
+    located = [stop for stop in stops if stop.xy is not None]
+    unlocated = sorted((stop for stop in stops if stop.xy is None), key=lambda stop: stop.route_key)
+    if located:
+        cx = sum(stop.xy[0] for stop in located) / len(located)
+        cy = sum(stop.xy[1] for stop in located) / len(located)
+        located.sort(key=lambda stop: math.atan2(stop.xy[1] - cy, stop.xy[0] - cx))
+    ordered = located + unlocated
+    return [ordered[index:index + size] for index in range(0, len(ordered), size)]
+
+
+# ─── Planning ─────────────────────────────────────────────────────────────────
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def _windows_for(schedules):
+    if not schedules:
+        default = DeliverySchedule._meta.get_field('max_deliveries').default
+        return [Window(datetime.time(0, 0), datetime.time(23, 59), default)]
+    return [
+        Window(schedule.start_time, schedule.end_time, max(1, schedule.max_deliveries))
+        for schedule in sorted(schedules, key=lambda schedule: schedule.start_time)
+    ]
+
+
+def _bucket(stops, windows):
+    """``[(window, stops)]``: timed stops by window, untimed ones filling windows in order."""
+    buckets = [[] for _ in windows]
+    untimed = []
+    for stop in stops:
+        if stop.delivery_time is None:
+            untimed.append(stop)
+            continue
+        minute = _minutes(stop.delivery_time)
+        index = min(range(len(windows)), key=lambda i: (
+            0 if _minutes(windows[i].start) <= minute < _minutes(windows[i].end)
+            else min(abs(minute - _minutes(windows[i].start)), abs(minute - _minutes(windows[i].end)))
+        ))
+        buckets[index].append(stop)
+    for stop in untimed:
+        index = next(
+            (i for i, window in enumerate(windows) if len(buckets[i]) < window.max_deliveries),
+            len(windows) - 1,
+        )
+        buckets[index].append(stop)
+    return [(window, bucket) for window, bucket in zip(windows, buckets) if bucket]
+
+
+def _load_stops(day, alias, zone_ids=None):
+    deliveries = DeliveryStatus.objects.using(alias).filter(
+        date=day, status__in=PLANNED_STATUSES,
+    ).select_related(
+        'delivery_address', 'subscription__customer', 'subscription__time_slot',
+        'subscription__lunch_address', 'subscription__dinner_address',
+    ).order_by('pk')
+    stops, unplanned, points = [], [], []
+    zone_index = None
+    for delivery in deliveries:
+        subscription = delivery.subscription
+        address = delivery.delivery_address or get_delivery_address_for_subscription(subscription)
+        customer = subscription.customer
+        point = address_point(address, customer) if address else None
+        zone_id = address.zone_id if address else None
+        if zone_id is None and point is not None:
+            zone_index = zone_index or get_zone_index(alias)
+            zone_id = zone_index.lookup(point)
+        if zone_id is None:
+            unplanned.append(delivery.pk)
+            continue
+        if zone_ids and zone_id not in zone_ids:
+            continue
+        stops.append(Stop(
+            delivery_status_id=delivery.pk, zone_id=zone_id, route_id=customer.route_id,
+            delivery_time=delivery.delivery_time, point=point,
+            route_key=(customer.route_id or 0, address.building_name or '', address.street or '', delivery.pk),
+        ))
+        if point:
+            points.append(point)
+    if points:
+        reference = sum(point[0] for point in points) / len(points)
+        for stop in stops:
+            if stop.point:
+                stop.xy = to_plane(stop.point, reference)
+    return stops, unplanned, (reference if points else None)
+
+
+def _drivers(alias):
+    """Active drivers as ``({route_id: [ids]}, {zone_id: [ids]})``, in name order."""
+    by_route, by_zone = defaultdict(list), defaultdict(list)
+    drivers = DeliveryDriver.objects.using(alias).filter(is_active=True).prefetch_related('zones', 'routes')
+    for driver in drivers:
+        for route in driver.routes.all():
+            by_route[route.pk].append(driver.pk)
+        for zone in driver.zones.all():
+            by_zone[zone.pk].append(driver.pk)
+    return by_route, by_zone
+
+
+def plan_deliveries(day, zone_ids=None, using=None):
+    """Plan the deliveries of ``day`` (in ``zone_ids`` only, if given). Nothing is saved."""
+    alias = using or get_current_db_alias()
+    config = planner_settings()
+    stops, unplanned, reference = _load_stops(day, alias, set(zone_ids or ()))
+    plan = DispatchPlan(day=day, unplanned=unplanned)
+    if not stops:
+        return plan
+    if config['DEPOT'] and reference is not None:
+        plan.depot = to_plane(config['DEPOT'], reference)
+
+    schedules = defaultdict(list)
+    for schedule in DeliverySchedule.objects.using(alias).filter(
+        day_of_week=day.weekday(), is_active=True, zone__in={stop.zone_id for stop in stops},
+    ):
+        schedules[schedule.zone_id].append(schedule)
+    by_route, by_zone = _drivers(alias)
+    groups = defaultdict(list)
+    for stop in stops:
+        groups[(stop.zone_id, stop.route_id or 0)].append(stop)
+
+    load = defaultdict(int)
+    busy = defaultdict(list)
+    for (zone_id, route_id), group in sorted(groups.items()):
+        for window, bucket in _bucket(group, _windows_for(schedules.get(zone_id))):
+            for chunk in _sweep(bucket, window.max_deliveries):
+                ordered = sequence_stops(chunk, plan.depot, config['TWO_OPT_MAX_STOPS'])
+                run = Run(
+                    number=len(plan.runs) + 1, zone_id=zone_id, route_id=route_id or None,
+                    window=window, stops=ordered,
+                    distance_km=path_length([stop.xy for stop in ordered if stop.xy], plan.depot),
+                )
+                run.driver_id = _pick_driver(
+                    by_route.get(route_id, []), by_zone.get(zone_id, []), window, load, busy,
+                )
+                if run.driver_id:
+                    load[run.driver_id] += len(ordered)
+                    busy[run.driver_id].append(window)
+                plan.runs.append(run)
+    return plan
+
+
+def _pick_driver(route_drivers, zone_drivers, window, load, busy):
+    """Route drivers before zone drivers, free ones before busy ones, then the least loaded."""
+    tier = {driver_id: 1 for driver_id in zone_drivers}
+    tier.update({driver_id: 0 for driver_id in route_drivers})
+    if not tier:
+        return None
+
+    def key(driver_id):
+        overlaps = any(other.start < window.end and window.start < other.end for other in busy[driver_id])
+        return overlaps, tier[driver_id], load[driver_id], driver_id
+    return min(tier, key=key)
+
+
+# ─── Saving ───────────────────────────────────────────────────────────────────
+
+def _schedule_times(run, config, depot):
+    """Estimated arrival time at each stop of ``run``."""
+    clock = datetime.datetime.combine(datetime.date.min, run.window.start)
+    previous = depot
+    times = []
+    for stop in run.stops:
+        if previous is not None and stop.xy is not None:
+            travel = _distance(previous, stop.xy) / config['SPEED_KMH'] * 60
+        elif previous is None and stop.xy is not None and not times:
+            travel = 0
+        else:
+            travel = config['UNKNOWN_LEG_MINUTES']
+        clock += datetime.timedelta(minutes=travel)
+        times.append(min(clock, datetime.datetime.combine(datetime.date.min, datetime.time(23, 59))).time())
+        clock += datetime.timedelta(minutes=config['SERVICE_MINUTES'])
+        previous = stop.xy
+    return times
+
+
+def save_plan(plan, using=None):
+    """
+    Store ``plan`` as DeliveryAssignments in one transaction. Returns
+    ``{'created', 'updated'}``.
+    """
+    alias = using or get_current_db_alias()
+    config = planner_settings()
+    stop_ids = [stop.delivery_status_id for run in plan.runs for stop in run.stops]
+    with transaction.atomic(using=alias):
+        existing = {
+            assignment.delivery_status_id: assignment
+            for assignment in DeliveryAssignment.objects.using(alias)
+            .filter(delivery_status_id__in=stop_ids).select_for_update()
+        }
+        created, updated = [], []
+        now = timezone.now()
+        for run in plan.runs:
+            for number, (stop, eta) in enumerate(zip(run.stops, _schedule_times(run, config, plan.depot)), start=1):
+                assignment = existing.get(stop.delivery_status_id)
+                if assignment is None:
+                    assignment = DeliveryAssignment(delivery_status_id=stop.delivery_status_id)
+                    created.append(assignment)
+                else:
+                    updated.append(assignment)
+                assignment.driver_id = run.driver_id
+                assignment.run_number = run.number
+                assignment.stop_number = number
+                assignment.estimated_pickup_time = run.window.start
+                assignment.estimated_delivery_time = eta
+                assignment.updated_at = now
+        DeliveryAssignment.objects.using(alias).bulk_create(created, batch_size=1000)
+        DeliveryAssignment.objects.using(alias).bulk_update(updated, [
+            'driver', 'run_number', 'stop_number', 'estimated_pickup_time', 'estimated_delivery_time', 'updated_at',
+        ], batch_size=1000)
+    return {'created': len(created), 'updated': len(updated)}
+
+
+def dispatch_day(day, zone_ids=None, dry_run=False, using=None):
+    """Plan ``day`` and, unless ``dry_run``, save the plan. Returns the plan and what was written."""
+    plan = plan_deliveries(day, zone_ids=zone_ids, using=using)
+    written = None if dry_run else save_plan(plan, using=using)
+    return plan, written
@@ -0,0 +1,22 @@
+"""Scheduled jobs for delivery payments (see apps/jobs/scheduler.py)."""
+from django.db import transaction
+
+from apps.driver.models import DeliveryStatus
+from apps.jobs.scheduler import for_each_tenant, scheduled_job
+
+
+@scheduled_job('process_delivery_payments', cron={'minute': '*/30'}, min_gap=600,
+               enabled_setting='PAYMENT_AUTO_PROCESS')
+def process_delivery_payments():
+    """Charge delivered deliveries whose payment was not processed (every 30 minutes)."""
+    def process(tenant, alias):
+        pending = DeliveryStatus.objects.using(alias).filter(
+            status='delivered', payment_processed=False, payment_amount__gt=0,
+        ).select_related('subscription__customer')
+        processed = 0
+        for delivery_status in pending.iterator(chunk_size=500):
+            with transaction.atomic(using=alias):
+                processed += delivery_status.process_payment()
+        return {'processed': processed}
+
+    return {'tenants': for_each_tenant(process)}
@@ -2,6 +2,7 @@
 Admin-facing serializers for Zone, Route, DeliveryDriver, Schedule management.
 """
 from rest_framework import serializers
+from apps.driver.geo import decode_plus_code, validate_polygon
 from apps.driver.models import (
     Zone, Route, DeliveryDriver, DeliveryAssignment,
     DeliverySchedule, DeliveryStatus,
@@ -16,7 +17,7 @@ class ZoneSerializer(serializers.ModelSerializer):
         model = Zone
         fields = [
             'id', 'name', 'description', 'delivery_fee',
-            'estimated_delivery_time', 'is_active', 'route_count',
+            'estimated_delivery_time', 'boundary', 'is_active', 'route_count',
             'assigned_driver_count', 'created_at',
         ]
         read_only_fields = ['created_at']
@@ -24,6 +25,14 @@ class ZoneSerializer(serializers.ModelSerializer):
     def get_assigned_driver_count(self, obj):
         return obj.assigned_drivers.count()
 
+    def validate_boundary(self, value):
+        if value is None:
+            return value
+        try:
+            return [list(vertex) for vertex in validate_polygon(value)]
+        except ValueError as exc:
+            raise serializers.ValidationError(str(exc))
+
 
 class RouteSerializer(serializers.ModelSerializer):
     zone_name = serializers.CharField(source='zone.name', read_only=True)
@@ -159,6 +168,31 @@ class DeliveryAssignmentAdminSerializer(serializers.ModelSerializer):
             'id', 'delivery_status', 'driver', 'driver_name',
             'delivery_date', 'delivery_status_value',
             'assigned_at', 'estimated_pickup_time', 'estimated_delivery_time',
-            'notes',
+            'run_number', 'stop_number', 'notes',
         ]
         read_only_fields = ['assigned_at']
+
+
+class ZoneResolveSerializer(serializers.Serializer):
+    """A location to resolve to a zone: lat/lng or a full plus code."""
+    lat = serializers.FloatField(required=False, min_value=-90, max_value=90)
+    lng = serializers.FloatField(required=False, min_value=-180, max_value=180)
+    plus_code = serializers.CharField(required=False)
+
+    def validate(self, attrs):
+        if 'plus_code' in attrs:
+            point = decode_plus_code(attrs['plus_code'])
+            if point is None:
+                raise serializers.ValidationError({'plus_code': 'Only full plus codes can be resolved.'})
+        elif 'lat' in attrs and 'lng' in attrs:
+            point = (attrs['lat'], attrs['lng'])
+        else:
+            raise serializers.ValidationError('Send lat and lng, or plus_code.')
+        return {'point': point}
+
+
+class DispatchPlanRequestSerializer(serializers.Serializer):
+    """Input of the dispatch planner: which day, optionally which zones."""
+    date = serializers.DateField()
+    zones = serializers.PrimaryKeyRelatedField(queryset=Zone.objects.all(), many=True, required=False)
+    dry_run = serializers.BooleanField(default=False)
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from apps.driver.models import DeliveryAssignment, DeliveryStatus
+from apps.driver.sync import SYNC_STATUSES, decode_cursor, sync_settings
 from apps.main.serializers.customer_serializers import AddressSerializer
 
 class DeliveryStatusSerializer(serializers.ModelSerializer):
@@ -30,3 +31,41 @@ class DeliveryAssignmentSerializer(serializers.ModelSerializer):
             'id', 'delivery_status', 'delivery_details',
             'estimated_pickup_time', 'estimated_delivery_time', 'notes'
         ]
+
+
+class DriverSyncPullSerializer(serializers.Serializer):
+    """Query of a sync pull: the cursor of the last pull and, optionally, a single day."""
+    cursor = serializers.CharField(required=False)
+    date = serializers.DateField(required=False)
+
+    def validate_cursor(self, value):
+        try:
+            decode_cursor(value)
+        except (ValueError, OverflowError):
+            raise serializers.ValidationError('Invalid cursor.')
+        return value
+
+
+class DriverSyncOperationSerializer(serializers.Serializer):
+    """One change made offline: a status, a note, or both."""
+    op = serializers.CharField(max_length=64)
+    assignment = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=SYNC_STATUSES, required=False)
+    note = serializers.CharField(required=False, max_length=1000)
+    at = serializers.DateTimeField()
+
+    def validate(self, attrs):
+        if not attrs.get('status') and not attrs.get('note'):
+            raise serializers.ValidationError('Send a status, a note, or both.')
+        return attrs
+
+
+class DriverSyncPushSerializer(serializers.Serializer):
+    operations = DriverSyncOperationSerializer(many=True, allow_empty=False)
+
+    def validate_operations(self, value):
+        limit = sync_settings()['MAX_BATCH']
+        if len(value) > limit:
+            raise serializers.ValidationError(f'At most {limit} operations per upload.')
+        return value
+
@@ -0,0 +1,10 @@
+"""
+Signal wiring for the driver app.
+
+Zone responses support conditional GETs, so the per-tenant versions of
+the models they are built from are tracked (``core.utils.conditional``).
+"""
+from apps.driver.models import DeliveryDriver, Route, Zone
+from core.utils.conditional import track_model_versions
+
+track_model_versions(Zone, Route, DeliveryDriver)
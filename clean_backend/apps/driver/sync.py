@@ -0,0 +1,259 @@
+"""
+Offline sync for driver apps.
+
+Pull (``pull``): the driver's assignments that changed since a cursor.
+An assignment counts as changed when it or its DeliveryStatus was
+updated. Rows come back as arrays in ``PULL_FIELDS`` order, oldest change
+first, ``PAGE_SIZE`` at a time. Each response carries:
+
+- ``cursor`` for the next pull, and ``more`` while pages remain;
+- ``ids``: every assignment the driver currently has in the window, so
+  the app can drop deliveries reassigned or deleted since.
+
+A row's address is the one the planner routes to: the DeliveryStatus's
+``delivery_address``, else the subscription's lunch or dinner address by
+its time slot (``get_delivery_address_for_subscription``).
+
+A change can commit after a later one has been read, so a caught-up
+cursor stays ``CURSOR_LAG`` seconds behind the clock. Rows changed in
+that margin come again on the next pull, and apps upsert them by id.
+
+Push (``push``): a batch of changes the app made offline. Each change is
+a status (``out_for_delivery`` or ``delivered``), a note, or both, with
+an id the app generated and the time it was made on the device. The
+batch is applied in one transaction, in device-time order, and each
+change is logged (``DriverSyncOperation``):
+
+- A change whose id is already logged is not applied again. A retried
+  upload gets the original outcome.
+- A status older than one already applied, or one that does not move
+  the delivery forward, is ``stale`` and skipped (a note sent with it is still
+  added).
+- Changes to other drivers' or cancelled deliveries are ``rejected``.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.driver.models import DeliveryAssignment, DeliveryDriver, DeliveryStatus, DriverSyncOperation
+from apps.main.utils.delivery_utils import meal_of_slot
+from core.db.router import get_current_db_alias
+
+DEFAULTS = {
+    'PAGE_SIZE': 500,
+    'MAX_BATCH': 200,
+    'CURSOR_LAG': 10,  # seconds
+    'DAYS_AHEAD': 1,  # pulls cover today and this many days after
+}
+
+SYNC_STATUSES = ('out_for_delivery', 'delivered')
+# How far along a delivery is; a change may only move it forward
+STATUS_PROGRESS = {'pending': 0, 'preparing': 0, 'out_for_delivery': 1, 'delivered': 2, 'failed': 2}
+
+PULL_FIELDS = [
+    'id', 'delivery', 'date', 'status', 'time', 'eta', 'run', 'stop',
+    'customer', 'phone', 'address', 'lat', 'lng', 'notes', 'driver_notes', 'customer_notes', 'amount',
+]
+# The delivery's own address, then the subscription's, as in get_delivery_address_for_subscription
+_ADDRESSES = (
+    'delivery_status__delivery_address',
+    'delivery_status__subscription__lunch_address',
+    'delivery_status__subscription__dinner_address',
+)
+_ADDRESS_FIELDS = ('id', 'building_name', 'flat_number', 'street', 'city', 'latitude', 'longitude')
+
+_PULL_COLUMNS = [
+    'pk', 'delivery_status_id', 'delivery_status__date', 'delivery_status__status',
+    'delivery_status__delivery_time', 'estimated_delivery_time', 'run_number', 'stop_number',
+    'delivery_status__subscription__customer__name', 'delivery_status__subscription__customer__phone',
+    'delivery_status__subscription__time_slot__name', 'delivery_status__subscription__time_slot__code',
+    *(f'{address}__{field}' for address in _ADDRESSES for field in _ADDRESS_FIELDS),
+    'notes', 'delivery_status__driver_notes', 'delivery_status__customer_notes',
+    'delivery_status__payment_amount', 'changed',
+]
+
+
+def sync_settings():
+    return {**DEFAULTS, **getattr(settings, 'DRIVER_SYNC', {})}
+
+
+def driver_for_user(user, using=None):
+    """The DeliveryDriver of ``user``: the linked profile, else the driver with the user's email."""
+    alias = using or get_current_db_alias()
+    drivers = DeliveryDriver.objects.using(alias)
+    driver = drivers.filter(user_id=user.pk).first()
+    if driver is None and user.email:
+        driver = drivers.filter(email=user.email).first()
+    return driver
+
+
+# ─── Cursors ──────────────────────────────────────────────────────────────────
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def encode_cursor(changed, pk):
+    """``changed`` (to the microsecond) and ``pk`` as an opaque string."""
+    return f"{(changed - _EPOCH) // datetime.timedelta(microseconds=1)}-{pk}"
+
+
+def decode_cursor(cursor):
+    """``(changed, pk)`` of ``cursor``; ValueError if it is not one."""
+    micros, _, pk = cursor.partition('-')
+    return _EPOCH + datetime.timedelta(microseconds=int(micros)), int(pk)
+
+
+# ─── Pull ─────────────────────────────────────────────────────────────────────
+
+def _address(slot_name, slot_code, values):
+    """The address columns of the delivery's address, else of the subscription's for its slot."""
+    size = len(_ADDRESS_FIELDS)
+    delivered_to, lunch, dinner = (values[index:index + size] for index in range(0, 3 * size, size))
+    if delivered_to[0] is not None:
+        return delivered_to
+    meal = meal_of_slot(slot_name, slot_code)
+    if meal:
+        return lunch if meal == 'lunch' else dinner
+    return lunch if lunch[0] is not None else dinner
+
+
+def _row(values):
+    pk, delivery_id, day, status, time, eta, run, stop, customer, phone, slot_name, slot_code = values[:12]
+    addresses_end = 12 + 3 * len(_ADDRESS_FIELDS)
+    _, building, flat, street, city, lat, lng = _address(slot_name, slot_code, values[12:addresses_end])
+    notes, driver_notes, customer_notes, amount, _ = values[addresses_end:]
+    address = ', '.join(part for part in (flat, building, street, city) if part)
+    return [
+        pk, delivery_id, day.isoformat(), status,
+        time.strftime('%H:%M') if time else None, eta.strftime('%H:%M') if eta else None, run, stop,
+        customer or '', phone or '', address,
+        float(lat) if lat is not None else None, float(lng) if lng is not None else None,
+        notes or '', driver_notes or '', customer_notes or '', str(amount) if amount is not None else None,
+    ]
+
+
+def pull(driver, cursor=None, day=None, using=None):
+    """
+    The driver's assignments changed since ``cursor`` (everything if None),
+    for ``day`` or for today and the next ``DAYS_AHEAD`` days.
+    """
+    alias = using or get_current_db_alias()
+    config = sync_settings()
+    now = timezone.now()
+    if day is None:
+        today = timezone.localdate()
+        days = (today, today + datetime.timedelta(days=config['DAYS_AHEAD']))
+    else:
+        days = (day, day)
+    since = decode_cursor(cursor) if cursor else None
+
+    assignments = DeliveryAssignment.objects.using(alias).filter(driver=driver, delivery_status__date__range=days)
+    changed = assignments.annotate(changed=Greatest('updated_at', 'delivery_status__updated_at'))
+    if since:
+        changed = changed.filter(Q(changed__gt=since[0]) | Q(changed=since[0], pk__gt=since[1]))
+    rows = list(changed.order_by('changed', 'pk').values_list(*_PULL_COLUMNS)[:config['PAGE_SIZE'] + 1])
+
+    more = len(rows) > config['PAGE_SIZE']
+    if more:
+        rows = rows[:-1]
+        next_cursor = (rows[-1][-1], rows[-1][0])
+    else:
+        next_cursor = max((now - datetime.timedelta(seconds=config['CURSOR_LAG']), 0), since or (_EPOCH, 0))
+    return {
+        'cursor': encode_cursor(*next_cursor),
+        'more': more,
+        'fields': PULL_FIELDS,
+        'rows': [_row(values) for values in rows],
+        'ids': list(assignments.order_by('pk').values_list('pk', flat=True)),
+    }
+
+
+# ─── Push ─────────────────────────────────────────────────────────────────────
+
+def _apply(operation, delivery, last_status_at):
+    """Apply ``operation`` to ``delivery`` in memory; ``(result, error)``."""
+    if delivery.status == 'cancelled':
+        return 'rejected', 'Delivery was cancelled.'
+    status = operation.get('status')
+    if status:
+        current = STATUS_PROGRESS.get(delivery.status, 0)
+        previous_at = last_status_at.get(delivery.pk)
+        if STATUS_PROGRESS[status] <= current or (previous_at and operation['at'] < previous_at):
+            if not operation.get('note'):
+                return 'stale', ''
+        else:
+            delivery.status = status
+            if status == 'delivered':
+                delivery.actual_delivery_time = timezone.localtime(operation['at']).time()
+            last_status_at[delivery.pk] = operation['at']
+    if operation.get('note'):
+        note = operation['note']
+        delivery.driver_notes = f"{delivery.driver_notes}\n{note}" if delivery.driver_notes else note
+    return 'applied', ''
+
+
+def push(driver, operations, using=None):
+    """
+    Apply ``operations`` (dicts with ``op``, ``assignment``, ``at`` and
+    ``status`` and/or ``note``) for ``driver``. Returns
+    ``{'applied': [op, ...], 'stale': [op, ...], 'rejected': {op: error}}``.
+    """
+    alias = using or get_current_db_alias()
+    now = timezone.now()
+    outcome = {'applied': [], 'stale': [], 'rejected': {}}
+
+    with transaction.atomic(using=alias):
+        # Locked first, so a concurrent retry of this batch waits and then sees its log
+        deliveries = {
+            delivery.assignment.pk: delivery
+            for delivery in DeliveryStatus.objects.using(alias).select_for_update(of=('self',)).filter(
+                assignment__driver=driver, assignment__pk__in={operation['assignment'] for operation in operations},
+            ).select_related('assignment')
+        }
+        logged = {
+            entry.operation_id: entry for entry in DriverSyncOperation.objects.using(alias).filter(
+                driver=driver, operation_id__in=[operation['op'] for operation in operations],
+            )
+        }
+        last_status_at = dict(
+            DriverSyncOperation.objects.using(alias).filter(
+                assignment__in=list(deliveries), result='applied',
+            ).exclude(status='').values('assignment__delivery_status_id').annotate(
+                latest=Max('client_timestamp'),
+            ).values_list('assignment__delivery_status_id', 'latest')
+        )
+
+        log, touched = [], {}
+        ordered = sorted(enumerate(operations), key=lambda item: (item[1]['at'], item[0]))
+        for _, operation in ordered:
+            entry = logged.get(operation['op'])
+            if entry is None:
+                delivery = deliveries.get(operation['assignment'])
+                operation['at'] = min(operation['at'], now)
+                if delivery is None:
+                    result, error = 'rejected', 'Not one of your deliveries.'
+                else:
+                    result, error = _apply(operation, delivery, last_status_at)
+                    if result == 'applied':
+                        touched[delivery.pk] = delivery
+                entry = logged[operation['op']] = DriverSyncOperation(
+                    driver=driver, operation_id=operation['op'], assignment_id=operation['assignment'] if delivery else None,
+                    status=operation.get('status') or '', note=operation.get('note') or '',
+                    client_timestamp=operation['at'], result=result, error=error,
+                )
+                log.append(entry)
+            if entry.result == 'rejected':
+                outcome['rejected'][entry.operation_id] = entry.error
+            elif entry.operation_id not in outcome[entry.result]:
+                outcome[entry.result].append(entry.operation_id)
+
+        for delivery in touched.values():
+            delivery.save(update_fields=['status', 'actual_delivery_time', 'driver_notes', 'updated_at'])
+            if delivery.status == 'delivered' and not delivery.payment_processed:
+                delivery.process_payment()
+        DriverSyncOperation.objects.using(alias).bulk_create(log, ignore_conflicts=True)
+    return outcome
@@ -0,0 +1,151 @@
+import datetime
+import io
+import random
+from decimal import Decimal
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from apps.driver.geo import decode_plus_code
+from apps.driver.models import DeliveryAssignment, DeliveryDriver, DeliverySchedule, DeliveryStatus, Route, Zone
+from apps.driver.planner import Stop, path_length, plan_deliveries, save_plan, sequence_stops
+from apps.main.models import Address, CustomerProfile, Subscription
+
+User = get_user_model()
+DAY = datetime.date(2030, 1, 7)  # a Monday
+
+
+def test_decode_plus_code():
+    lat, lng = decode_plus_code('7HQQ67V8+WV')
+    assert lat == pytest.approx(25.24481, abs=1e-4) and lng == pytest.approx(55.26719, abs=1e-4)
+    assert decode_plus_code('7hqq67v8+wv') == (lat, lng)
+    assert decode_plus_code('7HQQ6700+') == (25.225, 55.275)
+    # Short codes need a reference location; anything else is not a code
+    assert decode_plus_code('67V8+WV') is None
+    assert decode_plus_code('7HQQ67V8WV') is None
+    assert decode_plus_code('7HQQ67V8+AB') is None
+    assert decode_plus_code('') is None
+
+
+def test_sequencing_beats_input_order():
+    rng = random.Random(7)
+    stops = [
+        Stop(delivery_status_id=index, zone_id=1, xy=(rng.uniform(0, 10), rng.uniform(0, 10)), route_key=(index,))
+        for index in range(2000)
+    ]
+    ordered = sequence_stops(stops)
+    assert sorted(stop.delivery_status_id for stop in ordered) == list(range(2000))
+    assert path_length([stop.xy for stop in ordered]) < path_length([stop.xy for stop in stops]) / 5
+
+    # 2-opt undoes a crossing that nearest neighbour leaves behind
+    square = [Stop(index, 1, xy=xy, route_key=(index,)) for index, xy in enumerate([(0, 0), (1, 1), (1, 0), (0, 1)])]
+    assert path_length([stop.xy for stop in sequence_stops(square)]) == pytest.approx(3)
+
+    # Stops without coordinates follow, in route order
+    unlocated = [Stop(10, 1, route_key=(2, 'B')), Stop(11, 1, route_key=(1, 'A'))]
+    assert [stop.delivery_status_id for stop in sequence_stops(square + unlocated)][-2:] == [11, 10]
+
+
+@pytest.mark.django_db
+class TestDispatchPlanner:
+
+    def setup_method(self):
+        self.zone = Zone.objects.create(name='Marina')
+        self.route = Route.objects.create(name='North', zone=self.zone)
+        self.other_route = Route.objects.create(name='South', zone=self.zone)
+        DeliverySchedule.objects.create(
+            zone=self.zone, day_of_week=DAY.weekday(),
+            start_time=datetime.time(11), end_time=datetime.time(14), max_deliveries=3,
+        )
+        DeliverySchedule.objects.create(
+            zone=self.zone, day_of_week=DAY.weekday(),
+            start_time=datetime.time(18), end_time=datetime.time(21), max_deliveries=3,
+        )
+        self.route_driver = DeliveryDriver.objects.create(name='Route driver', phone='1')
+        self.route_driver.routes.add(self.route)
+        self.zone_driver = DeliveryDriver.objects.create(name='Zone driver', phone='2')
+        self.zone_driver.zones.add(self.zone)
+        self.deliveries = []
+
+    def _delivery(self, index, route=None, delivery_time=None, zone=True, plus_code=''):
+        user = User.objects.create_user(username=f'planner{index}')
+        customer = CustomerProfile.objects.create(user=user, route=route or self.route, plus_code=plus_code)
+        address = Address.objects.create(
+            customer=customer, zone=self.zone if zone else None, building_name=f'B{index:02d}',
+            latitude=None if plus_code else Decimal('25.08') + Decimal(index % 5) / 100,
+            longitude=None if plus_code else Decimal('55.14') + Decimal(index // 5) / 100,
+        )
+        subscription = Subscription.objects.bulk_create([Subscription(
+            customer=customer, lunch_address=address, status='active', start_date=DAY, end_date=DAY,
+        )])[0]
+        delivery = DeliveryStatus.objects.create(subscription=subscription, date=DAY, delivery_time=delivery_time)
+        self.deliveries.append(delivery)
+        return delivery
+
+    def test_runs_respect_capacity_windows_and_routes(self):
+        evening = [self._delivery(index, delivery_time=datetime.time(19, index)) for index in range(2)]
+        for index in range(2, 9):
+            self._delivery(index)
+        south = self._delivery(9, route=self.other_route, plus_code='7HQQ67V8+WV')
+        unzoned = self._delivery(10, zone=False)
+
+        plan = plan_deliveries(DAY)
+        assert plan.unplanned == [unzoned.pk]
+        assert all(len(run.stops) <= 3 for run in plan.runs)
+        north = [run for run in plan.runs if run.route_id == self.route.pk]
+        # 7 untimed stops: 3 at lunch, the rest overflow into the evening with the 2 timed ones
+        assert [(run.window.start.hour, len(run.stops)) for run in north] == [(11, 3), (18, 3), (18, 3)]
+        assert {stop.delivery_status_id for stop in north[1].stops + north[2].stops} >= {d.pk for d in evening}
+        # The two evening runs overlap, so the second goes to the zone driver
+        assert [run.driver_id for run in north] == [self.route_driver.pk, self.route_driver.pk, self.zone_driver.pk]
+        south_run = next(run for run in plan.runs if run.route_id == self.other_route.pk)
+        assert south_run.stops[0].point is not None and south_run.driver_id == self.zone_driver.pk
+        assert [stop.delivery_status_id for stop in south_run.stops] == [south.pk]
+
+    def test_save_plan_creates_then_updates(self, django_assert_max_num_queries):
+        for index in range(5):
+            self._delivery(index)
+        existing = DeliveryAssignment.objects.create(delivery_status=self.deliveries[0], notes='Gate code 42')
+
+        plan = plan_deliveries(DAY)
+        with django_assert_max_num_queries(5):
+            assert save_plan(plan) == {'created': 4, 'updated': 1}
+        assignments = DeliveryAssignment.objects.order_by('run_number', 'stop_number')
+        assert [(a.run_number, a.stop_number) for a in assignments] == [(1, 1), (1, 2), (1, 3), (2, 1), (2, 2)]
+        first_run = [a for a in assignments if a.run_number == 1]
+        assert all(a.estimated_pickup_time == datetime.time(11) for a in first_run)
+        times = [a.estimated_delivery_time for a in first_run]
+        assert times == sorted(times) and times[0] == datetime.time(11)
+        existing.refresh_from_db()
+        assert existing.notes == 'Gate code 42' and existing.run_number is not None
+
+        assert save_plan(plan_deliveries(DAY)) == {'created': 0, 'updated': 5}
+        assert DeliveryAssignment.objects.count() == 5
+
+    def test_plan_endpoint(self):
+        for index in range(4):
+            self._delivery(index)
+        client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        client.force_authenticate(user=User.objects.create_superuser('planner_admin', 'admin@example.com', 'x'))
+
+        response = client.post('/api/v1/driver/assignments/plan/', {'date': DAY, 'dry_run': True}, format='json')
+        assert response.status_code == 200
+        assert response.data['stops'] == 4 and response.data['runs'] == 2 and response.data['saved'] is None
+        assert not DeliveryAssignment.objects.exists()
+
+        response = client.post('/api/v1/driver/assignments/plan/', {'date': DAY, 'zones': [self.zone.pk]}, format='json')
+        assert response.data['saved'] == {'created': 4, 'updated': 0}
+        assert sorted(stop for run in response.data['plan'] for stop in run['stops']) == sorted(
+            delivery.pk for delivery in self.deliveries
+        )
+        assert client.post('/api/v1/driver/assignments/plan/', {}, format='json').status_code == 400
+
+
+@pytest.mark.django_db
+def test_benchmark_command():
+    out = io.StringIO()
+    call_command('benchmark_dispatch_planner', stops=200, repeat=1, stdout=out)
+    assert 'planned 200 stops' in out.getvalue() and 'shorter than route order' in out.getvalue()
+    assert not DeliveryStatus.objects.exists()
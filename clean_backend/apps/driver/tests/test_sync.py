@@ -0,0 +1,183 @@
+import datetime
+import gzip
+import json
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.driver.models import DeliveryAssignment, DeliveryDriver, DeliveryStatus, DriverSyncOperation
+from apps.main.models import Address, CustomerProfile, MealSlot, Subscription
+
+User = get_user_model()
+URL = '/api/v1/driver/deliveries/sync/'
+
+
+@pytest.fixture(autouse=True)
+def sync_settings(settings):
+    settings.DRIVER_SYNC = {**settings.DRIVER_SYNC, 'CURSOR_LAG': 0}
+
+
+@pytest.mark.django_db
+class TestDriverSync:
+
+    def setup_method(self):
+        self.user = User.objects.create_user(username='sync_driver')
+        self.driver = DeliveryDriver.objects.create(name='Sync driver', phone='100', user=self.user)
+        self.other = DeliveryDriver.objects.create(name='Other driver', phone='200')
+        customer = CustomerProfile.objects.create(user=User.objects.create_user(username='sync_cust'), name='Sara')
+        address = Address.objects.create(customer=customer, building_name='Marina Tower', flat_number='1204')
+        today = timezone.localdate()
+        self.assignments = []
+        for offset in range(4):
+            subscription = Subscription.objects.bulk_create([Subscription(
+                customer=customer, lunch_address=address, start_date=today, end_date=today,
+            )])[0]
+            delivery = DeliveryStatus.objects.create(
+                subscription=subscription, date=today + datetime.timedelta(days=offset // 3),
+                delivery_address=address,
+            )
+            self.assignments.append(DeliveryAssignment.objects.create(delivery_status=delivery, driver=self.driver))
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.client.force_authenticate(user=self.user)
+
+    def _pull(self, **params):
+        response = self.client.get(URL, params)
+        assert response.status_code == 200
+        return response.json()
+
+    def _push(self, *operations):
+        return self.client.post(URL, {'operations': list(operations)}, format='json')
+
+    def _at(self, minutes):
+        return (timezone.now() - datetime.timedelta(minutes=60 - minutes)).isoformat()
+
+    def test_delta_pulls(self, django_assert_max_num_queries):
+        with django_assert_max_num_queries(3):
+            first = self._pull()
+        ids = [assignment.pk for assignment in self.assignments]
+        assert sorted(row[0] for row in first['rows']) == first['ids'] == ids
+        row = dict(zip(first['fields'], first['rows'][0]))
+        assert row['customer'] == 'Sara' and row['address'] == '1204, Marina Tower' and row['status'] == 'pending'
+
+        assert self._pull(cursor=first['cursor'])['rows'] == []
+
+        changed = self.assignments[1].delivery_status
+        changed.customer_notes = 'Leave at the door'
+        changed.save()
+        moved = self.assignments[2]
+        moved.driver = self.other
+        moved.save()
+        delta = self._pull(cursor=first['cursor'])
+        assert [row[0] for row in delta['rows']] == [self.assignments[1].pk]
+        assert delta['rows'][0][first['fields'].index('customer_notes')] == 'Leave at the door'
+        # The reassigned delivery is gone from the ids, so the app drops it
+        assert delta['ids'] == [ids[0], ids[1], ids[3]]
+
+        day = self._pull(date=timezone.localdate().isoformat())
+        assert day['ids'] == [ids[0], ids[1]]
+
+    def test_address_falls_back_to_the_subscription(self):
+        customer = CustomerProfile.objects.get(name='Sara')
+        lunch = Address.objects.create(customer=customer, street='Al Sufouh Rd', city='Dubai')
+        dinner = Address.objects.create(
+            customer=customer, building_name='Palm Villa', latitude='25.1124', longitude='55.1390',
+        )
+        dinner_slot = MealSlot.objects.create(name='Dinner', code='dinner')
+        for assignment, time_slot in zip(self.assignments[:2], (dinner_slot, None)):
+            Subscription.objects.filter(pk=assignment.delivery_status.subscription_id).update(
+                lunch_address=lunch, dinner_address=dinner, time_slot=time_slot,
+            )
+        DeliveryStatus.objects.filter(pk__in=[a.delivery_status_id for a in self.assignments[:2]]).update(
+            delivery_address=None,
+        )
+
+        pulled = self._pull()
+        rows = {row[0]: dict(zip(pulled['fields'], row)) for row in pulled['rows']}
+        by_slot, unslotted = rows[self.assignments[0].pk], rows[self.assignments[1].pk]
+        assert by_slot['address'] == 'Palm Villa' and (by_slot['lat'], by_slot['lng']) == (25.1124, 55.139)
+        assert unslotted['address'] == 'Al Sufouh Rd, Dubai' and unslotted['lat'] is None
+        assert rows[self.assignments[2].pk]['address'] == '1204, Marina Tower'
+
+    def test_pages(self, settings):
+        settings.DRIVER_SYNC = {**settings.DRIVER_SYNC, 'PAGE_SIZE': 3}
+        page = self._pull()
+        assert page['more'] and len(page['rows']) == 3
+        rest = self._pull(cursor=page['cursor'])
+        assert not rest['more'] and len(rest['rows']) == 1
+        assert {row[0] for row in page['rows'] + rest['rows']} == {assignment.pk for assignment in self.assignments}
+
+    def test_push_is_idempotent(self):
+        first, second = self.assignments[0], self.assignments[1]
+        other = DeliveryAssignment.objects.create(
+            delivery_status=DeliveryStatus.objects.create(
+                subscription=first.delivery_status.subscription, date=timezone.localdate() + datetime.timedelta(days=5),
+            ),
+            driver=self.other,
+        )
+        batch = [
+            {'op': 'a3', 'assignment': first.pk, 'status': 'delivered', 'at': self._at(30)},
+            {'op': 'a1', 'assignment': first.pk, 'status': 'out_for_delivery', 'at': self._at(10)},
+            {'op': 'a2', 'assignment': first.pk, 'note': 'Gate code 42', 'at': self._at(20)},
+            {'op': 'a4', 'assignment': first.pk, 'status': 'out_for_delivery', 'at': self._at(40)},
+            {'op': 'b1', 'assignment': second.pk, 'status': 'delivered', 'note': 'Handed over', 'at': self._at(15)},
+            {'op': 'x1', 'assignment': other.pk, 'status': 'delivered', 'at': self._at(15)},
+        ]
+        response = self._push(*batch)
+        assert response.status_code == 200
+        expected = {
+            'applied': ['a1', 'b1', 'a2', 'a3'], 'stale': ['a4'], 'rejected': {'x1': 'Not one of your deliveries.'},
+        }
+        assert response.json() == expected
+
+        delivery = DeliveryStatus.objects.get(pk=first.delivery_status_id)
+        assert delivery.status == 'delivered' and delivery.driver_notes == 'Gate code 42'
+        assert delivery.actual_delivery_time == timezone.localtime(datetime.datetime.fromisoformat(batch[0]['at'])).time()
+        assert DeliveryStatus.objects.get(pk=second.delivery_status_id).driver_notes == 'Handed over'
+        assert DeliveryStatus.objects.get(pk=other.delivery_status_id).status == 'pending'
+
+        # A retried upload changes nothing and gets the same answer
+        response = self._push(*batch, {'op': 'a5', 'assignment': first.pk, 'status': 'out_for_delivery', 'at': self._at(5)})
+        assert response.json() == {**expected, 'stale': ['a5', 'a4']}
+        assert DeliveryStatus.objects.get(pk=first.delivery_status_id).driver_notes == 'Gate code 42'
+        assert DriverSyncOperation.objects.filter(driver=self.driver).count() == 7
+
+        cancelled = self.assignments[2].delivery_status
+        cancelled.status = 'cancelled'
+        cancelled.save()
+        response = self._push({'op': 'c1', 'assignment': self.assignments[2].pk, 'note': 'Nobody home', 'at': self._at(50)})
+        assert response.json()['rejected'] == {'c1': 'Delivery was cancelled.'}
+
+    def test_pushed_changes_come_back_in_the_next_pull(self):
+        cursor = self._pull()['cursor']
+        self._push({'op': 'n1', 'assignment': self.assignments[0].pk, 'status': 'out_for_delivery', 'at': self._at(0)})
+        delta = self._pull(cursor=cursor)
+        assert [(row[0], row[3]) for row in delta['rows']] == [(self.assignments[0].pk, 'out_for_delivery')]
+
+    def test_invalid_requests(self, settings):
+        settings.DRIVER_SYNC = {**settings.DRIVER_SYNC, 'MAX_BATCH': 2}
+        operation = {'op': 'o1', 'assignment': self.assignments[0].pk, 'at': self._at(0)}
+        assert self._push().status_code == 400
+        assert self._push(operation).status_code == 400
+        assert self._push(*[{**operation, 'note': 'x', 'op': f'o{i}'} for i in range(3)]).status_code == 400
+        assert self._push({**operation, 'status': 'pending'}).status_code == 400
+        assert self.client.get(URL, {'cursor': 'nope'}).status_code == 400
+
+        stranger = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        stranger.force_authenticate(user=User.objects.create_user(username='not_a_driver'))
+        assert stranger.get(URL).status_code == 404
+
+    def test_gzipped_pull(self):
+        response = self.client.get(URL, HTTP_ACCEPT_ENCODING='gzip')
+        assert response.status_code == 200 and response['Content-Encoding'] == 'gzip'
+        assert len(json.loads(gzip.decompress(response.content))['rows']) == 4
+
+    def test_list_shows_one_day(self):
+        response = self.client.get('/api/v1/driver/deliveries/')
+        results = response.data['results'] if 'results' in response.data else response.data
+        assert len(results) == 3
+        tomorrow = (timezone.localdate() + datetime.timedelta(days=1)).isoformat()
+        response = self.client.get('/api/v1/driver/deliveries/', {'date': tomorrow})
+        results = response.data['results'] if 'results' in response.data else response.data
+        assert [item['id'] for item in results] == [self.assignments[3].pk]
@@ -0,0 +1,193 @@
+import io
+from decimal import Decimal
+
+import pytest
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from rest_framework.test import APIClient
+
+from apps.driver.geo import point_in_polygon, validate_polygon
+from apps.driver.models import Zone
+from apps.driver.zone_index import ZoneIndex, assign_address_zones, get_zone_index, resolve_zone_id
+from apps.main.models import Address, CustomerProfile
+from apps.users.models import Tenant
+
+User = get_user_model()
+
+MARINA = [[25.06, 55.12], [25.06, 55.16], [25.10, 55.16], [25.10, 55.12]]
+# An L-shaped district inside the Marina
+HARBOUR = [[25.07, 55.13], [25.07, 55.15], [25.08, 55.15], [25.08, 55.14], [25.09, 55.14], [25.09, 55.13]]
+DOWNTOWN = [[25.18, 55.26], [25.18, 55.30], [25.21, 55.30], [25.21, 55.26]]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_polygons():
+    assert validate_polygon(MARINA + [MARINA[0]]) == [tuple(vertex) for vertex in MARINA]
+    for invalid in ([[25, 55], [25.1, 55]], [[25, 55], [25, 55.1], [25, 55.2]], [[25, 55], 'x', [26, 56]],
+                    [[95, 55], [25, 55.1], [25.1, 55]], 'polygon'):
+        with pytest.raises(ValueError):
+            validate_polygon(invalid)
+    harbour = validate_polygon(HARBOUR)
+    assert point_in_polygon((25.075, 55.145), harbour)
+    # The notch of the L is outside
+    assert not point_in_polygon((25.085, 55.145), harbour)
+
+
+def test_index_prefers_the_smallest_zone():
+    index = ZoneIndex(
+        [(1, validate_polygon(MARINA)), (2, validate_polygon(HARBOUR)), (3, validate_polygon(DOWNTOWN))],
+        cell_degrees=0.01,
+    )
+    assert index.lookup((25.075, 55.145)) == 2
+    assert index.lookup((25.085, 55.145)) == 1
+    assert index.lookup((25.20, 55.27)) == 3
+    assert index.lookup((25.15, 55.20)) is None
+    assert index.lookup(None) is None
+
+
+@pytest.mark.django_db
+class TestZoneResolution:
+
+    def setup_method(self):
+        self.marina = Zone.objects.create(name='Marina', boundary=MARINA)
+        self.downtown = Zone.objects.create(name='Downtown', boundary=DOWNTOWN)
+        self.customer = CustomerProfile.objects.create(user=User.objects.create_user(username='zoned'))
+
+    def _address(self, lat=None, lng=None, **kwargs):
+        return Address.objects.create(
+            customer=self.customer, street='Al Sufouh Rd',
+            latitude=None if lat is None else Decimal(str(lat)), longitude=None if lng is None else Decimal(str(lng)),
+            **kwargs,
+        )
+
+    def test_index_is_rebuilt_when_zones_change(self, django_assert_num_queries):
+        assert resolve_zone_id((25.08, 55.14)) == self.marina.pk
+        with django_assert_num_queries(0):
+            assert resolve_zone_id((25.2, 55.28)) == self.downtown.pk
+
+        self.downtown.boundary = MARINA
+        self.downtown.save()
+        small = Zone.objects.create(name='Harbour', boundary=HARBOUR)
+        assert resolve_zone_id((25.075, 55.145)) == small.pk
+        assert resolve_zone_id((25.2, 55.28)) is None
+
+        small.is_active = False
+        small.save()
+        assert resolve_zone_id((25.075, 55.145)) in (self.marina.pk, self.downtown.pk)
+        assert get_zone_index().size == 2
+
+    def test_addresses_get_a_zone_when_saved(self):
+        assert self._address(25.08, 55.14).zone == self.marina
+        assert self._address(25.15, 55.20).zone is None
+        # An explicit zone is kept
+        assert self._address(25.08, 55.14, zone=self.downtown).zone == self.downtown
+        # The customer's plus code is left to assign_address_zones
+        self.customer.plus_code = '7HQQ67V8+WV'  # 25.2448, 55.2672
+        self.customer.save()
+        self.downtown.boundary = [[25.2, 55.2], [25.2, 55.3], [25.3, 55.3], [25.3, 55.2]]
+        self.downtown.save()
+        coded = self._address()
+        assert coded.zone is None
+        assert assign_address_zones() == {'checked': 2, 'assigned': 1, 'unresolved': 1}
+        assert Address.objects.get(pk=coded.pk).zone == self.downtown
+
+    def test_partial_saves_leave_the_zone_alone(self):
+        address = self._address()
+        address.latitude, address.longitude = Decimal('25.08'), Decimal('55.14')
+        address.save(update_fields=['latitude', 'longitude'])
+        assert Address.objects.get(pk=address.pk).zone is None
+        address.save(update_fields=['latitude', 'longitude', 'zone'])
+        assert Address.objects.get(pk=address.pk).zone == self.marina
+
+    def test_bulk_assignment(self):
+        Zone.objects.filter(pk__in=[self.marina.pk, self.downtown.pk]).update(boundary=None)
+        addresses = [self._address(25.08, 55.14), self._address(25.2, 55.28), self._address(25.15, 55.2)]
+        wrong = self._address(25.2, 55.28, zone=self.marina)
+        assert all(address.zone is None for address in addresses)
+        # Queryset updates send no signals; saving one zone bumps the version for both
+        Zone.objects.filter(pk=self.marina.pk).update(boundary=MARINA)
+        self.downtown.boundary = DOWNTOWN
+        self.downtown.save()
+
+        assert assign_address_zones(chunk_size=1) == {'checked': 3, 'assigned': 2, 'unresolved': 1}
+        assert [Address.objects.get(pk=address.pk).zone_id for address in addresses] == [
+            self.marina.pk, self.downtown.pk, None,
+        ]
+        assert assign_address_zones(overwrite=True) == {'checked': 4, 'assigned': 1, 'unresolved': 1}
+        wrong.refresh_from_db()
+        assert wrong.zone == self.downtown
+
+    def test_admin_endpoints(self):
+        client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        client.force_authenticate(user=User.objects.create_superuser('zones_admin', 'admin@example.com', 'x'))
+
+        response = client.get('/api/v1/driver/zones/resolve/', {'lat': 25.2, 'lng': 55.28})
+        assert response.status_code == 200 and response.data == {'zone': self.downtown.pk, 'zone_name': 'Downtown'}
+        assert client.get('/api/v1/driver/zones/resolve/', {'plus_code': '7HQQ67V8+WV'}).data['zone'] is None
+        assert client.get('/api/v1/driver/zones/resolve/', {'plus_code': '67V8+WV'}).status_code == 400
+        assert client.get('/api/v1/driver/zones/resolve/', {'lat': 25.2}).status_code == 400
+
+        response = client.patch(f'/api/v1/driver/zones/{self.marina.pk}/', {'boundary': [[25, 55], [25, 56]]}, format='json')
+        assert response.status_code == 400 and 'boundary' in response.data
+        response = client.patch(f'/api/v1/driver/zones/{self.marina.pk}/', {'boundary': DOWNTOWN}, format='json')
+        assert response.status_code == 200
+
+        Address.objects.bulk_create([Address(customer=self.customer, street='x', latitude=Decimal('25.2'),
+                                             longitude=Decimal('55.28'))])
+        response = client.post('/api/v1/driver/zones/assign_addresses/', {}, format='json')
+        assert response.data == {'checked': 1, 'assigned': 1, 'unresolved': 0}
+
+
+@pytest.mark.django_db
+def test_commands():
+    out = io.StringIO()
+    call_command('benchmark_zone_lookup', zones=16, points=2000, rows=200, stdout=out)
+    assert '0 mismatches' in out.getvalue() and 'assigned 200 of 200' in out.getvalue()
+    assert not Zone.objects.exists()
+
+    out = io.StringIO()
+    call_command('assign_address_zones', stdout=out)
+    assert 'No active zone has a boundary' in out.getvalue()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestAssignCommandForTenants:
+    """The tenant's database is the test database itself."""
+
+    def setup_method(self):
+        self.tenant = Tenant.objects.create(
+            name='Zones', subdomain='zones', schema_name='zones',
+            db_name=connection.settings_dict['NAME'], is_active=True,
+        )
+        customer = CustomerProfile.objects.create(user=User.objects.create_user(username='zoned_tenant'))
+        Address.objects.bulk_create([Address(customer=customer, street='x', latitude=Decimal('25.08'),
+                                             longitude=Decimal('55.14'))])
+        self.marina = Zone.objects.create(name='Marina', boundary=MARINA)
+
+    def teardown_method(self):
+        alias = f'tenant_{self.tenant.id}'
+        if alias in connections:
+            connections[alias].close()
+        settings.DATABASES.pop(alias, None)
+
+    def test_tenant_alias_is_registered(self):
+        out = io.StringIO()
+        call_command('assign_address_zones', tenant='ZONES', stdout=out)
+        assert 'zones: Checked 1 addresses' in out.getvalue() and '1 assigned' in out.getvalue()
+        assert Address.objects.get().zone == self.marina
+
+        out = io.StringIO()
+        call_command('assign_address_zones', all=True, overwrite=True, stdout=out)
+        assert 'zones: Checked 1 addresses' in out.getvalue()
+
+        with pytest.raises(CommandError):
+            call_command('assign_address_zones', tenant='nowhere', stdout=io.StringIO())
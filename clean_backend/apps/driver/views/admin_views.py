@@ -14,12 +14,18 @@ from apps.driver.models import (
 from apps.driver.serializers.admin_serializers import (
     ZoneSerializer, RouteSerializer, DeliveryDriverSerializer,
     DeliveryAssignmentAdminSerializer, DeliveryScheduleSerializer,
+    DispatchPlanRequestSerializer, ZoneResolveSerializer,
 )
+from apps.driver.planner import dispatch_day
+from apps.driver.zone_index import assign_address_zones, resolve_zone_id
 from apps.driver.permissions import IsLogisticsAdmin
+from apps.main.retention import ArchivedHistoryMixin
+from core.utils.conditional import ConditionalGetMixin
 
 
-class ZoneViewSet(viewsets.ModelViewSet):
-    """CRUD for delivery zones."""
+class ZoneViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    """CRUD for delivery zones. List/retrieve support conditional GETs."""
+    conditional_models = (Zone, Route, DeliveryDriver)
     queryset = Zone.objects.annotate(route_count=Count('routes')).order_by('name')
     serializer_class = ZoneSerializer
     permission_classes = [permissions.IsAuthenticated, IsLogisticsAdmin]
@@ -34,6 +40,24 @@ class ZoneViewSet(viewsets.ModelViewSet):
         drivers = zone.assigned_drivers.all()
         return Response(DeliveryDriverSerializer(drivers, many=True).data)
 
+    @action(detail=False, methods=['get'])
+    def resolve(self, request):
+        """The zone a location falls in. Query with ?lat=&lng= or ?plus_code=."""
+        serializer = ZoneResolveSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        zone_id = resolve_zone_id(serializer.validated_data['point'])
+        zone = Zone.objects.filter(pk=zone_id).first() if zone_id else None
+        return Response({'zone': zone.pk if zone else None, 'zone_name': zone.name if zone else None})
+
+    @action(detail=False, methods=['post'])
+    def assign_addresses(self, request):
+        """
+        Set the zone of addresses from their location. Send {"overwrite": true}
+        to also re-resolve addresses that already have a zone.
+        """
+        overwrite = str(request.data.get('overwrite', '')).lower() in ('1', 'true')
+        return Response(assign_address_zones(overwrite=overwrite))
+
 
 class RouteViewSet(viewsets.ModelViewSet):
     """CRUD for delivery routes within zones."""
@@ -109,8 +133,11 @@ class DeliveryScheduleViewSet(viewsets.ModelViewSet):
     filterset_fields = ['zone', 'day_of_week', 'is_active']
 
 
-class DeliveryAssignmentAdminViewSet(viewsets.ModelViewSet):
-    """Assign and manage delivery assignments."""
+class DeliveryAssignmentAdminViewSet(ArchivedHistoryMixin, viewsets.ModelViewSet):
+    """
+    Assign and manage delivery assignments; ``archived/`` reads archived
+    delivery history and ``plan/`` runs the dispatch planner.
+    """
     queryset = DeliveryAssignment.objects.select_related(
         'delivery_status', 'driver',
     ).all()
@@ -118,3 +145,32 @@ class DeliveryAssignmentAdminViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, IsLogisticsAdmin]
     filterset_fields = ['driver', 'delivery_status__date']
     ordering = ['-assigned_at']
+    archive_dataset = 'deliveries'
+    archive_summary = True
+
+    @action(detail=False, methods=['post'])
+    def plan(self, request):
+        """
+        Plan a day's deliveries into driver runs and store them as
+        assignments. Send {"date": "YYYY-MM-DD", "zones": [ids], "dry_run": false}.
+        """
+        serializer = DispatchPlanRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        plan, written = dispatch_day(
+            data['date'], zone_ids=[zone.pk for zone in data.get('zones', [])], dry_run=data['dry_run'],
+        )
+        return Response({
+            **plan.summary(),
+            'saved': written,
+            'plan': [
+                {
+                    'run': run.number, 'zone': run.zone_id, 'route': run.route_id, 'driver': run.driver_id,
+                    'window': [run.window.start, run.window.end],
+                    'distance_km': round(run.distance_km, 2),
+                    'stops': [stop.delivery_status_id for stop in run.stops],
+                }
+                for run in plan.runs
+            ],
+            'unplanned_ids': plan.unplanned,
+        })
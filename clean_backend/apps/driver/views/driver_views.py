@@ -1,19 +1,33 @@
 from rest_framework import viewsets, permissions, status, decorators
 from rest_framework.response import Response
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
 from apps.driver.models import DeliveryAssignment, DeliveryStatus
-from apps.driver.serializers.driver_serializers import DeliveryAssignmentSerializer
+from apps.driver.serializers.driver_serializers import (
+    DeliveryAssignmentSerializer, DriverSyncPullSerializer, DriverSyncPushSerializer,
+)
+from apps.driver.sync import driver_for_user, pull, push
 
 class DriverDeliveryViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for drivers to see their deliveries and update status.
+
+    The list shows one day's deliveries: ``?date=YYYY-MM-DD``, today by
+    default. Apps that work offline use ``sync/`` instead (apps/driver/sync.py).
     """
     serializer_class = DeliveryAssignmentSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        queryset = DeliveryAssignment.objects.all()
-        # Filter for the current user's driver profile and today's deliveries
+        queryset = DeliveryAssignment.objects.select_related(
+            'delivery_status__subscription__customer__user', 'delivery_status__delivery_address',
+        ).prefetch_related('delivery_status__subscription__menus')
+        if self.action == 'list':
+            day = parse_date(self.request.query_params.get('date') or '') or timezone.localdate()
+            queryset = queryset.filter(delivery_status__date=day)
+        # Filter for the current user's driver profile
         user = self.request.user
         if hasattr(user, 'driver_profile'):
             return queryset.filter(driver=user.driver_profile)
@@ -24,6 +38,25 @@ class DriverDeliveryViewSet(viewsets.ReadOnlyModelViewSet):
         
         return queryset.none()
 
+    @method_decorator(gzip_page)
+    @decorators.action(detail=False, methods=['get', 'post'])
+    def sync(self, request):
+        """
+        GET: assignments changed since ``?cursor=`` (optionally for one
+        ``?date=``). POST: apply {"operations": [{"op", "assignment",
+        "status", "note", "at"}, ...]} made offline, in one transaction.
+        """
+        driver = driver_for_user(request.user)
+        if driver is None:
+            return Response({'error': 'No driver profile.'}, status=status.HTTP_404_NOT_FOUND)
+        if request.method == 'GET':
+            query = DriverSyncPullSerializer(data=request.query_params)
+            query.is_valid(raise_exception=True)
+            return Response(pull(driver, cursor=query.validated_data.get('cursor'), day=query.validated_data.get('date')))
+        upload = DriverSyncPushSerializer(data=request.data)
+        upload.is_valid(raise_exception=True)
+        return Response(push(driver, upload.validated_data['operations']))
+
     @decorators.action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
         assignment = self.get_object()
@@ -41,7 +74,7 @@ class DriverDeliveryViewSet(viewsets.ReadOnlyModelViewSet):
             delivery_status.mark_as_delivered()
         else:
             delivery_status.status = new_status
-            delivery_status.save(update_fields=['status'])
+            delivery_status.save(update_fields=['status', 'updated_at'])
             
         return Response({'status': 'success', 'new_status': delivery_status.status})
 
@@ -60,5 +93,5 @@ class DriverDeliveryViewSet(viewsets.ReadOnlyModelViewSet):
         else:
             delivery_status.driver_notes = note
         
-        delivery_status.save(update_fields=['driver_notes'])
+        delivery_status.save(update_fields=['driver_notes', 'updated_at'])
         return Response({'status': 'success', 'driver_notes': delivery_status.driver_notes})
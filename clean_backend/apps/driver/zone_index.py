@@ -0,0 +1,149 @@
+"""
+Zone resolution: which delivery zone a point falls in.
+
+Active zones with a ``boundary`` are loaded into an in-memory grid index
+for each database. The grid has square cells of ``ZONE_INDEX_CELL_DEGREES``.
+Each cell lists the zones whose bounding box overlaps it. A lookup reads
+one cell and runs the point-in-polygon test on those few zones only. When
+zones overlap, the smallest one wins, so a district can be carved out of a
+larger area.
+
+Zone writes bump Zone's per-tenant version (``core.utils.conditional``).
+The next lookup in every process sees the new version and rebuilds that
+database's index, which takes one query.
+
+``resolve_zone_id`` looks up a single point. ``Address.save`` uses it to
+fill in a missing zone from the address's coordinates.
+``assign_address_zones`` does the same for existing addresses in bulk, and
+also falls back to the customer's plus code.
+"""
+import math
+from collections import defaultdict
+
+from django.conf import settings
+
+from apps.driver.geo import address_point, decode_plus_code, point_in_polygon, polygon_area, polygon_bounds, validate_polygon
+from apps.driver.models import Zone
+from core.db.router import get_current_db_alias
+from core.utils.conditional import model_versions
+
+ASSIGN_CHUNK_SIZE = 1000
+
+_indexes = {}  # alias -> ZoneIndex
+
+
+class ZoneIndex:
+    """Grid index over zone polygons."""
+
+    def __init__(self, zones, cell_degrees=None, version=None):
+        """``zones`` is an iterable of ``(zone_id, ring)``, ``ring`` a list of ``(lat, lng)``."""
+        self.cell_degrees = cell_degrees or settings.ZONE_INDEX_CELL_DEGREES
+        self.version = version
+        self.cells = defaultdict(list)
+        self.size = 0
+        for zone_id, ring in sorted(zones, key=lambda zone: polygon_area(zone[1])):
+            bounds = polygon_bounds(ring)
+            min_row, min_column = self._cell((bounds[0], bounds[1]))
+            max_row, max_column = self._cell((bounds[2], bounds[3]))
+            entry = (zone_id, ring, bounds)
+            for row in range(min_row, max_row + 1):
+                for column in range(min_column, max_column + 1):
+                    # Smallest zones first, since they are added in that order
+                    self.cells[(row, column)].append(entry)
+            self.size += 1
+
+    def _cell(self, point):
+        return math.floor(point[0] / self.cell_degrees), math.floor(point[1] / self.cell_degrees)
+
+    def lookup(self, point):
+        """Id of the smallest zone containing ``(lat, lng)``, or None."""
+        if point is None:
+            return None
+        for zone_id, ring, (min_lat, min_lng, max_lat, max_lng) in self.cells.get(self._cell(point), ()):
+            if min_lat <= point[0] <= max_lat and min_lng <= point[1] <= max_lng and point_in_polygon(point, ring):
+                return zone_id
+        return None
+
+
+def zone_polygons(using=None):
+    """``[(zone_id, ring)]`` of the active zones with a usable boundary."""
+    alias = using or get_current_db_alias()
+    polygons = []
+    zones = Zone.objects.using(alias).filter(is_active=True, boundary__isnull=False).values_list('pk', 'boundary')
+    for zone_id, boundary in zones:
+        try:
+            polygons.append((zone_id, validate_polygon(boundary)))
+        except ValueError:
+            continue  # Boundaries written outside the API are not trusted
+    return polygons
+
+
+def get_zone_index(using=None):
+    """The zone index of the database, rebuilt if zones changed since it was built."""
+    alias = using or get_current_db_alias()
+    version = model_versions([Zone], alias)[0]
+    index = _indexes.get(alias)
+    if index is None or index.version != version:
+        index = _indexes[alias] = ZoneIndex(zone_polygons(alias), version=version)
+    return index
+
+
+def resolve_zone_id(point, using=None):
+    """Id of the zone ``(lat, lng)`` falls in, or None."""
+    if point is None:
+        return None
+    return get_zone_index(using).lookup(point)
+
+
+def resolve_address_zone_id(address, using=None):
+    """
+    Id of the zone ``address``'s own coordinates fall in, or None. The
+    customer's plus code is not consulted (it would cost a query per save);
+    ``assign_address_zones`` covers addresses that only have a plus code.
+    """
+    return resolve_zone_id(address_point(address), using)
+
+
+def assign_address_zones(queryset=None, overwrite=False, chunk_size=ASSIGN_CHUNK_SIZE, using=None):
+    """
+    Set the zone of addresses from their location. Only addresses without
+    a zone are considered unless ``overwrite``. An address whose location
+    is unknown or outside every zone is left as it is.
+
+    Returns ``{'checked', 'assigned', 'unresolved'}``.
+    """
+    from apps.main.models import Address
+
+    alias = using or (queryset.db if queryset is not None else get_current_db_alias())
+    queryset = Address.objects.using(alias).all() if queryset is None else queryset
+    if not overwrite:
+        queryset = queryset.filter(zone__isnull=True)
+    rows = queryset.order_by('pk').values_list(
+        'pk', 'zone_id', 'latitude', 'longitude', 'customer__plus_code',
+    )
+
+    index = get_zone_index(alias)
+    manager = Address.objects.db_manager(alias)
+    counts = {'checked': 0, 'assigned': 0, 'unresolved': 0}
+    changes = defaultdict(list)
+
+    def flush(zone_id):
+        # One UPDATE per zone and chunk, rather than a CASE per row (bulk_update)
+        counts['assigned'] += manager.filter(pk__in=changes.pop(zone_id)).update(zone_id=zone_id)
+
+    for pk, current_zone_id, latitude, longitude, plus_code in rows.iterator(chunk_size=chunk_size):
+        counts['checked'] += 1
+        if latitude is not None and longitude is not None:
+            point = float(latitude), float(longitude)
+        else:
+            point = decode_plus_code(plus_code)
+        zone_id = index.lookup(point)
+        if zone_id is None:
+            counts['unresolved'] += 1
+        elif zone_id != current_zone_id:
+            changes[zone_id].append(pk)
+            if len(changes[zone_id]) >= chunk_size:
+                flush(zone_id)
+    for zone_id in list(changes):
+        flush(zone_id)
+    return counts
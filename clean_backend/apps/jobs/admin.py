@@ -0,0 +1,11 @@
+from django.contrib import admin
+
+from apps.jobs.models import BackgroundJob
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'tenant_alias', 'status', 'progress', 'attempts', 'created_at', 'finished_at')
+    list_filter = ('status', 'tenant_alias')
+    search_fields = ('name', 'idempotency_key')
+    readonly_fields = [field.name for field in BackgroundJob._meta.fields]
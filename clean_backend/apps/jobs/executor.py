@@ -0,0 +1,248 @@
+"""
+Tenant-aware background jobs.
+
+A job is a plain function decorated with ``@background_job``. Its first
+argument is a ``JobContext``; the others must be JSON-serialisable because
+they are stored on the ``BackgroundJob`` row:
+
+    @background_job(max_attempts=3)
+    def rebuild_report(ctx, report_id):
+        ctx.set_progress(50, 'Aggregating')
+        return {'rows': 120}
+
+    job = rebuild_report.enqueue(7, idempotency_key='report-7', created_by=request.user)
+
+``enqueue`` records the current tenant alias (``get_current_db_alias()``)
+with the job. The worker restores that alias before calling the function,
+so models route to the same tenant database as in the request that
+enqueued it. By default each attempt runs in a transaction on that
+database; jobs that issue DDL (``CREATE DATABASE``) opt out with
+``atomic=False``.
+
+Status, progress and the return value (or error) are kept on the row and
+served by ``/api/v1/jobs/``. A failed attempt is retried after
+``retry_delay`` seconds, doubling each time, until ``max_attempts``. An
+``idempotency_key`` makes ``enqueue`` return the existing job for the same
+tenant, job and key instead of queueing a second one.
+
+Executors (``settings.BACKGROUND_JOBS['EXECUTOR']``):
+
+- ``ThreadPoolJobExecutor`` runs jobs on a process-wide thread pool once
+  the enqueuing transaction commits.
+- ``LocalJobExecutor`` runs them inline as soon as they are enqueued,
+  retries included. The test settings use it.
+
+Jobs still queued when a process stops are picked up by
+``manage.py run_background_jobs``.
+"""
+import datetime
+import functools
+import json
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signals import setting_changed
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.jobs.models import BackgroundJob
+from core.db.router import get_current_db_alias, set_current_db_alias
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+# ─── Declaring and enqueueing jobs ────────────────────────────────────────────
+
+@dataclass
+class JobContext:
+    """Handed to the job function as its first argument."""
+    job_id: object
+    tenant_alias: str
+    attempt: int
+
+    def set_progress(self, percent, message=''):
+        BackgroundJob.objects.filter(pk=self.job_id).update(
+            progress=max(0, min(100, int(percent))), progress_message=message[:255],
+        )
+
+
+def background_job(func=None, *, max_attempts=1, retry_delay=30, atomic=True):
+    """Register ``func`` as a background job and give it an ``enqueue`` method."""
+    def decorate(func):
+        func.job_name = f"{func.__module__}.{func.__qualname__}"
+        func.max_attempts = max_attempts
+        func.retry_delay = retry_delay
+        func.atomic = atomic
+        func.enqueue = functools.partial(enqueue, func)
+        _registry[func.job_name] = func
+        return func
+
+    return decorate(func) if func is not None else decorate
+
+
+def enqueue(func, *args, idempotency_key=None, created_by=None, tenant_alias=None, **kwargs):
+    """Store a job for ``func`` and hand it to the executor. Returns the ``BackgroundJob``."""
+    tenant_alias = tenant_alias or get_current_db_alias()
+    job = BackgroundJob(
+        name=func.job_name, tenant_alias=tenant_alias,
+        args=list(args), kwargs=kwargs, idempotency_key=idempotency_key,
+        max_attempts=func.max_attempts, created_by_id=getattr(created_by, 'pk', created_by),
+    )
+    try:
+        with transaction.atomic(using='default'):
+            job.save(using='default')
+    except IntegrityError:
+        if not idempotency_key:
+            raise
+        return BackgroundJob.objects.get(
+            tenant_alias=tenant_alias, name=func.job_name, idempotency_key=idempotency_key,
+        )
+
+    get_executor().submit(job.pk)
+    # An inline executor has already run it
+    job.refresh_from_db()
+    return job
+
+
+def resolve_job(name):
+    """The job function registered as ``name``, importing its module if needed."""
+    if name not in _registry:
+        import_string(name)
+    return _registry[name]
+
+
+# ─── Running jobs ─────────────────────────────────────────────────────────────
+
+def run_job(job_id):
+    """
+    Claim the queued job ``job_id`` and run one attempt of it in its tenant
+    context. Returns the job, or None if it was not queued (already claimed
+    by another worker, finished or unknown).
+    """
+    from apps.organizations.provisioning import ensure_tenant_alias
+
+    now = timezone.now()
+    claimed = BackgroundJob.objects.filter(pk=job_id, status=BackgroundJob.STATUS_QUEUED).update(
+        status=BackgroundJob.STATUS_RUNNING, attempts=F('attempts') + 1,
+        started_at=now, finished_at=None, run_after=None,
+    )
+    if not claimed:
+        return None
+    job = BackgroundJob.objects.get(pk=job_id)
+
+    previous_alias = get_current_db_alias()
+    try:
+        func = resolve_job(job.name)
+        alias = ensure_tenant_alias(job.tenant_alias)
+        set_current_db_alias(alias)
+        context = JobContext(job.pk, alias, job.attempts)
+        if func.atomic:
+            with transaction.atomic(using=alias):
+                result = func(context, *job.args, **job.kwargs)
+        else:
+            result = func(context, *job.args, **job.kwargs)
+        # Fail the attempt here, not on save, if the result can't be stored
+        result = json.loads(json.dumps(result, cls=DjangoJSONEncoder))
+    except Exception as exc:
+        logger.exception("Background job %s (%s) failed on attempt %s", job.pk, job.name, job.attempts)
+        _record_failure(job, exc)
+        if job.status == BackgroundJob.STATUS_QUEUED:
+            # An inline executor may already have run the retry
+            job.refresh_from_db()
+    else:
+        job.status = BackgroundJob.STATUS_SUCCEEDED
+        job.progress = 100
+        job.result = result
+        job.error = ''
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'progress', 'result', 'error', 'finished_at'])
+    finally:
+        set_current_db_alias(previous_alias)
+    return job
+
+
+def _record_failure(job, exc):
+    job.error = f"{type(exc).__name__}: {exc}"
+    func = _registry.get(job.name)
+    if job.attempts < job.max_attempts:
+        delay = (func.retry_delay if func else 30) * 2 ** (job.attempts - 1)
+        job.status = BackgroundJob.STATUS_QUEUED
+        job.run_after = timezone.now() + datetime.timedelta(seconds=delay)
+        job.save(update_fields=['status', 'error', 'run_after'])
+        get_executor().submit(job.pk, delay=delay)
+    else:
+        job.status = BackgroundJob.STATUS_FAILED
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+
+
+# ─── Executors ────────────────────────────────────────────────────────────────
+
+class LocalJobExecutor:
+    """Runs each job inline when it is submitted; retries run immediately."""
+
+    def __init__(self, max_workers=1):
+        pass
+
+    def submit(self, job_id, delay=0):
+        run_job(job_id)
+
+
+class ThreadPoolJobExecutor:
+    """
+    Runs jobs on a thread pool once the enqueuing transactions commit.
+    Each worker closes its database connections after every job.
+    """
+
+    def __init__(self, max_workers=4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='background-job')
+
+    def submit(self, job_id, delay=0):
+        if delay:
+            timer = threading.Timer(delay, self._pool.submit, args=(self._run, job_id))
+            timer.daemon = True
+            timer.start()
+            return
+        alias = get_current_db_alias()
+        # The job row (default) and the data it works on (tenant) must be
+        # committed before a worker can see them
+        transaction.on_commit(
+            lambda: transaction.on_commit(lambda: self._pool.submit(self._run, job_id), using=alias),
+            using='default',
+        )
+
+    @staticmethod
+    def _run(job_id):
+        try:
+            run_job(job_id)
+        finally:
+            connections.close_all()
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            config = settings.BACKGROUND_JOBS
+            _executor = import_string(config['EXECUTOR'])(max_workers=config.get('MAX_WORKERS', 4))
+        return _executor
+
+
+@receiver(setting_changed)
+def _reset_executor(setting, **kwargs):
+    global _executor
+    if setting == 'BACKGROUND_JOBS':
+        _executor = None
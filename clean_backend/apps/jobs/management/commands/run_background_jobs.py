@@ -0,0 +1,56 @@
+"""
+Run background jobs that are still queued, e.g. after a restart dropped
+the in-process thread pool, or whose retry is due. Jobs run one after the
+other in this process.
+
+Usage:
+    python manage.py run_background_jobs
+    python manage.py run_background_jobs --limit=50
+    python manage.py run_background_jobs --requeue-stale=30   # also retry jobs stuck 'running' for 30+ minutes
+"""
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.jobs.executor import run_job
+from apps.jobs.models import BackgroundJob
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs whose start time has come."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Run at most this many jobs.")
+        parser.add_argument(
+            "--requeue-stale", type=int, default=None, metavar="MINUTES",
+            help="Requeue jobs that have been 'running' for longer than this (their worker died).",
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        if options["requeue_stale"]:
+            requeued = BackgroundJob.objects.filter(
+                status=BackgroundJob.STATUS_RUNNING,
+                started_at__lt=now - datetime.timedelta(minutes=options["requeue_stale"]),
+            ).update(status=BackgroundJob.STATUS_QUEUED)
+            if requeued:
+                self.stdout.write(f"Requeued {requeued} stale job(s).")
+
+        due = BackgroundJob.objects.filter(
+            Q(run_after__isnull=True) | Q(run_after__lte=now),
+            status=BackgroundJob.STATUS_QUEUED,
+        ).order_by('created_at').values_list('pk', flat=True)
+        if options["limit"]:
+            due = due[:options["limit"]]
+
+        counts = {}
+        for job_id in list(due):
+            job = run_job(job_id)
+            if job is not None:
+                counts[job.status] = counts.get(job.status, 0) + 1
+                self.stdout.write(f"  {job.name} [{job.tenant_alias}] {job.status}")
+
+        summary = ', '.join(f"{count} {status}" for status, count in sorted(counts.items())) or 'nothing to run'
+        self.stdout.write(self.style.SUCCESS(f"Background jobs: {summary}."))
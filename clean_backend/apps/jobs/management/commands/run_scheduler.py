@@ -0,0 +1,62 @@
+"""
+Run the job scheduler in the foreground (for a dedicated scheduler
+process instead of SCHEDULER_AUTOSTART in the web workers), list the
+registered jobs, or run one job now.
+
+Usage:
+    python manage.py run_scheduler
+    python manage.py run_scheduler --list
+    python manage.py run_scheduler --run=sync_saas_metrics
+    python manage.py run_scheduler --run=sync_saas_metrics --force   # even if it ran recently
+"""
+import sys
+
+from django.core.management.base import BaseCommand
+
+from apps.jobs.models import ScheduledJobRun
+from apps.jobs.scheduler import build_scheduler, registered_jobs, run_scheduled_job
+
+
+class Command(BaseCommand):
+    help = "Run the APScheduler job scheduler, list its jobs, or run one job now."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--list", action="store_true", help="List registered jobs and their last run.")
+        parser.add_argument("--run", type=str, default=None, metavar="JOB_ID", help="Run one job now and exit.")
+        parser.add_argument("--force", action="store_true", help="With --run: ignore the job's minimum gap.")
+
+    def handle(self, *args, **options):
+        jobs = registered_jobs()
+
+        if options["list"]:
+            for job in sorted(jobs.values(), key=lambda job: job.id):
+                last = ScheduledJobRun.objects.filter(job_id=job.id).first()
+                last_run = f"{last.started_at:%Y-%m-%d %H:%M} {last.status} ({last.duration or 0:.2f}s)" if last else "never"
+                state = "enabled" if job.enabled else "disabled"
+                self.stdout.write(f"  {job.id:<28} {state:<9} cron={job.trigger_kwargs}  last: {last_run}")
+            return
+
+        if options["run"]:
+            if options["run"] not in jobs:
+                self.stderr.write(self.style.ERROR(f"Unknown job '{options['run']}'. Use --list."))
+                sys.exit(1)
+            run = run_scheduled_job(options["run"], force=options["force"])
+            if run is None:
+                self.stdout.write(self.style.WARNING("Skipped: running elsewhere or ran recently (use --force)."))
+            elif run.status == ScheduledJobRun.STATUS_FAILED:
+                self.stderr.write(self.style.ERROR(f"{run.job_id} failed after {run.duration:.2f}s: {run.error}"))
+                sys.exit(1)
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{run.job_id} finished in {run.duration:.2f}s "
+                    f"({run.tenant_count} tenants, {run.failed_tenant_count} failed)."
+                ))
+            return
+
+        scheduler = build_scheduler(blocking=True)
+        self.stdout.write(f"Scheduler running jobs: {', '.join(job.id for job in scheduler.get_jobs()) or 'none'}")
+        try:
+            scheduler.start()
+        except (KeyboardInterrupt, SystemExit):
+            scheduler.shutdown()
+            self.stdout.write(self.style.SUCCESS("Scheduler stopped."))
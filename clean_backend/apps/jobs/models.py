@@ -0,0 +1,105 @@
+import uuid
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class BackgroundJob(models.Model):
+    """
+    One enqueued unit of background work (see ``apps.jobs.executor``).
+
+    Jobs are platform-wide rows in the ``default`` database. ``tenant_alias``
+    records the tenant database the job runs against, and the worker
+    restores it before calling the job function.
+    """
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=200, help_text="Dotted path of the job function")
+    tenant_alias = models.CharField(max_length=100, default='default', db_index=True)
+    args = models.JSONField(default=list, blank=True, encoder=DjangoJSONEncoder)
+    kwargs = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    idempotency_key = models.CharField(max_length=200, null=True, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED, db_index=True)
+    progress = models.PositiveSmallIntegerField(default=0, help_text="0-100")
+    progress_message = models.CharField(max_length=255, blank=True)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=1)
+    run_after = models.DateTimeField(null=True, blank=True, help_text="Earliest time of the next attempt")
+
+    created_by_id = models.IntegerField(
+        null=True, blank=True,
+        help_text="User.id in the tenant database (not a FK due to multi-DB)",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tenant_alias', 'name', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='unique_job_idempotency_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} [{self.tenant_alias}] {self.status}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_SUCCEEDED, self.STATUS_FAILED)
+
+
+class ScheduledJobRun(models.Model):
+    """
+    One run of a scheduled job (see ``apps.jobs.scheduler``), with its
+    duration and per-tenant outcomes. Runs skipped because another process
+    held the job's lock are not recorded.
+    """
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    job_id = models.CharField(max_length=100)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    runner = models.CharField(max_length=100, blank=True, help_text="host:pid that ran the job")
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True, help_text="Seconds")
+    tenant_count = models.PositiveIntegerField(default=0)
+    failed_tenant_count = models.PositiveIntegerField(default=0)
+    details = models.JSONField(default=dict, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['job_id', '-started_at'], name='scheduled_run_job_started_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.job_id} @ {self.started_at:%Y-%m-%d %H:%M} {self.status}"
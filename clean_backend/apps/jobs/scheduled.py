@@ -0,0 +1,19 @@
+"""Housekeeping for the job tables themselves (see apps/jobs/scheduler.py)."""
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.jobs.models import BackgroundJob, ScheduledJobRun
+from apps.jobs.scheduler import scheduled_job
+
+
+@scheduled_job('prune_job_history', cron={'hour': 3, 'minute': 30})
+def prune_job_history():
+    """Delete finished background jobs and scheduled runs past the retention period (daily)."""
+    cutoff = timezone.now() - datetime.timedelta(days=getattr(settings, 'JOB_HISTORY_DAYS', 30))
+    jobs, _ = BackgroundJob.objects.filter(
+        status__in=(BackgroundJob.STATUS_SUCCEEDED, BackgroundJob.STATUS_FAILED), finished_at__lt=cutoff,
+    ).delete()
+    runs, _ = ScheduledJobRun.objects.filter(started_at__lt=cutoff).delete()
+    return {'background_jobs': jobs, 'scheduled_runs': runs}
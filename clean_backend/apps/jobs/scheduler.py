@@ -0,0 +1,249 @@
+"""
+Scheduled (cron-style) jobs run by APScheduler.
+
+Apps declare jobs in a ``scheduled.py`` module, which is autodiscovered
+when the scheduler starts:
+
+    @scheduled_job('sync_saas_metrics', cron={'minute': 15}, min_gap=600)
+    def sync_saas_metrics():
+        return {'tenants': for_each_tenant(sync_one)}
+
+Every web worker may start a scheduler (``SCHEDULER_AUTOSTART``), so each
+run is guarded twice:
+
+1. a Postgres advisory lock on the ``default`` database (``pg_try_advisory_lock``),
+   so only one process runs a job at a time; the others skip;
+2. a ``ScheduledJobRun`` row per run, so a process whose timer fires a
+   moment after another one finished does not run the job again within
+   ``min_gap`` seconds.
+
+The row also records the run's duration and per-tenant outcomes.
+``for_each_tenant`` fans work out over the active tenants with
+``core.db.fanout`` on a bounded thread pool (``SCHEDULER_TENANT_CONCURRENCY``),
+each thread routed to its tenant's database; one tenant failing does not
+stop the others.
+
+Schedules can be changed or jobs disabled per deployment with
+``SCHEDULED_JOBS = {'<job id>': {'cron': {...}, 'enabled': False}}``.
+"""
+import datetime
+import hashlib
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from apps.jobs.models import ScheduledJobRun
+from core.db.fanout import TenantFanOut
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+@dataclass
+class ScheduledJob:
+    id: str
+    func: object
+    cron: dict
+    min_gap: int = 300
+    enabled_setting: str = None
+    default_enabled: bool = True
+    description: str = field(default='')
+
+    @property
+    def options(self):
+        return getattr(settings, 'SCHEDULED_JOBS', {}).get(self.id, {})
+
+    @property
+    def enabled(self):
+        if 'enabled' in self.options:
+            return self.options['enabled']
+        if self.enabled_setting:
+            return getattr(settings, self.enabled_setting, False)
+        return self.default_enabled
+
+    @property
+    def trigger_kwargs(self):
+        return self.options.get('cron', self.cron)
+
+
+def scheduled_job(job_id, cron, min_gap=300, enabled_setting=None, default_enabled=True):
+    """
+    Register the decorated function as scheduled job ``job_id`` on a cron
+    trigger (``CronTrigger`` keyword arguments). It is enabled when
+    ``settings.<enabled_setting>`` is truthy (or ``default_enabled`` if no
+    setting is named), unless ``SCHEDULED_JOBS`` says otherwise.
+    """
+    def decorate(func):
+        _registry[job_id] = ScheduledJob(
+            job_id, func, cron, min_gap=min_gap, enabled_setting=enabled_setting,
+            default_enabled=default_enabled, description=(func.__doc__ or '').strip().split('\n')[0],
+        )
+        return func
+    return decorate
+
+
+def registered_jobs():
+    autodiscover_modules('scheduled')
+    return dict(_registry)
+
+
+# ─── Locking and run records ─────────────────────────────────────────────────
+
+def lock_key(name):
+    """Signed 64-bit advisory lock key for ``name``."""
+    return int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+@contextmanager
+def advisory_lock(name, using='default'):
+    """
+    Try to take the session-level advisory lock for ``name`` without
+    waiting. Yields True if this session holds it, False if another does.
+    """
+    key = lock_key(f"scheduled_job:{name}")
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(%s)", [key])
+        acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connections[using].cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [key])
+
+
+def _runner():
+    return f"{socket.gethostname()}:{os.getpid()}"[:100]
+
+
+def run_scheduled_job(job_id, force=False):
+    """
+    Run ``job_id`` under its lock and record the run. Returns the
+    ``ScheduledJobRun``, or None if the job was skipped (another process
+    holds the lock or ran it less than ``min_gap`` seconds ago; ``force``
+    ignores the latter).
+    """
+    job = registered_jobs()[job_id]
+    try:
+        with advisory_lock(job_id) as acquired:
+            if not acquired:
+                logger.info("Scheduled job %s is running elsewhere; skipped", job_id)
+                return None
+            now = timezone.now()
+            recent = ScheduledJobRun.objects.filter(
+                job_id=job_id, started_at__gte=now - datetime.timedelta(seconds=job.min_gap),
+            )
+            if not force and recent.exists():
+                logger.info("Scheduled job %s already ran at %s; skipped", job_id, recent.first().started_at)
+                return None
+            return _run(job, now)
+    finally:
+        if threading.current_thread() is not threading.main_thread():
+            connections.close_all()
+
+
+def _run(job, started_at):
+    run = ScheduledJobRun.objects.create(job_id=job.id, started_at=started_at, runner=_runner())
+    start = time.perf_counter()
+    try:
+        details = job.func() or {}
+    except Exception as exc:
+        logger.exception("Scheduled job %s failed", job.id)
+        run.status = ScheduledJobRun.STATUS_FAILED
+        run.error = f"{type(exc).__name__}: {exc}"
+    else:
+        tenants = details.get('tenants', []) if isinstance(details, dict) else []
+        run.status = ScheduledJobRun.STATUS_SUCCEEDED
+        run.details = details
+        run.tenant_count = len(tenants)
+        run.failed_tenant_count = sum(1 for outcome in tenants if outcome.get('error'))
+    run.finished_at = timezone.now()
+    run.duration = round(time.perf_counter() - start, 3)
+    run.save()
+    logger.info(
+        "Scheduled job %s %s in %.2fs (%s tenants, %s failed)",
+        job.id, run.status, run.duration, run.tenant_count, run.failed_tenant_count,
+    )
+    return run
+
+
+# ─── Tenant fan-out ───────────────────────────────────────────────────────────
+
+def for_each_tenant(func, tenants=None, max_workers=None):
+    """
+    Call ``func(tenant, alias)`` for every active tenant with a database
+    through ``core.db.fanout.TenantFanOut``: at most ``max_workers``
+    (default ``SCHEDULER_TENANT_CONCURRENCY``) at a time, each call routed
+    to its tenant's database under ``TENANT_STATEMENT_TIMEOUT``. Returns
+    one outcome dict per tenant (``tenant``, ``seconds`` and ``result`` or
+    ``error``), in tenant order.
+    """
+    if max_workers is None:
+        max_workers = getattr(settings, 'SCHEDULER_TENANT_CONCURRENCY', 4)
+    fan_out = TenantFanOut(
+        func, max_workers=max_workers,
+        statement_timeout=getattr(settings, 'TENANT_STATEMENT_TIMEOUT', None),
+    )
+    results = fan_out.run(tenants)
+    logger.info("Tenant fan-out: %s", fan_out.stats.format())
+    return [result.as_outcome() for result in results]
+
+
+# ─── Scheduler ────────────────────────────────────────────────────────────────
+
+def build_scheduler(blocking=False):
+    """An APScheduler scheduler with every enabled job added (not started)."""
+    from apscheduler.executors.pool import ThreadPoolExecutor as SchedulerThreadPool
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.schedulers.blocking import BlockingScheduler
+    from apscheduler.triggers.cron import CronTrigger
+
+    scheduler_class = BlockingScheduler if blocking else BackgroundScheduler
+    executor_config = getattr(settings, 'SCHEDULER_CONFIG', {}).get('apscheduler.executors.default', {})
+    scheduler = scheduler_class(
+        timezone=settings.TIME_ZONE,
+        executors={'default': SchedulerThreadPool(int(executor_config.get('max_workers', 4)))},
+        job_defaults={'coalesce': True, 'max_instances': 1, 'misfire_grace_time': 300},
+    )
+    for job in registered_jobs().values():
+        if not job.enabled:
+            continue
+        scheduler.add_job(
+            run_scheduled_job, CronTrigger(timezone=settings.TIME_ZONE, **job.trigger_kwargs),
+            args=[job.id], id=job.id, name=job.description or job.id, replace_existing=True,
+        )
+    return scheduler
+
+
+def should_autostart():
+    """Start with web servers only: not in management commands, tests or the runserver reloader parent."""
+    if not getattr(settings, 'SCHEDULER_AUTOSTART', False):
+        return False
+    program = os.path.basename(sys.argv[0]) if sys.argv else ''
+    if program in ('gunicorn', 'daphne', 'uvicorn'):
+        return True
+    return 'runserver' in sys.argv and os.environ.get('RUN_MAIN') == 'true'
+
+
+def start():
+    """Start the background scheduler once per process."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = build_scheduler()
+            _scheduler.start()
+            logger.info("Scheduler started with jobs: %s", ', '.join(job.id for job in _scheduler.get_jobs()))
+        return _scheduler
@@ -0,0 +1,14 @@
+from rest_framework import serializers
+
+from apps.jobs.models import BackgroundJob
+
+
+class BackgroundJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = BackgroundJob
+        fields = [
+            'id', 'name', 'status', 'progress', 'progress_message', 'result', 'error',
+            'attempts', 'max_attempts', 'run_after', 'idempotency_key', 'args', 'kwargs',
+            'created_by_id', 'created_at', 'started_at', 'finished_at',
+        ]
+        read_only_fields = fields
@@ -0,0 +1,184 @@
+import datetime
+import pytest
+from decimal import Decimal
+from io import StringIO
+from unittest.mock import MagicMock, patch
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.jobs.executor import ThreadPoolJobExecutor, background_job
+from apps.jobs.models import BackgroundJob
+from apps.main.models import (
+    CustomerProfile, Invoice, MealPackage, MealSlot, Order, Subscription,
+)
+from apps.users.models import Tenant
+from core.db.router import get_current_db_alias
+
+User = get_user_model()
+
+calls = []
+
+
+@background_job
+def record_alias(ctx, label):
+    calls.append(label)
+    ctx.set_progress(50, 'Halfway')
+    return {'alias': get_current_db_alias(), 'attempt': ctx.attempt}
+
+
+@background_job(max_attempts=3, retry_delay=0)
+def flaky(ctx, fail_times):
+    if ctx.attempt <= fail_times:
+        raise RuntimeError(f"attempt {ctx.attempt} failed")
+    return 'ok'
+
+
+@background_job
+def create_slot_then_fail(ctx):
+    MealSlot.objects.create(name='Rolled back', code='rolled_back')
+    raise ValueError('boom')
+
+
+@background_job(atomic=False)
+def current_alias(ctx):
+    return get_current_db_alias()
+
+
+@pytest.mark.django_db
+class TestBackgroundJobs:
+    def setup_method(self):
+        calls.clear()
+
+    def test_runs_and_records_result(self):
+        job = record_alias.enqueue('a', created_by=7)
+        assert calls == ['a']
+        assert job.status == BackgroundJob.STATUS_SUCCEEDED
+        assert job.tenant_alias == 'default'
+        assert (job.progress, job.progress_message) == (100, 'Halfway')
+        assert job.result == {'alias': 'default', 'attempt': 1}
+        assert job.created_by_id == 7 and job.finished_at is not None
+
+    def test_restores_tenant_alias(self):
+        tenant = Tenant.objects.create(name='Acme', subdomain='acme_jobs', schema_name='acme_jobs', db_name='tenant_acme_jobs')
+        alias = f"tenant_{tenant.id}"
+        try:
+            job = current_alias.enqueue(tenant_alias=alias)
+            assert job.result == alias
+            assert settings.DATABASES[alias]['NAME'] == 'tenant_acme_jobs'
+            assert get_current_db_alias() == 'default'
+        finally:
+            settings.DATABASES.pop(alias, None)
+
+    def test_retries_until_success(self):
+        job = flaky.enqueue(2)
+        assert (job.status, job.attempts, job.result, job.error) == (BackgroundJob.STATUS_SUCCEEDED, 3, 'ok', '')
+
+    def test_fails_after_max_attempts(self):
+        job = flaky.enqueue(5)
+        assert (job.status, job.attempts) == (BackgroundJob.STATUS_FAILED, 3)
+        assert job.error == 'RuntimeError: attempt 3 failed'
+
+    def test_failed_attempt_rolls_back(self):
+        job = create_slot_then_fail.enqueue()
+        assert job.status == BackgroundJob.STATUS_FAILED
+        assert not MealSlot.objects.filter(code='rolled_back').exists()
+
+    def test_idempotency_key(self):
+        first = record_alias.enqueue('a', idempotency_key='k1')
+        second = record_alias.enqueue('b', idempotency_key='k1')
+        assert second.pk == first.pk
+        assert calls == ['a']
+        assert record_alias.enqueue('c', idempotency_key='k2').pk != first.pk
+
+    def test_thread_pool_waits_for_commit(self, django_capture_on_commit_callbacks):
+        executor = ThreadPoolJobExecutor(max_workers=1)
+        executor._pool = MagicMock()
+        with django_capture_on_commit_callbacks(execute=True):
+            executor.submit('job-id')
+            executor._pool.submit.assert_not_called()
+        executor._pool.submit.assert_called_once_with(executor._run, 'job-id')
+
+    def test_command_runs_due_jobs(self):
+        due = BackgroundJob.objects.create(name=record_alias.job_name, args=['queued'])
+        later = BackgroundJob.objects.create(
+            name=record_alias.job_name, args=['later'], run_after=timezone.now() + datetime.timedelta(hours=1),
+        )
+        out = StringIO()
+        call_command('run_background_jobs', stdout=out)
+        assert calls == ['queued']
+        due.refresh_from_db()
+        later.refresh_from_db()
+        assert (due.status, later.status) == (BackgroundJob.STATUS_SUCCEEDED, BackgroundJob.STATUS_QUEUED)
+        assert '1 succeeded' in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestBackgroundJobApi:
+    def setup_method(self):
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.admin = User.objects.create_superuser(username='admin_jobs', password='password')
+        self.client.force_authenticate(user=self.admin)
+
+    def test_list_and_retrieve(self):
+        job = record_alias.enqueue('a')
+        BackgroundJob.objects.create(name=record_alias.job_name, tenant_alias='tenant_42')
+        response = self.client.get('/api/v1/jobs/')
+        assert response.status_code == status.HTTP_200_OK
+        assert [row['id'] for row in response.data['results']] == [str(job.pk)]
+        response = self.client.get(f'/api/v1/jobs/{job.pk}/')
+        assert response.data['result'] == {'alias': 'default', 'attempt': 1}
+
+    def test_staff_only(self):
+        client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        client.force_authenticate(user=User.objects.create_user(username='not_staff_jobs'))
+        assert client.get('/api/v1/jobs/').status_code == status.HTTP_403_FORBIDDEN
+
+    def test_activate_in_background(self):
+        today = timezone.now().date()
+        sub = Subscription.objects.create(
+            customer=CustomerProfile.objects.create(user=User.objects.create_user(username='job_cust'), phone='0501'),
+            meal_package=MealPackage.objects.create(name='Std', price=Decimal('100')),
+            time_slot=MealSlot.objects.create(name='Lunch', code='lunch'), start_date=today,
+            end_date=today + datetime.timedelta(days=13), status='pending', payment_mode='cash',
+            selected_days=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+        )
+        response = self.client.post(
+            f'/api/v1/subscriptions-admin/{sub.id}/activate/?background=1', {}, format='json',
+            HTTP_IDEMPOTENCY_KEY='act-1',
+        )
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['status'] == 'active'
+        job = response.data['job']
+        assert job['status'] == 'succeeded' and job['idempotency_key'] == 'act-1'
+        assert job['result']['orders_created'] == Order.objects.filter(subscription=sub).count() == 14
+        # No priced menus, so nothing to invoice
+        assert job['result']['invoice_created'] is False
+        assert not Invoice.objects.filter(customer=sub.customer).exists()
+
+        response = self.client.post(f'/api/v1/subscriptions-admin/{sub.id}/generate_orders/', {'background': True}, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['job']['result'] == {'orders_created': 0}
+
+    @patch('apps.organizations.jobs.seed_tenant_defaults', return_value={'meal_slots': 3, 'categories': 1})
+    @patch('apps.organizations.jobs.migrate_tenant_database')
+    @patch('apps.organizations.jobs.create_tenant_database', return_value='empty')
+    @patch('apps.organizations.serializers.TenantCreateSerializer.validate_subdomain', side_effect=lambda value: value)
+    def test_provision_tenant_in_background(self, _validate, create_db, migrate, seed):
+        response = self.client.post('/api/saas/tenants/?background=1', {
+            'name': 'Queued Kitchen', 'subdomain': 'queued', 'admin_email': 'owner@queued.com',
+        }, format='json')
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.data['is_active'] is False
+        tenant = Tenant.objects.get(subdomain='queued')
+        try:
+            assert create_db.call_args.args == ('tenant_queued',)
+            migrate.assert_called_once()
+            assert tenant.is_active
+            job = BackgroundJob.objects.get(pk=response.data['job']['id'])
+            assert job.tenant_alias == 'default' and job.created_by_id == self.admin.id
+            assert job.result['seeded'] == {'meal_slots': 3, 'categories': 1}
+        finally:
+            settings.DATABASES.pop(f"tenant_{tenant.id}", None)
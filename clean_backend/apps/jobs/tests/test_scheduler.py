@@ -0,0 +1,191 @@
+import threading
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.test import override_settings
+from django.utils import timezone
+from apps.delivery.models import Delivery
+from apps.driver.models import DeliveryStatus
+from apps.jobs import scheduler
+from apps.jobs.models import ScheduledJobRun
+from apps.jobs.scheduler import advisory_lock, build_scheduler, for_each_tenant, run_scheduled_job
+from apps.main.models import (
+    CustomerProfile, MealPackage, MealSlot, Order, Subscription, WalletTransaction,
+)
+from apps.users.models import Tenant
+from core.db.router import get_current_db_alias
+
+User = get_user_model()
+
+
+@pytest.fixture
+def test_job():
+    """Registers ``test_job`` running whatever the test assigns to ``state['func']``."""
+    state = {'count': 0, 'func': lambda: {}}
+
+    @scheduler.scheduled_job('test_job', cron={'minute': 0}, min_gap=300)
+    def job():
+        state['count'] += 1
+        return state['func']()
+
+    yield state
+    scheduler._registry.pop('test_job')
+
+
+def _fake_tenants(*subdomains):
+    return [Tenant(id=9000 + index, subdomain=subdomain, db_name=f'db_{subdomain}') for index, subdomain in enumerate(subdomains)]
+
+
+@pytest.mark.django_db
+class TestScheduledRuns:
+    def test_records_duration_and_skips_within_gap(self, test_job):
+        run = run_scheduled_job('test_job')
+        assert run.status == ScheduledJobRun.STATUS_SUCCEEDED
+        assert run.duration is not None and run.finished_at >= run.started_at
+        # Another worker's timer firing right after: skipped
+        assert run_scheduled_job('test_job') is None
+        assert run_scheduled_job('test_job', force=True) is not None
+        assert test_job['count'] == 2
+
+    def test_skips_while_locked_elsewhere(self, test_job):
+        held, release = threading.Event(), threading.Event()
+
+        def other_process():
+            try:
+                with advisory_lock('test_job') as acquired:
+                    assert acquired
+                    held.set()
+                    release.wait(5)
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=other_process)
+        thread.start()
+        held.wait(5)
+        try:
+            assert run_scheduled_job('test_job') is None
+        finally:
+            release.set()
+            thread.join()
+        assert test_job['count'] == 0
+        assert run_scheduled_job('test_job') is not None
+
+    def test_failure_recorded(self, test_job):
+        test_job['func'] = lambda: 1 / 0
+        run = run_scheduled_job('test_job')
+        assert run.status == ScheduledJobRun.STATUS_FAILED
+        assert run.error.startswith('ZeroDivisionError')
+
+    def test_tenant_fan_out_isolates_failures(self, test_job):
+        def work(tenant, alias):
+            if tenant.subdomain == 'bad':
+                raise RuntimeError('tenant down')
+            return {'alias': get_current_db_alias() == alias}
+
+        tenants = _fake_tenants('one', 'bad', 'three')
+        test_job['func'] = lambda: {'tenants': for_each_tenant(work, tenants=tenants, max_workers=2)}
+        try:
+            run = run_scheduled_job('test_job')
+        finally:
+            for tenant in tenants:
+                settings.DATABASES.pop(f'tenant_{tenant.id}', None)
+        assert run.status == ScheduledJobRun.STATUS_SUCCEEDED
+        assert (run.tenant_count, run.failed_tenant_count) == (3, 1)
+        outcomes = {outcome['tenant']: outcome for outcome in run.details['tenants']}
+        assert outcomes['one']['result'] == outcomes['three']['result'] == {'alias': True}
+        assert outcomes['bad']['error'] == 'RuntimeError: tenant down'
+        assert all('seconds' in outcome for outcome in outcomes.values())
+
+    @override_settings(
+        DELIVERY_AUTO_COMPLETE=False,
+        SCHEDULED_JOBS={'clean_tenant_orders': {'enabled': True, 'cron': {'hour': 4}}},
+    )
+    def test_build_scheduler_honours_settings(self):
+        jobs = {job.id: job for job in build_scheduler().get_jobs()}
+        assert 'auto_advance_today_orders' not in jobs
+        assert 'clean_tenant_subscriptions' not in jobs
+        assert "hour='4'" in str(jobs['clean_tenant_orders'].trigger)
+        assert {'sync_saas_metrics', 'process_delivery_payments', 'prune_job_history'} <= set(jobs)
+
+
+@pytest.mark.django_db(transaction=True)
+class TestScheduledJobsOnTenants:
+    """Runs the real jobs against a tenant whose database is the test database."""
+
+    def setup_method(self):
+        self.tenant = Tenant.objects.create(
+            name='Scheduled', subdomain='scheduled', schema_name='scheduled',
+            db_name=connection.settings_dict['NAME'], is_active=True,
+        )
+        today = timezone.localdate()
+        self.subscription = Subscription.objects.create(
+            customer=CustomerProfile.objects.create(user=User.objects.create_user(username='sched_cust'), name='Sched'),
+            meal_package=MealPackage.objects.create(name='Standard', price=100),
+            time_slot=MealSlot.objects.create(name='Lunch', code='lunch'),
+            start_date=today, end_date=today + timedelta(days=30), status='active',
+            selected_days=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+        )
+
+    def teardown_method(self):
+        alias = f'tenant_{self.tenant.id}'
+        if alias in connections:
+            connections[alias].close()
+        settings.DATABASES.pop(alias, None)
+
+    def test_auto_advance_today_orders(self):
+        order = Order.objects.create(
+            subscription=self.subscription, order_date=timezone.localdate(),
+            delivery_date=timezone.localdate(), status='confirmed', quantity=1,
+        )
+        run = run_scheduled_job('auto_advance_today_orders')
+        order.refresh_from_db()
+        assert order.status == 'ready'
+        assert Delivery.objects.filter(order=order).count() == 1
+        assert run.details['tenants'][0]['result'] == {'ready': 1, 'deliveries_created': 1}
+
+    def test_cleanup_jobs_purge_in_chunks(self):
+        for offset in range(3):
+            Order.objects.create(
+                subscription=self.subscription, order_date=timezone.localdate(),
+                delivery_date=timezone.localdate() + timedelta(days=offset), status='confirmed', quantity=1,
+            )
+        run = run_scheduled_job('clean_tenant_orders')
+        result = run.details['tenants'][0]['result']
+        assert result['deleted'] == 3 and not Order.objects.exists()
+        steps = {step['label']: step for step in result['steps']}
+        assert (steps['main.Order']['rows'], steps['main.Order']['chunks']) == (3, 1)
+        assert all({'action', 'seconds'} <= set(step) for step in steps.values())
+
+        run = run_scheduled_job('clean_tenant_subscriptions')
+        assert run.details['tenants'][0]['result']['deleted'] == 1
+        assert not Subscription.objects.exists()
+
+    def test_process_delivery_payments(self):
+        DeliveryStatus.objects.update_or_create(
+            subscription=self.subscription, date=timezone.localdate(),
+            defaults={'status': 'delivered', 'payment_amount': Decimal('25.00')},
+        )
+        run = run_scheduled_job('process_delivery_payments')
+        assert run.details['tenants'][0]['result'] == {'processed': 1}
+        assert not DeliveryStatus.objects.filter(status='delivered', payment_processed=False).exists()
+        assert WalletTransaction.objects.filter(transaction_type='debit', amount=Decimal('25.00')).exists()
+
+    def test_process_delivery_payments_skips_deliveries_paid_meanwhile(self, monkeypatch):
+        delivery_status, _ = DeliveryStatus.objects.update_or_create(
+            subscription=self.subscription, date=timezone.localdate(),
+            defaults={'status': 'delivered', 'payment_amount': Decimal('25.00')},
+        )
+        process_payment = DeliveryStatus.process_payment
+
+        def paid_by_driver_sync_first(stale):
+            # Another path charges the delivery after the job read it
+            assert process_payment(DeliveryStatus.objects.get(pk=stale.pk)) is True
+            return process_payment(stale)
+
+        monkeypatch.setattr(DeliveryStatus, 'process_payment', paid_by_driver_sync_first)
+        run = run_scheduled_job('process_delivery_payments')
+        assert run.details['tenants'][0]['result'] == {'processed': 0}
+        assert WalletTransaction.objects.filter(subscription=delivery_status.subscription).count() == 1
@@ -0,0 +1,17 @@
+"""
+Background job API URLs.
+Mounted at /api/v1/jobs/
+"""
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+
+from apps.jobs.views import BackgroundJobViewSet
+
+app_name = 'jobs_api'
+
+router = DefaultRouter()
+router.register(r'', BackgroundJobViewSet, basename='background-job')
+
+urlpatterns = [
+    path('', include(router.urls)),
+]
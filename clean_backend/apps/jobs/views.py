@@ -0,0 +1,39 @@
+"""
+Read-only API over background jobs (``/api/v1/jobs/``).
+
+Tenant admins see the jobs of their own tenant; requests without a tenant
+(platform admins) see the platform-level jobs, e.g. tenant provisioning.
+"""
+from rest_framework import permissions, status, viewsets
+from rest_framework.response import Response
+
+from apps.jobs.models import BackgroundJob
+from apps.jobs.serializers import BackgroundJobSerializer
+from core.db.router import get_current_db_alias
+
+
+def wants_background(request):
+    """True when the caller asked for ``?background=1`` (or ``"background": true`` in the body)."""
+    value = request.query_params.get('background')
+    if value is None and hasattr(request.data, 'get'):
+        value = request.data.get('background')
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def job_accepted_response(job, data=None):
+    """202 with the job (under ``job``) so the client can poll ``/api/v1/jobs/<id>/``."""
+    return Response(
+        {**(data or {}), 'job': BackgroundJobSerializer(job).data},
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+class BackgroundJobViewSet(viewsets.ReadOnlyModelViewSet):
+    serializer_class = BackgroundJobSerializer
+    permission_classes = [permissions.IsAdminUser]
+    filterset_fields = ['status', 'name']
+    ordering_fields = ['created_at', 'finished_at']
+    ordering = ['-created_at']
+
+    def get_queryset(self):
+        return BackgroundJob.objects.filter(tenant_alias=get_current_db_alias())
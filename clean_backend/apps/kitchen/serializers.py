@@ -29,3 +29,14 @@ class KitchenOrderSerializer(serializers.ModelSerializer):
             'notes', 'created_at', 'updated_at',
         ]
         read_only_fields = ['created_at', 'updated_at']
+
+
+class KitchenOrderBulkTransitionSerializer(serializers.Serializer):
+    """Input for moving many kitchen orders to preparing/ready at once."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False,
+        max_length=1000,
+    )
+    meal_slot = serializers.IntegerField(required=False)
+    zone = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=['preparing', 'ready'])
@@ -83,3 +83,59 @@ class TestKitchenOrderFlow:
         url = f'/api/v1/kitchen/orders/{self.kitchen_order.id}/claim/'
         response = self.client.post(url, {}, format='json')
         assert response.status_code == status.HTTP_409_CONFLICT
+
+    def test_bulk_transition(self):
+        self.order.status = 'confirmed'
+        self.order.save(update_fields=['status', 'updated_at'])
+        other = Order.objects.create(
+            subscription=self.sub,
+            order_date=timezone.now().date(),
+            delivery_date=timezone.now().date(),
+            status='cancelled'
+        )
+        other_kitchen_order = KitchenOrder.objects.create(order=other)
+
+        url = f'{self.list_url}bulk_transition/'
+        response = self.client.post(url, {
+            'status': 'preparing',
+            'ids': [self.kitchen_order.id, other_kitchen_order.id],
+        }, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['updated'] == 1
+        results = {r['id']: r for r in response.data['results']}
+        assert results[self.kitchen_order.id]['ok'] is True
+        assert results[other_kitchen_order.id]['ok'] is False
+
+        self.kitchen_order.refresh_from_db()
+        assert self.kitchen_order.order.status == 'preparing'
+        assert self.kitchen_order.preparation_start_time is not None
+        other_kitchen_order.refresh_from_db()
+        assert other_kitchen_order.preparation_start_time is None
+
+        response = self.client.post(url, {'status': 'ready'}, format='json')
+        assert response.data['updated'] == 1
+        assert response.data['deliveries_created'] == 1
+        self.kitchen_order.refresh_from_db()
+        assert self.kitchen_order.preparation_end_time is not None
+
+    def test_list_query_count_is_constant(self, django_assert_max_num_queries):
+        for i in range(5):
+            user = User.objects.create_user(username=f'kds{i}', first_name='K', last_name=str(i))
+            sub = Subscription.objects.create(
+                customer=CustomerProfile.objects.create(user=user, phone=f'9{i}'),
+                meal_package=self.package,
+                start_date=timezone.now().date() + timezone.timedelta(days=1),
+                end_date=timezone.now().date() + timezone.timedelta(days=30),
+                time_slot=self.slot,
+                selected_days=['Monday']
+            )
+            order = Order.objects.create(
+                subscription=sub,
+                order_date=timezone.now().date(),
+                delivery_date=timezone.now().date(),
+                status='pending'
+            )
+            KitchenOrder.objects.create(order=order, assigned_to=self.staff_user)
+        with django_assert_max_num_queries(3):
+            response = self.client.get(self.list_url)
+        assert response.status_code == status.HTTP_200_OK
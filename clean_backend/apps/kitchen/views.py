@@ -6,7 +6,13 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from apps.kitchen.models import KitchenOrder
-from apps.kitchen.serializers import KitchenOrderSerializer
+from apps.kitchen.serializers import (
+    KitchenOrderSerializer, KitchenOrderBulkTransitionSerializer,
+)
+from apps.main.models import Order
+from apps.main.utils.order_state import (
+    TransitionError, bulk_transition_orders, filter_orders, transition_order,
+)
 from core.permissions.custom import IsKitchenStaff
 
 
@@ -33,6 +39,7 @@ class KitchenOrderViewSet(viewsets.ModelViewSet):
     """
     serializer_class = KitchenOrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 3}
     filterset_fields = ['order__status']
     ordering = ['created_at']
 
@@ -76,35 +83,81 @@ class KitchenOrderViewSet(viewsets.ModelViewSet):
                 {'error': 'Preparation already started.'},
                 status=drf_status.HTTP_400_BAD_REQUEST,
             )
+        try:
+            transition_order(kitchen_order.order, 'preparing', advance=True)
+        except TransitionError as exc:
+            return Response({'error': str(exc)}, status=drf_status.HTTP_400_BAD_REQUEST)
         kitchen_order.preparation_start_time = timezone.now()
-        kitchen_order.order.status = 'preparing'
-        kitchen_order.order.save(update_fields=['status', 'updated_at'])
         kitchen_order.save(update_fields=['preparation_start_time', 'updated_at'])
         return Response(self.get_serializer(kitchen_order).data)
 
     @action(detail=True, methods=['post'])
     def mark_ready(self, request, pk=None):
-        """Mark the order as ready for delivery."""
+        """Mark the order as ready for delivery (creates its Delivery)."""
         kitchen_order = self.get_object()
+        try:
+            transition_order(kitchen_order.order, 'ready', advance=True)
+        except TransitionError as exc:
+            return Response({'error': str(exc)}, status=drf_status.HTTP_400_BAD_REQUEST)
         kitchen_order.preparation_end_time = timezone.now()
-        kitchen_order.order.status = 'ready'
-        kitchen_order.order.save(update_fields=['status', 'updated_at'])
         kitchen_order.save(update_fields=['preparation_end_time', 'updated_at'])
-        
-        # Create Delivery with auto-assigned driver
-        from apps.delivery.models import Delivery
-        from apps.main.utils.delivery_utils import assign_driver_to_order
-        
-        assigned_driver = assign_driver_to_order(kitchen_order.order)
-        delivery, created = Delivery.objects.get_or_create(
-            order=kitchen_order.order,
-            defaults={
-                'status': 'pending',
-                'driver': assigned_driver
-            }
+        return Response(self.get_serializer(kitchen_order).data)
+
+    @action(detail=False, methods=['post'])
+    def bulk_transition(self, request):
+        """
+        Move many kitchen orders to ``preparing`` or ``ready`` in one call.
+
+        Targets the given kitchen order ``ids`` or, when omitted, every kitchen
+        order in the current list (``date``/``status`` query params), optionally
+        narrowed by ``meal_slot`` and ``zone``. Like ``start_preparation`` and
+        ``mark_ready``, orders advance through any intermediate statuses.
+        Results are keyed by kitchen order id.
+        """
+        serializer = KitchenOrderBulkTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        target = data['status']
+
+        qs = self.filter_queryset(self.get_queryset())
+        ids = data.get('ids')
+        if ids:
+            qs = qs.filter(id__in=ids)
+        order_to_kitchen = dict(qs.values_list('order_id', 'id'))
+        kitchen_to_order = {k: o for o, k in order_to_kitchen.items()}
+
+        orders = filter_orders(
+            Order.objects.filter(id__in=order_to_kitchen),
+            meal_slot=data.get('meal_slot'),
+            zone=data.get('zone'),
+        )
+        requested = ids if ids else list(kitchen_to_order)
+        results, updated_ids, deliveries_created = bulk_transition_orders(
+            orders, target,
+            ids=[kitchen_to_order.get(k) for k in requested],
+            advance=True,
         )
-        if not delivery.driver and assigned_driver:
-            delivery.driver = assigned_driver
-            delivery.save(update_fields=['driver'])
-        
-        return Response(self.get_serializer(kitchen_order).data) 
\ No newline at end of file
+
+        now = timezone.now()
+        kitchen_orders = KitchenOrder.objects.filter(order_id__in=updated_ids)
+        if target == 'preparing':
+            kitchen_orders.filter(preparation_start_time__isnull=True).update(
+                preparation_start_time=now, updated_at=now,
+            )
+        else:
+            kitchen_orders.update(preparation_end_time=now, updated_at=now)
+
+        for kitchen_id, result in zip(requested, results):
+            result['order_id'] = result['id']
+            result['id'] = kitchen_id
+            if result['order_id'] is None:
+                result['error'] = 'Kitchen order not found.'
+
+        return Response({
+            'status': target,
+            'requested': len(results),
+            'updated': len(updated_ids),
+            'failed': len(results) - len(updated_ids),
+            'deliveries_created': deliveries_created,
+            'results': results,
+        })
@@ -1,8 +1,10 @@
 from django.contrib import admin
 from apps.main.models import (
     Category, TimeSlot, CustomerProfile, MenuItem, Subscription, Order, Address, 
-    WalletTransaction, Notification, Menu, Invoice, CustomerRegistrationRequest
+    WalletTransaction, Notification, Menu, Invoice, CustomerRegistrationRequest,
+    ArchiveBatch, ArchiveSummary, NotificationBroadcast,
 )
+from apps.main.utils.search import SearchDocumentAdminMixin
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -15,7 +17,7 @@ class TimeSlotAdmin(admin.ModelAdmin):
     list_filter = ('is_active',)
 
 @admin.register(CustomerProfile)
-class CustomerProfileAdmin(admin.ModelAdmin):
+class CustomerProfileAdmin(SearchDocumentAdminMixin, admin.ModelAdmin):
     list_display = ('user', 'tenant_id', 'phone', 'created_at')
     search_fields = ('user__username', 'user__first_name', 'user__last_name', 'phone')
     list_filter = ('tenant_id',)
@@ -31,19 +33,26 @@ class NotificationAdmin(admin.ModelAdmin):
     list_display = ('customer', 'priority', 'read', 'created_at')
     list_filter = ('priority', 'read')
 
+@admin.register(NotificationBroadcast)
+class NotificationBroadcastAdmin(admin.ModelAdmin):
+    list_display = ('id', 'priority', 'recipients', 'pushed', 'created_by', 'created_at')
+    list_filter = ('priority',)
+    readonly_fields = ('filters', 'recipients', 'pushed', 'created_by')
+
 @admin.register(WalletTransaction)
 class WalletTransactionAdmin(admin.ModelAdmin):
     list_display = ('customer', 'amount', 'transaction_type', 'created_at')
     list_filter = ('transaction_type',)
 
 @admin.register(MenuItem)
-class MenuItemAdmin(admin.ModelAdmin):
+class MenuItemAdmin(SearchDocumentAdminMixin, admin.ModelAdmin):
     list_display = ('name', 'category', 'price', 'is_available')
     list_filter = ('category', 'is_available')
     search_fields = ('name', 'description')
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(SearchDocumentAdminMixin, admin.ModelAdmin):
+    search_document_path = 'customer'
     list_display = ('customer', 'status', 'start_date', 'end_date', 'total_cost')
     list_filter = ('status', 'start_date', 'payment_mode')
     search_fields = ('customer__user__username', 'customer__phone')
@@ -64,7 +73,24 @@ class CustomerRegistrationRequestAdmin(admin.ModelAdmin):
     list_filter = ('status',)
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
+class OrderAdmin(SearchDocumentAdminMixin, admin.ModelAdmin):
+    search_document_path = 'subscription__customer'
     list_display = ('id', 'subscription', 'order_date', 'status')
     list_filter = ('status', 'order_date')
     search_fields = ('id', 'subscription__customer__user__username')
+
+@admin.register(ArchiveBatch)
+class ArchiveBatchAdmin(admin.ModelAdmin):
+    list_display = ('dataset', 'storage', 'first_date', 'last_date', 'records', 'rows', 'archived_at')
+    list_filter = ('dataset', 'storage')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(ArchiveSummary)
+class ArchiveSummaryAdmin(admin.ModelAdmin):
+    list_display = ('dataset', 'period', 'status', 'records', 'amount')
+    list_filter = ('dataset', 'status')
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'apps.main' 
\ No newline at end of file
+    name = 'apps.main'
+
+    def ready(self):
+        import apps.main.signals  # noqa
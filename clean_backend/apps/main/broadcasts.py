@@ -0,0 +1,160 @@
+"""
+Notification broadcasts to customer segments.
+
+A segment is a set of filters on subscriptions:
+
+- ``zone``: Zone ids of the lunch or dinner address
+- ``meal_slot``: MealSlot ids
+- ``diet_type``: ``veg`` / ``nonveg``
+- ``subscription_status``: defaults to ``['active']``
+- ``delivery_date``: has a delivery (not cancelled) on that day
+
+Subscriptions with ``want_notifications`` off are left out. The segment
+resolves to customer ids with one query. ``broadcast`` then creates a
+``NotificationBroadcast`` and one ``Notification`` per customer, inserted
+``BROADCAST_CHUNK_SIZE`` at a time in one transaction.
+
+After the commit the notifications are pushed to the customers' connected
+apps through the ``push`` channel backend. Pushed rows get ``sent_via =
+'push'``, so dispatch only sends them on the customers' other channels.
+Until the push is done a dispatch lease keeps the scheduled dispatch off
+the new rows.
+"""
+import datetime
+import logging
+
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from apps.driver.models import DeliveryStatus
+from apps.main.models import Notification, NotificationBroadcast, Subscription
+from apps.main.notification_backends import OutboundMessage, customer_group
+from apps.main.notification_inbox import inbox_added
+from apps.main.notifications import get_backend, get_limiter, notification_settings, schedule_dispatch
+from core.db.router import get_current_db_alias
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_FILTERS = ('zone', 'meal_slot', 'diet_type', 'subscription_status', 'delivery_date')
+DEFAULT_STATUSES = ['active']
+
+
+def segment_subscriptions(segment):
+    """Subscriptions matching ``segment``."""
+    subscriptions = Subscription.objects.filter(
+        status__in=segment.get('subscription_status') or DEFAULT_STATUSES, want_notifications=True,
+    )
+    if segment.get('zone'):
+        subscriptions = subscriptions.filter(
+            Q(lunch_address__zone__in=segment['zone']) | Q(dinner_address__zone__in=segment['zone']),
+        )
+    if segment.get('meal_slot'):
+        subscriptions = subscriptions.filter(time_slot__in=segment['meal_slot'])
+    if segment.get('diet_type'):
+        subscriptions = subscriptions.filter(diet_type__in=segment['diet_type'])
+    if segment.get('delivery_date'):
+        subscriptions = subscriptions.filter(Exists(
+            DeliveryStatus.objects.filter(subscription=OuterRef('pk'), date=segment['delivery_date'])
+            .exclude(status='cancelled')
+        ))
+    return subscriptions
+
+
+def segment_customer_ids(segment):
+    """Ids of the customers in ``segment``, in one query."""
+    return list(
+        segment_subscriptions(segment).order_by('customer_id')
+        .values_list('customer_id', flat=True).distinct()
+    )
+
+
+def _stored_filters(segment):
+    return {
+        key: value.isoformat() if isinstance(value, datetime.date) else value
+        for key, value in segment.items() if key in SEGMENT_FILTERS and value not in (None, [], '')
+    }
+
+
+def broadcast(message, segment, priority='medium', created_by=None, chunk_size=None):
+    """
+    Send ``message`` to every customer in ``segment``. Returns the
+    ``NotificationBroadcast``; its ``pushed`` count is filled in once the
+    transaction has committed and the push has run.
+    """
+    config = notification_settings()
+    chunk_size = chunk_size or config['BROADCAST_CHUNK_SIZE']
+    alias = get_current_db_alias()
+    customer_ids = segment_customer_ids(segment)
+    lease = timezone.now() + datetime.timedelta(seconds=config['LEASE'])
+
+    with transaction.atomic(using=alias):
+        sent = NotificationBroadcast.objects.create(
+            message=message, priority=priority, filters=_stored_filters(segment),
+            recipients=len(customer_ids), created_by=created_by,
+        )
+        recipients = []
+        for start in range(0, len(customer_ids), chunk_size):
+            created = Notification.objects.bulk_create([
+                Notification(
+                    customer_id=customer_id, broadcast=sent, message=message,
+                    priority=priority, next_attempt_at=lease,
+                )
+                for customer_id in customer_ids[start:start + chunk_size]
+            ])
+            inbox_added(created, alias=alias)
+            recipients.extend((notification.pk, notification.customer_id) for notification in created)
+        transaction.on_commit(lambda: push_broadcast(sent, recipients, alias), using=alias)
+    return sent
+
+
+def push_broadcast(sent, recipients, alias):
+    """
+    Push the broadcast's notifications (``(id, customer_id)`` pairs) to
+    connected apps, then hand them to dispatch for the other channels.
+    """
+    backend = get_backend('push')
+    pushed = 0
+    if backend is not None:
+        for start in range(0, len(recipients), backend.batch_size):
+            chunk = recipients[start:start + backend.batch_size]
+            get_limiter('push').acquire(len(chunk))
+            try:
+                errors = backend.send_messages([
+                    OutboundMessage(
+                        channel='push', customer_id=customer_id, address=customer_group(alias, customer_id),
+                        body=sent.message, priority=sent.priority, notification_ids=[pk],
+                    )
+                    for pk, customer_id in chunk
+                ])
+            except Exception:
+                logger.exception("Push of broadcast %s failed on %s message(s)", sent.pk, len(chunk))
+                continue
+            ok = [pk for (pk, _), error in zip(chunk, errors) if not error]
+            Notification.objects.filter(pk__in=ok).update(sent_via='push', next_attempt_at=None)
+            pushed += len(ok)
+    # Release the lease on whatever was not pushed
+    Notification.objects.filter(broadcast=sent, next_attempt_at__isnull=False).update(next_attempt_at=None)
+    sent.pushed = pushed
+    sent.save(update_fields=['pushed'])
+    if recipients:
+        schedule_dispatch(None, using=alias)
+    return pushed
+
+
+def delivery_counts(sent):
+    """How far the broadcast's notifications have got, in one query."""
+    counts = Notification.objects.filter(broadcast=sent).aggregate(
+        total=Count('pk'),
+        sent_count=Count('pk', filter=Q(sent=True)),
+        failed_count=Count('pk', filter=Q(sent=False, attempts__gt=0)),
+        read_count=Count('pk', filter=Q(read=True)),
+    )
+    return {
+        'total': counts['total'],
+        'pushed': sent.pushed,
+        'sent': counts['sent_count'],
+        'pending': counts['total'] - counts['sent_count'],
+        'failed': counts['failed_count'],
+        'read': counts['read_count'],
+    }
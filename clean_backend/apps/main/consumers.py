@@ -0,0 +1,131 @@
+"""
+Websocket consumer for live customer notifications.
+
+A connected customer app joins its channel-layer group
+(``notification_backends.customer_group``). The ``push`` channel backend
+and segment broadcasts send ``notification.message`` events to that group,
+which are forwarded to the app as JSON.
+
+Sockets are authenticated by ``TenantJWTAuthMiddleware`` (see
+``config/asgi.py``), not by session cookies. The tenant is identified like
+``MultiDbTenantMiddleware`` does it: the ``X-Tenant-ID`` / ``X-Tenant-Slug``
+header, else the Host subdomain. The app sends the access token it got from
+the customer API as ``?token=`` (browsers cannot set websocket headers) or
+an ``Authorization: Bearer`` header. The token's ``tenant`` claim must name
+the resolved tenant, and its user is looked up in that tenant's database.
+"""
+from urllib.parse import parse_qs
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from channels.middleware import BaseMiddleware
+
+from apps.main.notification_backends import customer_group
+
+
+def _headers(scope):
+    return {name.decode('latin1').lower(): value.decode('latin1') for name, value in scope.get('headers', [])}
+
+
+def _tenant_slug(headers):
+    slug = headers.get('x-tenant-id') or headers.get('x-tenant-slug')
+    if slug:
+        return slug
+    host = headers.get('host', '').split(':')[0]
+    parts = host.split('.')
+    if host != 'localhost' and not host.replace('.', '').isnumeric() and len(parts) >= 3:
+        return parts[0]
+    return None
+
+
+def _raw_token(scope, headers):
+    token = parse_qs(scope.get('query_string', b'').decode('latin1')).get('token')
+    if token:
+        return token[0]
+    scheme, _, value = headers.get('authorization', '').partition(' ')
+    return value.strip() if scheme.lower() == 'bearer' else None
+
+
+@database_sync_to_async
+def authenticate_socket(scope):
+    """
+    ``(user, db_alias)`` of a websocket connection: the active user of a
+    valid access token issued on the connection's tenant, looked up in that
+    tenant's database. ``(AnonymousUser(), None)`` otherwise.
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.models import AnonymousUser
+    from rest_framework_simplejwt.exceptions import TokenError
+    from rest_framework_simplejwt.settings import api_settings
+    from rest_framework_simplejwt.tokens import AccessToken
+
+    from apps.organizations.provisioning import ensure_tenant_alias
+    from apps.users.models import Tenant
+
+    anonymous = AnonymousUser(), None
+    headers = _headers(scope)
+    raw = _raw_token(scope, headers)
+    if not raw:
+        return anonymous
+    try:
+        token = AccessToken(raw)
+    except TokenError:
+        return anonymous
+
+    tenant, alias = None, 'default'
+    slug = _tenant_slug(headers)
+    if slug:
+        tenant = Tenant.objects.using('default').filter(subdomain__iexact=slug, is_active=True).first()
+        if tenant is None:
+            return anonymous
+        alias = ensure_tenant_alias(f"tenant_{tenant.id}", tenant)
+    # Tokens are signed with one key for every tenant, so a user id alone
+    # would match whoever has that id in another tenant's database
+    if token.get('tenant') != (tenant.subdomain if tenant else None):
+        return anonymous
+    user = get_user_model().objects.using(alias).filter(
+        pk=token.get(api_settings.USER_ID_CLAIM), is_active=True,
+    ).first()
+    return (user, alias) if user else anonymous
+
+
+class TenantJWTAuthMiddleware(BaseMiddleware):
+    """Sets ``scope['user']`` and ``scope['db_alias']`` from ``authenticate_socket``."""
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        scope['user'], scope['db_alias'] = await authenticate_socket(scope)
+        return await super().__call__(scope, receive, send)
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    group = None
+
+    async def connect(self):
+        user = self.scope.get('user')
+        if user is None or not user.is_authenticated or not self.scope.get('db_alias'):
+            await self.close()
+            return
+        self.group = await self._customer_group(user)
+        if self.group is None:
+            await self.close()
+            return
+        await self.channel_layer.group_add(self.group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if self.group:
+            await self.channel_layer.group_discard(self.group, self.channel_name)
+
+    async def notification_message(self, event):
+        await self.send_json({key: event[key] for key in ('ids', 'message', 'priority')})
+
+    @database_sync_to_async
+    def _customer_group(self, user):
+        from apps.main.models import CustomerProfile
+
+        alias = self.scope['db_alias']
+        customer_id = (
+            CustomerProfile.objects.using(alias).filter(user_id=user.pk).values_list('pk', flat=True).first()
+        )
+        return customer_group(alias, customer_id) if customer_id else None
@@ -0,0 +1,56 @@
+"""
+Background jobs for subscriptions and notifications (see apps/jobs/executor.py).
+
+``SubscriptionAdminViewSet.activate`` and ``generate_orders`` run these
+instead of working inline when called with ``?background=1``.
+``send_notifications`` is queued whenever new notifications commit.
+"""
+import datetime
+
+from apps.jobs.executor import background_job
+from apps.main.models import Invoice, Subscription
+from apps.main.notifications import dispatch_notifications
+
+
+def fulfil_activation(sub):
+    """
+    Delivery schedule, orders and the period invoice for a subscription
+    that has just been activated. Returns ``(orders_created, invoice_created)``.
+    """
+    sub.update_delivery_schedule()
+    orders_created = sub.generate_orders()
+    # Cash/card = tenant already collected → mark paid. Wallet = pending (settled on delivery/top-up).
+    invoice_created = False
+    if sub.total_cost and sub.total_cost > 0:
+        Invoice.objects.create(
+            customer=sub.customer,
+            due_date=sub.start_date + datetime.timedelta(days=7),
+            total=sub.total_cost,
+            status='paid' if sub.payment_mode in ('cash', 'card') else 'pending',
+            notes=f"Subscription #{sub.id} ({sub.start_date} to {sub.end_date})",
+        )
+        invoice_created = True
+    return orders_created, invoice_created
+
+
+@background_job(max_attempts=3)
+def activate_subscription(ctx, subscription_id):
+    sub = Subscription.objects.select_related('customer', 'time_slot').get(pk=subscription_id)
+    if sub.status != 'active':
+        # Paused or cancelled again before the job ran
+        return {'orders_created': 0, 'invoice_created': False, 'skipped': sub.status}
+    ctx.set_progress(10, 'Generating orders')
+    orders_created, invoice_created = fulfil_activation(sub)
+    return {'orders_created': orders_created, 'invoice_created': invoice_created}
+
+
+@background_job(max_attempts=3)
+def generate_subscription_orders(ctx, subscription_id):
+    sub = Subscription.objects.select_related('time_slot').get(pk=subscription_id)
+    return {'orders_created': sub.generate_orders()}
+
+
+# Sends outside the job transaction, so claimed and sent rows commit as it goes
+@background_job(atomic=False)
+def send_notifications(ctx, ids=None):
+    return dispatch_notifications(ids=ids)
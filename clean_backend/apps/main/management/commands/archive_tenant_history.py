@@ -0,0 +1,81 @@
+"""
+Move tenant history past its retention horizon into the archive.
+
+Each tenant with an enabled TenantRetentionPolicy has its old orders,
+delivery statuses, notifications and wallet transactions moved, in
+batches of one transaction each, into its archive tables or gzipped
+JSONL files (see apps/main/retention.py). Runs daily as the
+archive_tenant_history scheduled job.
+
+Usage:
+    python manage.py archive_tenant_history                    # every tenant with a policy
+    python manage.py archive_tenant_history --tenant=abc
+    python manage.py archive_tenant_history --dry-run          # records per dataset, nothing moved
+    python manage.py archive_tenant_history --batch-size=5000 --max-batches=10
+"""
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.main.retention import run_retention
+from apps.users.models import Tenant
+
+
+class Command(BaseCommand):
+    help = "Archives tenant history past each tenant's retention horizon."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", type=str, default=None, help="Archive a single tenant by subdomain.")
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Print the records each dataset would archive; move nothing.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.RETENTION_BATCH_SIZE,
+            help="Records moved per transaction.",
+        )
+        parser.add_argument(
+            "--max-batches", type=int, default=None,
+            help="Stop each dataset after this many batches (continue on the next run).",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=settings.SCHEDULER_TENANT_CONCURRENCY,
+            help="Tenants processed in parallel.",
+        )
+
+    def handle(self, *args, **options):
+        tenants = None
+        if options["tenant"]:
+            tenants = list(Tenant.objects.using("default").filter(subdomain__iexact=options["tenant"]))
+            if not tenants:
+                self.stderr.write(self.style.ERROR(f"Tenant '{options['tenant']}' not found."))
+                sys.exit(1)
+
+        outcomes = run_retention(
+            tenants=tenants, dry_run=options["dry_run"], batch_size=options["batch_size"],
+            max_batches=options["max_batches"], max_workers=options["workers"],
+        )
+        if not outcomes:
+            self.stdout.write(self.style.WARNING("No tenant has an enabled retention policy."))
+            return
+
+        for outcome in outcomes:
+            if 'error' in outcome:
+                self.stdout.write(self.style.ERROR(f"  {outcome['tenant']}: failed: {outcome['error']}"))
+            elif 'skipped' in outcome:
+                self.stdout.write(self.style.WARNING(f"  {outcome['tenant']}: skipped: {outcome['skipped']}"))
+            elif options["dry_run"]:
+                counts = ", ".join(f"{name} {count}" for name, count in outcome['result'].items())
+                self.stdout.write(f"  {outcome['tenant']} (dry run): {counts or 'nothing to archive'}")
+            else:
+                moved = ", ".join(
+                    f"{name} {totals['records']} ({totals['rows']} rows)"
+                    for name, totals in outcome['result'].items()
+                )
+                self.stdout.write(f"  {outcome['tenant']}: {moved or 'nothing to archive'} ({outcome['seconds']:.2f}s)")
+
+        failed = sum(1 for outcome in outcomes if 'error' in outcome)
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        verb = "Checked" if options["dry_run"] else "Archived"
+        self.stdout.write(style(f"{verb} {len(outcomes) - failed} tenants ({failed} failed)."))
@@ -7,14 +7,16 @@ and a Delivery record is created for each order that becomes ready (so they appe
 in Delivery Management for driver assignment).
 
 Run daily via cron (e.g. at 10:00) so all of today's subscription orders are
-ready and in the delivery queue without manual clicking.
+ready and in the delivery queue without manual clicking. Tenants are processed
+in parallel (core/db/fanout.py); without --no-input the orders are counted first
+and one confirmation covers all tenants.
 
 Usage:
     python manage.py auto_advance_today_orders --tenant=test_tenant
     python manage.py auto_advance_today_orders --all
     python manage.py auto_advance_today_orders --all --no-input  # no confirmation
+    python manage.py auto_advance_today_orders --all --no-input --workers=8 --statement-timeout=60
 """
-import copy
 import sys
 
 from django.conf import settings
@@ -22,7 +24,9 @@ from django.core.management.base import BaseCommand
 from django.utils import timezone
 
 from apps.main.models import Order
+from apps.main.utils.order_state import bulk_transition_orders
 from apps.users.models import Tenant
+from core.db.fanout import TenantFanOut
 
 
 class Command(BaseCommand):
@@ -49,6 +53,18 @@ class Command(BaseCommand):
             action="store_true",
             help="Do not prompt for confirmation.",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.SCHEDULER_TENANT_CONCURRENCY,
+            help="Tenants processed in parallel.",
+        )
+        parser.add_argument(
+            "--statement-timeout",
+            type=int,
+            default=settings.TENANT_STATEMENT_TIMEOUT,
+            help="Per-statement timeout in seconds on tenant databases (0 = none).",
+        )
 
     def handle(self, *args, **options):
         if not options["tenant"] and not options["all"]:
@@ -80,103 +96,75 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING("No active tenants."))
                 return
 
-        for tenant in tenants:
-            self._advance_for_tenant(tenant, today, options["no_input"])
+        def fan_out(func):
+            return TenantFanOut(
+                func, max_workers=options["workers"],
+                statement_timeout=options["statement_timeout"],
+            )
 
-    def _advance_for_tenant(self, tenant, today, no_input):
-        db_alias = f"tenant_{tenant.id}"
-        if not tenant.db_name:
-            self.stdout.write(
-                self.style.WARNING(
-                    f"  SKIP  {tenant.subdomain} — no db_name configured"
+        if not options["no_input"]:
+            tenants = self._confirm(tenants, today, fan_out(
+                lambda tenant, alias: self._pending_orders(alias, today).count()
+            ))
+            if not tenants:
+                return
+
+        advance = fan_out(lambda tenant, alias: self._advance_for_tenant(tenant, alias, today))
+        for result in advance.stream(tenants):
+            if result.status == "skipped":
+                self.stdout.write(
+                    self.style.WARNING(f"  SKIP  {result.tenant.subdomain} — {result.error}")
                 )
-            )
-            return
-
-        # Register tenant DB if needed
-        default_db = settings.DATABASES["default"]
-        if db_alias not in settings.DATABASES:
-            db_config = copy.deepcopy(default_db)
-            db_config.update({
-                "NAME": tenant.db_name,
-                "USER": tenant.db_user or default_db.get("USER", ""),
-                "PASSWORD": tenant.db_password or default_db.get("PASSWORD", ""),
-                "HOST": tenant.db_host or default_db.get("HOST", "localhost"),
-                "PORT": tenant.db_port or default_db.get("PORT", "5432"),
-                "ATOMIC_REQUESTS": False,
-            })
-            settings.DATABASES[db_alias] = db_config
-
-        order_qs = Order.objects.using(db_alias).filter(
+            elif not result.ok:
+                self.stderr.write(
+                    self.style.ERROR(f"  {result.tenant.subdomain}: failed — {result.error}")
+                )
+        self.stdout.write(f"  {advance.stats.format()}")
+
+    def _confirm(self, tenants, today, count):
+        """Count today's orders per tenant and ask once. Returns the tenants to advance."""
+        counts = {}
+        for result in count.stream(tenants):
+            if result.ok and result.result:
+                counts[result.tenant.pk] = result.result
+                self.stdout.write(f"  {result.tenant.subdomain}: {result.result} order(s) for {today}")
+            elif not result.ok and result.status != "skipped":
+                self.stderr.write(
+                    self.style.ERROR(f"  {result.tenant.subdomain}: failed — {result.error}")
+                )
+        if not counts:
+            self.stdout.write(self.style.SUCCESS(f"No orders to advance for {today}."))
+            return []
+        confirm = input(
+            f"  Advance {sum(counts.values())} order(s) for {today} in {len(counts)} tenant(s) "
+            f"to ready and create Deliveries? [y/N]: "
+        )
+        if confirm.lower() != "y":
+            self.stdout.write("  Skipped.")
+            return []
+        return [tenant for tenant in tenants if tenant.pk in counts]
+
+    def _pending_orders(self, db_alias, today):
+        return Order.objects.using(db_alias).filter(
             delivery_date=today,
             status__in=('pending', 'confirmed', 'preparing'),
         )
-        count = order_qs.count()
-        if count == 0:
+
+    def _advance_for_tenant(self, tenant, db_alias, today):
+        # One validated UPDATE walks every order through the remaining
+        # steps; Deliveries for the ready orders are created in bulk.
+        _, ready_ids, created_deliveries = bulk_transition_orders(
+            self._pending_orders(db_alias, today), 'ready', today=today, advance=True,
+        )
+        if ready_ids:
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"  {tenant.subdomain}: no orders to advance for {today}."
+                    f"  {tenant.subdomain}: advanced {len(ready_ids)} order(s) to ready, "
+                    f"created {created_deliveries} delivery record(s)."
                 )
             )
-            return
-
-        if not no_input:
-            confirm = input(
-                f"  Advance {count} order(s) for {today} in tenant '{tenant.subdomain}' "
-                f"to ready and create Deliveries? [y/N]: "
-            )
-            if confirm.lower() != "y":
-                self.stdout.write(f"  Skipped {tenant.subdomain}.")
-                return
-
-        # Advance in steps so we don't skip a step
-        Order.objects.using(db_alias).filter(
-            delivery_date=today, status='pending',
-        ).update(status='confirmed')
-        Order.objects.using(db_alias).filter(
-            delivery_date=today, status='confirmed',
-        ).update(status='preparing')
-        ready_ids = list(
-            Order.objects.using(db_alias).filter(
-                delivery_date=today, status='preparing',
-            ).values_list('id', flat=True)
-        )
-        Order.objects.using(db_alias).filter(id__in=ready_ids).update(status='ready')
-
-        # Set the thread-local DB alias so that model instantiation and router checks work
-        from core.db.router import set_current_db_alias
-        previous_alias = settings.DATABASES.get('default', {}).get('NAME', 'default') # Just ensuring we can revert if needed, but 'default' is safe fallback
-        set_current_db_alias(db_alias)
-        
-        try:
-            # Create Delivery for each order that is now ready (so they appear in Delivery Management)
-            from apps.delivery.models import Delivery
-            from apps.main.utils.delivery_utils import assign_driver_to_order
-            created_deliveries = 0
-            for order_id in ready_ids:
-                # get_or_create needs the order instance; we only have id
-                order = Order.objects.using(db_alias).get(id=order_id)
-                # Auto-assign driver based on zone
-                assigned_driver = assign_driver_to_order(order)
-                delivery, created = Delivery.objects.using(db_alias).get_or_create(
-                    order=order,
-                    defaults={
-                        'status': 'pending',
-                        'driver': assigned_driver
-                    }
-                )
-                # Update driver if not set and we have one
-                if not delivery.driver and assigned_driver:
-                    delivery.driver = assigned_driver
-                    delivery.save(update_fields=['driver'])
-                if created:
-                    created_deliveries += 1
-        finally:
-            set_current_db_alias('default')
-
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"  {tenant.subdomain}: advanced {count} order(s) to ready, "
-                f"created {created_deliveries} delivery record(s)."
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"  {tenant.subdomain}: no orders to advance for {today}.")
             )
-        )
+        return {'ready': len(ready_ids), 'deliveries_created': created_deliveries}
@@ -0,0 +1,107 @@
+"""
+Benchmark customer search: the old multi-join ``icontains`` lookups against
+the indexed search documents (``apps.main.utils.search``).
+
+Seeds N customers inside a transaction, runs a few representative terms
+(name prefix, email fragment, phone prefix) both ways, then rolls
+everything back.
+
+Usage:
+    python manage.py benchmark_customer_search
+    python manage.py benchmark_customer_search --rows 20000 --repeat 5
+"""
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Q
+
+from apps.main.models import CustomerProfile
+from apps.main.utils.search import search_queryset
+
+FIRST_NAMES = ['Ahmed', 'Fatima', 'Omar', 'Aisha', 'Yusuf', 'Mariam', 'Khalid', 'Layla', 'Hassan', 'Noor']
+LAST_NAMES = ['Khan', 'Ali', 'Saeed', 'Rahman', 'Haddad', 'Nasser', 'Farouk', 'Qasim']
+TERMS = ['layl', 'khan omar', 'mail7', '+971500012']
+LEGACY_FIELDS = ['user__username', 'user__email', 'name', 'phone']
+
+
+class Command(BaseCommand):
+    help = 'Time legacy icontains search vs the search-document index on seeded customers (rolled back).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000, help='Customers to seed.')
+        parser.add_argument('--repeat', type=int, default=3, help='Timed runs per term.')
+        parser.add_argument('--database', default='default', help='Database alias to use.')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        with transaction.atomic(using=using):
+            self._seed(options['rows'], using)
+            self._run(options['repeat'], using)
+            transaction.set_rollback(True, using=using)
+
+    def _seed(self, rows, using):
+        start = time.perf_counter()
+        tag = f"bench{int(time.time())}"
+        rng = random.Random(rows)
+
+        users = User.objects.using(using).bulk_create([
+            User(username=f'{tag}-{i}', email=f'{tag}.mail{i}@example.com',
+                 first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES))
+            for i in range(rows)
+        ], batch_size=5000)
+        profiles = []
+        for i, user in enumerate(users):
+            profile = CustomerProfile(
+                user=user, name=f'{user.first_name} {user.last_name}',
+                phone=f'+9715{rng.randint(0, 9)}{i:07d}',
+            )
+            profile.refresh_search_document()
+            profiles.append(profile)
+        CustomerProfile.objects.using(using).bulk_create(profiles, batch_size=2000)
+
+        with connections[using].cursor() as cursor:
+            cursor.execute('ANALYZE auth_user')
+            cursor.execute('ANALYZE main_customerprofile')
+        self.stdout.write(f"Seeded {rows} customers in {time.perf_counter() - start:.2f}s")
+
+    def _run(self, repeat, using):
+        queryset = CustomerProfile.objects.using(using).select_related('user').order_by('-created_at')
+
+        def legacy(term):
+            condition = Q()
+            for word in term.split():
+                matches = Q()
+                for field in LEGACY_FIELDS:
+                    matches |= Q(**{f'{field}__icontains': word})
+                condition &= matches
+            return queryset.filter(condition).distinct()
+
+        def indexed(term):
+            return search_queryset(queryset, term, rank=True)
+
+        def best_of(build, term):
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                page = build(term)
+                count = page.count()
+                list(page[:10])
+                timings.append(time.perf_counter() - start)
+            return min(timings), count
+
+        totals = {'legacy': 0.0, 'indexed': 0.0}
+        for term in TERMS:
+            legacy_time, legacy_count = best_of(legacy, term)
+            indexed_time, indexed_count = best_of(indexed, term)
+            totals['legacy'] += legacy_time
+            totals['indexed'] += indexed_time
+            self.stdout.write(
+                f"  {term!r:<14} legacy {legacy_time * 1000:8.1f} ms ({legacy_count} rows)  "
+                f"indexed {indexed_time * 1000:8.1f} ms ({indexed_count} rows)"
+            )
+
+        speedup = totals['legacy'] / totals['indexed']
+        self.stdout.write(self.style.SUCCESS(f"Indexed search is {speedup:.1f}x faster (count + first page)."))
@@ -1,27 +1,42 @@
 """
-Delete all subscriptions (and related Orders, DeliveryStatus, etc.) for one or all tenant DBs.
+Delete subscriptions (and related Orders, DeliveryStatus, etc.) for one or all tenant DBs.
 
 CASCADE will also remove:
 - Order, SubscriptionEditRequest (main)
-- DeliveryStatus, DeliveryAssignment (driver)
+- DeliveryStatus, DeliveryAssignment, DeliveryNotification (driver)
 - Delivery, KitchenOrder (via Order)
+and wallet transactions keep their rows with the subscription cleared.
+
+Rows are deleted in fixed-size primary-key chunks, dependants first, each
+chunk in its own transaction (core/db/purge.py), so large tenants are purged
+without loading them into memory. Purges can be scoped by end date and
+status. Tenants are processed in parallel (core/db/fanout.py); without
+--no-input the subscriptions are counted first and one confirmation covers
+all tenants.
 
 Usage:
     python manage.py clean_tenant_subscriptions --tenant=test_tenant   # one tenant by subdomain
     python manage.py clean_tenant_subscriptions --all                 # all active tenants
+    python manage.py clean_tenant_subscriptions --all --before=2026-01-01 --status=expired,cancelled
+    python manage.py clean_tenant_subscriptions --all --dry-run       # rows per table, nothing deleted
+    python manage.py clean_tenant_subscriptions --all --no-input --chunk-size=10000
 """
-import copy
+import datetime
 import sys
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 
 from apps.main.models import Subscription
 from apps.users.models import Tenant
+from core.db.fanout import TenantFanOut
+from core.db.purge import Purge
+
+SUBSCRIPTION_STATUSES = {value for value, _ in Subscription._meta.get_field("status").choices}
 
 
 class Command(BaseCommand):
-    help = "Delete all subscriptions (and related orders, delivery statuses, etc.) for the given tenant(s)."
+    help = "Delete subscriptions (and related orders, delivery statuses, etc.) for the given tenant(s)."
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -41,6 +56,47 @@ class Command(BaseCommand):
             action="store_true",
             help="Do not prompt for confirmation.",
         )
+        parser.add_argument(
+            "--before",
+            type=str,
+            default=None,
+            help="Only subscriptions that ended before this date (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--after",
+            type=str,
+            default=None,
+            help="Only subscriptions that ended on or after this date (YYYY-MM-DD).",
+        )
+        parser.add_argument(
+            "--status",
+            type=str,
+            default=None,
+            help="Only subscriptions in these statuses (comma-separated).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the rows each table would lose; delete nothing.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Rows deleted per statement and transaction.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.SCHEDULER_TENANT_CONCURRENCY,
+            help="Tenants processed in parallel.",
+        )
+        parser.add_argument(
+            "--statement-timeout",
+            type=int,
+            default=settings.TENANT_STATEMENT_TIMEOUT,
+            help="Per-statement timeout in seconds on tenant databases (0 = none).",
+        )
 
     def handle(self, *args, **options):
         if not options["tenant"] and not options["all"]:
@@ -54,6 +110,9 @@ class Command(BaseCommand):
             )
             sys.exit(1)
 
+        self.scope = self._scope(options)
+        self.chunk_size = options["chunk_size"]
+
         if options["tenant"]:
             tenants = list(
                 Tenant.objects.using("default").filter(
@@ -71,51 +130,99 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.WARNING("No active tenants."))
                 return
 
-        for tenant in tenants:
-            self._clean_subscriptions_for_tenant(tenant, options["no_input"])
+        def fan_out(func):
+            return TenantFanOut(
+                func, max_workers=options["workers"],
+                statement_timeout=options["statement_timeout"],
+            )
+
+        if options["dry_run"]:
+            work = fan_out(self._dry_run_for_tenant)
+        else:
+            if not options["no_input"]:
+                tenants = self._confirm(tenants, fan_out(
+                    lambda tenant, alias: self._subscriptions(alias).count()
+                ))
+                if not tenants:
+                    return
+            work = fan_out(self._clean_subscriptions_for_tenant)
 
-    def _clean_subscriptions_for_tenant(self, tenant, no_input):
-        db_alias = f"tenant_{tenant.id}"
-        if not tenant.db_name:
-            self.stdout.write(
-                self.style.WARNING(
-                    f"  SKIP  {tenant.subdomain} — no db_name configured"
+        for result in work.stream(tenants):
+            if result.status == "skipped":
+                self.stdout.write(
+                    self.style.WARNING(f"  SKIP  {result.tenant.subdomain} — {result.error}")
                 )
-            )
-            return
-
-        # Register tenant DB if needed
-        default_db = settings.DATABASES["default"]
-        if db_alias not in settings.DATABASES:
-            db_config = copy.deepcopy(default_db)
-            db_config.update({
-                "NAME": tenant.db_name,
-                "USER": tenant.db_user or default_db.get("USER", ""),
-                "PASSWORD": tenant.db_password or default_db.get("PASSWORD", ""),
-                "HOST": tenant.db_host or default_db.get("HOST", "localhost"),
-                "PORT": tenant.db_port or default_db.get("PORT", "5432"),
-                "ATOMIC_REQUESTS": False,
-            })
-            settings.DATABASES[db_alias] = db_config
-
-        count = Subscription.objects.using(db_alias).count()
-        if count == 0:
-            self.stdout.write(
-                self.style.SUCCESS(f"  {tenant.subdomain}: no subscriptions to delete.")
-            )
-            return
+            elif not result.ok:
+                self.stderr.write(
+                    self.style.ERROR(f"  {result.tenant.subdomain}: failed — {result.error}")
+                )
+        self.stdout.write(f"  {work.stats.format()}")
 
-        if not no_input:
-            confirm = input(
-                f"  Delete {count} subscription(s) (and their orders, delivery statuses, etc.) "
-                f"in tenant '{tenant.subdomain}'? [y/N]: "
-            )
-            if confirm.lower() != "y":
-                self.stdout.write(f"  Skipped {tenant.subdomain}.")
-                return
+    def _scope(self, options):
+        """Filter kwargs for the subscriptions to delete."""
+        scope = {}
+        try:
+            if options["before"]:
+                scope["end_date__lt"] = datetime.date.fromisoformat(options["before"])
+            if options["after"]:
+                scope["end_date__gte"] = datetime.date.fromisoformat(options["after"])
+        except ValueError:
+            raise CommandError("Invalid date. Use YYYY-MM-DD.")
+        if options["status"]:
+            statuses = [status.strip() for status in options["status"].split(",") if status.strip()]
+            unknown = set(statuses) - SUBSCRIPTION_STATUSES
+            if unknown:
+                raise CommandError(f"Unknown subscription status: {', '.join(sorted(unknown))}.")
+            scope["status__in"] = statuses
+        return scope
+
+    def _subscriptions(self, db_alias):
+        return Subscription.objects.using(db_alias).filter(**self.scope)
 
-        # CASCADE removes: Order, SubscriptionEditRequest, DeliveryStatus (and DeliveryAssignment), etc.
-        Subscription.objects.using(db_alias).all().delete()
-        self.stdout.write(
-            self.style.SUCCESS(f"  {tenant.subdomain}: deleted {count} subscription(s).")
+    def _confirm(self, tenants, count):
+        """Count subscriptions per tenant and ask once. Returns the tenants to clean."""
+        counts = {}
+        for result in count.stream(tenants):
+            if result.ok and result.result:
+                counts[result.tenant.pk] = result.result
+                self.stdout.write(f"  {result.tenant.subdomain}: {result.result} subscription(s)")
+            elif not result.ok and result.status != "skipped":
+                self.stderr.write(
+                    self.style.ERROR(f"  {result.tenant.subdomain}: failed — {result.error}")
+                )
+        if not counts:
+            self.stdout.write(self.style.SUCCESS("No subscriptions to delete."))
+            return []
+        confirm = input(
+            f"  Delete {sum(counts.values())} subscription(s) (and their orders, delivery statuses, etc.) "
+            f"in {len(counts)} tenant(s)? [y/N]: "
         )
+        if confirm.lower() != "y":
+            self.stdout.write("  Skipped.")
+            return []
+        return [tenant for tenant in tenants if tenant.pk in counts]
+
+    def _purge(self, tenant, db_alias):
+        def progress(step, rows):
+            self.stdout.write(f"  {tenant.subdomain}: {step.label} {rows} row(s)")
+
+        return Purge(self._subscriptions(db_alias), chunk_size=self.chunk_size, progress=progress)
+
+    def _dry_run_for_tenant(self, tenant, db_alias):
+        counts = self._purge(tenant, db_alias).count()
+        summary = ", ".join(f"{label} {rows}" for label, rows in counts.items())
+        self.stdout.write(f"  {tenant.subdomain} (dry run): {summary}")
+        return counts
+
+    def _clean_subscriptions_for_tenant(self, tenant, db_alias):
+        # Orders, delivery statuses and their dependants go first, chunk by chunk
+        results = self._purge(tenant, db_alias).run()
+        count = results[-1].rows
+        if not count:
+            self.stdout.write(self.style.SUCCESS(f"  {tenant.subdomain}: no subscriptions to delete."))
+        else:
+            seconds = sum(result.seconds for result in results)
+            self.stdout.write(self.style.SUCCESS(
+                f"  {tenant.subdomain}: deleted {count} subscription(s) in {seconds:.1f}s."
+            ))
+        return count
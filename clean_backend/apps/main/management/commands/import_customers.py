@@ -0,0 +1,99 @@
+"""
+Bulk-import customers from a CSV or JSON file into one tenant (or the
+default database). See apps/main/utils/customer_import.py for the columns.
+
+Usage:
+    python manage.py import_customers customers.csv --tenant=test_tenant
+    python manage.py import_customers customers.json --tenant=test_tenant --invite --report=report.json
+    python manage.py import_customers customers.csv --tenant=test_tenant --dry-run
+"""
+import json
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.main.utils.customer_import import (
+    IMPORT_CHUNK_SIZE, ImportFormatError, import_customers, parse_rows,
+)
+from apps.organizations.provisioning import register_tenant_database
+from apps.users.models import Tenant
+from core.db.router import get_current_db_alias, set_current_db_alias
+
+
+class Command(BaseCommand):
+    help = "Bulk-import customers (User + CustomerProfile + Address) from CSV or JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or JSON file to import.")
+        parser.add_argument(
+            "--tenant", type=str, default=None,
+            help="Tenant subdomain. Without it the default database is used.",
+        )
+        parser.add_argument("--format", choices=["csv", "json"], default=None,
+                            help="File format (default: from the extension/content).")
+        parser.add_argument("--invite", action="store_true",
+                            help="Include password reset invite tokens in the report.")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Validate only; nothing is written.")
+        parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE,
+                            help="Rows inserted per transaction.")
+        parser.add_argument("--hash-workers", type=int, default=os.cpu_count() or 1,
+                            help="Processes hashing passwords supplied in the file.")
+        parser.add_argument("--report", default=None,
+                            help="Write the full JSON report to this file.")
+
+    def handle(self, *args, **options):
+        alias, plan = "default", None
+        if options["tenant"]:
+            tenant = Tenant.objects.using("default").select_related("service_plan").filter(
+                subdomain__iexact=options["tenant"]
+            ).first()
+            if tenant is None or not tenant.db_name:
+                self.stderr.write(self.style.ERROR(f"Tenant '{options['tenant']}' not found or has no database."))
+                sys.exit(1)
+            alias = f"tenant_{tenant.id}"
+            if alias not in settings.DATABASES:
+                register_tenant_database(
+                    alias, tenant.db_name, tenant.db_user, tenant.db_password,
+                    tenant.db_host, tenant.db_port,
+                )
+            plan = tenant.service_plan
+
+        try:
+            with open(options["path"], "rb") as handle:
+                records, first_row = parse_rows(handle.read(), options["format"], options["path"])
+        except (OSError, ImportFormatError) as exc:
+            self.stderr.write(self.style.ERROR(str(exc)))
+            sys.exit(1)
+
+        old_alias = get_current_db_alias()
+        set_current_db_alias(alias)
+        try:
+            result = import_customers(
+                records, using=alias, plan=plan, invite=options["invite"],
+                dry_run=options["dry_run"], chunk_size=options["chunk_size"],
+                hash_workers=options["hash_workers"], first_row=first_row,
+            )
+        finally:
+            set_current_db_alias(old_alias)
+
+        report = result.as_dict()
+        if options["report"]:
+            with open(options["report"], "w") as handle:
+                json.dump(report, handle, indent=2)
+
+        for entry in report["errors"][:20]:
+            messages = "; ".join(
+                f"{name}: {' '.join(str(m) for m in errors)}" for name, errors in entry["errors"].items()
+            )
+            self.stdout.write(self.style.WARNING(f"  row {entry['row']}: {messages}"))
+        if report["error_count"] > 20:
+            self.stdout.write(f"  ... {report['error_count'] - 20} more errors (see --report)")
+
+        verb = "Validated" if report["dry_run"] else "Imported"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {report['created_count']} of {report['total']} customer(s) into {alias}; "
+            f"{report['error_count']} row(s) rejected."
+        ))
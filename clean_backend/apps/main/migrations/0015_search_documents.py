@@ -0,0 +1,113 @@
+# Generated by Django 4.2.30 on 2026-10-19 09:31
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+# Mirrors CustomerProfile.search_parts / MenuItem.search_parts for existing rows.
+BACKFILL_SQL = r"""
+UPDATE main_customerprofile p SET
+    search_document = lower(concat_ws(' ',
+        nullif(btrim(p.name), ''), nullif(btrim(u.first_name), ''),
+        nullif(btrim(u.last_name), ''), nullif(btrim(u.username), ''),
+        nullif(btrim(u.email), ''), nullif(btrim(p.phone), ''),
+        nullif(regexp_replace(coalesce(p.phone, ''), '\D', '', 'g'), ''),
+        nullif(btrim(p.emirates_id), ''))),
+    search_vector =
+        setweight(to_tsvector('simple', lower(concat_ws(' ',
+            nullif(btrim(p.name), ''), nullif(btrim(u.first_name), ''),
+            nullif(btrim(u.last_name), ''), nullif(btrim(u.username), '')))), 'A')
+        || setweight(to_tsvector('simple', lower(concat_ws(' ',
+            nullif(btrim(u.email), ''), nullif(btrim(p.phone), ''),
+            nullif(regexp_replace(coalesce(p.phone, ''), '\D', '', 'g'), ''),
+            nullif(btrim(p.emirates_id), '')))), 'B')
+FROM auth_user u
+WHERE u.id = p.user_id;
+
+UPDATE main_menuitem m SET
+    search_document = lower(concat_ws(' ',
+        nullif(btrim(m.name), ''), nullif(btrim(m.description), ''), nullif(btrim(c.name), ''))),
+    search_vector =
+        setweight(to_tsvector('simple', lower(coalesce(nullif(btrim(m.name), ''), ''))), 'A')
+        || setweight(to_tsvector('simple', lower(concat_ws(' ',
+            nullif(btrim(m.description), ''), nullif(btrim(c.name), '')))), 'B')
+FROM main_category c
+WHERE c.id = m.category_id;
+"""
+
+# Substring matches on search_document use trigram indexes. pg_trgm ships
+# with contrib; where it is not installed the searches still work, just
+# without an index for the substring fallback.
+TRIGRAM_SQL = """
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm') THEN
+        CREATE EXTENSION IF NOT EXISTS pg_trgm;
+        CREATE INDEX IF NOT EXISTS customer_search_document_trgm
+            ON main_customerprofile USING gin (search_document gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS menuitem_search_document_trgm
+            ON main_menuitem USING gin (search_document gin_trgm_ops);
+    END IF;
+END
+$$;
+"""
+
+TRIGRAM_REVERSE_SQL = """
+DROP INDEX IF EXISTS customer_search_document_trgm;
+DROP INDEX IF EXISTS menuitem_search_document_trgm;
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0014_add_zone_to_address"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="customerprofile",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="customerprofile",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="menuitem",
+            name="search_document",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.AddField(
+            model_name="menuitem",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customerprofile",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="customer_search_vector_gin"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="customerprofile",
+            index=models.Index(
+                fields=["phone"],
+                name="customer_phone_prefix_idx",
+                opclasses=["varchar_pattern_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="menuitem",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["search_vector"], name="menuitem_search_vector_gin"
+            ),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+        migrations.RunSQL(TRIGRAM_SQL, TRIGRAM_REVERSE_SQL),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0016_order_created_at_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                fields=["delivery_date"], name="order_delivery_date_idx"
+            ),
+        ),
+    ]
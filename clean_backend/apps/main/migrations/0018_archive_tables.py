@@ -0,0 +1,147 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:26
+
+from decimal import Decimal
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0017_order_delivery_date_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchiveBatch",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dataset", models.CharField(max_length=30)),
+                (
+                    "storage",
+                    models.CharField(
+                        choices=[
+                            ("table", "Archive tables"),
+                            ("file", "Compressed JSONL file"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("path", models.CharField(blank=True, max_length=255)),
+                ("records", models.PositiveIntegerField(default=0)),
+                (
+                    "rows",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Records plus the dependent rows archived with them",
+                    ),
+                ),
+                ("first_date", models.DateField()),
+                ("last_date", models.DateField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["-archived_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ArchivedRecord",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dataset", models.CharField(max_length=30)),
+                ("object_id", models.BigIntegerField()),
+                ("customer_id", models.IntegerField(null=True)),
+                ("recorded_on", models.DateField()),
+                (
+                    "data",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder
+                    ),
+                ),
+                (
+                    "related",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ArchiveSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("dataset", models.CharField(max_length=30)),
+                ("period", models.DateField(help_text="First day of the month")),
+                ("status", models.CharField(blank=True, max_length=30)),
+                ("records", models.PositiveIntegerField(default=0)),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=14
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["dataset", "period", "status"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="archivesummary",
+            constraint=models.UniqueConstraint(
+                fields=("dataset", "period", "status"), name="unique_archive_summary"
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedrecord",
+            name="batch",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="archived_records",
+                to="main.archivebatch",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivebatch",
+            index=models.Index(
+                fields=["dataset", "last_date"], name="archivebatch_dataset_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedrecord",
+            index=models.Index(
+                fields=["dataset", "customer_id", "recorded_on"],
+                name="archivedrecord_customer_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="archivedrecord",
+            index=models.Index(
+                fields=["dataset", "recorded_on"], name="archivedrecord_date_idx"
+            ),
+        ),
+    ]
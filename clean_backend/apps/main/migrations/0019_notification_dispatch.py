@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:33
+
+from django.db import migrations, models
+
+
+def mark_existing_sent(apps, schema_editor):
+    """
+    Nothing set ``sent`` before dispatch existed, so every older row is
+    unsent. Mark them sent so the first dispatch run does not deliver the
+    whole notification history.
+    """
+    Notification = apps.get_model("main", "Notification")
+    Notification.objects.using(schema_editor.connection.alias).filter(sent=False).update(
+        sent=True, sent_at=models.F("created_at"),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0018_archive_tables"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="last_error",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="next_attempt_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="notification",
+            name="sent_via",
+            field=models.CharField(
+                blank=True,
+                help_text="Channels that delivered it, comma-separated",
+                max_length=50,
+            ),
+        ),
+        migrations.RunPython(mark_existing_sent, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                condition=models.Q(("sent", False)),
+                fields=["created_at"],
+                name="notification_unsent_idx",
+            ),
+        ),
+    ]
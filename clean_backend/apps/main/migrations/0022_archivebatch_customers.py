@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 11:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("main", "0021_address_coordinates"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="archivebatch",
+            name="customers",
+            field=models.JSONField(
+                blank=True,
+                help_text="File batches: records per customer id and day, {customer: {YYYY-MM-DD: n}}",
+                null=True,
+            ),
+        ),
+    ]
@@ -7,7 +7,11 @@ from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
+from apps.main.utils.search import build_search_document, build_search_vector, phone_digits
 from apps.main.utils.validators import (
     validate_image_file_extension, validate_image_file_size_5mb,
     validate_video_file_extension, validate_video_file_size_10mb,
@@ -30,6 +34,67 @@ def cache_model_method(timeout=3600):
     return decorator
 
 
+class ValidatedSaveMixin:
+    """
+    Scoped validation and loaded-value tracking for hot save paths.
+
+    ``validate_for_save(update_fields)`` runs ``full_clean`` only on the
+    fields being written (all of them when ``update_fields`` is None).
+    ``clean()`` can ask ``in_validation_scope(...)`` to skip checks for
+    fields that are not being saved. Foreign keys whose related object is
+    already cached on the instance are not re-validated, since their
+    existence is known.
+
+    Fields listed in ``tracked_fields`` are remembered as loaded from the
+    database; ``loaded_value(name)`` returns them without re-reading the row.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_loaded_values()
+        return instance
+
+    def _snapshot_loaded_values(self):
+        self._loaded_values = {
+            name: self.__dict__[name]
+            for name in self.tracked_fields if name in self.__dict__
+        }
+
+    def loaded_value(self, name):
+        """Value of ``name`` as last loaded or saved (None for new rows)."""
+        if self._state.adding:
+            return None
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        if name not in loaded:
+            # Deferred or never loaded (e.g. instance built by hand)
+            loaded[name] = type(self)._base_manager.using(self._state.db).filter(
+                pk=self.pk,
+            ).values_list(name, flat=True).first()
+        return loaded[name]
+
+    def in_validation_scope(self, *names):
+        scope = getattr(self, '_validation_scope', None)
+        return scope is None or any(name in scope for name in names)
+
+    def validate_for_save(self, update_fields=None):
+        scope = set(update_fields) if update_fields is not None else None
+        exclude = []
+        for field in self._meta.concrete_fields:
+            if scope is not None and field.name not in scope and field.attname not in scope:
+                exclude.append(field.name)
+            elif field.is_relation and field.is_cached(self):
+                related = field.get_cached_value(self)
+                if related is not None and related.pk is not None:
+                    exclude.append(field.name)
+        self._validation_scope = scope
+        try:
+            self.full_clean(exclude=exclude)
+        finally:
+            self._validation_scope = None
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
@@ -55,7 +120,42 @@ class TimeSlot(models.Model):
         return f"{self.name} ({self.time})"
 
 
-class CustomerProfile(models.Model):
+class SearchIndexedModel(models.Model):
+    """
+    Keeps a denormalized ``search_document``/``search_vector`` pair current
+    on save (see ``apps.main.utils.search``). Subclasses list the fields the
+    document is built from in ``search_source_fields`` and return its
+    ``(primary, secondary)`` parts from ``search_parts()``.
+    """
+    search_source_fields = ()
+    search_related = ()
+
+    search_document = models.TextField(blank=True, default='', editable=False)
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def search_parts(self):
+        raise NotImplementedError
+
+    def refresh_search_document(self):
+        primary, secondary = self.search_parts()
+        self.search_document = build_search_document(primary, secondary)
+        self.search_vector = build_search_vector(primary, secondary)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or set(update_fields) & set(self.search_source_fields):
+            self.refresh_search_document()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_document', 'search_vector'}
+        super().save(*args, **kwargs)
+        # The vector was written as an expression; reload it lazily if read.
+        self.__dict__.pop('search_vector', None)
+
+
+class CustomerProfile(SearchIndexedModel):
     """
     Extends the default Django User model with customer-specific information.
     
@@ -132,9 +232,17 @@ class CustomerProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    search_source_fields = ('name', 'phone', 'emirates_id', 'user')
+    search_related = ('user',)
+
     def __str__(self):
         return f"[Tenant #{self.tenant_id or '?'}] {self.user.username} ({self.phone or 'No Phone'})"
 
+    def search_parts(self):
+        user = self.user
+        primary = [self.name, user.first_name, user.last_name, user.username]
+        return primary, [user.email, self.phone, phone_digits(self.phone), self.emirates_id]
+
     @staticmethod
     def get_default_notifications():
         return {"email": True, "sms": True, "push": True}
@@ -142,9 +250,15 @@ class CustomerProfile(models.Model):
     class Meta:
         verbose_name = "Customer Profile"
         verbose_name_plural = "Customer Profiles"
+        indexes = [
+            GinIndex(fields=['search_vector'], name='customer_search_vector_gin'),
+            # LIKE 'x%' on phone under a non-C collation needs the pattern opclass
+            models.Index(fields=['phone'], name='customer_phone_prefix_idx',
+                         opclasses=['varchar_pattern_ops']),
+        ]
 
 
-class MenuItem(models.Model):
+class MenuItem(SearchIndexedModel):
     DIET_CHOICES = [
         ('veg', 'Vegetarian'),
         ('nonveg', 'Non-Vegetarian'),
@@ -177,12 +291,21 @@ class MenuItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    search_source_fields = ('name', 'description', 'category')
+    search_related = ('category',)
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            GinIndex(fields=['search_vector'], name='menuitem_search_vector_gin'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.get_diet_type_display()})"
 
+    def search_parts(self):
+        return [self.name], [self.description, self.category.name]
+
 
 class Menu(models.Model):
     """
@@ -449,6 +572,8 @@ class Address(models.Model):
     building_name = models.CharField(max_length=100, blank=True, null=True)
     floor_number = models.CharField(max_length=10, blank=True, null=True)
     flat_number = models.CharField(max_length=10, blank=True, null=True)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
     is_default = models.BooleanField(default=False, db_index=True)
     status = models.CharField(
         max_length=20,
@@ -482,11 +607,18 @@ class Address(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        parts = [self.building_name or "", 
-                 f"Floor {self.floor_number}" if self.floor_number else "", 
-                 f"Flat {self.flat_number}" if self.flat_number else ""]
+        return self.format_display(
+            self.street, self.city, self.building_name, self.floor_number, self.flat_number,
+        )
+
+    @staticmethod
+    def format_display(street, city, building_name, floor_number, flat_number):
+        """Render address parts the way ``__str__`` does (usable on ``values()`` rows)."""
+        parts = [building_name or "", 
+                 f"Floor {floor_number}" if floor_number else "", 
+                 f"Flat {flat_number}" if flat_number else ""]
         building_part = " - ".join(filter(None, parts))
-        return f"{self.street or ''}, {self.city or ''} {building_part}".strip(", ")
+        return f"{street or ''}, {city or ''} {building_part}".strip(", ")
 
     def clean(self):
         if not any([self.street, self.building_name]):
@@ -520,7 +652,13 @@ class Address(models.Model):
 
         if self.status == 'active' and self.is_default:
             Address.objects.filter(customer=self.customer).exclude(pk=self.pk).update(is_default=False)
-            
+
+        update_fields = kwargs.get('update_fields')
+        if self.zone_id is None and (update_fields is None or {'zone', 'zone_id'} & set(update_fields)):
+            # Fill in the zone from the address's coordinates, if they fall in one
+            from apps.driver.zone_index import resolve_address_zone_id
+            self.zone_id = resolve_address_zone_id(self, using=kwargs.get('using') or self._state.db)
+
         super().save(*args, **kwargs)
 
     def approve(self, user):
@@ -532,10 +670,11 @@ class Address(models.Model):
             self.save(update_fields=['status', 'processed_at', 'processed_by', 'is_default']) 
 
             if self.notify_customer:
-                Notification.objects.create(
-                    customer=self.customer,
+                from apps.main.notifications import notify
+                notify(
+                    self.customer,
                     message=f"Your address change request has been approved: {self.__str__()}.",
-                    priority='high'
+                    priority='high',
                 )
         return True
 
@@ -548,10 +687,11 @@ class Address(models.Model):
             self.admin_notes = reason
             self.save(update_fields=['status', 'processed_at', 'processed_by', 'admin_notes'])
             if self.notify_customer:
-                Notification.objects.create(
-                    customer=self.customer,
+                from apps.main.notifications import notify
+                notify(
+                    self.customer,
                     message=f"Your address change request was rejected: {reason}",
-                    priority='high'
+                    priority='high',
                 )
         return True
 
@@ -564,7 +704,7 @@ class Address(models.Model):
         ]
 
 
-class Subscription(models.Model):
+class Subscription(ValidatedSaveMixin, models.Model):
     customer = models.ForeignKey(CustomerProfile, on_delete=models.CASCADE, db_index=True)
     meal_package = models.ForeignKey(
         MealPackage,
@@ -638,9 +778,23 @@ class Subscription(models.Model):
             current_date += timezone.timedelta(days=1)
         return None
 
+    def get_menu_prices(self):
+        """
+        Prices of the selected menus. Uses prefetched menus when available,
+        otherwise queries once per instance; the cache is dropped when the
+        menus relation changes (see apps.main.signals).
+        """
+        if not self.pk:
+            return []
+        prefetched = getattr(self, '_prefetched_objects_cache', {}).get('menus')
+        if prefetched is not None:
+            return [menu.price for menu in prefetched]
+        if '_menu_prices' not in self.__dict__:
+            self._menu_prices = list(self.menus.values_list('price', flat=True))
+        return self._menu_prices
+
     def calculate_total_cost(self):
-        # Assuming menus are prefetched or efficiently accessed
-        menu_prices = [menu.price for menu in self.menus.all()] if self.pk else []
+        menu_prices = self.get_menu_prices()
         self.cost_per_meal = sum(menu_prices) or Decimal('0.00')
         total_days_selected = len(self.get_selected_days())
         
@@ -660,28 +814,34 @@ class Subscription(models.Model):
         return self.total_cost
 
     def clean(self):
-        if self.start_date and self.end_date and self.start_date > self.end_date:
-            raise ValidationError({'end_date': 'End date must be after start date.'})
+        if self.in_validation_scope('start_date', 'end_date'):
+            if self.start_date and self.end_date and self.start_date > self.end_date:
+                raise ValidationError({'end_date': 'End date must be after start date.'})
         if not self.pk and self.start_date and self.start_date < timezone.now().date():
             raise ValidationError({'start_date': 'Start date cannot be in the past for new subscriptions.'})
         
-        selected_days_list = self.get_selected_days()
-        if not selected_days_list:
-            raise ValidationError({'selected_days': 'At least one day must be selected.'})
-        
-        valid_days = [day[0] for day in self.DAYS_CHOICES]
-        if not all(day in valid_days for day in selected_days_list):
-            raise ValidationError({'selected_days': f'Invalid day selection.'})
+        if self.in_validation_scope('selected_days'):
+            selected_days_list = self.get_selected_days()
+            if not selected_days_list:
+                raise ValidationError({'selected_days': 'At least one day must be selected.'})
+            
+            valid_days = [day[0] for day in self.DAYS_CHOICES]
+            if not all(day in valid_days for day in selected_days_list):
+                raise ValidationError({'selected_days': f'Invalid day selection.'})
 
         if not self.pk and (self.end_date - self.start_date).days + 1 < self.MINIMUM_SUBSCRIPTION_DAYS:
             raise ValidationError(f'Minimum subscription duration is {self.MINIMUM_SUBSCRIPTION_DAYS} days.')
         
-        if not self.pk and Subscription.objects.filter(customer=self.customer, status__in=['active', 'pending']).count() >= self.MAX_SUBSCRIPTIONS_PER_USER:
+        if not self.pk and Subscription.objects.filter(
+            customer_id=self.customer_id, status__in=['active', 'pending'],
+        )[self.MAX_SUBSCRIPTIONS_PER_USER - 1:].exists():
             raise ValidationError(f'Maximum {self.MAX_SUBSCRIPTIONS_PER_USER} active subscriptions allowed.')
 
     def save(self, *args, **kwargs):
-        self.calculate_total_cost() 
-        self.full_clean()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or {'cost_per_meal', 'total_cost'} & set(update_fields):
+            self.calculate_total_cost()
+        self.validate_for_save(update_fields)
         is_new = not self.pk
         super().save(*args, **kwargs)
         if self.status == 'active' and is_new:
@@ -708,7 +868,9 @@ class Subscription(models.Model):
         
         dates_to_cancel = existing_deliveries - required_dates
         if dates_to_cancel:
-            DeliveryStatus.objects.filter(subscription=self, date__in=dates_to_cancel, status='pending').update(status='cancelled')
+            DeliveryStatus.objects.filter(subscription=self, date__in=dates_to_cancel, status='pending').update(
+                status='cancelled', updated_at=timezone.now(),
+            )
 
         new_dates = required_dates - existing_deliveries
         if new_dates:
@@ -752,14 +914,14 @@ class Subscription(models.Model):
         current_date = max(self.start_date, today)
         selected = self.get_selected_days()
         existing = set(self.order_set.values_list('delivery_date', flat=True))
-        created = 0
         
         # Get zone for this subscription's meal slot
         delivery_zone = self._get_delivery_zone_for_order(self.time_slot)
         
+        orders = []
         while current_date <= self.end_date:
             if current_date.strftime('%A') in selected and current_date not in existing:
-                Order.objects.create(
+                order = Order(
                     subscription=self,
                     order_date=today,
                     delivery_date=current_date,
@@ -767,9 +929,20 @@ class Subscription(models.Model):
                     quantity=1,
                     special_instructions=self.special_instructions or '',
                 )
-                created += 1
+                order.validate_for_save()
+                orders.append(order)
             current_date += timezone.timedelta(days=1)
-        return created
+
+        if orders:
+            using = self._state.db
+            Order.objects.using(using).bulk_create(orders)
+            for order in orders:
+                order._snapshot_loaded_values()
+            from apps.main.utils.order_state import after_status_change
+            after_status_change(
+                orders, {order.pk: None for order in orders}, 'pending', using=using,
+            )
+        return len(orders)
 
     class Meta:
         verbose_name_plural = "Subscriptions"
@@ -780,7 +953,7 @@ class Subscription(models.Model):
             models.Index(fields=['customer', 'start_date']),
         ]
 
-class Order(models.Model):
+class Order(ValidatedSaveMixin, models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'), ('confirmed', 'Confirmed'), ('preparing', 'Preparing'),
         ('ready', 'Ready'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')
@@ -797,31 +970,38 @@ class Order(models.Model):
     def __str__(self):
         return f"Order {self.id} - {self.subscription.customer.user.get_full_name()}"
 
+    tracked_fields = ('status',)
+
     def clean(self):
+        if not self.in_validation_scope('status', 'delivery_date'):
+            return
         if self.status in ['preparing', 'ready'] and self.delivery_date > timezone.localdate():
             raise ValidationError(f"Cannot prepare/ready order before delivery date ({self.delivery_date}).")
     
     def save(self, *args, **kwargs):
-        self.full_clean()
-        
-        # Check if status changed to 'ready'
-        is_becoming_ready = False
-        if self.pk:
-            old_status = Order.objects.get(pk=self.pk).status
-            if old_status != 'ready' and self.status == 'ready':
-                is_becoming_ready = True
-        elif self.status == 'ready':
-            is_becoming_ready = True
-            
+        self.validate_for_save(kwargs.get('update_fields'))
+        old_status = self.loaded_value('status')
+
         super().save(*args, **kwargs)
-        
-        if is_becoming_ready:
-            try:
-                Delivery = apps.get_model('delivery', 'Delivery')
-                if not Delivery.objects.filter(order=self).exists():
-                    Delivery.objects.create(order=self, status='pending')
-            except LookupError:
-                pass  # delivery app might not be installed
+        self._snapshot_loaded_values()
+
+        if old_status != self.status:
+            # Side effects (e.g. Delivery creation on 'ready') and the
+            # order_status_changed signal live in the state machine.
+            from apps.main.utils.order_state import after_status_change
+            after_status_change(
+                [self], {self.pk: old_status}, self.status, using=self._state.db,
+            )
+
+    class Meta:
+        indexes = [
+            # Month-to-date usage counts orders created after a watermark
+            models.Index(fields=['created_at'], name='order_created_at_idx'),
+            # Daily analytics facts reload recent delivery dates
+            models.Index(fields=['delivery_date'], name='order_delivery_date_idx'),
+        ]
+
+
 class SubscriptionEditRequest(models.Model):
     customer = models.ForeignKey(CustomerProfile, on_delete=models.CASCADE)
     subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE)
@@ -869,8 +1049,36 @@ class InvoiceItem(models.Model):
         return f"{self.invoice.invoice_number} - {self.menu.name} x {self.quantity}"
 
 
+class NotificationBroadcast(models.Model):
+    """
+    One message sent to a customer segment (``apps.main.broadcasts``). The
+    segment is kept as the filters it was resolved from; each recipient
+    gets a ``Notification`` linked back here.
+    """
+    message = models.TextField()
+    priority = models.CharField(
+        max_length=20,
+        choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('urgent', 'Urgent')],
+        default='medium'
+    )
+    filters = models.JSONField(default=dict, blank=True, help_text="Segment the recipients were resolved from")
+    recipients = models.PositiveIntegerField(default=0)
+    pushed = models.PositiveIntegerField(default=0, help_text="Notifications pushed to connected apps")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Broadcast #{self.pk} to {self.recipients} customer(s)"
+
+
 class Notification(models.Model):
     customer = models.ForeignKey(CustomerProfile, on_delete=models.CASCADE)
+    broadcast = models.ForeignKey(
+        NotificationBroadcast, on_delete=models.SET_NULL, null=True, blank=True, related_name='notifications',
+    )
     message = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
@@ -882,6 +1090,16 @@ class Notification(models.Model):
         choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High'), ('urgent', 'Urgent')], 
         default='medium'
     )
+    # Dispatch state (apps/main/notifications.py)
+    sent_via = models.CharField(max_length=50, blank=True, help_text="Channels that delivered it, comma-separated")
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at'], condition=models.Q(sent=False), name='notification_unsent_idx'),
+        ]
 
     def __str__(self):
         return f"Notification for {self.customer.name} - {self.created_at.strftime('%Y-%m-%d %H:%M')}"
@@ -911,10 +1129,11 @@ class WalletTransaction(models.Model):
                 else: 
                     new_balance = self.customer.wallet_balance - self.amount
                     if new_balance < 0:
-                        Notification.objects.create(
-                            customer=self.customer,
-                            message=f"Urgent: Your wallet balance is now negative (AED {new_balance:.2f}). Please add funds.",
-                            priority='urgent'
+                        from apps.main.notifications import notify
+                        notify(
+                            self.customer,
+                            f"Urgent: Your wallet balance is now negative (AED {new_balance:.2f}). Please add funds.",
+                            priority='urgent',
                         )
                     self.customer.wallet_balance = new_balance
                 self.customer.save(update_fields=['wallet_balance']) 
@@ -958,4 +1177,72 @@ class KitchenProfile(models.Model):
     is_kitchen_staff = models.BooleanField(default=True)
 
     def __str__(self):
-        return f"Kitchen Staff: {self.user.username}"
\ No newline at end of file
+        return f"Kitchen Staff: {self.user.username}"
+
+class ArchiveBatch(models.Model):
+    """
+    One batch of history moved out of the live tables by the retention
+    policy (``apps.main.retention``). Table batches own their
+    ``ArchivedRecord`` rows; file batches point at a gzipped JSONL file
+    under ``RETENTION_ARCHIVE_DIR``.
+    """
+    dataset = models.CharField(max_length=30)
+    storage = models.CharField(max_length=10, choices=[('table', 'Archive tables'), ('file', 'Compressed JSONL file')])
+    path = models.CharField(max_length=255, blank=True)
+    records = models.PositiveIntegerField(default=0)
+    rows = models.PositiveIntegerField(default=0, help_text="Records plus the dependent rows archived with them")
+    first_date = models.DateField()
+    last_date = models.DateField()
+    customers = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="File batches: records per customer id and day, {customer: {YYYY-MM-DD: n}}"
+    )
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-archived_at']
+        indexes = [
+            models.Index(fields=['dataset', 'last_date'], name='archivebatch_dataset_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset} {self.first_date}–{self.last_date} ({self.records})"
+
+
+class ArchivedRecord(models.Model):
+    """A row moved out of its live table, with its dependent rows under ``related``."""
+    batch = models.ForeignKey(ArchiveBatch, on_delete=models.CASCADE, related_name='archived_records')
+    dataset = models.CharField(max_length=30)
+    object_id = models.BigIntegerField()
+    customer_id = models.IntegerField(null=True)
+    recorded_on = models.DateField()
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    related = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['dataset', 'customer_id', 'recorded_on'], name='archivedrecord_customer_idx'),
+            models.Index(fields=['dataset', 'recorded_on'], name='archivedrecord_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"Archived {self.dataset} #{self.object_id}"
+
+
+class ArchiveSummary(models.Model):
+    """Monthly totals of archived records, kept so reports survive archiving."""
+    dataset = models.CharField(max_length=30)
+    period = models.DateField(help_text="First day of the month")
+    status = models.CharField(max_length=30, blank=True)
+    records = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+
+    class Meta:
+        ordering = ['dataset', 'period', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['dataset', 'period', 'status'], name='unique_archive_summary'),
+        ]
+
+    def __str__(self):
+        return f"{self.dataset} {self.period:%Y-%m} {self.status}: {self.records}"
@@ -0,0 +1,123 @@
+"""
+Channel backends for notification dispatch (see apps/main/notifications.py).
+
+``settings.NOTIFICATIONS['BACKENDS']`` maps each channel (``email``,
+``sms``, ``whatsapp``, ``push``) to a backend class path. A backend gets
+a batch of ``OutboundMessage`` objects for its channel and returns one
+entry per message: None when it was sent, otherwise the error.
+
+- ``EmailBackend`` sends through Django's mail connection, one connection
+  per batch.
+- ``ChannelLayerBackend`` pushes to the customer's channel-layer group,
+  where the app's websocket connections listen.
+- ``LogBackend`` only logs. It stands in for SMS and WhatsApp until a
+  provider backend is configured.
+- ``FakeBackend`` records messages in memory for tests, like Django's
+  locmem mail outbox.
+"""
+import logging
+from dataclasses import dataclass, field
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core import mail
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutboundMessage:
+    channel: str
+    customer_id: int
+    address: str  # email address, phone number or group name
+    body: str
+    subject: str = ''
+    priority: str = 'medium'
+    notification_ids: list = field(default_factory=list)
+
+
+def customer_group(alias, customer_id):
+    """Channel-layer group of a customer's connected apps."""
+    return f"notifications.{alias}.{customer_id}"
+
+
+class BaseChannelBackend:
+    """Sends batches of messages for one channel."""
+    batch_size = 100
+
+    def __init__(self, channel, **options):
+        self.channel = channel
+        self.options = options
+
+    def send_messages(self, messages):
+        """Send ``messages``; return an error (or None) per message, in order."""
+        raise NotImplementedError
+
+
+class EmailBackend(BaseChannelBackend):
+    batch_size = 50
+
+    def send_messages(self, messages):
+        errors = []
+        with mail.get_connection() as connection:
+            for message in messages:
+                email = mail.EmailMessage(
+                    subject=message.subject, body=message.body,
+                    from_email=settings.DEFAULT_FROM_EMAIL, to=[message.address], connection=connection,
+                )
+                try:
+                    email.send()
+                except Exception as exc:
+                    errors.append(f"{type(exc).__name__}: {exc}")
+                else:
+                    errors.append(None)
+        return errors
+
+
+class ChannelLayerBackend(BaseChannelBackend):
+    batch_size = 500
+
+    def send_messages(self, messages):
+        from channels.layers import get_channel_layer
+
+        layer = get_channel_layer()
+        errors = []
+        for message in messages:
+            try:
+                async_to_sync(layer.group_send)(message.address, {
+                    'type': 'notification.message',
+                    'ids': message.notification_ids,
+                    'message': message.body,
+                    'priority': message.priority,
+                })
+            except Exception as exc:
+                errors.append(f"{type(exc).__name__}: {exc}")
+            else:
+                errors.append(None)
+        return errors
+
+
+class LogBackend(BaseChannelBackend):
+    def send_messages(self, messages):
+        for message in messages:
+            logger.info("%s to %s: %s", self.channel, message.address, message.body)
+        return [None] * len(messages)
+
+
+class FakeBackend(BaseChannelBackend):
+    """
+    Keeps sent messages in ``FakeBackend.outbox``. Messages to an address
+    in ``FakeBackend.failing`` fail. Tests reset both.
+    """
+    outbox = []
+    failing = set()
+
+    def send_messages(self, messages):
+        errors = []
+        for message in messages:
+            if message.address in self.failing:
+                errors.append(f"{self.channel} rejected {message.address}")
+            else:
+                self.outbox.append(message)
+                errors.append(None)
+        return errors
@@ -0,0 +1,194 @@
+"""
+Customer notification inboxes kept in the cache.
+
+Each customer has two cache entries per tenant database: the unread count
+and the latest ``INBOX_SIZE`` notifications, serialized the way the
+customer API returns them. They are kept current as notifications change:
+
+- ``inbox_added`` when notifications are created (``notify``, broadcasts,
+  the admin API). It increments the counter and prepends to the list.
+- ``inbox_read`` / ``inbox_all_read`` from ``mark_read`` / ``mark_all_read``.
+- ``forget_inboxes`` for any other change (admin edits and deletes,
+  archiving). The next read rebuilds the inbox.
+
+Updates run once the write commits, and only touch inboxes that are
+cached. A miss rebuilds the inbox from the database with two queries.
+Entries expire after ``INBOX_TIMEOUT``, which bounds any drift from
+concurrent updates.
+
+The customer id of a user is cached too, with whether the user is active
+(``customer_account``), so the ``summary`` endpoint answers a cache hit
+without any query. User saves that may change ``is_active`` forget it.
+"""
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from apps.main.models import Notification
+from apps.main.notifications import notification_settings
+from core.db.router import get_current_db_alias
+
+
+def _key(kind, customer_id, alias):
+    return f"notification_inbox:{alias}:{customer_id}:{kind}"
+
+
+def _user_key(user_id, alias):
+    return f"notification_inbox:{alias}:account:{user_id}"
+
+
+def _limits():
+    config = notification_settings()
+    return config['INBOX_SIZE'], config['INBOX_TIMEOUT']
+
+
+def _serializer():
+    from apps.main.serializers.customer_api_serializers import CustomerNotificationSerializer
+
+    return CustomerNotificationSerializer
+
+
+def inbox_items(notifications):
+    """``notifications`` as the customer API serializes them."""
+    return [dict(item) for item in _serializer()(notifications, many=True).data]
+
+
+def _timestamp(value):
+    return _serializer()().fields['read_at'].to_representation(value)
+
+
+def customer_account(user_id, alias=None):
+    """
+    ``(customer_id, active)`` of ``user_id``: its CustomerProfile id (None
+    for non-customers) and whether the user exists and is active. Cached.
+    """
+    alias = alias or get_current_db_alias()
+    key = _user_key(user_id, alias)
+    account = cache.get(key)
+    if account is None:
+        row = (
+            get_user_model().objects.using(alias).filter(pk=user_id)
+            .values_list('customerprofile', 'is_active').first()
+        )
+        account = [row[0] or 0, row[1]] if row else [0, False]
+        cache.set(key, account, _limits()[1])
+    return account[0] or None, account[1]
+
+
+def customer_id_for_user(user_id, alias=None):
+    """The CustomerProfile id of ``user_id`` (None for non-customers), cached."""
+    return customer_account(user_id, alias)[0]
+
+
+def forget_user(user_id, alias=None):
+    """Drop the cached ``customer_account`` of ``user_id`` once the current transaction commits."""
+    alias = alias or get_current_db_alias()
+    key = _user_key(user_id, alias)
+    transaction.on_commit(lambda: cache.delete(key), using=alias)
+
+
+def rebuild_inbox(customer_id, alias=None):
+    alias = alias or get_current_db_alias()
+    size, timeout = _limits()
+    notifications = Notification.objects.using(alias).filter(customer_id=customer_id)
+    inbox = {
+        'unread': notifications.filter(read=False).count(),
+        'latest': inbox_items(notifications.order_by('-created_at', '-pk')[:size]),
+    }
+    cache.set_many({
+        _key('unread', customer_id, alias): inbox['unread'],
+        _key('latest', customer_id, alias): inbox['latest'],
+    }, timeout)
+    return inbox
+
+
+def get_inbox(customer_id, alias=None):
+    """``{'unread': count, 'latest': [notification, ...]}`` for ``customer_id``."""
+    alias = alias or get_current_db_alias()
+    unread_key, latest_key = _key('unread', customer_id, alias), _key('latest', customer_id, alias)
+    found = cache.get_many([unread_key, latest_key])
+    if unread_key in found and latest_key in found:
+        return {'unread': found[unread_key], 'latest': found[latest_key]}
+    return rebuild_inbox(customer_id, alias)
+
+
+# ─── Updates ──────────────────────────────────────────────────────────────────
+
+def _update_latest(customer_ids, alias, update):
+    """Apply ``update(customer_id, items)`` to the cached latest lists of ``customer_ids``."""
+    size, timeout = _limits()
+    keys = {_key('latest', customer_id, alias): customer_id for customer_id in customer_ids}
+    found = cache.get_many(list(keys))
+    if found:
+        cache.set_many({key: update(keys[key], items)[:size] for key, items in found.items()}, timeout)
+
+
+def _adjust_unread(customer_id, alias, delta):
+    key = _key('unread', customer_id, alias)
+    try:
+        unread = cache.incr(key, delta)
+    except ValueError:
+        return  # Not cached
+    if unread < 0:
+        cache.delete(key)
+
+
+def inbox_added(notifications, alias=None):
+    """Add newly created ``notifications`` to their customers' inboxes once they commit."""
+    alias = alias or get_current_db_alias()
+    added = defaultdict(list)
+    for notification, item in zip(notifications, inbox_items(notifications)):
+        added[notification.customer_id].append(item)
+    if not added:
+        return
+
+    def update():
+        for customer_id, items in added.items():
+            unread = sum(1 for item in items if not item['read'])
+            if unread:
+                _adjust_unread(customer_id, alias, unread)
+        _update_latest(added, alias, lambda customer_id, items: sorted(
+            added[customer_id] + items, key=lambda item: (item['created_at'], item['id']), reverse=True,
+        ))
+    transaction.on_commit(update, using=alias)
+
+
+def inbox_read(customer_id, ids, read_at, alias=None):
+    """Record that the notifications ``ids`` of ``customer_id`` were read at ``read_at``."""
+    alias = alias or get_current_db_alias()
+    ids = set(ids)
+    read_at = _timestamp(read_at)
+
+    def mark(_, items):
+        return [
+            {**item, 'read': True, 'read_at': read_at} if item['id'] in ids and not item['read'] else item
+            for item in items
+        ]
+
+    def update():
+        _adjust_unread(customer_id, alias, -len(ids))
+        _update_latest([customer_id], alias, mark)
+    transaction.on_commit(update, using=alias)
+
+
+def inbox_all_read(customer_id, read_at, alias=None):
+    """Record that every notification of ``customer_id`` was read at ``read_at``."""
+    alias = alias or get_current_db_alias()
+    read_at = _timestamp(read_at)
+
+    def update():
+        cache.set(_key('unread', customer_id, alias), 0, _limits()[1])
+        _update_latest([customer_id], alias, lambda _, items: [
+            item if item['read'] else {**item, 'read': True, 'read_at': read_at} for item in items
+        ])
+    transaction.on_commit(update, using=alias)
+
+
+def forget_inboxes(customer_ids, alias=None):
+    """Drop the cached inboxes of ``customer_ids`` once the current write commits."""
+    alias = alias or get_current_db_alias()
+    keys = [_key(kind, customer_id, alias) for customer_id in set(customer_ids) for kind in ('unread', 'latest')]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys), using=alias)
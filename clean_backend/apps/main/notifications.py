@@ -0,0 +1,332 @@
+"""
+Customer notification queue and dispatch.
+
+Writing: ``notify(customer, message, priority)`` queues a notification on
+the current transaction of the customer's database. When the transaction
+commits, everything queued in it is inserted with one ``bulk_create`` and
+handed to dispatch. Outside a transaction the notification is written at
+once. Notifications queued in a transaction that rolls back are dropped
+with it.
+
+Sending: ``dispatch_notifications`` claims unsent notifications in
+batches. ``SELECT ... FOR UPDATE SKIP LOCKED`` picks the rows, and a lease
+on ``next_attempt_at`` keeps concurrent dispatchers off them. The claimed
+rows are coalesced into one message per customer and channel, then sent
+through the channel backends (apps/main/notification_backends.py). The
+channels are the customer's ``preferred_communication``, unless
+``notification_preferences`` switches it off, plus any channel
+``notification_preferences`` switches on. Each channel is rate limited
+per process (``RATE_LIMITS``, messages per second).
+
+Sent rows are marked with one UPDATE per set of channels used. A
+customer without any usable channel is marked sent with an empty
+``sent_via``. Failed rows are retried with exponential backoff up to
+``MAX_ATTEMPTS``. Channels that already succeeded for a row are recorded
+in ``sent_via`` and skipped on the retry.
+
+Dispatch runs as a background job after each flush, and every minute as
+the ``dispatch_notifications`` scheduled job, which also sends retries.
+New notifications are also added to the customers' cached inboxes
+(apps/main/notification_inbox.py).
+"""
+import datetime
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import router, transaction
+from django.db.models import Q
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from apps.main.models import Notification
+from apps.main.notification_backends import OutboundMessage, customer_group
+from core.db.router import get_current_db_alias
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ('whatsapp', 'sms', 'email', 'push')
+PRIORITIES = ('low', 'medium', 'high', 'urgent')
+
+DEFAULTS = {
+    'BACKENDS': {},
+    'RATE_LIMITS': {},
+    'BATCH_SIZE': 200,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 60,
+    'LEASE': 300,
+    'DISPATCH_ON_COMMIT': True,
+    'BROADCAST_CHUNK_SIZE': 1000,
+    'INBOX_SIZE': 20,
+    'INBOX_TIMEOUT': 60 * 60,
+}
+
+
+def notification_settings():
+    """``settings.NOTIFICATIONS`` over ``DEFAULTS``."""
+    return {**DEFAULTS, **getattr(settings, 'NOTIFICATIONS', {})}
+
+
+# ─── Queueing ─────────────────────────────────────────────────────────────────
+
+_outboxes = threading.local()
+
+
+class _Outbox:
+    """Notifications queued on one database's current transaction."""
+
+    def __init__(self, alias):
+        self.alias = alias
+        self.notifications = []
+
+    def flush(self):
+        if getattr(_outboxes, self.alias, None) is self:
+            delattr(_outboxes, self.alias)
+        if not self.notifications:
+            return
+        from apps.main.notification_inbox import inbox_added
+
+        created = Notification.objects.using(self.alias).bulk_create(self.notifications, batch_size=500)
+        inbox_added(created, alias=self.alias)
+        schedule_dispatch([notification.pk for notification in created], using=self.alias)
+
+
+def _outbox(alias):
+    connection = transaction.get_connection(alias)
+    outbox = getattr(_outboxes, alias, None)
+    # A rollback discards the outbox's commit hook along with the transaction
+    if outbox is None or not any(hook[1] == outbox.flush for hook in connection.run_on_commit):
+        outbox = _Outbox(alias)
+        setattr(_outboxes, alias, outbox)
+        transaction.on_commit(outbox.flush, using=alias)
+    return outbox
+
+
+def notify(customer, message, priority='medium'):
+    """Queue a notification for ``customer``; it is written when the current transaction commits."""
+    alias = customer._state.db or router.db_for_write(Notification)
+    notification = Notification(customer=customer, message=message, priority=priority)
+    if not transaction.get_connection(alias).in_atomic_block:
+        from apps.main.notification_inbox import inbox_added
+
+        notification.save(using=alias)
+        inbox_added([notification], alias=alias)
+        schedule_dispatch([notification.pk], using=alias)
+        return
+    _outbox(alias).notifications.append(notification)
+
+
+def schedule_dispatch(ids, using=None):
+    """
+    Send the notifications ``ids`` (every due one if None) in a background
+    job once ``using``'s transaction commits.
+    """
+    if (ids is not None and not ids) or not notification_settings()['DISPATCH_ON_COMMIT']:
+        return
+    from apps.main.jobs import send_notifications
+
+    alias = using or get_current_db_alias()
+
+    def enqueue():
+        try:
+            send_notifications.enqueue(ids=None if ids is None else list(ids), tenant_alias=alias)
+        except Exception:
+            # The scheduled dispatch picks them up instead
+            logger.exception("Could not queue notification dispatch on %s", alias)
+
+    transaction.on_commit(enqueue, using=alias)
+
+
+# ─── Channels ─────────────────────────────────────────────────────────────────
+
+def notification_channels(customer):
+    """The channels ``customer`` is notified through, preferred channel first."""
+    preferences = customer.notification_preferences
+    if not isinstance(preferences, dict):
+        preferences = {}
+    channels = []
+    preferred = customer.preferred_communication
+    if preferred in CHANNELS and preferences.get(preferred, True):
+        channels.append(preferred)
+    channels.extend(
+        channel for channel in CHANNELS
+        if channel not in channels and preferences.get(channel) is True
+    )
+    return channels
+
+
+def _address(channel, customer, alias):
+    if channel == 'email':
+        return getattr(customer.user, 'email', '')
+    if channel == 'push':
+        return customer_group(alias, customer.pk)
+    return customer.phone
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` messages a second on average, in bursts of up to ``rate``."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.tokens = rate
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, count=1):
+        if not self.rate:
+            return
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate) - count
+            self.updated = now
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            self.sleep(wait)
+
+
+_backends = {}
+_limiters = {}
+_channels_lock = threading.Lock()
+
+
+def get_backend(channel):
+    """The configured backend for ``channel``, or None when the channel is not set up."""
+    with _channels_lock:
+        if channel not in _backends:
+            path = notification_settings()['BACKENDS'].get(channel)
+            _backends[channel] = import_string(path)(channel) if path else None
+        return _backends[channel]
+
+
+def get_limiter(channel):
+    with _channels_lock:
+        if channel not in _limiters:
+            _limiters[channel] = RateLimiter(notification_settings()['RATE_LIMITS'].get(channel))
+        return _limiters[channel]
+
+
+@receiver(setting_changed)
+def _reset_channels(setting, **kwargs):
+    if setting == 'NOTIFICATIONS':
+        _backends.clear()
+        _limiters.clear()
+
+
+# ─── Dispatch ─────────────────────────────────────────────────────────────────
+
+def _coalesce(rows):
+    if len(rows) == 1:
+        return 'New notification', rows[0].message
+    lines = '\n'.join(f"- {row.message}" for row in rows)
+    return f"{len(rows)} new notifications", f"You have {len(rows)} new notifications:\n{lines}"
+
+
+def _claim(config, ids, now):
+    alias = get_current_db_alias()
+    due = Notification.objects.filter(sent=False, attempts__lt=config['MAX_ATTEMPTS']).filter(
+        Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now),
+    )
+    if ids is not None:
+        due = due.filter(pk__in=ids)
+    with transaction.atomic(using=alias):
+        claimed = list(
+            due.order_by('created_at').select_for_update(skip_locked=True, of=('self',))
+            .values_list('pk', flat=True)[:config['BATCH_SIZE']]
+        )
+        Notification.objects.filter(pk__in=claimed).update(
+            next_attempt_at=now + datetime.timedelta(seconds=config['LEASE']),
+        )
+    return list(Notification.objects.filter(pk__in=claimed).select_related('customer__user').order_by('created_at'))
+
+
+def _dispatch_batch(config, ids, stats):
+    now = timezone.now()
+    rows = _claim(config, ids, now)
+    if not rows:
+        return 0
+    alias = get_current_db_alias()
+
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(row.customer_id, row.sent_via)].append(row)
+
+    outcome = {}
+    pending = defaultdict(list)
+    for key, group in groups.items():
+        customer = group[0].customer
+        done = {channel for channel in key[1].split(',') if channel}
+        outcome[key] = {'sent': done, 'errors': []}
+        subject, body = _coalesce(group)
+        priority = max((row.priority for row in group), key=lambda value: PRIORITIES.index(value) if value in PRIORITIES else 0)
+        for channel in notification_channels(customer):
+            address = _address(channel, customer, alias)
+            if channel in done or not address or get_backend(channel) is None:
+                continue
+            pending[channel].append((key, OutboundMessage(
+                channel=channel, customer_id=customer.pk, address=address, body=body,
+                subject=subject, priority=priority, notification_ids=[row.pk for row in group],
+            )))
+
+    for channel, messages in pending.items():
+        backend = get_backend(channel)
+        for start in range(0, len(messages), backend.batch_size):
+            chunk = messages[start:start + backend.batch_size]
+            get_limiter(channel).acquire(len(chunk))
+            try:
+                errors = backend.send_messages([message for _, message in chunk])
+            except Exception as exc:
+                logger.exception("%s backend failed on %s message(s)", channel, len(chunk))
+                errors = [f"{type(exc).__name__}: {exc}"] * len(chunk)
+            stats['messages'] += len(chunk)
+            for (key, _), error in zip(chunk, errors):
+                if error:
+                    outcome[key]['errors'].append(f"{channel}: {error}")
+                else:
+                    outcome[key]['sent'].add(channel)
+
+    sent, retry = defaultdict(list), []
+    for key, group in groups.items():
+        sent_via = ','.join(channel for channel in CHANNELS if channel in outcome[key]['sent'])
+        if not outcome[key]['errors']:
+            sent[sent_via].extend(row.pk for row in group)
+            continue
+        for row in group:
+            row.attempts += 1
+            row.sent_via = sent_via
+            row.last_error = '; '.join(outcome[key]['errors'])[:255]
+            if row.attempts < config['MAX_ATTEMPTS']:
+                row.next_attempt_at = now + datetime.timedelta(seconds=config['RETRY_DELAY'] * 2 ** (row.attempts - 1))
+            else:
+                row.next_attempt_at = None
+                stats['gave_up'] += 1
+            retry.append(row)
+
+    for sent_via, pks in sent.items():
+        Notification.objects.filter(pk__in=pks).update(
+            sent=True, sent_at=now, sent_via=sent_via, next_attempt_at=None, last_error='',
+        )
+        stats['sent'] += len(pks)
+    if retry:
+        Notification.objects.bulk_update(retry, ['attempts', 'next_attempt_at', 'sent_via', 'last_error'])
+        stats['failed'] += len(retry)
+    return len(rows)
+
+
+def dispatch_notifications(ids=None):
+    """
+    Send the due unsent notifications of the current tenant database (only
+    ``ids`` if given), batch after batch. Returns counts of notifications
+    ``sent`` and ``failed``, channel ``messages`` and rows that ran out of
+    attempts (``gave_up``).
+    """
+    config = notification_settings()
+    stats = {'sent': 0, 'failed': 0, 'gave_up': 0, 'messages': 0}
+    while _dispatch_batch(config, ids, stats) == config['BATCH_SIZE']:
+        pass
+    return stats
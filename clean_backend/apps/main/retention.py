@@ -0,0 +1,500 @@
+"""
+Retention and archival of tenant history.
+
+Orders, delivery statuses, notifications and wallet transactions only
+ever grow. A tenant's ``TenantRetentionPolicy`` (default database) sets a
+horizon in days for each dataset, and ``archive_tenant`` moves every
+older record out of the live tables, ``RETENTION_BATCH_SIZE`` records at
+a time. Dependent rows go with their record: an order takes its delivery
+and kitchen ticket along, a delivery status its assignment and
+notifications. Where the records go depends on the policy's storage:
+
+- ``table``: one ``ArchivedRecord`` per record, dependants under ``related``;
+- ``file``: the same documents as gzipped JSONL, one file per batch, under
+  ``RETENTION_ARCHIVE_DIR/<tenant>/<dataset>/``.
+
+Each batch is one transaction on the tenant database. The records are
+read and locked, copied, added to the monthly ``ArchiveSummary`` totals
+and deleted with ``core.db.purge``, and the ``ArchiveBatch`` row is
+written, all before it commits. An interrupted run therefore never loses
+or duplicates a record. A batch file is removed again if its transaction
+fails. Parquet is not offered, since it would need pyarrow.
+
+Archived history is read-only. ``archived_history`` reads both storages,
+and viewsets expose it through ``ArchivedHistoryMixin`` as
+``GET <list url>/archived/``.
+"""
+import datetime
+import gzip
+import heapq
+import json
+import os
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from apps.main.models import ArchiveBatch, ArchivedRecord, ArchiveSummary
+from apps.main.notification_inbox import forget_inboxes
+from core.db.purge import Purge
+
+
+@dataclass(frozen=True)
+class Dataset:
+    name: str
+    model: str  # app_label.Model
+    horizon: str  # TenantRetentionPolicy field with the horizon in days
+    date_field: str
+    customer: str  # lookup from the model to the customer id
+    statuses: tuple = ()  # only records in these statuses are archived (empty: all)
+    summary_field: str = None  # ArchiveSummary rows are split by this field
+    amount_field: str = None  # and total it
+    related: tuple = ()  # (model label, FK attname) rows archived with each record
+
+    def get_model(self):
+        return apps.get_model(self.model)
+
+
+DATASETS = {dataset.name: dataset for dataset in (
+    Dataset(
+        'orders', 'main.Order', 'order_days', 'delivery_date', 'subscription__customer_id',
+        statuses=('delivered', 'cancelled'), summary_field='status',
+        related=(('kitchen.KitchenOrder', 'order_id'), ('delivery.Delivery', 'order_id')),
+    ),
+    Dataset(
+        'deliveries', 'driver.DeliveryStatus', 'delivery_days', 'date', 'subscription__customer_id',
+        statuses=('delivered', 'failed', 'cancelled'), summary_field='status', amount_field='payment_amount',
+        related=(('driver.DeliveryAssignment', 'delivery_status_id'), ('driver.DeliveryNotification', 'delivery_status_id')),
+    ),
+    Dataset('notifications', 'main.Notification', 'notification_days', 'created_at', 'customer_id',
+            summary_field='priority'),
+    Dataset('wallet', 'main.WalletTransaction', 'wallet_days', 'created_at', 'customer_id',
+            summary_field='transaction_type', amount_field='amount'),
+)}
+
+
+def _is_datetime(model, field_name):
+    return model._meta.get_field(field_name).get_internal_type() == 'DateTimeField'
+
+
+def _recorded_on(value):
+    return timezone.localdate(value) if isinstance(value, datetime.datetime) else value
+
+
+def expired_records(dataset, alias, policy, today=None):
+    """Records of ``dataset`` past the policy's horizon, or None when it keeps them forever."""
+    days = getattr(policy, dataset.horizon)
+    if not days:
+        return None
+    model = dataset.get_model()
+    cutoff = (today or timezone.localdate()) - datetime.timedelta(days=days)
+    if _is_datetime(model, dataset.date_field):
+        cutoff = timezone.make_aware(datetime.datetime.combine(cutoff, datetime.time.min))
+    queryset = model._base_manager.using(alias).filter(**{f"{dataset.date_field}__lt": cutoff})
+    if dataset.statuses:
+        queryset = queryset.filter(status__in=dataset.statuses)
+    return queryset
+
+
+def _fields(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _documents(dataset, alias, ids):
+    """The archive documents for ``ids``, read under lock, plus their row count."""
+    model = dataset.get_model()
+    rows = (
+        model._base_manager.using(alias).filter(pk__in=ids).order_by('pk')
+        .select_for_update(of=('self',))
+        .values(*_fields(model), archive_customer=F(dataset.customer))
+    )
+    related = defaultdict(lambda: defaultdict(list))
+    for label, fk in dataset.related:
+        related_model = apps.get_model(label)
+        for row in related_model._base_manager.using(alias).filter(**{f"{fk}__in": ids}).values(*_fields(related_model)):
+            related[row[fk]][label].append(row)
+
+    documents, count = [], 0
+    for row in rows:
+        extra = related.get(row['id'], {})
+        documents.append({
+            'id': row['id'],
+            'customer_id': row.pop('archive_customer'),
+            'recorded_on': _recorded_on(row[dataset.date_field]),
+            'data': row,
+            'related': dict(extra),
+        })
+        count += 1 + sum(len(items) for items in extra.values())
+    return documents, count
+
+
+def _summaries(dataset, documents):
+    totals = defaultdict(lambda: [0, Decimal('0.00')])
+    for document in documents:
+        data = document['data']
+        key = (
+            document['recorded_on'].replace(day=1),
+            str(data[dataset.summary_field]) if dataset.summary_field else '',
+        )
+        totals[key][0] += 1
+        if dataset.amount_field:
+            totals[key][1] += data[dataset.amount_field] or Decimal('0.00')
+    return totals
+
+
+def _add_summaries(dataset, alias, totals):
+    existing = {
+        (summary.period, summary.status): summary
+        for summary in ArchiveSummary.objects.using(alias).select_for_update().filter(
+            dataset=dataset.name, period__in={period for period, _ in totals},
+        )
+    }
+    new = []
+    for (period, status), (records, amount) in totals.items():
+        summary = existing.get((period, status))
+        if summary is None:
+            new.append(ArchiveSummary(dataset=dataset.name, period=period, status=status,
+                                      records=records, amount=amount))
+        else:
+            summary.records += records
+            summary.amount += amount
+    ArchiveSummary.objects.using(alias).bulk_update(existing.values(), ['records', 'amount'])
+    ArchiveSummary.objects.using(alias).bulk_create(new)
+
+
+def _day_counts(documents):
+    """``{customer_id: {YYYY-MM-DD: records}}`` of ``documents``, kept on file batches."""
+    counts = defaultdict(lambda: defaultdict(int))
+    for document in documents:
+        counts[str(document['customer_id'])][str(document['recorded_on'])] += 1
+    return counts
+
+
+def _write_file(dataset, archive_key, documents):
+    """Write ``documents`` as gzipped JSONL. Returns the path relative to ``RETENTION_ARCHIVE_DIR``."""
+    path = os.path.join(
+        archive_key, dataset.name,
+        f"{timezone.now():%Y%m%dT%H%M%S}-{documents[0]['id']}-{documents[-1]['id']}.jsonl.gz",
+    )
+    full_path = os.path.join(settings.RETENTION_ARCHIVE_DIR, path)
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with gzip.open(f"{full_path}.tmp", 'wt', encoding='utf-8') as stream:
+        for document in documents:
+            stream.write(json.dumps(document, cls=DjangoJSONEncoder))
+            stream.write('\n')
+    os.replace(f"{full_path}.tmp", full_path)
+    return path
+
+
+def archive_batch(dataset, queryset, alias, storage='table', archive_key='', batch_size=None):
+    """
+    Move the first ``batch_size`` records of ``queryset`` (by primary key)
+    into the archive in one transaction. Returns the ``ArchiveBatch``, or
+    None when there is nothing left to move.
+    """
+    batch_size = batch_size or getattr(settings, 'RETENTION_BATCH_SIZE', 1000)
+    model = dataset.get_model()
+    purge_labels = {label for label, _ in dataset.related} | {dataset.model}
+    path = ''
+    try:
+        with transaction.atomic(using=alias):
+            ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return None
+            purge = Purge(model._base_manager.using(alias).filter(pk__in=ids))
+            unarchived = {step.label for step in purge.steps if step.action == 'delete'} - purge_labels
+            if unarchived:
+                raise ValueError(f"Archiving {dataset.name} would delete unarchived rows of {', '.join(sorted(unarchived))}")
+
+            documents, rows = _documents(dataset, alias, ids)
+            dates = [document['recorded_on'] for document in documents]
+            if storage == 'file':
+                path = _write_file(dataset, archive_key, documents)
+            batch = ArchiveBatch.objects.using(alias).create(
+                dataset=dataset.name, storage=storage, path=path, records=len(documents), rows=rows,
+                first_date=min(dates), last_date=max(dates),
+                customers=_day_counts(documents) if storage == 'file' else None,
+            )
+            if storage == 'table':
+                ArchivedRecord.objects.using(alias).bulk_create([
+                    ArchivedRecord(
+                        batch=batch, dataset=dataset.name, object_id=document['id'],
+                        customer_id=document['customer_id'], recorded_on=document['recorded_on'],
+                        data=document['data'], related=document['related'],
+                    )
+                    for document in documents
+                ], batch_size=500)
+            _add_summaries(dataset, alias, _summaries(dataset, documents))
+            purge.run()
+            if dataset.name == 'notifications':
+                forget_inboxes({document['customer_id'] for document in documents}, alias=alias)
+    except Exception:
+        if path:
+            os.remove(os.path.join(settings.RETENTION_ARCHIVE_DIR, path))
+        raise
+    return batch
+
+
+def archive_tenant(alias, policy, archive_key='', today=None, batch_size=None, max_batches=None):
+    """
+    Archive every dataset of the tenant database ``alias`` past ``policy``'s
+    horizons. Returns ``{dataset: {'batches', 'records', 'rows'}}`` for the
+    datasets the policy limits.
+    """
+    moved = {}
+    for dataset in DATASETS.values():
+        queryset = expired_records(dataset, alias, policy, today=today)
+        if queryset is None:
+            continue
+        totals = moved[dataset.name] = {'batches': 0, 'records': 0, 'rows': 0}
+        while max_batches is None or totals['batches'] < max_batches:
+            batch = archive_batch(
+                dataset, queryset, alias, storage=policy.storage,
+                archive_key=archive_key or alias, batch_size=batch_size,
+            )
+            if batch is None:
+                break
+            totals['batches'] += 1
+            totals['records'] += batch.records
+            totals['rows'] += batch.rows
+    return moved
+
+
+def preview_tenant(alias, policy, today=None):
+    """Dry run of ``archive_tenant``: ``{dataset: records to archive}``."""
+    counts = {}
+    for dataset in DATASETS.values():
+        queryset = expired_records(dataset, alias, policy, today=today)
+        if queryset is not None:
+            counts[dataset.name] = queryset.count()
+    return counts
+
+
+def run_retention(tenants=None, today=None, dry_run=False, batch_size=None, max_batches=None, max_workers=None):
+    """
+    Apply the enabled retention policies of ``tenants`` (default: every
+    active tenant with one) through ``for_each_tenant``. Returns the
+    per-tenant outcomes; tenants without an enabled policy are left out.
+    """
+    from apps.jobs.scheduler import for_each_tenant
+    from apps.organizations.models_saas import TenantRetentionPolicy
+
+    policies = {
+        policy.tenant_id: policy
+        for policy in TenantRetentionPolicy.objects.using('default').filter(is_enabled=True).select_related('tenant')
+    }
+    if tenants is None:
+        tenants = sorted(
+            (policy.tenant for policy in policies.values() if policy.tenant.is_active),
+            key=lambda tenant: tenant.id,
+        )
+    tenants = [tenant for tenant in tenants if tenant.id in policies]
+
+    def apply(tenant, alias):
+        policy = policies[tenant.id]
+        if dry_run:
+            return preview_tenant(alias, policy, today=today)
+        return archive_tenant(
+            alias, policy, archive_key=tenant.subdomain or alias, today=today,
+            batch_size=batch_size, max_batches=max_batches,
+        )
+
+    outcomes = for_each_tenant(apply, tenants=tenants, max_workers=max_workers)
+    if not dry_run:
+        finished = [tenant.id for tenant, outcome in zip(tenants, outcomes) if 'result' in outcome]
+        TenantRetentionPolicy.objects.using('default').filter(tenant_id__in=finished).update(last_run_at=timezone.now())
+    return outcomes
+
+
+# ─── Reading the archive ──────────────────────────────────────────────────────
+
+def _read_file(batch):
+    with gzip.open(os.path.join(settings.RETENTION_ARCHIVE_DIR, batch.path), 'rt', encoding='utf-8') as stream:
+        for line in stream:
+            yield json.loads(line)
+
+
+def _order(document):
+    return document['recorded_on'], document['id']
+
+
+def _batch_counts(batch):
+    """``ArchiveBatch.customers`` of a file batch, read from the file once for batches archived before it existed."""
+    if batch.customers is None:
+        batch.customers = _day_counts(_read_file(batch))
+        batch.save(update_fields=['customers'])
+    return batch.customers
+
+
+def _matching_records(batch, customer_id, start, end):
+    """Records in ``batch`` of ``customer_id`` (all customers if None) between ``start`` and ``end``."""
+    counts = _batch_counts(batch)
+    customers = [counts.get(str(customer_id), {})] if customer_id is not None else counts.values()
+    return sum(
+        records
+        for per_day in customers for day, records in per_day.items()
+        if (not start or day >= start) and (not end or day <= end)
+    )
+
+
+class _Newest:
+    """Heap entry for a batch's next document; the newest sorts first."""
+    __slots__ = ('key', 'document', 'rest')
+
+    def __init__(self, document, rest):
+        self.key, self.document, self.rest = _order(document), document, rest
+
+    def __lt__(self, other):
+        return self.key > other.key
+
+
+def _file_documents(batches, customer_id, start, end):
+    """
+    Documents of the file ``batches`` (ordered by ``last_date``, newest
+    first) that match the filters, newest first. A file is only opened once
+    the next document could come from it, i.e. once everything newer than
+    its ``last_date`` has been yielded, so a page near the top reads a few
+    files and not the whole archive.
+    """
+    def documents(batch):
+        matching = [
+            document for document in _read_file(batch)
+            if (customer_id is None or document['customer_id'] == customer_id)
+            and (not start or document['recorded_on'] >= start)
+            and (not end or document['recorded_on'] <= end)
+        ]
+        return iter(sorted(matching, key=_order, reverse=True))
+
+    heap = []
+    batches = iter(batches)
+    upcoming = next(batches, None)
+    while True:
+        while upcoming is not None and (not heap or upcoming.last_date.isoformat() >= heap[0].key[0]):
+            rest = documents(upcoming)
+            first = next(rest, None)
+            if first is not None:
+                heapq.heappush(heap, _Newest(first, rest))
+            upcoming = next(batches, None)
+        if not heap:
+            return
+        entry = heap[0]
+        yield entry.document
+        following = next(entry.rest, None)
+        if following is None:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, _Newest(following, entry.rest))
+
+
+def archived_history(dataset, customer_id=None, start=None, end=None, offset=0, limit=50):
+    """
+    Archived records of ``dataset`` on the current tenant database, newest
+    first, from archive tables and batch files alike. Returns
+    ``(count, documents)`` for the requested page.
+
+    File batches are picked by their ``ArchiveBatch`` metadata: dates, and
+    the per-customer day counts in ``customers``, which also give the
+    count. Only the files the page reaches into are read.
+    """
+    records = ArchivedRecord.objects.filter(dataset=dataset)
+    batches = ArchiveBatch.objects.filter(dataset=dataset, storage='file')
+    if customer_id is not None:
+        records = records.filter(customer_id=customer_id)
+        batches = batches.filter(Q(customers__has_key=str(customer_id)) | Q(customers__isnull=True))
+    if start:
+        records = records.filter(recorded_on__gte=start)
+        batches = batches.filter(last_date__gte=start)
+    if end:
+        records = records.filter(recorded_on__lte=end)
+        batches = batches.filter(first_date__lte=end)
+
+    start, end = start and start.isoformat(), end and end.isoformat()
+    matching = {}  # batch -> records in it that match
+    for batch in batches.order_by('-last_date', '-pk'):
+        records_in_batch = _matching_records(batch, customer_id, start, end)
+        if records_in_batch:
+            matching[batch] = records_in_batch
+    from_files = _file_documents(matching, customer_id, start, end)
+    from_table = (
+        {
+            'id': record['object_id'], 'customer_id': record['customer_id'],
+            'recorded_on': record['recorded_on'].isoformat(),
+            'data': record['data'], 'related': record['related'],
+        }
+        for record in records.order_by('-recorded_on', '-object_id').values(
+            'object_id', 'customer_id', 'recorded_on', 'data', 'related',
+        )[:offset + limit]
+    )
+    page = list(islice(heapq.merge(from_table, from_files, key=_order, reverse=True), offset, offset + limit))
+    return records.count() + sum(matching.values()), page
+
+
+def _date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise ValidationError({name: 'Use YYYY-MM-DD.'})
+
+
+def _int_param(params, name, default, maximum=None):
+    value = params.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        value = int(value)
+    except ValueError:
+        raise ValidationError({name: 'Must be an integer.'})
+    if value < 0:
+        raise ValidationError({name: 'Must not be negative.'})
+    return min(value, maximum) if maximum else value
+
+
+class ArchivedHistoryMixin:
+    """
+    Adds a read-only ``archived`` list route over the retention archive;
+    set ``archive_dataset``. ``?start=&end=`` (YYYY-MM-DD) bound the
+    records' dates; ``?offset=&limit=`` page them. Viewsets that set
+    ``archive_summary`` also return the dataset's monthly totals.
+    """
+    archive_dataset = None
+    archive_summary = False
+
+    def get_archive_customer(self, request):
+        """Customer whose archive is read; by default ``?customer=`` (all when absent)."""
+        return _int_param(request.query_params, 'customer', None)
+
+    @action(detail=False, methods=['get'])
+    def archived(self, request, *args, **kwargs):
+        params = request.query_params
+        start, end = _date_param(params, 'start'), _date_param(params, 'end')
+        offset = _int_param(params, 'offset', 0)
+        limit = _int_param(params, 'limit', 50, maximum=500)
+        count, results = archived_history(
+            self.archive_dataset, customer_id=self.get_archive_customer(request),
+            start=start, end=end, offset=offset, limit=limit,
+        )
+        data = {'count': count, 'offset': offset, 'limit': limit, 'results': results}
+        if self.archive_summary:
+            summary = ArchiveSummary.objects.filter(dataset=self.archive_dataset)
+            if start:
+                summary = summary.filter(period__gte=start.replace(day=1))
+            if end:
+                summary = summary.filter(period__lte=end)
+            data['summary'] = [
+                {'period': row['period'], 'status': row['status'], 'records': row['records'], 'amount': str(row['amount'])}
+                for row in summary.values('period', 'status', 'records', 'amount')
+            ]
+        return Response(data)
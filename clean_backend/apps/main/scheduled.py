@@ -0,0 +1,75 @@
+"""Scheduled jobs for orders and subscriptions (see apps/jobs/scheduler.py)."""
+import logging
+from dataclasses import asdict
+
+from django.utils import timezone
+
+from apps.jobs.scheduler import for_each_tenant, scheduled_job
+from apps.main.models import Order, Subscription
+from apps.main.notifications import dispatch_notifications
+from apps.main.retention import run_retention
+from apps.main.utils.order_state import bulk_transition_orders
+from core.db.purge import Purge
+
+logger = logging.getLogger(__name__)
+
+
+@scheduled_job('auto_advance_today_orders', cron={'hour': 10, 'minute': 0},
+               enabled_setting='DELIVERY_AUTO_COMPLETE')
+def auto_advance_today_orders():
+    """Move today's orders to ready and queue their deliveries (daily, 10:00)."""
+    today = timezone.localdate()
+
+    def advance(tenant, alias):
+        orders = Order.objects.using(alias).filter(
+            delivery_date=today, status__in=('pending', 'confirmed', 'preparing'),
+        )
+        _, ready_ids, created_deliveries = bulk_transition_orders(orders, 'ready', today=today, advance=True)
+        return {'ready': len(ready_ids), 'deliveries_created': created_deliveries}
+
+    return {'date': today, 'tenants': for_each_tenant(advance)}
+
+
+@scheduled_job('dispatch_notifications', cron={'minute': '*'}, min_gap=30)
+def send_pending_notifications():
+    """Send queued customer notifications and due retries (every minute)."""
+    return {'tenants': for_each_tenant(lambda tenant, alias: dispatch_notifications())}
+
+
+@scheduled_job('archive_tenant_history', cron={'hour': 2, 'minute': 30})
+def archive_tenant_history():
+    """Move history past each tenant's retention horizon into its archive (daily, 02:30)."""
+    return {'tenants': run_retention()}
+
+
+# The cleanup jobs wipe every order / subscription of every tenant, like the
+# clean_tenant_* commands. They are only for demo and staging deployments
+# and must be switched on explicitly through SCHEDULED_JOBS.
+
+def _purge_all(model):
+    """
+    A ``for_each_tenant`` function deleting every row of ``model`` through
+    ``core.db.purge.Purge``, like the clean_tenant_* commands: primary-key
+    chunks, dependants first, each chunk committed on its own. Its result is
+    the rows deleted and, per step, the rows, chunks and seconds it took.
+    """
+    def purge(tenant, alias):
+        def progress(step, rows):
+            logger.info("%s: %s %s row(s)", tenant.subdomain, step.label, rows)
+
+        results = Purge(model.objects.using(alias).all(), progress=progress).run()
+        return {'deleted': results[-1].rows, 'steps': [asdict(result) for result in results]}
+
+    return purge
+
+
+@scheduled_job('clean_tenant_orders', cron={'hour': 3, 'minute': 0}, default_enabled=False)
+def clean_tenant_orders():
+    """Delete all orders of every tenant (opt-in; demo/staging only)."""
+    return {'tenants': for_each_tenant(_purge_all(Order))}
+
+
+@scheduled_job('clean_tenant_subscriptions', cron={'hour': 3, 'minute': 10}, default_enabled=False)
+def clean_tenant_subscriptions():
+    """Delete all subscriptions of every tenant (opt-in; demo/staging only)."""
+    return {'tenants': for_each_tenant(_purge_all(Subscription))}
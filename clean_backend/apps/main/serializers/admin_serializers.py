@@ -9,7 +9,7 @@ from apps.main.models import (
     Order, Subscription, CustomerProfile, Invoice, InvoiceItem,
     Notification, CustomerRegistrationRequest, Category, Address,
     MealSlot, DailyMenu, DailyMenuItem, MenuItem, MealPackage,
-    Menu,
+    Menu, WalletTransaction, NotificationBroadcast,
 )
 
 
@@ -63,6 +63,29 @@ class OrderStatusUpdateSerializer(serializers.Serializer):
     reason = serializers.CharField(required=False, allow_blank=True)
 
 
+class OrderBulkStatusUpdateSerializer(serializers.Serializer):
+    """
+    Bulk status change. Target orders either by explicit ``ids`` or by a
+    filter; a filter must include ``delivery_date``.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False,
+        max_length=1000,
+    )
+    delivery_date = serializers.DateField(required=False)
+    meal_slot = serializers.IntegerField(required=False)
+    zone = serializers.IntegerField(required=False)
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
+    def validate(self, attrs):
+        if not attrs.get('ids') and not attrs.get('delivery_date'):
+            raise serializers.ValidationError(
+                'Provide either ids or a delivery_date filter '
+                '(optionally with meal_slot and zone).'
+            )
+        return attrs
+
+
 # ─── Address (admin view) ────────────────────────────────────────────────────
 
 class AddressAdminSerializer(serializers.ModelSerializer):
@@ -75,7 +98,7 @@ class AddressAdminSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'customer', 'customer_name',
             'street', 'city', 'building_name',
-            'floor_number', 'flat_number',
+            'floor_number', 'flat_number', 'latitude', 'longitude',
             'zone', 'zone_name',
             'is_default', 'status',
             'admin_notes', 'reason',
@@ -97,7 +120,7 @@ class AddressCreateSerializer(serializers.ModelSerializer):
         model = Address
         fields = [
             'customer', 'street', 'city', 'building_name',
-            'floor_number', 'flat_number', 'zone', 'is_default',
+            'floor_number', 'flat_number', 'latitude', 'longitude', 'zone', 'is_default',
         ]
 
 
@@ -301,6 +324,19 @@ class InvoiceSerializer(serializers.ModelSerializer):
         read_only_fields = ['invoice_number', 'created_at']
 
 
+# ─── Wallet ────────────────────────────────────────────────────────────────────
+
+class WalletTransactionAdminSerializer(serializers.ModelSerializer):
+    customer_name = serializers.CharField(source='customer.name', read_only=True)
+
+    class Meta:
+        model = WalletTransaction
+        fields = [
+            'id', 'customer', 'customer_name', 'transaction_type', 'amount',
+            'description', 'reference_id', 'subscription', 'invoice', 'created_at',
+        ]
+
+
 # ─── Notifications ─────────────────────────────────────────────────────────────
 
 class NotificationSerializer(serializers.ModelSerializer):
@@ -313,6 +349,30 @@ class NotificationSerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at']
 
 
+class NotificationBroadcastSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = NotificationBroadcast
+        fields = ['id', 'message', 'priority', 'filters', 'recipients', 'pushed', 'created_by', 'created_at']
+        read_only_fields = fields
+
+
+class NotificationBroadcastCreateSerializer(serializers.Serializer):
+    """A message and the customer segment it goes to (see apps.main.broadcasts)."""
+    message = serializers.CharField()
+    priority = serializers.ChoiceField(
+        choices=NotificationBroadcast._meta.get_field('priority').choices, default='medium',
+    )
+    zone = serializers.ListField(child=serializers.IntegerField(), required=False)
+    meal_slot = serializers.ListField(child=serializers.IntegerField(), required=False)
+    diet_type = serializers.ListField(
+        child=serializers.ChoiceField(choices=Subscription.DIET_TYPE_CHOICES), required=False,
+    )
+    subscription_status = serializers.ListField(
+        child=serializers.ChoiceField(choices=Subscription._meta.get_field('status').choices), required=False,
+    )
+    delivery_date = serializers.DateField(required=False)
+
+
 # ─── Categories ────────────────────────────────────────────────────────────────
 
 class CategorySerializer(serializers.ModelSerializer):
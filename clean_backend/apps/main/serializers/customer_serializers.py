@@ -47,7 +47,7 @@ class AddressSerializer(serializers.ModelSerializer):
         model = Address
         fields = [
             'id', 'street', 'city', 'building_name', 
-            'floor_number', 'flat_number', 'zone', 'zone_name',
+            'floor_number', 'flat_number', 'latitude', 'longitude', 'zone', 'zone_name',
             'is_default', 'status', 'admin_notes', 'reason'
         ]
         read_only_fields = ['customer', 'status', 'admin_notes']
@@ -0,0 +1,75 @@
+"""
+Signals published (and a few handled) by the main app.
+
+``order_status_changed`` fires after one or more orders have moved to a new
+status, whether through ``Order.save`` or a bulk transition. Receivers get:
+
+- ``sender``: the ``Order`` model
+- ``to_status``: the status the orders moved to
+- ``changes``: dict of order id -> previous status (``None`` for new orders)
+- ``using``: database alias the change was written to
+
+Models whose responses support conditional GETs or are cached as menu
+snapshots have their per-tenant versions tracked here
+(``core.utils.conditional``).
+
+Search documents embed a few names from related rows (the customer's
+username and email, the menu item's category); changes to those rows
+rebuild the affected documents (``apps.main.utils.search``).
+
+The notification inbox caches each user's customer id and active flag
+(``apps.main.notification_inbox.customer_account``); user and customer
+profile changes forget it.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from apps.main.models import Category, CustomerProfile, MealPackage, Menu, MenuItem, Subscription
+from apps.main.notification_inbox import forget_user
+from apps.main.utils.menu_snapshots import SNAPSHOT_MODELS
+from apps.main.utils.search import rebuild_search_documents
+from core.utils.conditional import track_model_versions
+
+order_status_changed = Signal()
+
+track_model_versions(*SNAPSHOT_MODELS, Menu, MealPackage)
+
+
+@receiver(m2m_changed, sender=Subscription.menus.through)
+def reset_subscription_menu_prices(sender, instance, action, **kwargs):
+    """Drop the cached menu prices used by Subscription.calculate_total_cost."""
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Subscription):
+        instance.__dict__.pop('_menu_prices', None)
+
+
+USER_SEARCH_FIELDS = {'username', 'email', 'first_name', 'last_name'}
+
+
+@receiver(post_save, sender=User)
+def refresh_customer_search_document(sender, instance, created, update_fields=None, using=None, **kwargs):
+    """Logins only touch ``last_login``; skip saves that leave the indexed names alone."""
+    if created or (update_fields is not None and not USER_SEARCH_FIELDS & set(update_fields)):
+        return
+    rebuild_search_documents(CustomerProfile.objects.using(using).filter(user=instance))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_account(sender, instance, update_fields=None, using=None, **kwargs):
+    """The notification inbox caches whether a user is active; logins leave it alone."""
+    if update_fields is None or 'is_active' in update_fields:
+        forget_user(instance.pk, alias=using)
+
+
+@receiver(post_save, sender=CustomerProfile)
+@receiver(post_delete, sender=CustomerProfile)
+def forget_customer_account(sender, instance, created=True, using=None, **kwargs):
+    if created:
+        forget_user(instance.user_id, alias=using)
+
+
+@receiver(post_save, sender=Category)
+def refresh_menu_item_search_documents(sender, instance, created, using=None, **kwargs):
+    if not created:
+        rebuild_search_documents(MenuItem.objects.using(using).filter(category=instance))
@@ -0,0 +1,226 @@
+import datetime
+import json
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.driver.models import DeliveryStatus, Zone
+from apps.main.broadcasts import broadcast, segment_customer_ids
+from apps.main.models import Address, CustomerProfile, MealPackage, MealSlot, Notification, Subscription
+from apps.main.notification_backends import FakeBackend, OutboundMessage, customer_group
+from apps.main.notifications import get_backend
+from apps.users.models import Tenant
+from config.asgi import application
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def fake_outbox():
+    FakeBackend.outbox.clear()
+    FakeBackend.failing.clear()
+    yield FakeBackend.outbox
+    FakeBackend.outbox.clear()
+    FakeBackend.failing.clear()
+
+
+class SegmentData:
+
+    def setup_method(self):
+        self.today = timezone.localdate()
+        self.marina = Zone.objects.create(name='Marina')
+        self.downtown = Zone.objects.create(name='Downtown')
+        self.lunch = MealSlot.objects.create(name='Lunch', code='lunch')
+        self.dinner = MealSlot.objects.create(name='Dinner', code='dinner')
+        self.package = MealPackage.objects.create(name='Standard', price=100)
+
+        self.veg_marina = self._subscribe('veg_marina', self.marina, self.lunch, diet_type='veg')
+        self.marina_dinner = self._subscribe('marina_dinner', self.marina, self.dinner)
+        self.downtown_lunch = self._subscribe('downtown_lunch', self.downtown, self.lunch)
+        self.paused = self._subscribe('paused', self.marina, self.lunch, status='paused')
+        self.opted_out = self._subscribe('opted_out', self.marina, self.lunch, want_notifications=False)
+
+    def _subscribe(self, username, zone, slot, status='active', **fields):
+        customer = CustomerProfile.objects.create(
+            user=User.objects.create_user(username=username), name=username, phone=f'+9715{len(username):08d}',
+        )
+        address = Address.objects.create(customer=customer, zone=zone, street='1 Main St', status='active')
+        slot_address = {'lunch_address' if slot.code == 'lunch' else 'dinner_address': address}
+        return Subscription.objects.create(
+            customer=customer, meal_package=self.package, time_slot=slot, status=status,
+            start_date=self.today, end_date=self.today + datetime.timedelta(days=30),
+            selected_days=['Monday'], **slot_address, **fields,
+        )
+
+    def _customers(self, *subscriptions):
+        return sorted(subscription.customer_id for subscription in subscriptions)
+
+
+@pytest.mark.django_db
+class TestSegments(SegmentData):
+
+    def test_filters_combine(self, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            everyone = segment_customer_ids({})
+        assert everyone == self._customers(self.veg_marina, self.marina_dinner, self.downtown_lunch)
+        assert segment_customer_ids({'zone': [self.marina.pk]}) == self._customers(self.veg_marina, self.marina_dinner)
+        assert segment_customer_ids({'zone': [self.marina.pk], 'meal_slot': [self.lunch.pk]}) == self._customers(self.veg_marina)
+        assert segment_customer_ids({'diet_type': ['nonveg']}) == self._customers(self.marina_dinner, self.downtown_lunch)
+        assert segment_customer_ids({'subscription_status': ['paused']}) == self._customers(self.paused)
+
+    def test_delivery_date(self):
+        tomorrow = self.today + datetime.timedelta(days=1)
+        DeliveryStatus.objects.create(subscription=self.downtown_lunch, date=tomorrow)
+        DeliveryStatus.objects.create(subscription=self.veg_marina, date=tomorrow, status='cancelled')
+        assert segment_customer_ids({'delivery_date': tomorrow}) == self._customers(self.downtown_lunch)
+
+    def test_chunked_insert_and_push(self, django_capture_on_commit_callbacks, fake_outbox):
+        with django_capture_on_commit_callbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                sent = broadcast('Lunch is running late', {'zone': [self.marina.pk]}, chunk_size=1)
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT INTO "main_notification"')]
+        assert len(inserts) == 2
+        sent.refresh_from_db()
+        assert (sent.recipients, sent.pushed) == (2, 2)
+        assert sent.filters == {'zone': [self.marina.pk]}
+        pushes = sorted(message.address for message in fake_outbox if message.channel == 'push')
+        assert pushes == sorted(customer_group('default', pk) for pk in self._customers(self.veg_marina, self.marina_dinner))
+        # Dispatch then sends on the customers' own channel only
+        assert [message.channel for message in fake_outbox if message.channel != 'push'] == ['whatsapp', 'whatsapp']
+        assert set(Notification.objects.values_list('sent', 'sent_via')) == {(True, 'whatsapp,push')}
+
+    def test_push_failure_left_to_dispatch(self, django_capture_on_commit_callbacks, settings):
+        settings.NOTIFICATIONS = {**settings.NOTIFICATIONS, 'DISPATCH_ON_COMMIT': False}
+        FakeBackend.failing.add(customer_group('default', self.veg_marina.customer_id))
+        with django_capture_on_commit_callbacks(execute=True):
+            sent = broadcast('Lunch is running late', {'zone': [self.marina.pk]})
+        assert sent.pushed == 1
+        failed = Notification.objects.get(customer_id=self.veg_marina.customer_id)
+        assert (failed.sent_via, failed.next_attempt_at) == ('', None)
+
+
+@pytest.mark.django_db
+class TestBroadcastApi(SegmentData):
+
+    def setup_method(self):
+        super().setup_method()
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.client.force_authenticate(user=User.objects.create_superuser('bc_admin', 'admin@example.com', 'x'))
+
+    def test_create_and_follow(self, django_capture_on_commit_callbacks):
+        payload = {'message': 'Dinner delayed', 'priority': 'high', 'meal_slot': [self.dinner.pk]}
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self.client.post('/api/v1/notification-broadcasts/', payload, format='json')
+        assert response.status_code == 201
+        assert response.data['recipients'] == 1
+        assert response.data['delivery']['total'] == 1
+
+        detail = self.client.get(f"/api/v1/notification-broadcasts/{response.data['id']}/")
+        assert detail.status_code == 200
+        assert detail.data['pushed'] == 1
+        assert detail.data['delivery']['sent'] == 1 and detail.data['delivery']['pending'] == 0
+        assert Notification.objects.get().priority == 'high'
+
+    def test_rejects_bad_filters_and_non_admins(self):
+        response = self.client.post(
+            '/api/v1/notification-broadcasts/', {'message': 'Hi', 'diet_type': ['keto']}, format='json',
+        )
+        assert response.status_code == 400
+        customer = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        customer.force_authenticate(user=self.veg_marina.customer.user)
+        assert customer.post('/api/v1/notification-broadcasts/', {'message': 'Hi'}, format='json').status_code == 403
+        assert not Notification.objects.exists()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestNotificationSocket:
+    """Connects through ``config.asgi.application``, so sockets authenticate like real apps."""
+
+    def setup_method(self):
+        self.tenant = Tenant.objects.create(
+            name='Sockets', subdomain='sockets', schema_name='sockets',
+            db_name=connection.settings_dict['NAME'], is_active=True,
+        )
+        self.alias = f'tenant_{self.tenant.id}'
+        self.user = User.objects.create_user(username='0501234567', password='pw-12345')
+        self.customer = CustomerProfile.objects.create(user=self.user, name='ws', tenant_id=self.tenant.id)
+
+    def teardown_method(self):
+        if self.alias in connections:
+            connections[self.alias].close()
+        settings.DATABASES.pop(self.alias, None)
+
+    def _token(self, **headers):
+        response = APIClient(HTTP_USER_AGENT='Mozilla/5.0', **headers).post(
+            '/api/v1/customer/auth/login/', {'phone': '0501234567', 'password': 'pw-12345'}, format='json',
+        )
+        assert response.status_code == 200
+        return response.data['tokens']['access']
+
+    @staticmethod
+    async def _connect(path, headers=()):
+        """``(communicator, accepted)``; daphne, which channels.testing needs, is not a dependency."""
+        path, _, query = path.partition('?')
+        communicator = ApplicationCommunicator(application, {
+            'type': 'websocket', 'path': path, 'query_string': query.encode(), 'headers': list(headers),
+        })
+        await communicator.send_input({'type': 'websocket.connect'})
+        return communicator, (await communicator.receive_output())['type'] == 'websocket.accept'
+
+    def _connects(self, path, headers=()):
+        async def scenario():
+            communicator, accepted = await self._connect(path, headers)
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait()
+            return accepted
+
+        return async_to_sync(scenario)()
+
+    def test_tenant_token_receives_pushes(self, settings):
+        settings.NOTIFICATIONS = {
+            **settings.NOTIFICATIONS, 'BACKENDS': {'push': 'apps.main.notification_backends.ChannelLayerBackend'},
+        }
+        token = self._token(HTTP_X_TENANT_ID='sockets')
+        push = sync_to_async(get_backend('push').send_messages)
+
+        async def scenario():
+            communicator, accepted = await self._connect(
+                f'/ws/notifications/?token={token}', [(b'x-tenant-id', b'sockets')],
+            )
+            assert accepted
+            errors = await push([OutboundMessage(
+                channel='push', customer_id=self.customer.pk, address=customer_group(self.alias, self.customer.pk),
+                body='Hello', notification_ids=[7],
+            )])
+            assert errors == [None]
+            event = await communicator.receive_output()
+            assert json.loads(event['text']) == {'ids': [7], 'message': 'Hello', 'priority': 'medium'}
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait()
+
+        async_to_sync(scenario)()
+
+    def test_rejects_other_credentials(self):
+        tenant_token = self._token(HTTP_X_TENANT_ID='sockets')
+        platform_token = self._token()
+        tenant = [(b'x-tenant-id', b'sockets')]
+        assert self._connects('/ws/notifications/', [(b'authorization', f'Bearer {tenant_token}'.encode())] + tenant)
+        # A session cookie is not accepted, even the customer's own
+        session = Client()
+        assert session.login(username='0501234567', password='pw-12345')
+        cookie = f"sessionid={session.cookies['sessionid'].value}".encode()
+        assert not self._connects('/ws/notifications/', [(b'cookie', cookie)] + tenant)
+        # Tokens only work on the tenant they were issued on
+        assert not self._connects(f'/ws/notifications/?token={platform_token}', tenant)
+        assert not self._connects(f'/ws/notifications/?token={tenant_token}')
+        assert not self._connects(f'/ws/notifications/?token={tenant_token}', [(b'x-tenant-id', b'elsewhere')])
+        assert not self._connects('/ws/notifications/?token=nonsense', tenant)
+        self.user.is_active = False
+        self.user.save()
+        assert not self._connects(f'/ws/notifications/?token={tenant_token}', tenant)
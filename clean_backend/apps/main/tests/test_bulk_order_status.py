@@ -0,0 +1,103 @@
+import pytest
+import datetime
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.main.models import (
+    Address, CustomerProfile, Order, MealSlot, MealPackage, Subscription,
+)
+from apps.delivery.models import Delivery
+from apps.driver.models import Zone, DeliveryDriver
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestBulkOrderStatusUpdate:
+    def setup_method(self):
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.admin = User.objects.create_superuser(username='admin_bulk', password='password')
+        self.client.force_authenticate(user=self.admin)
+        self.url = '/api/v1/orders/bulk_update_status/'
+
+        self.today = timezone.now().date()
+        self.zone = Zone.objects.create(name='North')
+        self.driver = DeliveryDriver.objects.create(name='Driver', phone='555000')
+        self.driver.zones.add(self.zone)
+        self.slot = MealSlot.objects.create(name='Lunch', code='lunch')
+
+        profile = CustomerProfile.objects.create(
+            user=User.objects.create_user('bulk_customer'), phone='111',
+        )
+        address = Address.objects.create(
+            customer=profile, zone=self.zone, street='Main St', status='active',
+        )
+        self.sub = Subscription.objects.create(
+            customer=profile,
+            meal_package=MealPackage.objects.create(name='P', price=10),
+            start_date=self.today,
+            end_date=self.today + datetime.timedelta(days=30),
+            time_slot=self.slot,
+            lunch_address=address,
+            selected_days=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+        )
+
+    def _order(self, order_status='pending', delivery_date=None):
+        return Order.objects.create(
+            subscription=self.sub,
+            order_date=self.today,
+            delivery_date=delivery_date or self.today,
+            status=order_status,
+        )
+
+    def test_bulk_update_by_ids_reports_per_order_outcome(self):
+        ok = self._order('pending')
+        bad = self._order('delivered')
+
+        response = self.client.post(
+            self.url, {'status': 'confirmed', 'ids': [ok.id, bad.id, 999999]}, format='json',
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['updated'] == 1
+        assert response.data['failed'] == 2
+        results = {r['id']: r for r in response.data['results']}
+        assert results[ok.id]['ok'] is True
+        assert results[bad.id]['ok'] is False
+        assert results[999999]['error'] == 'Order not found.'
+
+        ok.refresh_from_db()
+        bad.refresh_from_db()
+        assert ok.status == 'confirmed'
+        assert bad.status == 'delivered'
+
+    def test_bulk_ready_by_filter_creates_deliveries(self):
+        orders = [self._order('preparing') for _ in range(3)]
+        future = self._order('confirmed', self.today + datetime.timedelta(days=1))
+
+        response = self.client.post(self.url, {
+            'status': 'ready',
+            'delivery_date': self.today.isoformat(),
+            'meal_slot': self.slot.id,
+            'zone': self.zone.id,
+        }, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['updated'] == 3
+        assert response.data['deliveries_created'] == 3
+
+        deliveries = Delivery.objects.filter(order__in=orders)
+        assert deliveries.count() == 3
+        assert all(d.driver_id == self.driver.id for d in deliveries)
+        assert not Delivery.objects.filter(order=future).exists()
+
+    def test_bulk_update_query_count_is_constant(self, django_assert_max_num_queries):
+        ids = [self._order('preparing').id for _ in range(20)]
+        with django_assert_max_num_queries(15):
+            response = self.client.post(
+                self.url, {'status': 'ready', 'ids': ids}, format='json',
+            )
+        assert response.data['updated'] == 20
+
+    def test_requires_ids_or_delivery_date(self):
+        response = self.client.post(self.url, {'status': 'confirmed', 'zone': self.zone.id}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import patch, MagicMock, call
 from django.core.management import call_command
 from apps.users.models import Tenant
+from core.db.purge import PurgeStepResult
 
 class TestCleanupCommands:
     """Test cleanup management commands."""
@@ -18,12 +19,14 @@ class TestCleanupCommands:
         self.tenant.db_port = '5432'
         self.tenant.is_active = True
 
+    @patch('apps.main.management.commands.clean_tenant_orders.Purge')
     @patch('apps.main.management.commands.clean_tenant_orders.Order')
     @patch('apps.main.management.commands.clean_tenant_orders.Tenant')
-    def test_clean_tenant_orders_specific_tenant(self, mock_tenant_cls, mock_order):
+    def test_clean_tenant_orders_specific_tenant(self, mock_tenant_cls, mock_order, mock_purge):
         """Test clean_tenant_orders for a specific tenant."""
         # Given: Tenant found
         mock_tenant_cls.objects.using.return_value.filter.return_value = [self.tenant]
+        mock_purge.return_value.run.return_value = [PurgeStepResult('main.Order', 'delete', rows=3, chunks=1)]
         
         # When: call command
         call_command('clean_tenant_orders', tenant='test', no_input=True)
@@ -36,13 +39,17 @@ class TestCleanupCommands:
         db_alias = f"tenant_{self.tenant.id}"
         mock_order.objects.using.assert_called_with(db_alias)
         
-        # Verify delete called
+        # Verify the unscoped orders were purged in chunks
         using_return = mock_order.objects.using.return_value
-        assert using_return.all.return_value.delete.called
+        using_return.filter.assert_called_with()
+        assert mock_purge.call_args.args == (using_return.filter.return_value,)
+        assert mock_purge.call_args.kwargs['chunk_size'] == 5000
+        assert mock_purge.return_value.run.called
 
+    @patch('apps.main.management.commands.clean_tenant_orders.Purge')
     @patch('apps.main.management.commands.clean_tenant_orders.Order')
     @patch('apps.main.management.commands.clean_tenant_orders.Tenant')
-    def test_clean_tenant_orders_all_tenants(self, mock_tenant_cls, mock_order):
+    def test_clean_tenant_orders_all_tenants(self, mock_tenant_cls, mock_order, mock_purge):
         """Test clean_tenant_orders --all."""
         # Given: 2 tenants
         tenant2 = MagicMock(spec=Tenant)
@@ -51,6 +58,7 @@ class TestCleanupCommands:
         tenant2.db_name = 'test_db2'
         
         mock_tenant_cls.objects.using.return_value.filter.return_value = [self.tenant, tenant2]
+        mock_purge.return_value.run.return_value = [PurgeStepResult('main.Order', 'delete')]
         
         # When: call command --all
         call_command('clean_tenant_orders', all=True, no_input=True)
@@ -64,12 +72,14 @@ class TestCleanupCommands:
         assert alias1 in calls
         assert alias2 in calls
 
+    @patch('apps.main.management.commands.clean_tenant_subscriptions.Purge')
     @patch('apps.main.management.commands.clean_tenant_subscriptions.Subscription')
     @patch('apps.main.management.commands.clean_tenant_subscriptions.Tenant')
-    def test_clean_tenant_subscriptions_specific_tenant(self, mock_tenant_cls, mock_subscription):
+    def test_clean_tenant_subscriptions_specific_tenant(self, mock_tenant_cls, mock_subscription, mock_purge):
         """Test clean_tenant_subscriptions for a specific tenant."""
         # Given: Tenant
         mock_tenant_cls.objects.using.return_value.filter.return_value = [self.tenant]
+        mock_purge.return_value.run.return_value = [PurgeStepResult('main.Subscription', 'delete', rows=2, chunks=1)]
         
         # When: call command
         call_command('clean_tenant_subscriptions', tenant='test', no_input=True)
@@ -78,6 +88,35 @@ class TestCleanupCommands:
         db_alias = f"tenant_{self.tenant.id}"
         mock_subscription.objects.using.assert_called_with(db_alias)
         
-        # Verify delete called
+        # Verify the unscoped subscriptions were purged in chunks
         using_return = mock_subscription.objects.using.return_value
-        assert using_return.all.return_value.delete.called
+        assert mock_purge.call_args.args == (using_return.filter.return_value,)
+        assert mock_purge.return_value.run.called
+
+    @patch('apps.main.management.commands.clean_tenant_orders.Purge')
+    @patch('apps.main.management.commands.clean_tenant_orders.Order')
+    @patch('apps.main.management.commands.clean_tenant_orders.Tenant')
+    def test_clean_tenant_orders_scoped_dry_run(self, mock_tenant_cls, mock_order, mock_purge):
+        """--dry-run counts the scoped purge and deletes nothing."""
+        import datetime
+        from apps.main.models import Order
+        mock_order.STATUS_CHOICES = Order.STATUS_CHOICES
+        mock_tenant_cls.objects.using.return_value.filter.return_value = [self.tenant]
+        mock_purge.return_value.count.return_value = {'delivery.Delivery': 4, 'main.Order': 4}
+
+        call_command(
+            'clean_tenant_orders', tenant='test', dry_run=True,
+            before='2026-01-01', status='delivered,cancelled', chunk_size=100,
+        )
+
+        mock_order.objects.using.return_value.filter.assert_called_with(
+            delivery_date__lt=datetime.date(2026, 1, 1), status__in=['delivered', 'cancelled'],
+        )
+        assert mock_purge.call_args.kwargs['chunk_size'] == 100
+        assert mock_purge.return_value.count.called
+        assert not mock_purge.return_value.run.called
+
+    def test_clean_tenant_orders_rejects_unknown_status(self):
+        from django.core.management.base import CommandError
+        with pytest.raises(CommandError):
+            call_command('clean_tenant_orders', all=True, status='lost')
@@ -13,14 +13,15 @@ class TestMainCommands:
     @patch('apps.main.management.commands.auto_advance_today_orders.Command._advance_for_tenant')
     def test_auto_advance_command(self, mock_advance):
         # Test valid tenant
-        Tenant.objects.create(subdomain='test', schema_name='test', is_active=True)
+        # Tenants without a database are skipped by the fan-out
+        Tenant.objects.create(subdomain='test', schema_name='test', db_name='db_test', is_active=True)
         call_command('auto_advance_today_orders', tenant='test', no_input=True)
         mock_advance.assert_called()
 
     @patch('apps.main.management.commands.auto_advance_today_orders.Command._advance_for_tenant')
     def test_auto_advance_all(self, mock_advance):
-        Tenant.objects.create(subdomain='t1', schema_name='t1', is_active=True)
-        Tenant.objects.create(subdomain='t2', schema_name='t2', is_active=True)
+        Tenant.objects.create(subdomain='t1', schema_name='t1', db_name='db_t1', is_active=True)
+        Tenant.objects.create(subdomain='t2', schema_name='t2', db_name='db_t2', is_active=True)
         call_command('auto_advance_today_orders', all=True, no_input=True)
         assert mock_advance.call_count == 2
 
@@ -0,0 +1,145 @@
+import json
+import pytest
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.tokens import default_token_generator
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.driver.models import Zone
+from apps.main.models import Address, CustomerProfile
+from apps.main.utils.customer_import import hash_passwords, import_customers, parse_rows
+from apps.organizations.models import ServicePlan
+
+User = get_user_model()
+
+URL = '/api/v1/customers/import/'
+
+
+def _records(count, start=0):
+    return [{'name': f'Customer {i}', 'phone': f'+97150{i:07d}'} for i in range(start, start + count)]
+
+
+@pytest.mark.django_db
+class TestCustomerImportApi:
+    def setup_method(self):
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.admin = User.objects.create_superuser(username='admin_import', password='password')
+        self.client.force_authenticate(user=self.admin)
+        self.zone = Zone.objects.create(name='Marina')
+
+    def test_json_import_creates_everything(self):
+        response = self.client.post(URL, {'customers': [{
+            'name': 'Mona Adel', 'phone': '+971501111111', 'email': 'Mona@Example.com',
+            'zone': self.zone.id, 'street': 'Marina Walk', 'building_name': 'Tower 1',
+        }]}, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data['created_count'] == 1
+
+        profile = CustomerProfile.objects.select_related('user').get(phone='+971501111111')
+        assert profile.user.username == 'cust_971501111111'
+        assert profile.user.email == 'mona@example.com'
+        assert profile.user.first_name == 'Mona' and profile.user.last_name == 'Adel'
+        assert not profile.user.has_usable_password()
+        assert profile.zone == 'Marina'
+        address = Address.objects.get(customer=profile)
+        assert (address.zone, address.status, address.is_default) == (self.zone, 'active', True)
+        assert address.requested_by == self.admin
+        # Searchable straight away
+        assert self.client.get('/api/v1/customers/', {'search': 'mona'}).data['count'] == 1
+
+    def test_queries_do_not_grow_with_rows(self):
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(URL, {'customers': _records(5)}, format='json')
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.post(URL, {'customers': _records(60, start=100)}, format='json')
+        assert response.data['created_count'] == 60
+        assert len(large) == len(small)
+
+    def test_csv_upload_reports_errors_by_line(self):
+        existing = User.objects.create_user(username='existing', email='taken@example.com')
+        CustomerProfile.objects.create(user=existing, phone='0500000001')
+        content = '\n'.join([
+            'name,phone,email,zone',
+            'Good One,0500000010,,',
+            'Existing Phone,0500000001,,',
+            'Same File,0500000010,,',
+            'Taken Email,0500000011,TAKEN@example.com,',
+            'Bad Email,0500000012,not-an-email,',
+            ',0500000013,,',
+            'No Zone,0500000014,,999',
+        ])
+        upload = SimpleUploadedFile('customers.csv', content.encode(), content_type='text/csv')
+        response = self.client.post(URL, {'file': upload}, format='multipart')
+        assert response.status_code == status.HTTP_201_CREATED
+
+        assert [entry['row'] for entry in response.data['created']] == [2]
+        errors = {entry['row']: entry['errors'] for entry in response.data['errors']}
+        assert set(errors) == {3, 4, 5, 6, 7, 8}
+        assert 'already exists' in str(errors[3]['phone'][0])
+        assert 'Duplicate' in str(errors[4]['phone'][0])
+        assert 'already exists' in str(errors[5]['email'][0])
+        assert 'email' in errors[6]
+        assert 'name' in errors[7]
+        assert 'does not exist' in str(errors[8]['zone'][0])
+
+    def test_invite_tokens(self):
+        response = self.client.post(URL, {'customers': _records(2), 'invite': True}, format='json')
+        for entry in response.data['created']:
+            user = User.objects.get(username=entry['username'])
+            assert default_token_generator.check_token(user, entry['invite']['token'])
+
+    def test_dry_run_writes_nothing(self):
+        response = self.client.post(URL, {'customers': _records(3), 'dry_run': True}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created_count'] == 3
+        assert not CustomerProfile.objects.exists()
+
+    def test_nothing_valid(self):
+        response = self.client.post(URL, {'customers': [{'name': 'No phone'}]}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        response = self.client.post(URL, {'rows': []}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestCustomerImportPipeline:
+    def test_plan_limit_checked_once_per_batch(self):
+        CustomerProfile.objects.create(user=User.objects.create_user('already'), phone='1')
+        plan = ServicePlan(name='Tiny', max_customers=3)
+        result = import_customers(_records(4), plan=plan)
+        assert [entry['row'] for entry in result.created] == [1, 2]
+        assert [entry['row'] for entry in result.errors] == [3, 4]
+        assert 'maximum of 3' in result.errors[0]['errors']['non_field_errors'][0]
+
+    def test_username_collisions_get_suffix(self):
+        User.objects.create_user(username='cust_971500000000')
+        result = import_customers(_records(1))
+        assert result.created[0]['username'].startswith('cust_971500000000_')
+
+    def test_supplied_passwords_hashed(self):
+        records = _records(2)
+        records[0]['password'] = 's3cret-pass'
+        result = import_customers(records, invite=True)
+        user = User.objects.get(username=result.created[0]['username'])
+        assert user.check_password('s3cret-pass')
+        assert 'invite' not in result.created[0] and 'invite' in result.created[1]
+
+    def test_hash_passwords_in_pool(self):
+        hashed = hash_passwords(['a1', 'b2', 'c3'], workers=2)
+        assert [check_password(raw, value) for raw, value in zip(['a1', 'b2', 'c3'], hashed)] == [True] * 3
+
+    def test_parse_rows(self):
+        assert parse_rows(b'\xef\xbb\xbfname,phone\nAli,050\n') == ([{'name': 'Ali', 'phone': '050'}], 2)
+        assert parse_rows(json.dumps({'customers': [{'name': 'Ali'}]})) == ([{'name': 'Ali'}], 1)
+
+    def test_command(self, tmp_path):
+        source = tmp_path / 'customers.json'
+        source.write_text(json.dumps(_records(3)))
+        report = tmp_path / 'report.json'
+        call_command('import_customers', str(source), '--report', str(report), '--hash-workers', '1')
+        assert CustomerProfile.objects.count() == 3
+        assert json.loads(report.read_text())['created_count'] == 3
@@ -0,0 +1,96 @@
+import pytest
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.main.models import Category, DailyMenu, MealSlot, MenuItem
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestDailyMenuSnapshots:
+    def setup_method(self):
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.admin = User.objects.create_superuser(username='admin_snap', password='password')
+        self.client.force_authenticate(user=self.admin)
+        self.today = timezone.now().date()
+        self.slot = MealSlot.objects.create(name='Lunch', code='lunch')
+        self.category = Category.objects.create(name='Mains')
+        self.item = MenuItem.objects.create(name='Biryani', category=self.category, price=Decimal('12.00'))
+        self.menu = DailyMenu.objects.create(menu_date=self.today, meal_slot=self.slot, status='published')
+        self.menu.items.create(master_item=self.item)
+
+    def test_today_is_served_from_snapshot(self, django_assert_num_queries):
+        first = self.client.get('/api/v1/daily-menus/today/')
+        assert first.status_code == status.HTTP_200_OK
+        assert first.data[0]['items'][0]['master_item_name'] == 'Biryani'
+        assert first['ETag']
+
+        with django_assert_num_queries(0):
+            second = self.client.get('/api/v1/daily-menus/today/')
+        assert second.data == first.data
+        assert second['ETag'] == first['ETag']
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get('/api/v1/daily-menus/today/')['ETag']
+        response = self.client.get('/api/v1/daily-menus/today/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == etag
+        assert not response.content
+
+    def test_menu_item_change_invalidates(self):
+        etag = self.client.get('/api/v1/daily-menus/today/')['ETag']
+        self.item.name = 'Chicken Biryani'
+        self.item.save()
+
+        response = self.client.get('/api/v1/daily-menus/today/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data[0]['items'][0]['master_item_name'] == 'Chicken Biryani'
+        assert response['ETag'] != etag
+
+    def test_filters_get_their_own_snapshot(self):
+        DailyMenu.objects.create(menu_date=self.today, meal_slot=self.slot, diet_type='veg', status='published')
+        assert len(self.client.get('/api/v1/daily-menus/today/').data) == 2
+        assert len(self.client.get('/api/v1/daily-menus/today/?diet_type=veg').data) == 1
+
+    def test_week_snapshot(self, django_assert_num_queries):
+        start = self.today.isoformat()
+        first = self.client.get(f'/api/v1/daily-menus/week/?start={start}')
+        assert first.data['week_start'] == start
+        assert len(first.data['menus']) == 1
+        with django_assert_num_queries(0):
+            self.client.get(f'/api/v1/daily-menus/week/?start={start}')
+
+    def test_close_rebuilds_today_on_commit(self, django_assert_num_queries, django_capture_on_commit_callbacks):
+        self.client.get('/api/v1/daily-menus/today/')
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self.client.post(f'/api/v1/daily-menus/{self.menu.id}/close/', {}, format='json')
+        assert response.status_code == status.HTTP_200_OK
+
+        with django_assert_num_queries(0):
+            response = self.client.get('/api/v1/daily-menus/today/')
+        assert response.data == []
+
+
+@pytest.mark.django_db
+class TestPublicMenuSnapshot:
+    def setup_method(self):
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.url = '/api/v1/customer/menu/'
+        self.category = Category.objects.create(name='Starters')
+        MenuItem.objects.create(name='Lentil Soup', description='Warm', price=Decimal('5.00'), category=self.category)
+        MenuItem.objects.create(name='Salad', description='Fresh greens', price=Decimal('6.00'), category=self.category)
+
+    def test_search_filters_snapshot(self, django_assert_num_queries):
+        everything = self.client.get(self.url)
+        assert len(everything.data) == 2
+
+        with django_assert_num_queries(0):
+            found = self.client.get(self.url, {'search': 'GREENS'})
+        assert [item['name'] for item in found.data] == ['Salad']
+        assert found['ETag'] != everything['ETag']
+
+        response = self.client.get(self.url, {'search': 'GREENS'}, HTTP_IF_NONE_MATCH=found['ETag'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
@@ -0,0 +1,115 @@
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from apps.main.models import CustomerProfile, Notification
+from apps.main.notification_inbox import rebuild_inbox
+from apps.main.notifications import notify
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    settings.NOTIFICATIONS = {**settings.NOTIFICATIONS, 'DISPATCH_ON_COMMIT': False, 'INBOX_SIZE': 3}
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.mark.django_db
+class TestNotificationInbox:
+
+    def setup_method(self):
+        self.user = User.objects.create_user(username='inbox_cust')
+        self.customer = CustomerProfile.objects.create(user=self.user, name='Inbox')
+        self.notifications = [
+            Notification.objects.create(customer=self.customer, message=f'Message {index}') for index in range(4)
+        ]
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def _summary(self):
+        response = self.client.get('/api/v1/customer/notifications/summary/')
+        assert response.status_code == 200
+        return response.json()
+
+    def _matches_database(self, summary):
+        cache.clear()
+        assert summary == rebuild_inbox(self.customer.pk)
+
+    def test_cache_hit_runs_no_query(self, django_assert_num_queries):
+        first = self._summary()
+        assert first['unread'] == 4
+        assert [item['message'] for item in first['latest']] == ['Message 3', 'Message 2', 'Message 1']
+        with django_assert_num_queries(0):
+            assert self._summary() == first
+
+    def test_created_notifications_update_the_cached_inbox(self, django_capture_on_commit_callbacks, django_assert_num_queries):
+        self._summary()
+        with django_capture_on_commit_callbacks(execute=True):
+            with transaction.atomic():
+                notify(self.customer, 'Lunch is on its way')
+                notify(self.customer, 'Wallet topped up')
+        with django_assert_num_queries(0):
+            summary = self._summary()
+        assert summary['unread'] == 6
+        assert [item['message'] for item in summary['latest']] == ['Wallet topped up', 'Lunch is on its way', 'Message 3']
+        self._matches_database(summary)
+
+    def test_mark_read_and_mark_all_read(self, django_capture_on_commit_callbacks, django_assert_num_queries):
+        self._summary()
+        latest = self.notifications[-1]
+        with django_capture_on_commit_callbacks(execute=True):
+            assert self.client.post(f'/api/v1/customer/notifications/{latest.pk}/mark_read/', {}, format='json').status_code == 200
+            # Marking it again changes nothing
+            self.client.post(f'/api/v1/customer/notifications/{latest.pk}/mark_read/', {}, format='json')
+        with django_assert_num_queries(0):
+            summary = self._summary()
+        assert summary['unread'] == 3
+        assert summary['latest'][0]['read'] and summary['latest'][0]['read_at']
+        self._matches_database(summary)
+
+        self._summary()
+        with django_capture_on_commit_callbacks(execute=True):
+            assert self.client.post('/api/v1/customer/notifications/mark_all_read/', {}, format='json').status_code == 200
+        summary = self._summary()
+        assert summary['unread'] == 0 and all(item['read'] for item in summary['latest'])
+        self._matches_database(summary)
+
+    def test_admin_delete_forgets_the_inbox(self, django_capture_on_commit_callbacks):
+        assert self._summary()['unread'] == 4
+        admin = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        admin.force_authenticate(user=User.objects.create_superuser('inbox_admin', 'admin@example.com', 'x'))
+        with django_capture_on_commit_callbacks(execute=True):
+            assert admin.delete(f'/api/v1/notifications/{self.notifications[0].pk}/').status_code == 204
+        assert self._summary()['unread'] == 3
+
+    def test_non_customer(self):
+        staff = User.objects.create_user(username='inbox_staff')
+        client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(staff).access_token}')
+        assert client.get('/api/v1/customer/notifications/summary/').status_code == 404
+        assert client.post('/api/v1/customer/notifications/mark_all_read/', {}, format='json').status_code == 200
+
+    def test_token_from_another_tenant_is_rejected(self):
+        token = RefreshToken.for_user(self.user).access_token
+        token['tenant'] = 'elsewhere'
+        client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        assert client.get('/api/v1/customer/notifications/summary/').status_code == 401
+
+    def test_deactivated_user_is_rejected_after_a_cache_hit(self, django_capture_on_commit_callbacks):
+        self._summary()
+        with django_capture_on_commit_callbacks(execute=True):
+            self.user.is_active = False
+            self.user.save(update_fields=['is_active'])
+        assert self.client.get('/api/v1/customer/notifications/summary/').status_code == 401
+
+    def test_logins_keep_the_cached_account(self, django_assert_num_queries):
+        self._summary()
+        self.user.save(update_fields=['last_login'])
+        with django_assert_num_queries(0):
+            self._summary()
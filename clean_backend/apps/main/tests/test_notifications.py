@@ -0,0 +1,182 @@
+import datetime
+import importlib
+import pytest
+from types import SimpleNamespace
+from decimal import Decimal
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from apps.jobs.models import BackgroundJob
+from apps.main.models import CustomerProfile, Notification, WalletTransaction
+from apps.main.notification_backends import FakeBackend
+from apps.main.notifications import RateLimiter, dispatch_notifications, notification_channels, notify
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def fake_outbox():
+    FakeBackend.outbox.clear()
+    FakeBackend.failing.clear()
+    yield FakeBackend.outbox
+    FakeBackend.outbox.clear()
+    FakeBackend.failing.clear()
+
+
+def _customer(username, phone, preferred='sms', preferences=None):
+    user = User.objects.create_user(username=username, email=f'{username}@example.com')
+    return CustomerProfile.objects.create(
+        user=user, name=username, phone=phone,
+        preferred_communication=preferred, notification_preferences=preferences or {},
+    )
+
+
+def test_channels_follow_preferences():
+    assert notification_channels(CustomerProfile(preferred_communication='whatsapp')) == ['whatsapp']
+    assert notification_channels(CustomerProfile(
+        preferred_communication='sms', notification_preferences={'sms': False, 'push': True},
+    )) == ['push']
+    assert notification_channels(CustomerProfile(
+        preferred_communication='email', notification_preferences={'email': True, 'sms': True},
+    )) == ['email', 'sms']
+    assert notification_channels(CustomerProfile(preferred_communication='none')) == []
+
+
+def test_rate_limiter_waits_for_tokens():
+    now, waits = [0.0], []
+    limiter = RateLimiter(10, clock=lambda: now[0], sleep=waits.append)
+    limiter.acquire(10)
+    assert waits == []
+    limiter.acquire(5)
+    assert waits == [0.5]
+    now[0] = 2.0
+    limiter.acquire(5)
+    assert waits == [0.5]
+
+
+@pytest.mark.django_db
+class TestQueue:
+
+    def setup_method(self):
+        self.alice = _customer('alice', '+971500000001')
+        self.bob = _customer('bob', '+971500000002', preferred='email')
+
+    def test_queued_in_transaction_inserted_and_sent_once(self, django_capture_on_commit_callbacks, fake_outbox):
+        with django_capture_on_commit_callbacks(execute=True):
+            with transaction.atomic():
+                notify(self.alice, 'Lunch is on its way')
+                notify(self.alice, 'Your wallet was topped up', priority='high')
+                notify(self.bob, 'Menu published')
+                assert not Notification.objects.exists()
+
+        assert Notification.objects.count() == 3
+        assert not Notification.objects.filter(sent=False).exists()
+        assert BackgroundJob.objects.filter(name='apps.main.jobs.send_notifications').count() == 1
+        by_address = {message.address: message for message in fake_outbox}
+        assert set(by_address) == {'+971500000001', 'bob@example.com'}
+        coalesced = by_address['+971500000001']
+        assert 'You have 2 new notifications' in coalesced.body and coalesced.priority == 'high'
+        assert Notification.objects.filter(customer=self.alice).first().sent_via == 'sms'
+
+    def test_single_insert_for_the_whole_transaction(self, django_capture_on_commit_callbacks, settings):
+        settings.NOTIFICATIONS = {**settings.NOTIFICATIONS, 'DISPATCH_ON_COMMIT': False}
+        with django_capture_on_commit_callbacks() as callbacks:
+            with transaction.atomic():
+                for index in range(5):
+                    notify(self.alice, f'Message {index}')
+        with CaptureQueriesContext(connection) as queries:
+            for callback in callbacks:
+                callback()
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT')]
+        assert len(inserts) == 1
+        assert Notification.objects.count() == 5
+
+    def test_rolled_back_notifications_are_dropped(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            with pytest.raises(RuntimeError):
+                with transaction.atomic():
+                    notify(self.alice, 'Never sent')
+                    raise RuntimeError
+            with transaction.atomic():
+                notify(self.alice, 'Sent')
+        assert list(Notification.objects.values_list('message', flat=True)) == ['Sent']
+
+    def test_negative_wallet_balance_notifies(self, django_capture_on_commit_callbacks, fake_outbox):
+        with django_capture_on_commit_callbacks(execute=True):
+            WalletTransaction.objects.create(
+                customer=self.alice, amount=Decimal('50'), transaction_type='debit', description='Delivery',
+            )
+        notification = Notification.objects.get(customer=self.alice)
+        assert notification.priority == 'urgent' and notification.sent
+        assert 'negative' in fake_outbox[0].body
+
+
+@pytest.mark.django_db
+class TestDispatch:
+
+    def setup_method(self):
+        self.alice = _customer('alice', '+971500000001', preferred='email', preferences={'push': True})
+        self.silent = _customer('silent', '+971500000003', preferred='none')
+
+    def _make_due(self):
+        Notification.objects.filter(sent=False).update(next_attempt_at=timezone.now() - datetime.timedelta(seconds=1))
+
+    def test_failed_channel_retried_alone(self, fake_outbox):
+        Notification.objects.create(customer=self.alice, message='Hello')
+        FakeBackend.failing.add('alice@example.com')
+
+        assert dispatch_notifications() == {'sent': 0, 'failed': 1, 'gave_up': 0, 'messages': 2}
+        notification = Notification.objects.get()
+        assert (notification.sent, notification.attempts, notification.sent_via) == (False, 1, 'push')
+        assert notification.next_attempt_at > timezone.now()
+        assert 'email' in notification.last_error
+        # Not due yet
+        assert dispatch_notifications()['messages'] == 0
+
+        FakeBackend.failing.clear()
+        self._make_due()
+        assert dispatch_notifications()['sent'] == 1
+        notification.refresh_from_db()
+        assert (notification.sent, notification.sent_via, notification.last_error) == (True, 'email,push', '')
+        assert [message.channel for message in fake_outbox] == ['push', 'email']
+
+    def test_gives_up_after_max_attempts(self, settings):
+        settings.NOTIFICATIONS = {**settings.NOTIFICATIONS, 'MAX_ATTEMPTS': 2}
+        Notification.objects.create(customer=self.alice, message='Hello')
+        FakeBackend.failing.update({'alice@example.com', 'notifications.default.%s' % self.alice.pk})
+        dispatch_notifications()
+        self._make_due()
+        assert dispatch_notifications()['gave_up'] == 1
+        self._make_due()
+        assert dispatch_notifications()['messages'] == 0
+
+    def test_customer_without_channels_is_marked_handled(self, fake_outbox):
+        Notification.objects.create(customer=self.silent, message='Hello')
+        assert dispatch_notifications()['sent'] == 1
+        assert Notification.objects.get().sent_via == ''
+        assert fake_outbox == []
+
+    def test_history_from_before_dispatch_is_not_sent(self, fake_outbox):
+        old = Notification.objects.create(customer=self.alice, message='From last year')
+        migration = importlib.import_module('apps.main.migrations.0019_notification_dispatch')
+        migration.mark_existing_sent(django_apps, SimpleNamespace(connection=connection))
+
+        assert dispatch_notifications()['messages'] == 0
+        assert fake_outbox == []
+        old.refresh_from_db()
+        assert old.sent and old.sent_at == old.created_at
+
+        Notification.objects.create(customer=self.alice, message='New')
+        assert dispatch_notifications()['sent'] == 1
+
+    def test_batches_marked_in_bulk(self, settings):
+        settings.NOTIFICATIONS = {**settings.NOTIFICATIONS, 'BATCH_SIZE': 10}
+        customers = [_customer(f'bulk{index}', f'+97150100{index:04d}') for index in range(25)]
+        Notification.objects.bulk_create([Notification(customer=customer, message='Hi') for customer in customers])
+        with CaptureQueriesContext(connection) as queries:
+            stats = dispatch_notifications()
+        assert stats['sent'] == 25 and stats['messages'] == 25
+        updates = [query for query in queries.captured_queries if query['sql'].startswith('UPDATE "main_notification" SET "sent"')]
+        assert len(updates) == 3
@@ -0,0 +1,105 @@
+import pytest
+from datetime import date, timedelta
+from django.apps import apps
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from apps.main.models import Order, Subscription, MealPackage
+from apps.main.signals import order_status_changed
+from apps.main.utils.order_state import (
+    TransitionError, bulk_transition_orders, check_transition,
+    transition_order, transition_path,
+)
+from apps.delivery.models import Delivery
+
+
+class TestTransitionRules:
+    """Pure checks against the transition table and guards."""
+
+    def test_transition_path(self):
+        assert transition_path('pending', 'ready') == ['confirmed', 'preparing', 'ready']
+        assert transition_path('delivered', 'ready') is None
+        assert transition_path('ready', 'ready') is None
+
+    def test_direct_transition_requires_adjacent_status(self):
+        today = date.today()
+        assert check_transition('pending', 'confirmed', today, today) is None
+        assert check_transition('pending', 'ready', today, today) is not None
+        assert check_transition('pending', 'ready', today, today, advance=True) is None
+
+    def test_guard_applies_to_intermediate_steps(self):
+        today = date.today()
+        tomorrow = today + timedelta(days=1)
+        error = check_transition('confirmed', 'ready', tomorrow, today, advance=True)
+        assert "'preparing'" in error
+
+
+@pytest.mark.django_db
+class TestOrderStateMachine:
+    def setup_method(self):
+        user = apps.get_model('auth', 'User').objects.create_user(username='state_client')
+        profile = apps.get_model('main', 'CustomerProfile').objects.create(user=user)
+        self.subscription = Subscription.objects.create(
+            customer=profile,
+            meal_package=MealPackage.objects.create(name="Standard", price=100),
+            start_date=date.today(),
+            end_date=date.today() + timedelta(days=30),
+            status='active',
+            selected_days=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+        )
+        self.events = []
+        order_status_changed.connect(self._record)
+
+    def teardown_method(self):
+        order_status_changed.disconnect(self._record)
+
+    def _record(self, sender, to_status, changes, using, **kwargs):
+        self.events.append((to_status, changes))
+
+    def _order(self, status='pending'):
+        return Order.objects.create(
+            subscription=self.subscription,
+            order_date=date.today(),
+            delivery_date=date.today(),
+            status=status,
+        )
+
+    def test_transition_order_emits_event_and_creates_delivery(self):
+        order = Order.objects.get(pk=self._order('preparing').pk)
+        self.events.clear()
+
+        transition_order(order, 'ready')
+
+        assert self.events == [('ready', {order.pk: 'preparing'})]
+        assert Delivery.objects.filter(order=order).exists()
+
+    def test_transition_order_rejects_invalid_move(self):
+        order = self._order('pending')
+        with pytest.raises(TransitionError):
+            transition_order(order, 'delivered')
+        order.refresh_from_db()
+        assert order.status == 'pending'
+
+    def test_save_does_not_refetch_loaded_status(self):
+        order = Order.objects.get(pk=self._order('pending').pk)
+        order.status = 'confirmed'
+        with CaptureQueriesContext(connection) as ctx:
+            order.save(update_fields=['status', 'updated_at'])
+        order_selects = [
+            q['sql'] for q in ctx.captured_queries
+            if q['sql'].startswith('SELECT') and 'FROM "main_order"' in q['sql']
+        ]
+        assert order_selects == []
+
+    def test_bulk_advance_emits_single_event(self):
+        orders = [self._order('pending'), self._order('confirmed')]
+        self.events.clear()
+
+        _, updated_ids, created = bulk_transition_orders(
+            Order.objects.filter(pk__in=[o.pk for o in orders]), 'ready', advance=True,
+        )
+
+        assert sorted(updated_ids) == sorted(o.pk for o in orders)
+        assert created == 2
+        assert self.events == [(
+            'ready', {orders[0].pk: 'pending', orders[1].pk: 'confirmed'},
+        )]
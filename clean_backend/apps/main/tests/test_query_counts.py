@@ -0,0 +1,107 @@
+"""
+Query-count regression tests for hot write paths.
+
+The numbers are pinned on purpose: if a change adds queries to one of these
+paths, update the expected count only after checking the new queries are
+needed (run with ``-v`` to see them).
+"""
+import pytest
+import datetime
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.main.models import (
+    Address, CustomerProfile, Order, MealSlot, MealPackage, Menu, Subscription,
+)
+from apps.kitchen.models import KitchenOrder
+from apps.driver.models import Zone, DeliveryDriver
+
+User = get_user_model()
+
+ALL_DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+@pytest.mark.django_db
+class TestHotPathQueryCounts:
+    def setup_method(self):
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.admin = User.objects.create_superuser(username='admin_qc', password='password')
+        self.client.force_authenticate(user=self.admin)
+
+        self.today = timezone.now().date()
+        zone = Zone.objects.create(name='QC Zone')
+        driver = DeliveryDriver.objects.create(name='QC Driver', phone='777000')
+        driver.zones.add(zone)
+
+        self.profile = CustomerProfile.objects.create(
+            user=User.objects.create_user('qc_customer'), phone='222',
+        )
+        self.address = Address.objects.create(
+            customer=self.profile, zone=zone, street='Main St', status='active',
+        )
+        self.slot = MealSlot.objects.create(name='Lunch', code='lunch')
+        self.package = MealPackage.objects.create(name='QC', price=10)
+
+    def _subscription(self, sub_status='active', days=14):
+        sub = Subscription.objects.create(
+            customer=self.profile,
+            meal_package=self.package,
+            start_date=self.today,
+            end_date=self.today + datetime.timedelta(days=days - 1),
+            time_slot=self.slot,
+            lunch_address=self.address,
+            status=sub_status,
+            selected_days=ALL_DAYS,
+        )
+        return sub
+
+    def _order(self, order_status='preparing'):
+        return Order.objects.create(
+            subscription=self._subscription(),
+            order_date=self.today,
+            delivery_date=self.today,
+            status=order_status,
+        )
+
+    def test_activate_subscription(self, django_assert_num_queries):
+        sub = self._subscription(sub_status='pending', days=14)
+        sub.menus.add(
+            Menu.objects.create(name='M1', price=Decimal('5.00')),
+            Menu.objects.create(name='M2', price=Decimal('7.50')),
+        )
+
+        # Does not grow with the number of delivery days
+        with django_assert_num_queries(10):
+            response = self.client.post(
+                f'/api/v1/subscriptions-admin/{sub.id}/activate/', {}, format='json',
+            )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['orders_created'] == 14
+        assert Order.objects.filter(subscription=sub).count() == 14
+
+    def test_order_update_status(self, django_assert_num_queries):
+        order = self._order('confirmed')
+        with django_assert_num_queries(2):
+            response = self.client.post(
+                f'/api/v1/orders/{order.id}/update_status/', {'status': 'preparing'}, format='json',
+            )
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_order_update_status_to_ready(self, django_assert_num_queries):
+        order = self._order('preparing')
+        with django_assert_num_queries(7):
+            response = self.client.post(
+                f'/api/v1/orders/{order.id}/update_status/', {'status': 'ready'}, format='json',
+            )
+        assert response.status_code == status.HTTP_200_OK
+        assert order.delivery.driver is not None
+
+    def test_kitchen_mark_ready(self, django_assert_num_queries):
+        kitchen_order = KitchenOrder.objects.create(order=self._order('preparing'))
+        with django_assert_num_queries(8):
+            response = self.client.post(
+                f'/api/v1/kitchen/orders/{kitchen_order.id}/mark_ready/', {}, format='json',
+            )
+        assert response.status_code == status.HTTP_200_OK
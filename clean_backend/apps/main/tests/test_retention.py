@@ -0,0 +1,268 @@
+import datetime
+import pytest
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.delivery.models import Delivery
+from apps.driver.models import DeliveryNotification, DeliveryStatus
+from apps.kitchen.models import KitchenOrder
+from apps.main.models import (
+    ArchiveBatch, ArchivedRecord, ArchiveSummary, CustomerProfile, MealPackage, MealSlot,
+    Notification, Order, Subscription, WalletTransaction,
+)
+from apps.main import retention
+from apps.main.retention import archive_tenant, archived_history, preview_tenant, run_retention
+from apps.organizations.models_saas import TenantRetentionPolicy
+from apps.users.models import Tenant
+
+User = get_user_model()
+
+
+def _policy(**horizons):
+    values = {'order_days': 0, 'delivery_days': 0, 'notification_days': 0, 'wallet_days': 0, 'storage': 'table'}
+    values.update(horizons)
+    return TenantRetentionPolicy(**values)
+
+
+class ArchiveData:
+
+    def setup_method(self):
+        self.today = timezone.localdate()
+        self.customer = self._customer('ret_cust')
+        self.other = self._customer('ret_other')
+        package = MealPackage.objects.create(name='Standard', price=100)
+        slot = MealSlot.objects.create(name='Lunch', code='lunch')
+        self.subscriptions = {
+            customer.pk: Subscription.objects.create(
+                customer=customer, meal_package=package, time_slot=slot,
+                start_date=self.today, end_date=self.today + datetime.timedelta(days=30),
+                status='active', selected_days=['Monday'],
+            )
+            for customer in (self.customer, self.other)
+        }
+
+    def _customer(self, username):
+        return CustomerProfile.objects.create(user=User.objects.create_user(username=username), name=username)
+
+    def _order(self, days_ago, status='delivered', customer=None):
+        order = Order.objects.create(
+            subscription=self.subscriptions[(customer or self.customer).pk], order_date=self.today,
+            delivery_date=self.today - datetime.timedelta(days=days_ago),
+        )
+        Order.objects.filter(pk=order.pk).update(status=status)
+        return order
+
+    def _age(self, model, obj, days):
+        model.objects.filter(pk=obj.pk).update(created_at=timezone.now() - datetime.timedelta(days=days))
+
+
+@pytest.mark.django_db
+class TestArchiveTables(ArchiveData):
+
+    def test_orders_move_with_their_dependants(self):
+        old = [self._order(100 + day) for day in range(3)]
+        Delivery.objects.create(order=old[0], status='delivered')
+        KitchenOrder.objects.create(order=old[0])
+        cancelled = self._order(95, status='cancelled', customer=self.other)
+        open_old = self._order(120, status='pending')
+        recent = self._order(5)
+
+        assert preview_tenant('default', _policy(order_days=90), today=self.today) == {'orders': 4}
+        moved = archive_tenant('default', _policy(order_days=90), today=self.today, batch_size=2)
+
+        assert moved == {'orders': {'batches': 2, 'records': 4, 'rows': 6}}
+        assert set(Order.objects.values_list('pk', flat=True)) == {open_old.pk, recent.pk}
+        assert not Delivery.objects.exists() and not KitchenOrder.objects.exists()
+        record = ArchivedRecord.objects.get(dataset='orders', object_id=old[0].pk)
+        assert record.customer_id == self.customer.pk
+        assert record.data['status'] == 'delivered'
+        assert record.related['delivery.Delivery'][0]['status'] == 'delivered'
+        assert len(record.related['kitchen.KitchenOrder']) == 1
+        assert ArchiveBatch.objects.filter(dataset='orders', storage='table').count() == 2
+        summary = {(row.status, row.records) for row in ArchiveSummary.objects.filter(dataset='orders')}
+        assert sum(records for _, records in summary) == 4
+        assert ('cancelled', 1) in summary
+
+        # Nothing left to move: a second run does no work
+        assert archive_tenant('default', _policy(order_days=90), today=self.today)['orders']['records'] == 0
+        assert ArchivedRecord.objects.get(object_id=cancelled.pk).customer_id == self.other.pk
+
+    def test_deliveries_keep_their_notifications(self):
+        subscription = self.subscriptions[self.customer.pk]
+        status = DeliveryStatus.objects.create(
+            subscription=subscription, date=self.today - datetime.timedelta(days=400),
+            status='delivered', payment_amount=Decimal('12.50'),
+        )
+        DeliveryNotification.objects.create(
+            delivery_status=status, notification_type='delivery_completion', message='Delivered', sent_via='sms',
+        )
+        archive_tenant('default', _policy(delivery_days=365), today=self.today)
+        assert not DeliveryStatus.objects.filter(pk=status.pk).exists()
+        record = ArchivedRecord.objects.get(dataset='deliveries')
+        assert record.related['driver.DeliveryNotification'][0]['message'] == 'Delivered'
+        assert ArchiveSummary.objects.get(dataset='deliveries').amount == Decimal('12.50')
+
+    def test_zero_horizon_keeps_history(self):
+        self._order(1000)
+        assert archive_tenant('default', _policy(), today=self.today) == {}
+        assert Order.objects.count() == 1
+
+
+@pytest.mark.django_db
+class TestArchiveFiles(ArchiveData):
+
+    @pytest.fixture(autouse=True)
+    def _archive_dir(self, settings, tmp_path):
+        settings.RETENTION_ARCHIVE_DIR = str(tmp_path)
+        self.archive_dir = tmp_path
+
+    def test_wallet_to_jsonl_and_read_back(self):
+        old = WalletTransaction.objects.create(
+            customer=self.customer, amount=Decimal('20'), transaction_type='credit', description='Top-up',
+        )
+        others = WalletTransaction.objects.create(
+            customer=self.other, amount=Decimal('5'), transaction_type='debit', description='Delivery',
+        )
+        self._age(WalletTransaction, old, 800)
+        self._age(WalletTransaction, others, 900)
+        WalletTransaction.objects.create(
+            customer=self.customer, amount=Decimal('1'), transaction_type='credit', description='Recent',
+        )
+
+        moved = archive_tenant('default', _policy(wallet_days=730, storage='file'), archive_key='acme', today=self.today)
+        assert moved['wallet']['records'] == 2
+        assert WalletTransaction.objects.count() == 1
+        assert not ArchivedRecord.objects.exists()
+        batch = ArchiveBatch.objects.get(dataset='wallet')
+        assert batch.path.startswith('acme/wallet/') and (self.archive_dir / batch.path).exists()
+
+        count, records = archived_history('wallet', customer_id=self.customer.pk)
+        assert count == 1
+        assert records[0]['id'] == old.pk and records[0]['data']['description'] == 'Top-up'
+        assert archived_history('wallet')[0] == 2
+        summary = ArchiveSummary.objects.get(dataset='wallet', status='credit')
+        assert (summary.records, summary.amount) == (1, Decimal('20.00'))
+
+    def test_archive_pages_read_only_the_files_they_need(self, monkeypatch):
+        transactions = []
+        for days in (800, 801, 900, 901, 1000, 1001):
+            transaction = WalletTransaction.objects.create(
+                customer=self.customer if days % 100 == 0 else self.other,
+                amount=Decimal('1'), transaction_type='credit', description=f'{days} days ago',
+            )
+            self._age(WalletTransaction, transaction, days)
+            transactions.append(transaction.pk)
+        archive_tenant('default', _policy(wallet_days=730, storage='file'), today=self.today, batch_size=2)
+        assert ArchiveBatch.objects.filter(dataset='wallet').count() == 3
+
+        read = []
+        read_file = retention._read_file
+        monkeypatch.setattr(retention, '_read_file', lambda batch: read.append(batch.pk) or read_file(batch))
+
+        count, page = archived_history('wallet', limit=2)
+        assert count == 6 and [document['id'] for document in page] == transactions[:2]
+        assert len(read) == 1
+        read.clear()
+        count, page = archived_history('wallet', customer_id=self.customer.pk, offset=1, limit=1)
+        assert count == 3 and [document['id'] for document in page] == [transactions[2]]
+        assert len(read) == 2
+        read.clear()
+        start = self.today - datetime.timedelta(days=950)
+        assert archived_history('wallet', start=start, limit=0) == (4, [])
+        assert not read
+        assert [document['id'] for document in archived_history('wallet', limit=10)[1]] == transactions
+
+        # Batches archived before the per-customer counts existed get them on first read
+        ArchiveBatch.objects.update(customers=None)
+        assert archived_history('wallet', customer_id=self.other.pk, limit=0) == (3, [])
+        read.clear()
+        assert archived_history('wallet', customer_id=self.other.pk, limit=0) == (3, [])
+        assert not read
+
+    def test_failed_batch_leaves_no_file(self, monkeypatch):
+        notification = Notification.objects.create(customer=self.customer, message='Old')
+        self._age(Notification, notification, 400)
+
+        def fail(self):
+            raise RuntimeError('disk full')
+        monkeypatch.setattr('apps.main.retention.Purge.run', fail)
+
+        with pytest.raises(RuntimeError):
+            archive_tenant('default', _policy(notification_days=180, storage='file'), today=self.today)
+        assert Notification.objects.filter(pk=notification.pk).exists()
+        assert not ArchiveBatch.objects.exists()
+        assert not list(self.archive_dir.rglob('*.gz'))
+
+
+@pytest.mark.django_db
+class TestArchivedApi(ArchiveData):
+
+    def setup_method(self):
+        super().setup_method()
+        self.mine = self._order(400)
+        self._order(410, customer=self.other)
+        archive_tenant('default', _policy(order_days=365), today=self.today)
+
+    def test_customer_sees_only_own_archive(self):
+        client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        client.force_authenticate(user=self.customer.user)
+        response = client.get('/api/v1/customer/orders/archived/')
+        assert response.status_code == 200
+        assert response.data['count'] == 1
+        assert response.data['results'][0]['id'] == self.mine.pk
+        assert 'summary' not in response.data
+        # The live list is unaffected
+        assert client.get('/api/v1/customer/orders/').status_code == 200
+
+    def test_admin_archive_with_summary_and_filters(self):
+        client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        client.force_authenticate(user=User.objects.create_superuser('ret_admin', 'admin@example.com', 'x'))
+        response = client.get('/api/v1/orders/archived/')
+        assert response.status_code == 200
+        assert response.data['count'] == 2
+        assert sum(row['records'] for row in response.data['summary']) == 2
+
+        response = client.get('/api/v1/orders/archived/', {'customer': self.other.pk})
+        assert response.data['count'] == 1
+        start = (self.today - datetime.timedelta(days=405)).isoformat()
+        assert client.get('/api/v1/orders/archived/', {'start': start}).data['count'] == 1
+        assert client.get('/api/v1/orders/archived/', {'start': 'yesterday'}).status_code == 400
+
+
+@pytest.mark.django_db(transaction=True)
+class TestRunRetention(ArchiveData):
+    """The tenant's database is the test database itself."""
+
+    def setup_method(self):
+        super().setup_method()
+        self.tenant = Tenant.objects.create(
+            name='Retention', subdomain='retention', schema_name='retention',
+            db_name=connection.settings_dict['NAME'], is_active=True,
+        )
+        Tenant.objects.create(name='No policy', subdomain='nopolicy', schema_name='nopolicy', db_name='zz_missing_db')
+        self.policy = TenantRetentionPolicy.objects.create(tenant=self.tenant, is_enabled=True, order_days=30)
+
+    def teardown_method(self):
+        alias = f'tenant_{self.tenant.id}'
+        if alias in connections:
+            connections[alias].close()
+        settings.DATABASES.pop(alias, None)
+
+    def test_enabled_policies_only(self):
+        self._order(60)
+        dry_run, = run_retention(dry_run=True)
+        assert dry_run['tenant'] == 'retention' and dry_run['result']['orders'] == 1
+        assert Order.objects.count() == 1
+
+        outcome, = run_retention()
+        assert outcome['result']['orders']['records'] == 1
+        assert not Order.objects.exists()
+        self.policy.refresh_from_db()
+        assert self.policy.last_run_at is not None
+
+        self.policy.is_enabled = False
+        self.policy.save()
+        assert run_retention() == []
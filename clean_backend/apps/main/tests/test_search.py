@@ -0,0 +1,151 @@
+import datetime
+import importlib
+import pytest
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.main.models import (
+    Category, CustomerProfile, MealPackage, MealSlot, MenuItem, Order, Subscription,
+)
+from apps.main.utils.search import rebuild_search_documents, search_queryset
+
+User = get_user_model()
+
+
+def _customer(username, name='', phone=None, email=''):
+    user = User.objects.create_user(username=username, email=email, password='pw')
+    return CustomerProfile.objects.create(user=user, name=name, phone=phone)
+
+
+@pytest.mark.django_db
+class TestSearchDocuments:
+    def test_document_built_on_save(self):
+        profile = _customer('ahmed_k', name='Ahmed Khan', phone='+971 50 123 4567', email='ahmed@example.com')
+        profile.refresh_from_db()
+        assert profile.search_document == (
+            'ahmed khan ahmed_k ahmed@example.com +971 50 123 4567 971501234567'
+        )
+        assert profile.search_vector
+
+    def test_unrelated_update_fields_skip_rebuild(self, django_assert_num_queries):
+        profile = _customer('wallet_user', name='Sara')
+        profile.wallet_balance = Decimal('5.00')
+        with django_assert_num_queries(1):
+            profile.save(update_fields=['wallet_balance'])
+
+    def test_user_rename_refreshes_profile(self):
+        profile = _customer('old_name', name='Omar')
+        profile.user.username = 'new_name'
+        profile.user.save()
+        profile.refresh_from_db()
+        assert 'new_name' in profile.search_document
+
+    def test_login_does_not_touch_profiles(self, django_assert_num_queries):
+        profile = _customer('login_user')
+        profile.user.last_login = timezone.now()
+        with django_assert_num_queries(1):
+            profile.user.save(update_fields=['last_login'])
+
+    def test_category_rename_refreshes_items(self):
+        category = Category.objects.create(name='Soups')
+        item = MenuItem.objects.create(name='Harira', description='', category=category, price=Decimal('5.00'))
+        category.name = 'Moroccan Soups'
+        category.save()
+        item.refresh_from_db()
+        assert item.search_document == 'harira moroccan soups'
+
+    def test_bulk_writes_rebuilt_explicitly(self):
+        profile = _customer('bulk_user', name='Before')
+        CustomerProfile.objects.filter(pk=profile.pk).update(name='Layla')
+        assert not search_queryset(CustomerProfile.objects.all(), 'layla').exists()
+        assert rebuild_search_documents(CustomerProfile.objects.all()) == 1
+        assert search_queryset(CustomerProfile.objects.all(), 'layla').exists()
+
+    def test_migration_backfill_matches_save(self):
+        profile = _customer('mig_user', name='  Noor ', phone='050-111', email='noor@example.com')
+        item = MenuItem.objects.create(
+            name='Kebab', description='Grilled', price=Decimal('9.00'),
+            category=Category.objects.create(name='Grill'),
+        )
+        expected = [
+            CustomerProfile.objects.values_list('search_document', 'search_vector').get(pk=profile.pk),
+            MenuItem.objects.values_list('search_document', 'search_vector').get(pk=item.pk),
+        ]
+        migration = importlib.import_module('apps.main.migrations.0015_search_documents')
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE main_customerprofile SET search_document = \'\', search_vector = NULL')
+            cursor.execute('UPDATE main_menuitem SET search_document = \'\', search_vector = NULL')
+            cursor.execute(migration.BACKFILL_SQL)
+        assert [
+            CustomerProfile.objects.values_list('search_document', 'search_vector').get(pk=profile.pk),
+            MenuItem.objects.values_list('search_document', 'search_vector').get(pk=item.pk),
+        ] == expected
+
+
+@pytest.mark.django_db
+class TestSearchFilter:
+    def setup_method(self):
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.admin = User.objects.create_superuser(username='admin_search', password='password')
+        self.client.force_authenticate(user=self.admin)
+        self.fatima = _customer('fatima', name='Fatima Ali', phone='+971501112233', email='fatima@example.com')
+        self.zed = _customer('zed', name='Zed', phone='0559998877', email='alicia@example.com')
+        self.omar = _customer('omar', name='Omar Saeed', phone='+971509990000', email='omar@mail.com')
+
+    def _ids(self, response):
+        assert response.status_code == status.HTTP_200_OK
+        return [row['id'] for row in response.data['results']]
+
+    def test_prefix_words_ranked(self):
+        ids = self._ids(self.client.get('/api/v1/customers/', {'search': 'ali'}))
+        # Name (weight A) beats email (weight B)
+        assert ids == [self.fatima.id, self.zed.id]
+
+    def test_multiple_words_must_all_match(self):
+        ids = self._ids(self.client.get('/api/v1/customers/', {'search': 'fat ali'}))
+        assert ids == [self.fatima.id]
+
+    def test_substring_fallback(self):
+        ids = self._ids(self.client.get('/api/v1/customers/', {'search': 'aee'}))
+        assert ids == [self.omar.id]
+
+    def test_phone_prefix(self):
+        ids = self._ids(self.client.get('/api/v1/customers/', {'search': '+9715011'}))
+        assert ids == [self.fatima.id]
+        ids = self._ids(self.client.get('/api/v1/customers/', {'search': '055 999'}))
+        assert ids == [self.zed.id]
+
+    def test_explicit_ordering_wins(self):
+        response = self.client.get('/api/v1/customers/', {'search': 'ali', 'ordering': 'created_at'})
+        assert self._ids(response) == [self.fatima.id, self.zed.id]
+        response = self.client.get('/api/v1/customers/', {'search': 'ali', 'ordering': '-created_at'})
+        assert self._ids(response) == [self.zed.id, self.fatima.id]
+
+    def test_orders_and_subscriptions_search_customer(self):
+        today = timezone.now().date()
+        package = MealPackage.objects.create(name='Std', price=Decimal('100'))
+        slot = MealSlot.objects.create(name='Lunch', code='lunch')
+        subs = {
+            profile.id: Subscription.objects.create(
+                customer=profile, meal_package=package, time_slot=slot, start_date=today,
+                end_date=today + datetime.timedelta(days=30), selected_days=['Monday'],
+            )
+            for profile in (self.fatima, self.omar)
+        }
+        order = Order.objects.create(
+            subscription=subs[self.omar.id], order_date=today, delivery_date=today, status='pending',
+        )
+
+        assert self._ids(self.client.get('/api/v1/orders/', {'search': 'omar'})) == [order.id]
+        ids = self._ids(self.client.get('/api/v1/subscriptions-admin/', {'search': 'fatima@exa'}))
+        assert ids == [subs[self.fatima.id].id]
+
+    def test_menu_items(self):
+        category = Category.objects.create(name='Rice')
+        item = MenuItem.objects.create(name='Chicken Biryani', description='Spiced', category=category, price=Decimal('12.00'))
+        MenuItem.objects.create(name='Salad', description='Greens', category=category, price=Decimal('6.00'))
+        response = self.client.get('/api/v1/menu-items/', {'search': 'biry'})
+        assert self._ids(response) == [item.id]
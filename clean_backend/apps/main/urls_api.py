@@ -14,7 +14,9 @@ router.register(r'customers', views.CustomerProfileViewSet, basename='customer')
 router.register(r'registration-requests', views.CustomerRegistrationRequestViewSet, basename='registration-request')
 router.register(r'customer-addresses', views.AddressAdminViewSet, basename='customer-address')
 router.register(r'invoices', views.InvoiceViewSet, basename='invoice')
+router.register(r'wallet-transactions', views.WalletTransactionAdminViewSet, basename='wallet-transaction-admin')
 router.register(r'notifications', views.NotificationViewSet, basename='notification')
+router.register(r'notification-broadcasts', views.NotificationBroadcastViewSet, basename='notification-broadcast')
 router.register(r'staff', views.StaffUserViewSet, basename='staff')
 
 # Daily rotating menu endpoints
@@ -0,0 +1,325 @@
+"""
+Bulk customer import (CSV or JSON) for onboarding a kitchen's existing
+customer base.
+
+Rows carry the same fields as ``CustomerProfileCreateSerializer`` (name,
+phone, email, emirates_id, zone, preferred_communication, street, city,
+building_name, floor_number, flat_number), plus an optional ``password``.
+The pipeline replaces per-customer round trips with batch work:
+
+1. every row is validated field by field, without queries;
+2. phone/email/username uniqueness is checked with one ``__in`` lookup per
+   field (plus duplicates inside the file), and zones with one
+   ``in_bulk``;
+3. the plan's customer limit is checked once for the whole batch;
+4. User, CustomerProfile and Address rows are inserted with
+   ``bulk_create`` per chunk, one transaction per chunk.
+
+Customers get an unusable password and, with ``invite=True``, a password
+reset ``uid``/``token`` pair (the dj-rest-auth reset confirm flow) to send
+them. Passwords supplied in the file are hashed up front, in a process pool
+when ``hash_workers`` > 1.
+
+The result is a report with one entry per created or rejected row.
+"""
+import csv
+import io
+import json
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework import serializers
+
+from apps.main.models import Address, CustomerProfile
+from apps.main.serializers.admin_serializers import CustomerProfileCreateSerializer
+
+IMPORT_CHUNK_SIZE = 500
+LOOKUP_BATCH_SIZE = 1000
+ADDRESS_FIELDS = ('street', 'city', 'building_name', 'floor_number', 'flat_number')
+
+
+class ImportFormatError(ValueError):
+    """The upload could not be read as CSV or JSON rows."""
+
+
+class CustomerImportRowSerializer(CustomerProfileCreateSerializer):
+    """Field validation for one import row; uniqueness is checked per batch."""
+    password = serializers.CharField(required=False, allow_blank=True, default='', write_only=True)
+
+    def validate_phone(self, value):
+        return value.strip()
+
+    def validate_email(self, value):
+        return value.strip().lower()
+
+
+@dataclass
+class ImportResult:
+    total: int = 0
+    dry_run: bool = False
+    created: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def add_error(self, row, errors):
+        self.errors.append({'row': row, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'total': self.total,
+            'created_count': len(self.created),
+            'error_count': len(self.errors),
+            'dry_run': self.dry_run,
+            'created': self.created,
+            'errors': sorted(self.errors, key=lambda entry: entry['row']),
+        }
+
+
+@dataclass
+class _Row:
+    index: int
+    data: dict
+    username: str = ''
+
+
+# ─── Parsing ──────────────────────────────────────────────────────────────────
+
+def parse_rows(content, file_format=None, filename=''):
+    """
+    ``(records, first_row)`` from CSV (header row of field names) or JSON (a
+    list of objects, or ``{"customers": [...]}``). ``content`` is bytes or
+    str; ``first_row`` is the number of the first record in the source (its
+    line for CSV), used in the report.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    file_format = (file_format or ('json' if filename.lower().endswith('.json') else '')).lower()
+    if not file_format:
+        file_format = 'json' if content.lstrip()[:1] in ('[', '{') else 'csv'
+
+    if file_format == 'json':
+        try:
+            data = json.loads(content)
+        except ValueError as exc:
+            raise ImportFormatError(f"Invalid JSON: {exc}") from exc
+        if isinstance(data, dict):
+            data = data.get('customers')
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ImportFormatError("JSON must be a list of customer objects.")
+        return data, 1
+
+    if file_format == 'csv':
+        reader = csv.DictReader(io.StringIO(content))
+        if not reader.fieldnames:
+            raise ImportFormatError("CSV is empty.")
+        # Blank cells fall back to the field defaults
+        records = [
+            {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+            for row in reader
+        ]
+        return records, 2
+
+    raise ImportFormatError(f"Unsupported format '{file_format}'; use csv or json.")
+
+
+# ─── Batch checks ─────────────────────────────────────────────────────────────
+
+def _existing(queryset, field_name, values):
+    """Subset of ``values`` already present in ``field_name``, in batched ``__in`` lookups."""
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+        batch = values[start:start + LOOKUP_BATCH_SIZE]
+        found.update(queryset.filter(**{f'{field_name}__in': batch}).values_list(field_name, flat=True))
+    return found
+
+
+def base_username(phone):
+    return f"cust_{phone.replace('+', '').replace(' ', '').replace('-', '')}"
+
+
+def _assign_usernames(rows, using):
+    bases = {row.index: base_username(row.data['phone']) for row in rows}
+    taken = _existing(User.objects.using(using), 'username', set(bases.values()))
+    for row in rows:
+        username = bases[row.index]
+        if username in taken:
+            username = f"{username}_{uuid.uuid4().hex[:6]}"
+        taken.add(username)
+        row.username = username
+
+
+def _init_hasher():
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+
+
+def hash_passwords(passwords, workers=1):
+    """``make_password`` over ``passwords``; in a process pool when ``workers`` > 1."""
+    if workers <= 1 or len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_hasher) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (workers * 4))))
+
+
+# ─── Import ───────────────────────────────────────────────────────────────────
+
+def import_customers(records, *, using='default', plan=None, requested_by=None, invite=False,
+                     dry_run=False, chunk_size=IMPORT_CHUNK_SIZE, hash_workers=1, first_row=1):
+    """
+    Validate and insert ``records`` (dicts) into ``using``. Row numbers in
+    the report start at ``first_row`` (2 for CSV with a header line).
+    Returns an ``ImportResult``.
+    """
+    from apps.driver.models import Zone
+
+    result = ImportResult(total=len(records), dry_run=dry_run)
+    rows = []
+    for offset, record in enumerate(records):
+        serializer = CustomerImportRowSerializer(data=record)
+        if serializer.is_valid():
+            rows.append(_Row(first_row + offset, serializer.validated_data))
+        else:
+            result.add_error(first_row + offset, serializer.errors)
+
+    rows = _reject_duplicates(rows, result, using)
+
+    zone_ids = {row.data['zone'] for row in rows if row.data.get('zone')}
+    zones = Zone.objects.using(using).in_bulk(zone_ids) if zone_ids else {}
+    valid = []
+    for row in rows:
+        if row.data.get('zone') and row.data['zone'] not in zones:
+            result.add_error(row.index, {'zone': [f"Zone {row.data['zone']} does not exist."]})
+        else:
+            valid.append(row)
+    rows = valid
+
+    if plan is not None and rows:
+        allowed = _plan_capacity(plan, using)
+        if allowed is not None and allowed < len(rows):
+            for row in rows[allowed:]:
+                result.add_error(row.index, {'non_field_errors': [
+                    f"Your plan allows a maximum of {plan.max_customers} customers. Please upgrade.",
+                ]})
+            rows = rows[:allowed]
+
+    if dry_run or not rows:
+        result.created = [{'row': row.index, 'phone': row.data['phone']} for row in rows] if dry_run else []
+        return result
+
+    _assign_usernames(rows, using)
+    passwords = [row.data['password'] for row in rows if row.data.get('password')]
+    hashed = iter(hash_passwords(passwords, hash_workers))
+    for row in rows:
+        if row.data.get('password'):
+            row.data['password'] = next(hashed)
+
+    for start in range(0, len(rows), chunk_size):
+        result.created.extend(
+            _insert_chunk(rows[start:start + chunk_size], zones, using, requested_by, invite)
+        )
+    return result
+
+
+def _reject_duplicates(rows, result, using):
+    phones = _existing(CustomerProfile.objects.using(using), 'phone', {row.data['phone'] for row in rows})
+    emails = {row.data['email'] for row in rows if row.data.get('email')}
+    if emails:
+        emails = _existing(
+            User.objects.using(using).annotate(email_lower=Lower('email')), 'email_lower', emails,
+        )
+
+    kept, seen_phones, seen_emails = [], set(), set()
+    for row in rows:
+        phone, email = row.data['phone'], row.data.get('email')
+        errors = {}
+        if phone in phones:
+            errors['phone'] = ["A customer with this phone number already exists."]
+        elif phone in seen_phones:
+            errors['phone'] = ["Duplicate phone number in this file."]
+        if email and email in emails:
+            errors['email'] = ["A user with this email already exists."]
+        elif email and email in seen_emails:
+            errors['email'] = ["Duplicate email in this file."]
+        seen_phones.add(phone)
+        if email:
+            seen_emails.add(email)
+        if errors:
+            result.add_error(row.index, errors)
+        else:
+            kept.append(row)
+    return kept
+
+
+def _plan_capacity(plan, using):
+    """How many more customers the plan allows, or None for unlimited."""
+    if not plan.max_customers:
+        return None
+    return max(0, plan.max_customers - CustomerProfile.objects.using(using).count())
+
+
+def _insert_chunk(rows, zones, using, requested_by, invite):
+    now = timezone.now()
+    users = []
+    for row in rows:
+        data = row.data
+        name_parts = data['name'].split()
+        user = User(
+            username=row.username, email=data.get('email', ''),
+            first_name=name_parts[0] if name_parts else '',
+            last_name=' '.join(name_parts[1:]),
+            is_active=True, is_staff=False, date_joined=now,
+        )
+        if data.get('password'):
+            user.password = data['password']
+        else:
+            user.set_unusable_password()
+        users.append(user)
+
+    with transaction.atomic(using=using):
+        User.objects.using(using).bulk_create(users)
+        profiles = []
+        for row, user in zip(rows, users):
+            zone = zones.get(row.data.get('zone'))
+            profile = CustomerProfile(
+                user=user, name=row.data['name'], phone=row.data['phone'],
+                emirates_id=row.data.get('emirates_id', ''),
+                zone=zone.name if zone else '',
+                preferred_communication=row.data.get('preferred_communication', 'whatsapp'),
+            )
+            profile.refresh_search_document()
+            profiles.append(profile)
+        CustomerProfile.objects.using(using).bulk_create(profiles)
+
+        Address.objects.using(using).bulk_create([
+            Address(
+                customer=profile, zone=zones.get(row.data.get('zone')),
+                is_default=True, status='active', requested_at=now,
+                requested_by_id=getattr(requested_by, 'pk', None),
+                **{name: row.data.get(name, '') for name in ADDRESS_FIELDS},
+            )
+            for row, profile in zip(rows, profiles)
+            if any(row.data.get(name) for name in ADDRESS_FIELDS)
+        ])
+
+    created = []
+    for row, user, profile in zip(rows, users, profiles):
+        entry = {'row': row.index, 'customer_id': profile.pk, 'username': user.username}
+        if invite and not row.data.get('password'):
+            entry['invite'] = {
+                'uid': urlsafe_base64_encode(force_bytes(user.pk)),
+                'token': default_token_generator.make_token(user),
+            }
+        created.append(entry)
+    return created
@@ -32,31 +32,119 @@ def get_available_driver_for_zone(zone):
     return available_drivers.first()
 
 
+def meal_of_slot(name, code):
+    """``'lunch'`` or ``'dinner'`` for a meal slot's name or code, else None."""
+    name, code = (name or '').lower(), (code or '').lower()
+    if 'lunch' in name or 'lunch' in code:
+        return 'lunch'
+    if 'dinner' in name or 'dinner' in code:
+        return 'dinner'
+    return None
+
+
+def get_delivery_address_for_subscription(subscription):
+    """
+    Pick the address an order of this subscription is delivered to.
+
+    Lunch slots use ``lunch_address``, dinner slots use ``dinner_address``;
+    anything else falls back to whichever address is set.
+    """
+    meal_slot = subscription.time_slot
+    meal = meal_of_slot(getattr(meal_slot, 'name', ''), getattr(meal_slot, 'code', ''))
+    if meal == 'lunch':
+        return subscription.lunch_address
+    if meal == 'dinner':
+        return subscription.dinner_address
+    return subscription.lunch_address or subscription.dinner_address
+
+
 def assign_driver_to_order(order):
     """
     Automatically assign a driver to an order based on its delivery zone.
     
     Returns the assigned DeliveryDriver or None if no driver available.
     """
-    # Get zone from subscription's address based on meal slot
-    subscription = order.subscription
-    meal_slot = subscription.time_slot
-    
-    # Determine which address to use (lunch or dinner)
-    if meal_slot:
-        meal_slot_name = getattr(meal_slot, 'name', '').lower()
-        meal_slot_code = getattr(meal_slot, 'code', '').lower()
-        
-        if 'lunch' in meal_slot_name or 'lunch' in meal_slot_code:
-            address = subscription.lunch_address
-        elif 'dinner' in meal_slot_name or 'dinner' in meal_slot_code:
-            address = subscription.dinner_address
-        else:
-            address = subscription.lunch_address or subscription.dinner_address
-    else:
-        address = subscription.lunch_address or subscription.dinner_address
+    address = get_delivery_address_for_subscription(order.subscription)
     
     if not address or not address.zone:
         return None
     
     return get_available_driver_for_zone(address.zone)
+
+
+def resolve_drivers_for_orders(orders, using=None):
+    """
+    Batch version of ``assign_driver_to_order``.
+
+    ``orders`` should be loaded with ``select_related`` on
+    ``subscription__time_slot``, ``subscription__lunch_address`` and
+    ``subscription__dinner_address``. Drivers for every zone involved are
+    looked up in a single query.
+
+    Returns a dict mapping order id -> DeliveryDriver id (or None).
+    """
+    zone_by_order = {}
+    for order in orders:
+        address = get_delivery_address_for_subscription(order.subscription)
+        zone_by_order[order.id] = address.zone_id if address else None
+
+    zone_ids = {zone_id for zone_id in zone_by_order.values() if zone_id}
+    driver_by_zone = {}
+    if zone_ids:
+        # Same ordering as get_available_driver_for_zone().first() (Meta: name)
+        rows = DeliveryDriver.objects.db_manager(using).filter(
+            zones__in=zone_ids,
+            is_active=True,
+        ).values_list('zones', 'id')
+        for zone_id, driver_id in rows:
+            driver_by_zone.setdefault(zone_id, driver_id)
+
+    return {
+        order_id: driver_by_zone.get(zone_id)
+        for order_id, zone_id in zone_by_order.items()
+    }
+
+
+def bulk_create_deliveries(orders, using=None):
+    """
+    Ensure every order in ``orders`` has a Delivery, auto-assigning drivers.
+
+    Existing deliveries without a driver get one if their zone has an active
+    driver. Uses one SELECT for existing deliveries, one ``bulk_create`` and
+    one UPDATE per assigned driver. ``using`` selects the database alias
+    (defaults to the router's choice). Returns the number of deliveries created.
+    """
+    from apps.delivery.models import Delivery
+
+    orders = list(orders)
+    if not orders:
+        return 0
+
+    driver_by_order = resolve_drivers_for_orders(orders, using=using)
+    deliveries = Delivery.objects.db_manager(using)
+    existing = dict(
+        deliveries.filter(
+            order_id__in=driver_by_order.keys(),
+        ).values_list('order_id', 'driver_id')
+    )
+
+    to_create = [
+        Delivery(order_id=order_id, status='pending', driver_id=driver_id)
+        for order_id, driver_id in driver_by_order.items()
+        if order_id not in existing
+    ]
+    if to_create:
+        deliveries.bulk_create(to_create, ignore_conflicts=True)
+
+    # Backfill drivers on deliveries that were created without one
+    backfill = {}
+    for order_id, driver_id in existing.items():
+        new_driver = driver_by_order.get(order_id)
+        if driver_id is None and new_driver:
+            backfill.setdefault(new_driver, []).append(order_id)
+    for driver_id, order_ids in backfill.items():
+        deliveries.filter(
+            order_id__in=order_ids, driver__isnull=True,
+        ).update(driver_id=driver_id)
+
+    return len(to_create)
@@ -0,0 +1,47 @@
+"""
+Cached, versioned snapshots of the customer-facing menu endpoints.
+
+Menus are read on every app screen and written a few times a day, so
+``DailyMenuViewSet.today``/``week`` and ``public_menu`` serve serialized
+snapshots from the cache instead of querying on each hit. Every snapshot
+key embeds the tenant's model versions of ``SNAPSHOT_MODELS`` (see
+``core.utils.conditional``). Any write to those models therefore retires
+the snapshots: they are never read again and simply expire, and the next
+read rebuilds. Each snapshot stores an ETag of its content for
+conditional GETs.
+"""
+import hashlib
+
+from django.core.cache import cache
+
+from apps.main.models import Category, DailyMenu, DailyMenuItem, MealSlot, MenuItem
+from core.db.router import get_current_db_alias
+from core.utils.conditional import etag_for, model_versions
+
+SNAPSHOT_MODELS = (DailyMenu, DailyMenuItem, MenuItem, Category, MealSlot)
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+def snapshot_key(kind, params, alias=None):
+    alias = alias or get_current_db_alias()
+    version = '.'.join(str(v) for v in model_versions(SNAPSHOT_MODELS, alias))
+    digest = hashlib.md5(f"{version}:{tuple(params)!r}".encode()).hexdigest()
+    return f"menu_snapshot:{alias}:{kind}:{digest}"
+
+
+def get_snapshot(kind, params, build, alias=None):
+    """
+    Return ``(etag, data)`` for the snapshot identified by ``kind`` and
+    ``params``, calling ``build()`` to produce the data on a miss.
+    """
+    key = snapshot_key(kind, params, alias)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = store_snapshot(key, build())
+    return snapshot['etag'], snapshot['data']
+
+
+def store_snapshot(key, data):
+    snapshot = {'etag': etag_for(data), 'data': data}
+    cache.set(key, snapshot, SNAPSHOT_TIMEOUT)
+    return snapshot
@@ -0,0 +1,271 @@
+"""
+Order state machine.
+
+``ORDER_STATUS_TRANSITIONS`` is the single source of truth for which status
+an order may move to next. On top of it:
+
+- guards (``TRANSITION_GUARDS``) veto individual transitions, e.g. kitchen
+  statuses are only allowed on the delivery date;
+- side effects (``STATUS_SIDE_EFFECTS``) run after orders enter a status,
+  e.g. entering ``ready`` creates Deliveries;
+- every change is published through ``apps.main.signals.order_status_changed``.
+
+``transition_order`` handles one instance, ``bulk_transition_orders`` a whole
+queryset with set-based queries. Both can ``advance`` through intermediate
+statuses (pending -> confirmed -> preparing -> ready) in a single write, which
+is what the kitchen and the auto-advance command need.
+"""
+from collections import deque
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+ORDER_STATUS_TRANSITIONS = {
+    'pending': ['confirmed', 'cancelled'],
+    'confirmed': ['preparing', 'cancelled'],
+    'preparing': ['ready', 'cancelled'],
+    'ready': ['delivered'],
+    'delivered': [],
+    'cancelled': [],
+}
+
+# Kitchen statuses that require the order to be due today
+SAME_DAY_STATUSES = ('preparing', 'ready')
+
+
+class TransitionError(Exception):
+    """Raised when an order cannot move to the requested status."""
+
+
+def _delivery_date_is_today(current_status, target_status, delivery_date, today):
+    if target_status in SAME_DAY_STATUSES and delivery_date != today:
+        return (
+            f"Order can only be marked as '{target_status}' when delivery date is today "
+            f"({today.isoformat()}). This order is due {delivery_date.isoformat()}."
+        )
+    return None
+
+
+# Each guard takes (current_status, target_status, delivery_date, today) and
+# returns an error message or None.
+TRANSITION_GUARDS = [_delivery_date_is_today]
+
+
+def _create_deliveries(orders, using=None):
+    from apps.main.utils.delivery_utils import bulk_create_deliveries
+    return bulk_create_deliveries(orders, using=using)
+
+
+# Target status -> callables taking (orders, using). ``orders`` are loaded
+# with the subscription and its addresses. The return value of the first
+# effect (deliveries created for ``ready``) is reported back to callers.
+STATUS_SIDE_EFFECTS = {
+    'ready': [_create_deliveries],
+}
+
+
+def transition_path(current_status, target_status):
+    """
+    Return the statuses an order passes through to get from ``current_status``
+    to ``target_status`` (excluding the start), or None if unreachable.
+    """
+    if current_status == target_status:
+        return None
+    queue = deque([(current_status, [])])
+    seen = {current_status}
+    while queue:
+        status, path = queue.popleft()
+        for nxt in ORDER_STATUS_TRANSITIONS.get(status, []):
+            if nxt in seen:
+                continue
+            if nxt == target_status:
+                return path + [nxt]
+            seen.add(nxt)
+            queue.append((nxt, path + [nxt]))
+    return None
+
+
+def allowed_source_statuses(target_status, advance=False):
+    """Return the statuses an order may be in to move to ``target_status``."""
+    if advance:
+        return [
+            source for source in ORDER_STATUS_TRANSITIONS
+            if transition_path(source, target_status)
+        ]
+    return [
+        source for source, targets in ORDER_STATUS_TRANSITIONS.items()
+        if target_status in targets
+    ]
+
+
+def check_transition(current_status, target_status, delivery_date, today=None, advance=False):
+    """
+    Validate a transition. Returns an error message, or None if the
+    transition is allowed. With ``advance`` every intermediate step must be
+    allowed and pass the guards.
+    """
+    if advance:
+        steps = transition_path(current_status, target_status)
+    elif target_status in ORDER_STATUS_TRANSITIONS.get(current_status, []):
+        steps = [target_status]
+    else:
+        steps = None
+    if not steps:
+        return f"Cannot transition from '{current_status}' to '{target_status}'."
+
+    today = today or timezone.now().date()
+    previous = current_status
+    for step in steps:
+        for guard in TRANSITION_GUARDS:
+            error = guard(previous, step, delivery_date, today)
+            if error:
+                return error
+        previous = step
+    return None
+
+
+def _load_for_side_effects(order_ids, using):
+    from apps.main.models import Order
+    return Order.objects.using(using).filter(id__in=order_ids).select_related(
+        'subscription__time_slot',
+        'subscription__lunch_address',
+        'subscription__dinner_address',
+    )
+
+
+def after_status_change(orders, changes, to_status, using=None):
+    """
+    Run side effects for ``orders`` that just entered ``to_status`` and
+    publish ``order_status_changed``. ``changes`` maps order id -> previous
+    status. Returns the result of the first side effect, or 0.
+    """
+    from apps.main.models import Order
+    from apps.main.signals import order_status_changed
+
+    result = 0
+    for i, effect in enumerate(STATUS_SIDE_EFFECTS.get(to_status, [])):
+        outcome = effect(orders, using=using)
+        if i == 0:
+            result = outcome or 0
+
+    order_status_changed.send(
+        sender=Order, to_status=to_status, changes=changes, using=using,
+    )
+    return result
+
+
+def transition_order(order, target_status, today=None, advance=False):
+    """
+    Move one order to ``target_status`` and save it.
+
+    Side effects and the ``order_status_changed`` signal are fired by
+    ``Order.save``. Raises ``TransitionError`` if the move is not allowed.
+    """
+    error = check_transition(
+        order.status, target_status, order.delivery_date, today, advance=advance,
+    )
+    if error:
+        raise TransitionError(error)
+    order.status = target_status
+    order.save(update_fields=['status', 'updated_at'])
+    return order
+
+
+def bulk_transition_orders(queryset, target_status, ids=None, today=None, advance=False):
+    """
+    Move every order in ``queryset`` to ``target_status``.
+
+    Current statuses are read in one query, invalid transitions are reported
+    per order, and the valid ones are applied with a single UPDATE on the
+    queryset's database. Side effects run once for the whole batch.
+
+    ``ids`` is the list the caller asked for; ids missing from ``queryset``
+    are reported as not found.
+
+    Returns ``(results, updated_ids, deliveries_created)`` where ``results``
+    is a list of per-order outcome dicts in request order.
+    """
+    from apps.main.models import Order
+
+    using = queryset.db
+    today = today or timezone.now().date()
+    rows = {
+        row['id']: row
+        for row in queryset.values('id', 'status', 'delivery_date')
+    }
+    requested = list(ids) if ids is not None else sorted(rows)
+
+    results = []
+    valid_ids = []
+    for order_id in requested:
+        row = rows.get(order_id)
+        if row is None:
+            results.append({'id': order_id, 'ok': False, 'error': 'Order not found.'})
+            continue
+        error = check_transition(
+            row['status'], target_status, row['delivery_date'], today, advance=advance,
+        )
+        if error:
+            results.append({
+                'id': order_id, 'ok': False,
+                'from_status': row['status'], 'error': error,
+            })
+            continue
+        valid_ids.append(order_id)
+        results.append({
+            'id': order_id, 'ok': True,
+            'from_status': row['status'], 'status': target_status,
+        })
+
+    deliveries_created = 0
+    updated_ids = []
+    if valid_ids:
+        orders = Order.objects.using(using)
+        with transaction.atomic(using=using):
+            # Re-check the source status under a row lock so concurrent
+            # changes made since the read are not overwritten.
+            updated_ids = list(
+                orders.filter(
+                    id__in=valid_ids,
+                    status__in=allowed_source_statuses(target_status, advance=advance),
+                ).select_for_update().values_list('id', flat=True)
+            )
+            orders.filter(id__in=updated_ids).update(
+                status=target_status, updated_at=timezone.now(),
+            )
+            if updated_ids:
+                deliveries_created = after_status_change(
+                    _load_for_side_effects(updated_ids, using),
+                    {order_id: rows[order_id]['status'] for order_id in updated_ids},
+                    target_status,
+                    using=using,
+                )
+
+        skipped = set(valid_ids) - set(updated_ids)
+        for result in results:
+            if result['id'] in skipped:
+                result.update({
+                    'ok': False,
+                    'error': 'Order status changed concurrently; not updated.',
+                })
+                result.pop('status', None)
+
+    return results, updated_ids, deliveries_created
+
+
+def filter_orders(queryset, delivery_date=None, meal_slot=None, zone=None):
+    """
+    Narrow an Order queryset by delivery date, meal slot id and/or zone id.
+    The zone matches either the subscription's lunch or dinner address.
+    """
+    if delivery_date:
+        queryset = queryset.filter(delivery_date=delivery_date)
+    if meal_slot:
+        queryset = queryset.filter(subscription__time_slot_id=meal_slot)
+    if zone:
+        queryset = queryset.filter(
+            Q(subscription__lunch_address__zone_id=zone)
+            | Q(subscription__dinner_address__zone_id=zone)
+        ).distinct()
+    return queryset
@@ -0,0 +1,183 @@
+"""
+Full-text search over denormalized customer and menu item documents.
+
+``CustomerProfile`` and ``MenuItem`` each carry a ``search_document`` (the
+lowercased text worth searching: names, username, email, phone digits,
+category...) and a ``search_vector`` built from it, both refreshed on save
+(see ``SearchIndexedModel``). Searches then hit one table through its GIN
+indexes instead of ``ILIKE '%x%'`` scans across several joins:
+
+- words match as prefixes against ``search_vector`` (``biry`` -> biryani),
+  ranked with ``SearchRank``;
+- any fragment still matches as a substring of ``search_document``, which
+  the ``pg_trgm`` GIN index serves where the extension is available;
+- phone-like terms (``+97150``, ``050 12``) match ``phone`` by prefix.
+
+Views that list customers, or rows hanging off a customer or menu item,
+use ``SearchDocumentFilter`` and name the relation to the indexed model:
+
+    class OrderViewSet(viewsets.ModelViewSet):
+        filter_backends = SEARCH_FILTER_BACKENDS
+        search_document_path = 'subscription__customer'
+
+Writes that bypass ``save()`` (``bulk_create``, ``update()``) should call
+``rebuild_search_documents()`` for the rows they touched.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, Q, Value
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import BaseFilterBackend, OrderingFilter
+from rest_framework.settings import api_settings
+
+SEARCH_CONFIG = 'simple'
+REBUILD_CHUNK_SIZE = 1000
+
+_WORD_RE = re.compile(r'[^\W_]+')
+_PHONE_RE = re.compile(r'\+?[\d\s()-]{3,}')
+
+
+# ─── Documents ────────────────────────────────────────────────────────────────
+
+def _clean(parts):
+    return [str(part).strip() for part in parts if part and str(part).strip()]
+
+
+def build_search_document(primary, secondary=()):
+    """The lowercased text stored in ``search_document``."""
+    return ' '.join(_clean([*primary, *secondary])).lower()
+
+
+def build_search_vector(primary, secondary=()):
+    """
+    ``search_vector`` expression for the given parts. ``primary`` parts
+    (names) are weighted above ``secondary`` ones (email, phone...).
+    """
+    vector = SearchVector(Value(' '.join(_clean(primary)).lower()), config=SEARCH_CONFIG, weight='A')
+    if secondary:
+        vector = vector + SearchVector(
+            Value(' '.join(_clean(secondary)).lower()), config=SEARCH_CONFIG, weight='B',
+        )
+    return vector
+
+
+def phone_digits(phone):
+    return re.sub(r'\D', '', phone or '')
+
+
+def rebuild_search_documents(queryset, chunk_size=REBUILD_CHUNK_SIZE):
+    """
+    Recompute the search documents of every row in ``queryset`` (after a
+    bulk write or a change to a related name). Returns the number of rows.
+    """
+    model = queryset.model
+    fields = ['search_document', 'search_vector']
+    queryset = queryset.select_related(*model.search_related).order_by('pk')
+    batch, count = [], 0
+    for obj in queryset.iterator(chunk_size=chunk_size):
+        obj.refresh_search_document()
+        batch.append(obj)
+        if len(batch) >= chunk_size:
+            count += model._default_manager.db_manager(queryset.db).bulk_update(batch, fields)
+            batch = []
+    if batch:
+        count += model._default_manager.db_manager(queryset.db).bulk_update(batch, fields)
+    return count
+
+
+# ─── Queries ──────────────────────────────────────────────────────────────────
+
+def search_words(term):
+    return _WORD_RE.findall(term.lower())
+
+
+def prefix_query(words):
+    """``SearchQuery`` matching documents that have a word starting with each of ``words``."""
+    return SearchQuery(
+        ' & '.join(f"{word}:*" for word in words), search_type='raw', config=SEARCH_CONFIG,
+    )
+
+
+def search_queryset(queryset, term, path='', rank=False):
+    """
+    Filter ``queryset`` to rows whose search document (reached through
+    ``path``, '' for the indexed model itself) matches ``term``. With
+    ``rank`` the rows are annotated with ``search_rank`` and ordered by it,
+    keeping the queryset's existing ordering as the tie-breaker.
+    """
+    term = (term or '').strip()
+    words = search_words(term)
+    if not words:
+        return queryset
+
+    prefix = f'{path}__' if path else ''
+    query = prefix_query(words)
+    condition = Q(**{f'{prefix}search_vector': query})
+
+    fragments = Q()
+    for fragment in term.lower().split():
+        fragments &= Q(**{f'{prefix}search_document__contains': fragment})
+    condition |= fragments
+
+    if _PHONE_RE.fullmatch(term):
+        condition |= Q(**{f'{prefix}phone__startswith': term})
+        condition |= Q(**{f'{prefix}search_vector': prefix_query([phone_digits(term)])})
+
+    queryset = queryset.filter(condition)
+    if not rank:
+        return queryset
+
+    ordering = queryset.query.order_by or queryset.model._meta.ordering
+    return queryset.annotate(
+        search_rank=SearchRank(F(f'{prefix}search_vector'), query),
+    ).order_by('-search_rank', *ordering)
+
+
+# ─── DRF / admin integration ──────────────────────────────────────────────────
+
+class SearchDocumentFilter(BaseFilterBackend):
+    """
+    ``?search=`` against the indexed documents. Views set
+    ``search_document_path`` to the relation leading to a ``CustomerProfile``
+    or ``MenuItem`` ('' when listing them directly). Results are ranked
+    unless the client asked for an explicit ``?ordering=``; list this
+    backend after ``OrderingFilter`` so the view's default ordering breaks ties.
+    """
+    search_param = api_settings.SEARCH_PARAM
+
+    def filter_queryset(self, request, queryset, view):
+        path = getattr(view, 'search_document_path', None)
+        term = request.query_params.get(self.search_param, '')
+        if path is None or not term.strip():
+            return queryset
+        rank = api_settings.ORDERING_PARAM not in request.query_params
+        return search_queryset(queryset, term, path, rank=rank)
+
+    def get_schema_operation_parameters(self, view):
+        return [{
+            'name': self.search_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Full-text search term (words match by prefix, phone numbers by prefix).',
+            'schema': {'type': 'string'},
+        }]
+
+
+SEARCH_FILTER_BACKENDS = [DjangoFilterBackend, OrderingFilter, SearchDocumentFilter]
+
+
+class SearchDocumentAdminMixin:
+    """
+    ``ModelAdmin`` search through the indexed documents; set
+    ``search_document_path``. A numeric term also matches the primary key
+    when ``'id'`` is among ``search_fields``.
+    """
+    search_document_path = ''
+
+    def get_search_results(self, request, queryset, search_term):
+        results = search_queryset(queryset, search_term, self.search_document_path)
+        term = search_term.strip()
+        if term.isdigit() and 'id' in self.search_fields:
+            results = results | queryset.filter(pk=int(term))
+        return results, False
@@ -4,8 +4,11 @@ These power the Flutter admin dashboard for kitchen staff, managers, and admins.
 """
 import datetime
 
-from django.db.models import Sum, Count, Q
+from django.db import transaction
+from django.db.models import Sum, Count, Prefetch, Q
+from django.conf import settings
 from rest_framework import viewsets, permissions, status, filters
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.decorators import api_view, permission_classes as perm_classes
 from rest_framework.response import Response
 from rest_framework.decorators import action
@@ -15,14 +18,18 @@ from django.utils import timezone
 from apps.main.models import (
     Order, CustomerProfile, Invoice, Notification,
     CustomerRegistrationRequest, Category, Subscription, Address,
-    MealSlot, DailyMenu, MealPackage, Menu,
+    MealSlot, DailyMenu, MealPackage, Menu, MenuItem, WalletTransaction,
+    NotificationBroadcast,
 )
 from apps.main.serializers.admin_serializers import (
     OrderListSerializer, OrderDetailSerializer, OrderStatusUpdateSerializer,
+    OrderBulkStatusUpdateSerializer,
     CustomerProfileAdminSerializer, CustomerProfileCreateSerializer,
     CustomerRegistrationRequestSerializer,
     AddressAdminSerializer, AddressCreateSerializer,
-    InvoiceSerializer, NotificationSerializer, CategorySerializer,
+    InvoiceSerializer, WalletTransactionAdminSerializer,
+    NotificationSerializer, CategorySerializer,
+    NotificationBroadcastSerializer, NotificationBroadcastCreateSerializer,
     StaffUserSerializer, StaffUserCreateSerializer,
     MealSlotSerializer,
     DailyMenuListSerializer, DailyMenuDetailSerializer, DailyMenuCreateSerializer,
@@ -30,7 +37,22 @@ from apps.main.serializers.admin_serializers import (
     SubscriptionAdminListSerializer, SubscriptionAdminDetailSerializer,
     SubscriptionAdminCreateSerializer,
 )
+from apps.jobs.views import job_accepted_response, wants_background
+from apps.main.jobs import activate_subscription, fulfil_activation, generate_subscription_orders
+from apps.main.utils.customer_import import ImportFormatError, import_customers, parse_rows
+from apps.main.utils.order_state import (
+    TransitionError, bulk_transition_orders, filter_orders, transition_order,
+)
+from apps.main.utils.menu_snapshots import get_snapshot, snapshot_key, store_snapshot
+from apps.main.utils.search import SEARCH_FILTER_BACKENDS
+from apps.main.broadcasts import broadcast, delivery_counts
+from apps.main.notification_inbox import forget_inboxes, inbox_added
+from apps.main.notifications import schedule_dispatch
+from apps.main.retention import ArchivedHistoryMixin
+from core.db.router import get_current_db_alias
 from core.permissions.plan_limits import PlanLimitStaffUsers
+from core.utils.conditional import ConditionalGetMixin, conditional_response
+from core.utils.export import ExportMixin
 
 
 # ─── Dashboard Summary ─────────────────────────────────────────────────────────
@@ -134,7 +156,7 @@ def dashboard_summary(request):
 
 # ─── Orders ────────────────────────────────────────────────────────────────────
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ArchivedHistoryMixin, ExportMixin, viewsets.ModelViewSet):
     """
     Manage orders within the tenant. Staff can list all orders;
     update status, cancel, etc.
@@ -143,13 +165,27 @@ class OrderViewSet(viewsets.ModelViewSet):
         'subscription__customer__user',
     ).all()
     permission_classes = [permissions.IsAuthenticated]
+    query_budget = {'list': 3, 'retrieve': 3}
     filterset_fields = ['status', 'order_date', 'delivery_date']
-    search_fields = [
-        'subscription__customer__user__username',
-        'subscription__customer__phone',
-    ]
+    filter_backends = SEARCH_FILTER_BACKENDS
+    search_document_path = 'subscription__customer'
     ordering_fields = ['order_date', 'delivery_date', 'status', 'created_at']
     ordering = ['-delivery_date']
+    archive_dataset = 'orders'
+    archive_summary = True
+    export_columns = [
+        ('id', 'Order ID'),
+        ('order_date', 'Order date'),
+        ('delivery_date', 'Delivery date'),
+        ('status', 'Status'),
+        ('quantity', 'Quantity'),
+        ('subscription_id', 'Subscription ID'),
+        ('subscription__customer_id', 'Customer ID'),
+        ('subscription__customer__name', 'Customer'),
+        ('subscription__customer__phone', 'Phone'),
+        ('special_instructions', 'Special instructions'),
+        ('created_at', 'Created at'),
+    ]
 
     def get_serializer_class(self):
         if self.action == 'retrieve':
@@ -164,67 +200,65 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         new_status = serializer.validated_data['status']
-        valid_transitions = {
-            'pending': ['confirmed', 'cancelled'],
-            'confirmed': ['preparing', 'cancelled'],
-            'preparing': ['ready', 'cancelled'],
-            'ready': ['delivered'],
-            'delivered': [],
-            'cancelled': [],
-        }
+        try:
+            # Entering 'ready' creates the Delivery (with zone-based driver
+            # assignment) as a side effect of the transition.
+            transition_order(order, new_status)
+        except TransitionError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
 
-        if new_status not in valid_transitions.get(order.status, []):
-            return Response(
-                {'error': f"Cannot transition from '{order.status}' to '{new_status}'."},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        return Response(OrderDetailSerializer(order).data)
 
-        # Preparing/ready only allowed when delivery date is today
-        today = timezone.now().date()
-        if new_status in ('preparing', 'ready') and order.delivery_date != today:
-            return Response(
-                {
-                    'error': (
-                        f"Order can only be marked as '{new_status}' when delivery date is today "
-                        f"({today.isoformat()}). This order is due {order.delivery_date.isoformat()}."
-                    )
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+    @action(detail=False, methods=['post'])
+    def bulk_update_status(self, request):
+        """
+        Move many orders to one status in a single call.
 
-        order.status = new_status
-        order.save(update_fields=['status', 'updated_at'])
-
-        # When order becomes "ready", create a Delivery so it appears in Delivery Management
-        if new_status == 'ready':
-            from apps.delivery.models import Delivery
-            from apps.main.utils.delivery_utils import assign_driver_to_order
-            
-            # Auto-assign driver based on zone
-            assigned_driver = assign_driver_to_order(order)
-            delivery, created = Delivery.objects.get_or_create(
-                order=order,
-                defaults={
-                    'status': 'pending',
-                    'driver': assigned_driver  # Now uses DeliveryDriver
-                }
-            )
-            # Update driver if not set and we have one
-            if not delivery.driver and assigned_driver:
-                delivery.driver = assigned_driver
-                delivery.save(update_fields=['driver'])
+        Body: ``{"status": "ready", "ids": [1, 2, 3]}`` or
+        ``{"status": "ready", "delivery_date": "2026-02-15", "meal_slot": 1, "zone": 2}``.
+        Returns a per-order outcome list; invalid transitions do not block
+        the valid ones.
+        """
+        serializer = OrderBulkStatusUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
 
-        return Response(OrderDetailSerializer(order).data)
+        qs = Order.objects.all()
+        ids = data.get('ids')
+        if ids:
+            qs = qs.filter(id__in=ids)
+        qs = filter_orders(
+            qs,
+            delivery_date=data.get('delivery_date'),
+            meal_slot=data.get('meal_slot'),
+            zone=data.get('zone'),
+        )
+
+        results, updated_ids, deliveries_created = bulk_transition_orders(
+            qs, data['status'], ids=ids,
+        )
+        return Response({
+            'status': data['status'],
+            'requested': len(results),
+            'updated': len(updated_ids),
+            'failed': len(results) - len(updated_ids),
+            'deliveries_created': deliveries_created,
+            'results': results,
+        })
 
 
 # ─── Customer Management ──────────────────────────────────────────────────────
 
 class CustomerProfileViewSet(viewsets.ModelViewSet):
     """View and manage customer profiles within the tenant."""
-    queryset = CustomerProfile.objects.select_related('user').prefetch_related('addresses').all()
+    queryset = CustomerProfile.objects.select_related('user').prefetch_related(
+        Prefetch('addresses', queryset=Address.objects.select_related('zone')),
+    ).all()
     permission_classes = [permissions.IsAdminUser]
+    query_budget = {'list': 4, 'retrieve': 3}
     filterset_fields = ['loyalty_tier', 'preferred_communication']
-    search_fields = ['user__username', 'user__email', 'name', 'phone']
+    filter_backends = SEARCH_FILTER_BACKENDS
+    search_document_path = ''
     ordering_fields = ['created_at', 'wallet_balance', 'loyalty_points']
     ordering = ['-created_at']
 
@@ -244,6 +278,41 @@ class CustomerProfileViewSet(viewsets.ModelViewSet):
             status=status.HTTP_201_CREATED,
         )
 
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[MultiPartParser, FormParser, JSONParser])
+    def import_customers(self, request):
+        """
+        Bulk-create customers from an uploaded CSV/JSON ``file`` or a JSON
+        body ``{"customers": [...]}``. Options: ``invite`` (return password
+        reset tokens), ``dry_run``. Responds with the per-row report.
+        """
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                records, first_row = parse_rows(upload.read(), filename=upload.name)
+            else:
+                records, first_row = request.data.get('customers'), 1
+                if not isinstance(records, list):
+                    raise ImportFormatError("Upload a 'file' or send a 'customers' list.")
+        except ImportFormatError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        def flag(name):
+            return str(request.data.get(name, '')).lower() in ('1', 'true', 'yes')
+
+        result = import_customers(
+            records, using=get_current_db_alias(), plan=getattr(request, 'tenant_plan', None),
+            requested_by=request.user, invite=flag('invite'), dry_run=flag('dry_run'),
+            hash_workers=settings.CUSTOMER_IMPORT_HASH_WORKERS, first_row=first_row,
+        )
+        if result.dry_run:
+            code = status.HTTP_200_OK
+        elif result.created:
+            code = status.HTTP_201_CREATED
+        else:
+            code = status.HTTP_400_BAD_REQUEST
+        return Response(result.as_dict(), status=code)
+
 
 class CustomerRegistrationRequestViewSet(viewsets.ModelViewSet):
     """Manage customer registration requests (approve/reject)."""
@@ -323,8 +392,9 @@ class CustomerRegistrationRequestViewSet(viewsets.ModelViewSet):
 
 class AddressAdminViewSet(viewsets.ModelViewSet):
     """Admin CRUD for customer addresses in the tenant."""
-    queryset = Address.objects.select_related('customer__user').all()
+    queryset = Address.objects.select_related('customer__user', 'zone').all()
     permission_classes = [permissions.IsAdminUser]
+    query_budget = {'list': 3, 'retrieve': 2}
     filterset_fields = ['customer', 'status', 'is_default']
     ordering = ['-created_at']
 
@@ -364,13 +434,24 @@ class AddressAdminViewSet(viewsets.ModelViewSet):
 
 # ─── Invoices ──────────────────────────────────────────────────────────────────
 
-class InvoiceViewSet(viewsets.ReadOnlyModelViewSet):
+class InvoiceViewSet(ExportMixin, viewsets.ReadOnlyModelViewSet):
     """View invoices. Admins can see all; filtering by customer and status."""
     queryset = Invoice.objects.select_related('customer__user').prefetch_related('items__menu').all()
     serializer_class = InvoiceSerializer
     permission_classes = [permissions.IsAdminUser]
     filterset_fields = ['status', 'customer']
     ordering = ['-date']
+    export_columns = [
+        ('invoice_number', 'Invoice number'),
+        ('date', 'Date'),
+        ('due_date', 'Due date'),
+        ('customer_id', 'Customer ID'),
+        ('customer__name', 'Customer'),
+        ('customer__user__email', 'Email'),
+        ('total', 'Total'),
+        ('status', 'Status'),
+        ('notes', 'Notes'),
+    ]
 
     @action(detail=False, methods=['get'])
     def summary(self, request):
@@ -401,21 +482,91 @@ class InvoiceViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(InvoiceSerializer(invoice).data)
 
 
+# ─── Wallet ledger ─────────────────────────────────────────────────────────────
+
+class WalletTransactionAdminViewSet(ArchivedHistoryMixin, ExportMixin, viewsets.ReadOnlyModelViewSet):
+    """Tenant-wide wallet ledger for finance; filter by customer, type, subscription or invoice."""
+    queryset = WalletTransaction.objects.select_related('customer').all()
+    serializer_class = WalletTransactionAdminSerializer
+    permission_classes = [permissions.IsAdminUser]
+    filterset_fields = ['transaction_type', 'customer', 'subscription', 'invoice']
+    ordering_fields = ['created_at', 'amount']
+    ordering = ['-created_at']
+    archive_dataset = 'wallet'
+    archive_summary = True
+    export_columns = [
+        ('id', 'Transaction ID'),
+        ('created_at', 'Created at'),
+        ('customer_id', 'Customer ID'),
+        ('customer__name', 'Customer'),
+        ('transaction_type', 'Type'),
+        ('amount', 'Amount'),
+        ('description', 'Description'),
+        ('reference_id', 'Reference'),
+        ('subscription_id', 'Subscription ID'),
+        ('invoice__invoice_number', 'Invoice number'),
+    ]
+
+
 # ─── Notifications ─────────────────────────────────────────────────────────────
 
-class NotificationViewSet(viewsets.ModelViewSet):
+class NotificationViewSet(ArchivedHistoryMixin, viewsets.ModelViewSet):
     """Manage notifications for customers."""
     queryset = Notification.objects.select_related('customer').all()
     serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAdminUser]
     filterset_fields = ['priority', 'read', 'customer']
     ordering = ['-created_at']
+    archive_dataset = 'notifications'
+    archive_summary = True
+
+    def perform_create(self, serializer):
+        notification = serializer.save()
+        inbox_added([notification])
+        schedule_dispatch([notification.pk])
+
+    def perform_update(self, serializer):
+        previous = serializer.instance.customer_id
+        forget_inboxes([previous, serializer.save().customer_id])
+
+    def perform_destroy(self, instance):
+        forget_inboxes([instance.customer_id])
+        instance.delete()
+
+
+class NotificationBroadcastViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Send one message to a customer segment (zone, meal slot, diet type,
+    subscription status, delivery date) and follow its delivery.
+    """
+    queryset = NotificationBroadcast.objects.all()
+    serializer_class = NotificationBroadcastSerializer
+    permission_classes = [permissions.IsAdminUser]
+    filterset_fields = ['priority']
+    ordering = ['-created_at']
+
+    def create(self, request, *args, **kwargs):
+        serializer = NotificationBroadcastCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        segment = dict(serializer.validated_data)
+        message, priority = segment.pop('message'), segment.pop('priority')
+        sent = broadcast(message, segment, priority=priority, created_by=request.user)
+        data = NotificationBroadcastSerializer(sent).data
+        data['delivery'] = delivery_counts(sent)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        sent = self.get_object()
+        data = self.get_serializer(sent).data
+        data['delivery'] = delivery_counts(sent)
+        return Response(data)
 
 
 # ─── Categories ────────────────────────────────────────────────────────────────
 
-class CategoryViewSet(viewsets.ModelViewSet):
-    """Manage food categories."""
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+    """Manage food categories. List/retrieve support conditional GETs."""
+    conditional_models = (Category,)
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -564,6 +715,10 @@ class DailyMenuViewSet(viewsets.ModelViewSet):
         - POST  /{id}/close/     →  status = closed
         - GET   /today/          →  today's published menus
         - GET   /week/           →  current (or specified) week's menus
+
+    ``today`` and ``week`` are served from cached snapshots (see
+    ``apps.main.utils.menu_snapshots``) with an ETag; publishing or closing
+    a menu rebuilds today's snapshot once the change commits.
     """
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -571,11 +726,16 @@ class DailyMenuViewSet(viewsets.ModelViewSet):
     ordering_fields = ['menu_date', 'status', 'created_at']
     ordering = ['menu_date']
 
-    def get_queryset(self):
-        qs = DailyMenu.objects.select_related('meal_slot', 'created_by').prefetch_related(
+    FILTER_PARAMS = ('date_from', 'date_to', 'meal_slot', 'status', 'diet_type')
+
+    def _menu_queryset(self):
+        return DailyMenu.objects.select_related('meal_slot', 'created_by').prefetch_related(
             'items__master_item__category',
         ).annotate(item_count=Count('items'))
 
+    def get_queryset(self):
+        qs = self._menu_queryset()
+
         # ── Filters via query params ──
         date_from = self.request.query_params.get('date_from')
         date_to = self.request.query_params.get('date_to')
@@ -629,6 +789,7 @@ class DailyMenuViewSet(viewsets.ModelViewSet):
             )
         menu.status = 'published'
         menu.save(update_fields=['status', 'updated_at'])
+        self._rebuild_today_on_commit(request, menu)
         return Response(DailyMenuDetailSerializer(
             self.get_queryset().get(pk=menu.pk),
             context={'request': request},
@@ -642,18 +803,44 @@ class DailyMenuViewSet(viewsets.ModelViewSet):
             return Response({'detail': 'Already closed.'})
         menu.status = 'closed'
         menu.save(update_fields=['status', 'updated_at'])
+        self._rebuild_today_on_commit(request, menu)
         return Response(DailyMenuDetailSerializer(
             self.get_queryset().get(pk=menu.pk),
             context={'request': request},
         ).data)
 
+    # ── Snapshots ─────────────────────────────────────────────────────────────
+
+    def _snapshot_params(self, request, *extra):
+        # Image URLs are absolute, so the host is part of the snapshot
+        query = request.query_params
+        return (request.get_host(), *extra, *(query.get(name) for name in self.FILTER_PARAMS))
+
+    def _build_today(self, qs, today, request):
+        qs = qs.filter(menu_date=today, status='published')
+        return DailyMenuDetailSerializer(qs, many=True, context={'request': request}).data
+
+    def _rebuild_today_on_commit(self, request, menu):
+        today = timezone.now().date()
+        if menu.menu_date != today:
+            return
+        # Same key as an unfiltered GET /today/, built once the change is visible
+        params = (request.get_host(), today) + (None,) * len(self.FILTER_PARAMS)
+
+        def rebuild():
+            data = self._build_today(self._menu_queryset(), today, request)
+            store_snapshot(snapshot_key('today', params), data)
+        transaction.on_commit(rebuild)
+
     @action(detail=False, methods=['get'])
     def today(self, request):
         """Return today's published menus (for customer facing views)."""
         today = timezone.now().date()
-        qs = self.get_queryset().filter(menu_date=today, status='published')
-        serializer = DailyMenuDetailSerializer(qs, many=True, context={'request': request})
-        return Response(serializer.data)
+        etag, data = get_snapshot(
+            'today', self._snapshot_params(request, today),
+            lambda: self._build_today(self.get_queryset(), today, request),
+        )
+        return conditional_response(request, etag, data)
 
     @action(detail=False, methods=['get'])
     def week(self, request):
@@ -675,22 +862,29 @@ class DailyMenuViewSet(viewsets.ModelViewSet):
             start = today - datetime.timedelta(days=today.weekday())  # Monday
 
         end = start + datetime.timedelta(days=6)  # Sunday
-        qs = self.get_queryset().filter(menu_date__gte=start, menu_date__lte=end)
-        serializer = DailyMenuListSerializer(qs, many=True, context={'request': request})
-        return Response({
-            'week_start': start.isoformat(),
-            'week_end': end.isoformat(),
-            'menus': serializer.data,
-        })
+
+        def build():
+            qs = self.get_queryset().filter(menu_date__gte=start, menu_date__lte=end)
+            serializer = DailyMenuListSerializer(qs, many=True, context={'request': request})
+            return {
+                'week_start': start.isoformat(),
+                'week_end': end.isoformat(),
+                'menus': serializer.data,
+            }
+
+        etag, data = get_snapshot('week', self._snapshot_params(request, start), build)
+        return conditional_response(request, etag, data)
 
 
 # ─── Menus (admin) ────────────────────────────────────────────────────────────
 
-class MenuViewSet(viewsets.ModelViewSet):
+class MenuViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     CRUD for menus (collections of menu items, e.g. Weekly Plan A).
     Menus are used in MealPackages and Subscriptions.
+    List/retrieve support conditional GETs.
     """
+    conditional_models = (Menu, MenuItem)
     queryset = Menu.objects.prefetch_related('menu_items').all()
     serializer_class = MenuAdminSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -705,11 +899,13 @@ class MenuViewSet(viewsets.ModelViewSet):
 
 # ─── Meal Packages ────────────────────────────────────────────────────────────
 
-class MealPackageViewSet(viewsets.ModelViewSet):
+class MealPackageViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     CRUD for tenant-defined meal packages / subscription tiers.
     Tenants create their own package names, prices, and configurations.
+    List/retrieve support conditional GETs.
     """
+    conditional_models = (MealPackage, Menu)
     queryset = MealPackage.objects.prefetch_related('menus').all()
     serializer_class = MealPackageSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -732,7 +928,8 @@ class SubscriptionAdminViewSet(viewsets.ModelViewSet):
     """
     permission_classes = [permissions.IsAdminUser]
     filterset_fields = ['status', 'payment_mode']
-    search_fields = ['customer__name', 'customer__phone', 'customer__user__email']
+    filter_backends = SEARCH_FILTER_BACKENDS
+    search_document_path = 'customer'
     ordering_fields = ['start_date', 'end_date', 'status', 'total_cost']
     ordering = ['-start_date']
 
@@ -768,33 +965,24 @@ class SubscriptionAdminViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def activate(self, request, pk=None):
-        """Activate a pending/paused subscription."""
+        """
+        Activate a pending/paused subscription. With ``?background=1`` the
+        orders and invoice are created by a background job (202 + job).
+        """
         sub = self.get_object()
         if sub.status not in ('pending', 'paused'):
             return Response(
                 {'error': f"Cannot activate a '{sub.status}' subscription."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        from django.db import models as db_models
         sub.status = 'active'
-        sub.calculate_total_cost()
-        db_models.Model.save(sub)
-        sub.update_delivery_schedule()
-        orders_created = sub.generate_orders()
-        # Create invoice for this subscription period.
-        # Cash/card = tenant already collected → mark paid. Wallet = pending (settled on delivery/top-up).
-        invoice_created = False
-        if sub.total_cost and sub.total_cost > 0:
-            due = sub.start_date + datetime.timedelta(days=7)
-            invoice_status = 'paid' if sub.payment_mode in ('cash', 'card') else 'pending'
-            Invoice.objects.create(
-                customer=sub.customer,
-                due_date=due,
-                total=sub.total_cost,
-                status=invoice_status,
-                notes=f"Subscription #{sub.id} ({sub.start_date} to {sub.end_date})",
+        sub.save(update_fields=['status', 'cost_per_meal', 'total_cost'])
+        if wants_background(request):
+            job = activate_subscription.enqueue(
+                sub.id, idempotency_key=request.headers.get('Idempotency-Key'), created_by=request.user,
             )
-            invoice_created = True
+            return job_accepted_response(job, SubscriptionAdminDetailSerializer(sub).data)
+        orders_created, invoice_created = fulfil_activation(sub)
         return Response({
             **SubscriptionAdminDetailSerializer(sub).data,
             'orders_created': orders_created,
@@ -804,7 +992,6 @@ class SubscriptionAdminViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def pause(self, request, pk=None):
         """Pause an active subscription."""
-        from django.db import models as db_models
         sub = self.get_object()
         if sub.status != 'active':
             return Response(
@@ -812,13 +999,12 @@ class SubscriptionAdminViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         sub.status = 'paused'
-        db_models.Model.save(sub)
+        sub.save(update_fields=['status'])
         return Response(SubscriptionAdminDetailSerializer(sub).data)
 
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         """Cancel a subscription."""
-        from django.db import models as db_models
         sub = self.get_object()
         if sub.status in ('cancelled', 'expired'):
             return Response(
@@ -826,7 +1012,7 @@ class SubscriptionAdminViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         sub.status = 'cancelled'
-        db_models.Model.save(sub)
+        sub.save(update_fields=['status'])
         sub.order_set.filter(status='pending').update(status='cancelled')
         return Response(SubscriptionAdminDetailSerializer(sub).data)
 
@@ -839,5 +1025,10 @@ class SubscriptionAdminViewSet(viewsets.ModelViewSet):
                 {'error': 'Only active subscriptions can generate orders.'},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        if wants_background(request):
+            job = generate_subscription_orders.enqueue(
+                sub.id, idempotency_key=request.headers.get('Idempotency-Key'), created_by=request.user,
+            )
+            return job_accepted_response(job, {'detail': 'Order generation queued.'})
         created = sub.generate_orders()
         return Response({'detail': f'{created} orders generated.', 'orders_created': created})
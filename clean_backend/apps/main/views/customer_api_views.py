@@ -13,12 +13,13 @@ They provide:
 """
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from django.db.models import Q
 from django.utils import timezone
 from rest_framework import viewsets, permissions, status as drf_status, generics
 from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from apps.main.models import (
@@ -37,10 +38,26 @@ from apps.main.serializers.customer_api_serializers import (
     CustomerInvoiceSerializer, CustomerNotificationSerializer,
     WalletTopUpSerializer,
 )
+from apps.main.notification_inbox import customer_account, customer_id_for_user, get_inbox, inbox_all_read, inbox_read
+from apps.main.retention import ArchivedHistoryMixin
+from apps.main.utils.menu_snapshots import get_snapshot
+from core.utils.conditional import conditional_get, conditional_response, make_etag
 
 
 # ─── Authentication ────────────────────────────────────────────────────────────
 
+def _tokens_for(request, user):
+    """
+    JWT pair for ``user``, carrying the subdomain of the request's tenant
+    (None without one) as the ``tenant`` claim. Websocket authentication
+    (``apps.main.consumers``) only accepts a token on its own tenant.
+    """
+    refresh = RefreshToken.for_user(user)
+    tenant = getattr(request, 'tenant', None)
+    refresh['tenant'] = tenant.subdomain if tenant else None
+    return refresh
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def customer_register(request):
@@ -83,7 +100,7 @@ def customer_register(request):
     )
 
     # Generate JWT tokens
-    refresh = RefreshToken.for_user(user)
+    refresh = _tokens_for(request, user)
 
     return Response({
         'user': {
@@ -128,7 +145,7 @@ def customer_login(request):
             status=drf_status.HTTP_403_FORBIDDEN,
         )
 
-    refresh = RefreshToken.for_user(user)
+    refresh = _tokens_for(request, user)
 
     # Get profile
     profile = getattr(user, 'customerprofile', None)
@@ -154,28 +171,38 @@ def customer_login(request):
 def public_menu(request):
     """
     Browse available menu items for this tenant. No authentication required.
-    Supports filtering by category.
-    """
-    items = MenuItem.objects.filter(is_available=True).select_related('category')
+    Supports filtering by category and a name/description search.
 
+    Served from a cached snapshot per category (see
+    ``apps.main.utils.menu_snapshots``); searches filter the snapshot.
+    """
     category_id = request.query_params.get('category')
-    if category_id:
-        items = items.filter(category_id=category_id)
+
+    def build():
+        items = MenuItem.objects.filter(is_available=True).select_related('category')
+        if category_id:
+            items = items.filter(category_id=category_id)
+        return PublicMenuItemSerializer(items, many=True).data
+
+    etag, data = get_snapshot('public_menu', (category_id,), build)
 
     search = request.query_params.get('search')
     if search:
-        items = items.filter(
-            Q(name__icontains=search) | Q(description__icontains=search)
-        )
-
-    serializer = PublicMenuItemSerializer(items, many=True)
-    return Response(serializer.data)
+        needle = search.casefold()
+        data = [
+            item for item in data
+            if needle in (item['name'] or '').casefold()
+            or needle in (item['description'] or '').casefold()
+        ]
+        etag = make_etag(etag, needle)
+    return conditional_response(request, etag, data)
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@conditional_get(Category)
 def public_categories(request):
-    """List all menu categories for the tenant."""
+    """List all menu categories for the tenant. Supports conditional GETs."""
     categories = Category.objects.all()
     serializer = PublicCategorySerializer(categories, many=True)
     return Response(serializer.data)
@@ -211,14 +238,25 @@ class CustomerSubscriptionViewSet(viewsets.ModelViewSet):
         serializer.save(customer=profile)
 
 
+# ─── Archived history ─────────────────────────────────────────────────────────
+
+class CustomerArchivedHistoryMixin(ArchivedHistoryMixin):
+    """``archived/`` limited to the authenticated customer's own history."""
+
+    def get_archive_customer(self, request):
+        return request.user.customerprofile.pk
+
+
 # ─── Customer Orders ──────────────────────────────────────────────────────────
 
-class CustomerOrderViewSet(viewsets.ReadOnlyModelViewSet):
+class CustomerOrderViewSet(CustomerArchivedHistoryMixin, viewsets.ReadOnlyModelViewSet):
     """
     Customers can view their orders and track delivery.
+    Orders past the kitchen's retention horizon are under ``archived/``.
     """
     serializer_class = CustomerOrderSerializer
     permission_classes = [IsAuthenticated]
+    archive_dataset = 'orders'
 
     def get_queryset(self):
         return Order.objects.filter(
@@ -250,12 +288,14 @@ class CustomerOrderViewSet(viewsets.ReadOnlyModelViewSet):
 
 # ─── Customer Wallet ──────────────────────────────────────────────────────────
 
-class CustomerWalletViewSet(viewsets.ReadOnlyModelViewSet):
+class CustomerWalletViewSet(CustomerArchivedHistoryMixin, viewsets.ReadOnlyModelViewSet):
     """
     Customers can view their wallet balance and transaction history.
+    Archived transactions are under ``archived/``.
     """
     serializer_class = WalletTransactionSerializer
     permission_classes = [IsAuthenticated]
+    archive_dataset = 'wallet'
 
     def get_queryset(self):
         return WalletTransaction.objects.filter(
@@ -310,33 +350,59 @@ class CustomerInvoiceViewSet(viewsets.ReadOnlyModelViewSet):
 
 # ─── Customer Notifications ───────────────────────────────────────────────────
 
-class CustomerNotificationViewSet(viewsets.ReadOnlyModelViewSet):
-    """Customers can view and mark their notifications as read."""
+class CustomerNotificationViewSet(CustomerArchivedHistoryMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Customers can view and mark their notifications as read; archived ones
+    are under ``archived/``. ``summary/`` returns the unread count and the
+    latest notifications from the cached inbox (``apps.main.notification_inbox``).
+    """
     serializer_class = CustomerNotificationSerializer
     permission_classes = [IsAuthenticated]
+    archive_dataset = 'notifications'
 
     def get_queryset(self):
         return Notification.objects.filter(
-            customer__user=self.request.user,
+            customer_id=customer_id_for_user(self.request.user.pk),
         ).order_by('-created_at')
 
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """Mark a notification as read."""
         notification = self.get_object()
-        notification.read = True
-        notification.read_at = timezone.now()
-        notification.save(update_fields=['read', 'read_at'])
+        now = timezone.now()
+        if Notification.objects.filter(pk=notification.pk, read=False).update(read=True, read_at=now):
+            inbox_read(notification.customer_id, [notification.pk], now)
         return Response({'status': 'marked as read'})
 
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
         """Mark all notifications as read."""
-        self.get_queryset().filter(read=False).update(
-            read=True, read_at=timezone.now(),
-        )
+        customer_id = customer_id_for_user(request.user.pk)
+        if customer_id:
+            now = timezone.now()
+            Notification.objects.filter(customer_id=customer_id, read=False).update(read=True, read_at=now)
+            inbox_all_read(customer_id, now)
         return Response({'status': 'all marked as read'})
 
+    @action(detail=False, methods=['get'], authentication_classes=[JWTStatelessUserAuthentication])
+    def summary(self, request):
+        """
+        Unread count and latest notifications. The user is taken from the
+        token without loading it, so a cache hit runs no query. The token
+        must have been issued on this tenant (see ``_tokens_for``), and the
+        cached account must still be active.
+        """
+        tenant = getattr(request, 'tenant', None)
+        claims = request.auth or {}
+        if claims.get('tenant') != (tenant.subdomain if tenant else None):
+            raise AuthenticationFailed('Token was not issued for this tenant.')
+        customer_id, active = customer_account(request.user.pk)
+        if not active:
+            raise AuthenticationFailed('User is inactive.')
+        if customer_id is None:
+            return Response({'error': 'Customer profile not found.'}, status=drf_status.HTTP_404_NOT_FOUND)
+        return Response(get_inbox(customer_id))
+
 
 # ─── Customer Addresses ───────────────────────────────────────────────────────
 
@@ -2,6 +2,7 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from apps.main.models import Subscription, WalletTransaction, Address, MenuItem
+from apps.main.utils.search import SEARCH_FILTER_BACKENDS
 from apps.main.serializers.customer_serializers import (
     SubscriptionSerializer,
     WalletTransactionSerializer,
@@ -28,7 +29,8 @@ class MenuItemViewSet(viewsets.ModelViewSet):
     serializer_class = MenuItemSerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['is_available', 'category']
-    search_fields = ['name', 'description']
+    filter_backends = SEARCH_FILTER_BACKENDS
+    search_document_path = ''
     ordering_fields = ['name', 'price', 'created_at']
 
     def get_permissions(self):
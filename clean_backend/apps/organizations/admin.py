@@ -2,6 +2,7 @@ from django.contrib import admin
 from apps.organizations.models import ServicePlan
 from apps.organizations.models_saas import (
     TenantSubscription, TenantInvoice, TenantUsage,
+    TenantDailyFact, TenantFactWatermark, TenantRetentionPolicy,
 )
 
 
@@ -71,3 +72,34 @@ class TenantUsageAdmin(admin.ModelAdmin):
     list_filter = ('period',)
     search_fields = ('tenant__name',)
     raw_id_fields = ('tenant',)
+
+
+@admin.register(TenantDailyFact)
+class TenantDailyFactAdmin(admin.ModelAdmin):
+    list_display = (
+        'tenant', 'date', 'orders_delivered', 'orders_cancelled',
+        'deliveries_delivered', 'deliveries_failed', 'revenue',
+        'new_customers', 'active_subscriptions',
+    )
+    list_filter = ('date',)
+    search_fields = ('tenant__name',)
+    raw_id_fields = ('tenant',)
+
+
+@admin.register(TenantFactWatermark)
+class TenantFactWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('tenant', 'loaded_through', 'loaded_at')
+    search_fields = ('tenant__name',)
+    raw_id_fields = ('tenant',)
+
+
+@admin.register(TenantRetentionPolicy)
+class TenantRetentionPolicyAdmin(admin.ModelAdmin):
+    list_display = (
+        'tenant', 'is_enabled', 'storage', 'order_days', 'delivery_days',
+        'notification_days', 'wallet_days', 'last_run_at',
+    )
+    list_filter = ('is_enabled', 'storage')
+    search_fields = ('tenant__name',)
+    raw_id_fields = ('tenant',)
+    readonly_fields = ('last_run_at', 'updated_at')
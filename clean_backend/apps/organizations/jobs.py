@@ -0,0 +1,47 @@
+"""
+Background jobs for tenant provisioning (see apps/jobs/executor.py).
+
+``TenantViewSet.create`` runs ``provision_tenant`` instead of creating and
+migrating the tenant database inline when called with ``?background=1``.
+The tenant stays inactive until its database is ready.
+"""
+from django.conf import settings
+
+from apps.jobs.executor import background_job
+from apps.organizations.provisioning import (
+    PhaseTimings, create_tenant_database, migrate_tenant_database,
+    register_tenant_database, seed_tenant_defaults,
+)
+from apps.users.models import Tenant
+
+
+@background_job(max_attempts=2, retry_delay=60, atomic=False)
+def provision_tenant(ctx, tenant_id):
+    """Create, migrate and seed the tenant's database, then activate the tenant."""
+    tenant = Tenant.objects.using('default').get(pk=tenant_id)
+    timings = PhaseTimings()
+
+    ctx.set_progress(5, 'Creating database')
+    created = create_tenant_database(
+        tenant.db_name, from_template=settings.TENANT_PROVISION_FROM_TEMPLATE, timings=timings,
+    )
+
+    ctx.set_progress(40, 'Applying migrations')
+    alias = register_tenant_database(
+        f"tenant_{tenant.id}", tenant.db_name, tenant.db_user, tenant.db_password,
+        tenant.db_host, tenant.db_port,
+    )
+    migrate_tenant_database(alias, timings=timings)
+
+    ctx.set_progress(85, 'Seeding defaults')
+    with timings.phase('seed'):
+        seeded = seed_tenant_defaults(alias)
+
+    tenant.is_active = True
+    tenant.save(update_fields=['is_active'])
+    return {
+        'database': tenant.db_name,
+        'created': created,
+        'seeded': seeded,
+        'timings': {name: round(seconds, 3) for name, seconds in timings.phases.items()},
+    }
@@ -0,0 +1,63 @@
+"""
+Load daily per-tenant analytics facts (TenantDailyFact) into the shared
+database. Each tenant continues from its watermark; see
+apps/organizations/analytics.py.
+
+Usage:
+    python manage.py load_analytics_facts
+    python manage.py load_analytics_facts --tenant=abc
+    python manage.py load_analytics_facts --since=2026-01-01   # reload from a date
+    python manage.py load_analytics_facts --workers=8
+"""
+import datetime
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.organizations.analytics import load_facts
+from apps.users.models import Tenant
+
+
+class Command(BaseCommand):
+    help = "Loads daily per-tenant analytics facts for the platform dashboard."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tenant", type=str, default=None, help="Load a single tenant by subdomain.")
+        parser.add_argument(
+            "--since", type=str, default=None,
+            help="Reload from this date (YYYY-MM-DD) instead of the watermark.",
+        )
+        parser.add_argument(
+            "--workers", type=int, default=settings.SCHEDULER_TENANT_CONCURRENCY,
+            help="Tenants processed in parallel.",
+        )
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = datetime.date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("Invalid --since date. Use YYYY-MM-DD.")
+
+        tenants = None
+        if options["tenant"]:
+            tenants = list(Tenant.objects.using("default").filter(subdomain__iexact=options["tenant"]))
+            if not tenants:
+                self.stderr.write(self.style.ERROR(f"Tenant '{options['tenant']}' not found."))
+                sys.exit(1)
+
+        outcomes = load_facts(tenants=tenants, since=since, max_workers=options["workers"])
+        for outcome in outcomes:
+            if 'error' in outcome:
+                self.stdout.write(self.style.ERROR(f"  {outcome['tenant']}: failed: {outcome['error']}"))
+            else:
+                self.stdout.write(
+                    f"  {outcome['tenant']}: {outcome['result']['days']} days from "
+                    f"{outcome['result']['from']} ({outcome['seconds']:.2f}s)"
+                )
+
+        failed = sum(1 for outcome in outcomes if 'error' in outcome)
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f"Loaded facts for {len(outcomes) - failed} tenants ({failed} failed)."))
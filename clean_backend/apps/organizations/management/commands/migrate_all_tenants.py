@@ -1,22 +1,43 @@
 """
 Management command to run migrations on ALL tenant databases.
 
+A planning phase runs first. It loads the migration graph once and reads
+each tenant's django_migrations table with one query. Tenants that are
+already current are skipped. The rest are grouped by the set of migrations
+they still need, and only those tenants are migrated.
+
 Usage:
     python manage.py migrate_all_tenants              # migrate all active tenants
     python manage.py migrate_all_tenants --all        # include inactive tenants
     python manage.py migrate_all_tenants --tenant=abc # migrate a single tenant by subdomain
-    python manage.py migrate_all_tenants --parallel   # run migrations in parallel (faster)
+    python manage.py migrate_all_tenants --parallel   # run migrations in worker processes (faster)
+    python manage.py migrate_all_tenants --plan       # only print the plan
+    python manage.py migrate_all_tenants --report=migrate-report.json
 """
-import copy
+import json
 import sys
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from django.conf import settings
 from django.core.management import call_command
 from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
 
+from apps.organizations.migration_plan import (
+    group_by_pending, plan_tenants, target_migrations,
+)
+from apps.organizations.provisioning import migration_state, register_tenant_database
 from apps.users.models import Tenant
+from core.db.fanout import TenantFanOut
+
+
+def _migrate_tenant(tenant, alias):
+    """Run ``migrate`` on one tenant database, in-process or in a pool worker."""
+    try:
+        call_command("migrate", database=alias, verbosity=0)
+    finally:
+        connections[alias].close()
 
 
 class Command(BaseCommand):
@@ -39,13 +60,25 @@ class Command(BaseCommand):
             "--parallel",
             action="store_true",
             default=False,
-            help="Run migrations in parallel threads (faster, but noisier output).",
+            help="Run migrations in a pool of worker processes.",
         )
         parser.add_argument(
             "--workers",
             type=int,
             default=4,
-            help="Number of parallel workers (default: 4). Only used with --parallel.",
+            help="Number of worker processes (default: 4). Only used with --parallel.",
+        )
+        parser.add_argument(
+            "--plan",
+            action="store_true",
+            default=False,
+            help="Print the migration plan without migrating anything.",
+        )
+        parser.add_argument(
+            "--report",
+            type=str,
+            default=None,
+            help="Write a JSON report with per-tenant status and durations to this path.",
         )
 
     def handle(self, *args, **options):
@@ -70,99 +103,133 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING("No tenants to migrate."))
             return
 
+        started = time.perf_counter()
+        self.results = {}
+        self.fanout_stats = None
+
+        # ── Plan ──
         self.stdout.write(
             self.style.MIGRATE_HEADING(
-                f"Migrating {len(tenants)} tenant database(s)...\n"
+                f"Planning migrations for {len(tenants)} tenant database(s)...\n"
             )
         )
+        plan_start = time.perf_counter()
+        tenants_by_alias = self._register(tenants)
+        plans = plan_tenants(tenants_by_alias, target_migrations())
+        groups = group_by_pending(plans)
+        unknown = [p for p in plans if p.status == "unknown"]
+        current = [p for p in plans if p.status == "current"]
+        plan_seconds = time.perf_counter() - plan_start
+        self._print_plan(current, groups, unknown, plan_seconds)
 
-        # ── Migrate ──
-        if options["parallel"] and len(tenants) > 1:
-            self._migrate_parallel(tenants, options["workers"])
-        else:
-            self._migrate_sequential(tenants)
-
-    # ── Sequential ────────────────────────────────────────────────────────
+        for plan in current:
+            self.results[plan.tenant.subdomain] = self._result(plan, "current")
 
-    def _migrate_sequential(self, tenants):
-        success, failed = 0, 0
-        for tenant in tenants:
-            ok = self._migrate_one(tenant)
-            if ok:
-                success += 1
-            else:
-                failed += 1
-
-        self._print_summary(success, failed, len(tenants))
-
-    # ── Parallel ──────────────────────────────────────────────────────────
-
-    def _migrate_parallel(self, tenants, workers):
-        success, failed = 0, 0
-        with ThreadPoolExecutor(max_workers=workers) as executor:
-            futures = {
-                executor.submit(self._migrate_one, t): t for t in tenants
-            }
-            for future in as_completed(futures):
-                if future.result():
-                    success += 1
-                else:
-                    failed += 1
-
-        self._print_summary(success, failed, len(tenants))
-
-    # ── Single tenant migration ───────────────────────────────────────────
-
-    def _migrate_one(self, tenant):
-        """Register the tenant DB and run migrations. Returns True on success."""
-        db_alias = f"tenant_{tenant.id}"
-        db_name = tenant.db_name
-
-        if not db_name:
-            self.stderr.write(
-                self.style.WARNING(
-                    f"  SKIP  {tenant.subdomain} — no db_name configured"
+        # Grouped tenants first, then those whose state couldn't be read
+        to_migrate = [p for _, group in groups for p in group] + unknown
+        if options["plan"]:
+            for plan in to_migrate:
+                self.results[plan.tenant.subdomain] = self._result(plan, plan.status)
+        elif to_migrate:
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"\nMigrating {len(to_migrate)} tenant database(s)...\n"
                 )
             )
-            return False
+            self._migrate(to_migrate, options["parallel"], options["workers"])
+            self._print_summary(to_migrate)
 
-        # Dynamically register the database
-        default_db = settings.DATABASES["default"]
-        if db_alias not in settings.DATABASES:
-            db_config = copy.deepcopy(default_db)
-            db_config.update(
-                {
-                    "NAME": db_name,
-                    "USER": tenant.db_user or default_db.get("USER", ""),
-                    "PASSWORD": tenant.db_password
-                    or default_db.get("PASSWORD", ""),
-                    "HOST": tenant.db_host or default_db.get("HOST", "localhost"),
-                    "PORT": tenant.db_port or default_db.get("PORT", "5432"),
-                    "ATOMIC_REQUESTS": False,
-                }
+        if options["report"]:
+            self._write_report(
+                options["report"], groups, plan_seconds,
+                time.perf_counter() - started,
             )
-            settings.DATABASES[db_alias] = db_config
 
-        self.stdout.write(f"  Migrating {tenant.subdomain} ({db_name}) ... ", ending="")
-        start = time.time()
+    # ── Planning ──────────────────────────────────────────────────────────
 
-        try:
-            call_command("migrate", database=db_alias, verbosity=0)
-            elapsed = time.time() - start
+    def _register(self, tenants):
+        """Register each tenant's database alias. Returns ``{alias: tenant}``."""
+        tenants_by_alias = {}
+        for tenant in tenants:
+            if not tenant.db_name:
+                self.stderr.write(
+                    self.style.WARNING(
+                        f"  SKIP  {tenant.subdomain} — no db_name configured"
+                    )
+                )
+                self.results[tenant.subdomain] = {
+                    "alias": None, "status": "skipped", "error": "no db_name configured",
+                }
+                continue
+
+            db_alias = f"tenant_{tenant.id}"
+            if db_alias not in settings.DATABASES:
+                register_tenant_database(
+                    db_alias, tenant.db_name, tenant.db_user,
+                    tenant.db_password, tenant.db_host, tenant.db_port,
+                )
+            tenants_by_alias[db_alias] = tenant
+        return tenants_by_alias
+
+    def _print_plan(self, current, groups, unknown, seconds):
+        pending = sum(len(group) for _, group in groups)
+        self.stdout.write(
+            f"  {len(current)} current, {pending} pending in {len(groups)} group(s), "
+            f"{len(unknown)} unknown ({seconds:.1f}s)"
+        )
+        for number, (migrations, group) in enumerate(groups, 1):
+            names = sorted(f"{app}.{name}" for app, name in migrations)
+            shown = ", ".join(names[:3]) + (f" (+{len(names) - 3} more)" if len(names) > 3 else "")
             self.stdout.write(
-                self.style.SUCCESS(f"OK ({elapsed:.1f}s)")
+                f"  Group {number}: {len(group)} tenant(s) need {len(names)} migration(s): {shown}"
             )
-            return True
-        except Exception as exc:
-            elapsed = time.time() - start
+        for plan in unknown:
+            self.stdout.write(
+                f"  {plan.tenant.subdomain}: state unknown, full migrate — {plan.error[:80]}"
+            )
+
+    def _result(self, plan, status, seconds=None, error=""):
+        return {
+            "alias": plan.alias,
+            "status": status,
+            "pending": sorted(f"{app}.{name}" for app, name in plan.pending or ()),
+            "duration": round(seconds, 3) if seconds is not None else None,
+            "error": error or plan.error,
+        }
+
+    # ── Migrating ─────────────────────────────────────────────────────────
+
+    def _migrate(self, plans, parallel, workers):
+        """Migrate through the tenant fan-out, in worker processes with --parallel."""
+        fan_out = TenantFanOut(
+            _migrate_tenant, max_workers=workers if parallel else 1, processes=parallel,
+        )
+        plans_by_tenant = {plan.tenant.pk: plan for plan in plans}
+        for result in fan_out.stream([plan.tenant for plan in plans]):
+            plan = plans_by_tenant[result.tenant.pk]
+            self.stdout.write(f"  {plan.tenant.subdomain} ({plan.tenant.db_name}) ... ", ending="")
+            self._record(plan, result.ok, result.seconds, result.error)
+        self.fanout_stats = fan_out.stats
+        self.stdout.write(f"  {fan_out.stats.format()}")
+
+    def _record(self, plan, ok, seconds, error):
+        if ok:
+            self.stdout.write(self.style.SUCCESS(f"OK ({seconds:.1f}s)"))
+        else:
             self.stderr.write(
-                self.style.ERROR(f"FAILED ({elapsed:.1f}s) — {exc}")
+                self.style.ERROR(f"FAILED ({seconds:.1f}s) — {error}")
             )
-            return False
+        self.results[plan.tenant.subdomain] = self._result(
+            plan, "migrated" if ok else "failed", seconds, error
+        )
 
-    # ── Summary ───────────────────────────────────────────────────────────
+    # ── Summary & report ──────────────────────────────────────────────────
 
-    def _print_summary(self, success, failed, total):
+    def _print_summary(self, plans):
+        total = len(plans)
+        failed = sum(
+            1 for p in plans if self.results[p.tenant.subdomain]["status"] == "failed"
+        )
         self.stdout.write("")
         if failed == 0:
             self.stdout.write(
@@ -173,6 +240,30 @@ class Command(BaseCommand):
         else:
             self.stdout.write(
                 self.style.WARNING(
-                    f"Done: {success}/{total} succeeded, {failed} failed."
+                    f"Done: {total - failed}/{total} succeeded, {failed} failed."
                 )
             )
+
+    def _write_report(self, path, groups, plan_seconds, total_seconds):
+        statuses = {}
+        for result in self.results.values():
+            statuses[result["status"]] = statuses.get(result["status"], 0) + 1
+        report = {
+            "generated_at": timezone.now().isoformat(),
+            "migration_state": migration_state(),
+            "plan_seconds": round(plan_seconds, 3),
+            "total_seconds": round(total_seconds, 3),
+            "summary": statuses,
+            "fanout": self.fanout_stats.as_dict() if self.fanout_stats else None,
+            "groups": [
+                {
+                    "migrations": sorted(f"{app}.{name}" for app, name in migrations),
+                    "tenants": [p.tenant.subdomain for p in group],
+                }
+                for migrations, group in groups
+            ],
+            "tenants": self.results,
+        }
+        with open(path, "w") as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(f"Report written to {path}")
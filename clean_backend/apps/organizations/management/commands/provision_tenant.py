@@ -1,7 +1,13 @@
 """
 Management command to provision a new tenant from the command line.
 
-Creates the PostgreSQL database, runs migrations, and creates the admin user.
+Creates the PostgreSQL database, runs migrations, seeds the tenant defaults
+and creates the admin user. Timings for each phase are printed at the end.
+
+With --from-template (or TENANT_PROVISION_FROM_TEMPLATE=True) the database is
+cloned from the pre-migrated template database, so only migrations added
+since the template was built have to run. See ``refresh_tenant_template``.
+--no-from-template creates an empty database even when the setting is on.
 
 Usage:
     python manage.py provision_tenant \\
@@ -16,21 +22,29 @@ Usage:
         --name "Ali Kitchen" \\
         --subdomain ali_kitchen \\
         --admin-email ali@example.com
+
+    # Clone from the template database:
+    python manage.py provision_tenant \\
+        --name "Ali Kitchen" \\
+        --subdomain ali_kitchen \\
+        --from-template
 """
-import copy
+import argparse
 import secrets
 import sys
-import time
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.management import call_command
 from django.core.management.base import BaseCommand, CommandError
 from django.db import connection as default_conn
 from django.utils import timezone
 
 from apps.organizations.models import ServicePlan
 from apps.organizations.models_saas import TenantSubscription
+from apps.organizations.provisioning import (
+    PhaseTimings, create_tenant_database, migrate_tenant_database,
+    register_tenant_database, seed_tenant_defaults,
+)
 from apps.users.models import Tenant
 from core.db.router import set_current_db_alias, get_current_db_alias
 
@@ -77,6 +91,16 @@ class Command(BaseCommand):
             default=False,
             help="Skip running migrations (useful if DB already exists).",
         )
+        parser.add_argument(
+            "--from-template",
+            action=argparse.BooleanOptionalAction,
+            default=getattr(settings, "TENANT_PROVISION_FROM_TEMPLATE", False),
+            help=(
+                "Clone the database from the pre-migrated template database "
+                "(default: TENANT_PROVISION_FROM_TEMPLATE). --no-from-template "
+                "creates an empty database and migrates it."
+            ),
+        )
 
     def handle(self, *args, **options):
         name = options["name"]
@@ -84,6 +108,7 @@ class Command(BaseCommand):
         admin_email = options["admin_email"]
         admin_password = options["admin_password"] or secrets.token_urlsafe(12)
         plan_id = options["plan_id"]
+        timings = PhaseTimings()
 
         # ── Validate ──
         if Tenant.objects.filter(subdomain__iexact=subdomain).exists():
@@ -99,63 +124,66 @@ class Command(BaseCommand):
         db_port = default_db.get("PORT", "5432")
 
         # ── Step 1: Create PostgreSQL database ──
-        self.stdout.write(f"\n1. Creating database '{db_name}' ... ", ending="")
+        source = "template" if options["from_template"] else "empty"
+        self.stdout.write(
+            f"\n1. Creating database '{db_name}' ({source}) ... ", ending=""
+        )
         try:
-            with default_conn.cursor() as cursor:
-                cursor.execute("COMMIT")  # CREATE DATABASE can't run in a tx
-                cursor.execute(f'CREATE DATABASE "{db_name}"')
-            self.stdout.write(self.style.SUCCESS("OK"))
-        except Exception as exc:
-            if "already exists" in str(exc):
+            created = create_tenant_database(
+                db_name,
+                from_template=options["from_template"],
+                timings=timings,
+                connection=default_conn,
+            )
+            if created == "exists":
                 self.stdout.write(self.style.WARNING("already exists (reusing)"))
+            elif created != source:
+                self.stdout.write(
+                    self.style.WARNING("OK (template unavailable, created empty)")
+                )
             else:
-                self.stderr.write(self.style.ERROR(f"FAILED — {exc}"))
-                sys.exit(1)
+                self.stdout.write(self.style.SUCCESS("OK"))
+        except Exception as exc:
+            self.stderr.write(self.style.ERROR(f"FAILED — {exc}"))
+            sys.exit(1)
 
         # ── Step 2: Create tenant record ──
         self.stdout.write("2. Creating tenant record ... ", ending="")
-        tenant = Tenant.objects.create(
-            name=name,
-            subdomain=subdomain,
-            schema_name=subdomain,
-            db_name=db_name,
-            db_user=db_user,
-            db_password=db_password,
-            db_host=db_host,
-            db_port=db_port,
-            is_active=True,
-        )
+        with timings.phase("tenant_record"):
+            tenant = Tenant.objects.create(
+                name=name,
+                subdomain=subdomain,
+                schema_name=subdomain,
+                db_name=db_name,
+                db_user=db_user,
+                db_password=db_password,
+                db_host=db_host,
+                db_port=db_port,
+                is_active=True,
+            )
         self.stdout.write(self.style.SUCCESS(f"OK (id={tenant.id})"))
 
         # DB alias for tenant DB (id can be None in test/transaction before flush)
         db_alias = f"tenant_{tenant.id}" if tenant.id is not None else f"tenant_{subdomain}"
+        register_tenant_database(
+            db_alias, db_name, db_user, db_password, db_host, db_port
+        )
 
-        # ── Step 3: Run migrations ──
+        # ── Step 3: Run migrations & seed defaults ──
         if not options["skip_migrate"]:
             self.stdout.write("3. Running migrations ... ", ending="")
-            db_config = copy.deepcopy(default_db)
-            db_config.update(
-                {
-                    "NAME": db_name,
-                    "USER": db_user,
-                    "PASSWORD": db_password,
-                    "HOST": db_host,
-                    "PORT": db_port,
-                    "ATOMIC_REQUESTS": False,
-                }
-            )
-            settings.DATABASES[db_alias] = db_config
-
-            start = time.time()
             try:
-                call_command("migrate", database=db_alias, verbosity=0)
-                elapsed = time.time() - start
-                self.stdout.write(self.style.SUCCESS(f"OK ({elapsed:.1f}s)"))
-            except Exception as exc:
-                elapsed = time.time() - start
-                self.stderr.write(
-                    self.style.ERROR(f"FAILED ({elapsed:.1f}s) — {exc}")
+                migrate_tenant_database(db_alias, timings=timings)
+                with timings.phase("seed"):
+                    seeded = seed_tenant_defaults(db_alias)
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"OK ({timings.phases['migrate']:.1f}s, "
+                        f"seeded {sum(seeded.values())} default row(s))"
+                    )
                 )
+            except Exception as exc:
+                self.stderr.write(self.style.ERROR(f"FAILED — {exc}"))
                 self.stderr.write(
                     "  Tenant record was created but migrations failed. "
                     "Fix the issue and run: "
@@ -163,18 +191,6 @@ class Command(BaseCommand):
                 )
         else:
             self.stdout.write("3. Skipping migrations (--skip-migrate)")
-            db_config = copy.deepcopy(default_db)
-            db_config.update(
-                {
-                    "NAME": db_name,
-                    "USER": db_user,
-                    "PASSWORD": db_password,
-                    "HOST": db_host,
-                    "PORT": db_port,
-                    "ATOMIC_REQUESTS": False,
-                }
-            )
-            settings.DATABASES[db_alias] = db_config
 
         # ── Step 4: Create admin user (in the TENANT database) ──
         self.stdout.write("4. Creating admin user in tenant DB ... ", ending="")
@@ -186,25 +202,26 @@ class Command(BaseCommand):
         # Switch to tenant DB context so User.objects routes there
         old_alias = get_current_db_alias()
         set_current_db_alias(db_alias)
-        try:
-            counter = 1
-            while User.objects.filter(username=username).exists():
-                username = f"{base_username}{counter}"
-                counter += 1
+        with timings.phase("admin_user"):
+            try:
+                counter = 1
+                while User.objects.filter(username=username).exists():
+                    username = f"{base_username}{counter}"
+                    counter += 1
 
-            admin_user = User.objects.create_user(
-                username=username,
-                email=admin_email,
-                password=admin_password,
-                is_staff=True,
-                is_active=True,
-            )
+                admin_user = User.objects.create_user(
+                    username=username,
+                    email=admin_email,
+                    password=admin_password,
+                    is_staff=True,
+                    is_active=True,
+                )
 
-            self.stdout.write(
-                self.style.SUCCESS(f"OK (username={username}, id={admin_user.id})")
-            )
-        finally:
-            set_current_db_alias(old_alias)
+                self.stdout.write(
+                    self.style.SUCCESS(f"OK (username={username}, id={admin_user.id})")
+                )
+            finally:
+                set_current_db_alias(old_alias)
 
         # ── Step 5: Assign plan & create subscription ──
         if plan_id:
@@ -255,4 +272,5 @@ class Command(BaseCommand):
             )
         else:
             self.stdout.write("  Password:  ****  (as provided)")
+        self.stdout.write(f"  Timings:   {timings.format()}")
         self.stdout.write("")
@@ -0,0 +1,39 @@
+"""
+Build or bring forward the template database new tenants are cloned from.
+
+Run after deploying new migrations so the first tenant provisioned
+afterwards doesn't pay for migrating the template.
+
+Usage:
+    python manage.py refresh_tenant_template
+    python manage.py refresh_tenant_template --force   # re-run even if current
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.organizations.provisioning import (
+    ensure_template_database, migration_state, template_name,
+)
+
+
+class Command(BaseCommand):
+    help = "Create or migrate the tenant template database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            default=False,
+            help="Migrate and re-seed the template even if it is current.",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"Template '{template_name()}' (migration state {migration_state()}) ... ",
+            ending="",
+        )
+        start = time.perf_counter()
+        status = ensure_template_database(force=options["force"])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"{status} ({elapsed:.1f}s)"))
@@ -0,0 +1,88 @@
+"""
+Plan tenant migrations before running them.
+
+``target_migrations()`` loads the migration graph from disk once;
+``plan_tenants()`` reads each tenant's ``django_migrations`` table with a
+single query and classifies the tenant as:
+
+- ``current``: nothing to apply, the tenant is skipped;
+- ``pending``: the exact set of migrations still to apply. Tenants needing
+  the same set are grouped by ``group_by_pending()``;
+- ``unknown``: the state couldn't be read (new, empty or unreachable
+  database), so the tenant gets a full ``migrate``.
+"""
+from django.db import connections
+from django.db.migrations.loader import MigrationLoader
+
+
+def target_migrations():
+    """
+    Every migration on disk as ``{(app, name): replaces}``. Squashed
+    migrations carry the keys of the migrations they replace.
+    """
+    graph = MigrationLoader(None, ignore_no_migrations=True).graph
+    return {key: tuple(tuple(r) for r in graph.nodes[key].replaces) for key in graph.nodes}
+
+
+def applied_migrations(alias):
+    """The ``(app, name)`` rows recorded in ``django_migrations`` on ``alias``."""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT app, name FROM django_migrations")
+            return set(cursor.fetchall())
+    finally:
+        connection.close()
+
+
+def pending_migrations(target, applied):
+    """Migrations in ``target`` not recorded in ``applied`` (a squash counts if all it replaces is)."""
+    return frozenset(
+        key for key, replaces in target.items()
+        if key not in applied and not (replaces and all(r in applied for r in replaces))
+    )
+
+
+class TenantPlan:
+    """Migration plan for one tenant database."""
+
+    def __init__(self, tenant, alias, pending=None, error=''):
+        self.tenant = tenant
+        self.alias = alias
+        self.pending = pending
+        self.error = error
+
+    @property
+    def status(self):
+        if self.pending is None:
+            return 'unknown'
+        return 'pending' if self.pending else 'current'
+
+
+def plan_tenants(tenants_by_alias, target=None):
+    """
+    Build a ``TenantPlan`` per ``{alias: tenant}`` entry. The aliases must
+    already be registered in ``settings.DATABASES``.
+    """
+    target = target if target is not None else target_migrations()
+    plans = []
+    for alias, tenant in tenants_by_alias.items():
+        try:
+            applied = applied_migrations(alias)
+        except Exception as exc:
+            plans.append(TenantPlan(tenant, alias, error=' '.join(str(exc).split())))
+            continue
+        plans.append(TenantPlan(tenant, alias, pending_migrations(target, applied)))
+    return plans
+
+
+def group_by_pending(plans):
+    """
+    ``[(pending, [plans])]`` for tenants with pending migrations, largest
+    group first. Tenants in a group need exactly the same migrations.
+    """
+    groups = {}
+    for plan in plans:
+        if plan.status == 'pending':
+            groups.setdefault(plan.pending, []).append(plan)
+    return sorted(groups.items(), key=lambda item: -len(item[1]))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("organizations", "0005_alter_serviceplan_max_customers_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenantusage",
+            name="orders_counted_until",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="Watermark: order_count includes orders created up to this time",
+                null=True,
+            ),
+        ),
+    ]
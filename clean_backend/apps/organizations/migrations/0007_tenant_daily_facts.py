@@ -0,0 +1,94 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:06
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_add_tenant_to_userprofile"),
+        ("organizations", "0006_tenantusage_orders_counted_until"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantFactWatermark",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("loaded_through", models.DateField()),
+                ("loaded_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fact_watermark",
+                        to="users.tenant",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="TenantDailyFact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("orders_pending", models.PositiveIntegerField(default=0)),
+                ("orders_confirmed", models.PositiveIntegerField(default=0)),
+                ("orders_preparing", models.PositiveIntegerField(default=0)),
+                ("orders_ready", models.PositiveIntegerField(default=0)),
+                ("orders_delivered", models.PositiveIntegerField(default=0)),
+                ("orders_cancelled", models.PositiveIntegerField(default=0)),
+                ("deliveries_scheduled", models.PositiveIntegerField(default=0)),
+                ("deliveries_delivered", models.PositiveIntegerField(default=0)),
+                ("deliveries_failed", models.PositiveIntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=12
+                    ),
+                ),
+                ("new_customers", models.PositiveIntegerField(default=0)),
+                ("active_subscriptions", models.PositiveIntegerField(default=0)),
+                ("subscriptions_started", models.PositiveIntegerField(default=0)),
+                ("subscriptions_ended", models.PositiveIntegerField(default=0)),
+                ("loaded_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_facts",
+                        to="users.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["date"],
+                "indexes": [
+                    models.Index(fields=["date"], name="tenant_daily_fact_date_idx")
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="tenantdailyfact",
+            constraint=models.UniqueConstraint(
+                fields=("tenant", "date"), name="unique_tenant_daily_fact"
+            ),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_add_tenant_to_userprofile"),
+        ("organizations", "0007_tenant_daily_facts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantRetentionPolicy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("is_enabled", models.BooleanField(default=False)),
+                (
+                    "storage",
+                    models.CharField(
+                        choices=[
+                            ("table", "Archive tables"),
+                            ("file", "Compressed JSONL files"),
+                        ],
+                        default="table",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "order_days",
+                    models.PositiveIntegerField(
+                        default=365,
+                        help_text="Delivered/cancelled orders, with their deliveries and kitchen tickets",
+                    ),
+                ),
+                (
+                    "delivery_days",
+                    models.PositiveIntegerField(
+                        default=365,
+                        help_text="Closed delivery statuses, with their assignments and notifications",
+                    ),
+                ),
+                ("notification_days", models.PositiveIntegerField(default=180)),
+                ("wallet_days", models.PositiveIntegerField(default=730)),
+                ("last_run_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="retention_policy",
+                        to="users.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "tenant retention policies",
+            },
+        ),
+    ]
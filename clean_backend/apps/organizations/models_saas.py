@@ -5,6 +5,7 @@ These live in the shared/default database and track:
 - Tenant subscriptions to service plans
 - Billing invoices for tenants
 - Usage metrics per tenant
+- Analytics rollups and retention policies per tenant
 """
 import uuid
 from decimal import Decimal
@@ -154,6 +155,10 @@ class TenantUsage(models.Model):
     menu_item_count = models.PositiveIntegerField(default=0)
     subscription_count = models.PositiveIntegerField(default=0)
     revenue = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    orders_counted_until = models.DateTimeField(
+        null=True, blank=True,
+        help_text="Watermark: order_count includes orders created up to this time",
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -164,3 +169,106 @@ class TenantUsage(models.Model):
 
     def __str__(self):
         return f"{self.tenant.name} — {self.period.strftime('%B %Y')}"
+
+
+class TenantDailyFact(models.Model):
+    """
+    One row per tenant per day of operational aggregates, copied out of
+    the tenant databases by ``apps.organizations.analytics`` so platform
+    analytics never has to query tenant databases.
+    Orders and deliveries are keyed by delivery date; revenue (wallet
+    debits) and new customers by the day they were recorded;
+    subscriptions by their start and end dates.
+    """
+    tenant = models.ForeignKey(
+        'users.Tenant',
+        on_delete=models.CASCADE,
+        related_name='daily_facts',
+    )
+    date = models.DateField()
+
+    orders_pending = models.PositiveIntegerField(default=0)
+    orders_confirmed = models.PositiveIntegerField(default=0)
+    orders_preparing = models.PositiveIntegerField(default=0)
+    orders_ready = models.PositiveIntegerField(default=0)
+    orders_delivered = models.PositiveIntegerField(default=0)
+    orders_cancelled = models.PositiveIntegerField(default=0)
+    deliveries_scheduled = models.PositiveIntegerField(default=0)
+    deliveries_delivered = models.PositiveIntegerField(default=0)
+    deliveries_failed = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    new_customers = models.PositiveIntegerField(default=0)
+    active_subscriptions = models.PositiveIntegerField(default=0)
+    subscriptions_started = models.PositiveIntegerField(default=0)
+    subscriptions_ended = models.PositiveIntegerField(default=0)
+
+    loaded_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['date']
+        constraints = [
+            models.UniqueConstraint(fields=['tenant', 'date'], name='unique_tenant_daily_fact'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='tenant_daily_fact_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tenant.name} — {self.date}"
+
+
+class TenantFactWatermark(models.Model):
+    """How far ``TenantDailyFact`` has been loaded for a tenant."""
+    tenant = models.OneToOneField(
+        'users.Tenant',
+        on_delete=models.CASCADE,
+        related_name='fact_watermark',
+    )
+    loaded_through = models.DateField()
+    loaded_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.tenant.name} facts through {self.loaded_through}"
+
+
+class TenantRetentionPolicy(models.Model):
+    """
+    How long a tenant keeps operational history in its live tables.
+    Older rows are moved out by ``apps.main.retention``, either into the
+    tenant's archive tables or into compressed JSONL files on disk, and
+    stay readable through the ``archived`` API routes. A horizon of 0
+    keeps that history forever.
+    """
+    STORAGE_CHOICES = [
+        ('table', 'Archive tables'),
+        ('file', 'Compressed JSONL files'),
+    ]
+
+    tenant = models.OneToOneField(
+        'users.Tenant',
+        on_delete=models.CASCADE,
+        related_name='retention_policy',
+    )
+    is_enabled = models.BooleanField(default=False)
+    storage = models.CharField(max_length=10, choices=STORAGE_CHOICES, default='table')
+
+    # Horizons in days (0 = keep forever)
+    order_days = models.PositiveIntegerField(
+        default=365,
+        help_text="Delivered/cancelled orders, with their deliveries and kitchen tickets",
+    )
+    delivery_days = models.PositiveIntegerField(
+        default=365,
+        help_text="Closed delivery statuses, with their assignments and notifications",
+    )
+    notification_days = models.PositiveIntegerField(default=180)
+    wallet_days = models.PositiveIntegerField(default=730)
+
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'tenant retention policies'
+
+    def __str__(self):
+        return f"{self.tenant.name} retention ({self.get_storage_display()})"
@@ -0,0 +1,236 @@
+"""
+Tenant database provisioning from a pre-migrated template database.
+
+Running every migration for each new tenant gets slower with every
+migration added. Instead, a golden template database
+(``settings.TENANT_TEMPLATE_DB_NAME``) is kept migrated and seeded with the
+tenant defaults, and new tenant databases are cloned from it with
+``CREATE DATABASE ... TEMPLATE``. The template records the migration state
+it was built for in its database comment. When new migrations ship, the
+template is brought forward once and later clones only run the delta.
+
+    timings = PhaseTimings()
+    create_tenant_database('tenant_acme', from_template=True, timings=timings)
+    register_tenant_database('tenant_7', 'tenant_acme')
+    migrate_tenant_database('tenant_7', timings=timings)
+    seed_tenant_defaults('tenant_7')
+    print(timings.format())
+"""
+import copy
+import hashlib
+import logging
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+
+from apps.main.management.commands.seed_meal_slots import DEFAULT_SLOTS
+from apps.main.models import Category, MealSlot
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_ALIAS = '_tenant_template'
+_STATE_PREFIX = 'migrations:'
+
+DEFAULT_CATEGORIES = [
+    {'name': 'Inventory', 'description': 'Default category for inventory items'},
+]
+
+
+class PhaseTimings:
+    """Wall-clock seconds per provisioning phase, in the order they ran."""
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    @property
+    def total(self):
+        return sum(self.phases.values())
+
+    def format(self):
+        parts = [f"{name} {seconds:.2f}s" for name, seconds in self.phases.items()]
+        return ', '.join(parts + [f"total {self.total:.2f}s"])
+
+
+def template_name():
+    return getattr(settings, 'TENANT_TEMPLATE_DB_NAME', 'tenant_template')
+
+
+def register_tenant_database(alias, db_name, user=None, password=None, host=None, port=None):
+    """Add ``alias`` to ``settings.DATABASES`` as a copy of default pointing at ``db_name``."""
+    default_db = settings.DATABASES['default']
+    db_config = copy.deepcopy(default_db)
+    db_config.update({
+        'NAME': db_name,
+        'USER': user or default_db.get('USER', ''),
+        'PASSWORD': password or default_db.get('PASSWORD', ''),
+        'HOST': host or default_db.get('HOST', 'localhost'),
+        'PORT': port or default_db.get('PORT', '5432'),
+        'ATOMIC_REQUESTS': False,
+    })
+    settings.DATABASES[alias] = db_config
+    return alias
+
+
+def ensure_tenant_alias(alias, tenant=None):
+    """
+    Make sure ``alias`` (``default`` or ``tenant_<id>``) is in
+    ``settings.DATABASES``, registering it from its Tenant record (looked up
+    unless given) if this process has not seen it yet, e.g. in a worker.
+    """
+    if alias in settings.DATABASES:
+        return alias
+    from apps.users.models import Tenant
+
+    if tenant is None:
+        tenant = Tenant.objects.using('default').get(pk=int(alias[len('tenant_'):]))
+    return register_tenant_database(
+        alias, tenant.db_name or f"kitchen_tenant_{tenant.subdomain}",
+        tenant.db_user, tenant.db_password, tenant.db_host, tenant.db_port,
+    )
+
+
+def migration_state():
+    """
+    Short hash of the migration graph's leaf nodes. It changes whenever a
+    migration is added, so it identifies the schema a template was built for.
+    """
+    from django.db.migrations.loader import MigrationLoader
+
+    leaves = sorted(MigrationLoader(None, ignore_no_migrations=True).graph.leaf_nodes())
+    return hashlib.sha1(repr(leaves).encode()).hexdigest()[:16]
+
+
+def _execute_ddl(sql, connection=None):
+    connection = connection or connections['default']
+    with connection.cursor() as cursor:
+        cursor.execute("COMMIT")  # CREATE DATABASE can't run in a tx
+        cursor.execute(sql)
+
+
+def _already_exists(exc):
+    return 'already exists' in str(exc)
+
+
+def template_state(connection=None):
+    """
+    Migration state recorded on the template database: None if the template
+    does not exist, '' if it exists but was never completed.
+    """
+    connection = connection or connections['default']
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT shobj_description(oid, 'pg_database') FROM pg_database WHERE datname = %s",
+            [template_name()],
+        )
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    comment = row[0] or ''
+    return comment[len(_STATE_PREFIX):] if comment.startswith(_STATE_PREFIX) else ''
+
+
+def ensure_template_database(force=False, connection=None):
+    """
+    Make sure the template exists and matches the current migrations.
+    Returns 'current', 'created' or 'refreshed'.
+    """
+    name = template_name()
+    state = migration_state()
+    recorded = template_state(connection)
+    if recorded == state and not force:
+        return 'current'
+
+    status = 'refreshed'
+    if recorded is None:
+        try:
+            _execute_ddl(f'CREATE DATABASE "{name}"', connection)
+            status = 'created'
+        except Exception as exc:
+            # Another process created it first; migrating again is harmless
+            if not _already_exists(exc):
+                raise
+
+    register_tenant_database(TEMPLATE_ALIAS, name)
+    try:
+        call_command('migrate', database=TEMPLATE_ALIAS, verbosity=0)
+        seed_tenant_defaults(TEMPLATE_ALIAS)
+    finally:
+        # CREATE DATABASE ... TEMPLATE refuses a source with open sessions
+        connections[TEMPLATE_ALIAS].close()
+        del connections[TEMPLATE_ALIAS]
+        del settings.DATABASES[TEMPLATE_ALIAS]
+
+    _execute_ddl(f"COMMENT ON DATABASE \"{name}\" IS '{_STATE_PREFIX}{state}'", connection)
+    logger.info("Tenant template %s %s (migration state %s)", name, status, state)
+    return status
+
+
+def create_tenant_database(db_name, from_template=False, timings=None, connection=None):
+    """
+    Create the tenant database ``db_name``. With ``from_template`` it is
+    cloned from the template, falling back to an empty database if the
+    template can't be used (e.g. someone is connected to it).
+
+    Returns 'template', 'empty', or 'exists' if the database was already there.
+    """
+    timings = timings or PhaseTimings()
+    if from_template:
+        try:
+            with timings.phase('template'):
+                ensure_template_database(connection=connection)
+            with timings.phase('create_db'):
+                _execute_ddl(f'CREATE DATABASE "{db_name}" TEMPLATE "{template_name()}"', connection)
+            return 'template'
+        except Exception as exc:
+            if _already_exists(exc):
+                return 'exists'
+            logger.warning("Could not clone %s from the template, creating it empty: %s", db_name, exc)
+
+    with timings.phase('create_db'):
+        try:
+            _execute_ddl(f'CREATE DATABASE "{db_name}"', connection)
+        except Exception as exc:
+            if _already_exists(exc):
+                return 'exists'
+            raise
+    return 'empty'
+
+
+def migrate_tenant_database(alias, timings=None):
+    """Apply outstanding migrations; on a fresh clone this is only the delta."""
+    timings = timings or PhaseTimings()
+    with timings.phase('migrate'):
+        call_command('migrate', database=alias, verbosity=0)
+
+
+def _seed_missing(model, alias, key, rows):
+    manager = model.objects.using(alias)
+    existing = set(
+        manager.filter(**{f'{key}__in': [row[key] for row in rows]}).values_list(key, flat=True)
+    )
+    missing = [model(**row) for row in rows if row[key] not in existing]
+    if missing:
+        manager.bulk_create(missing)
+    return len(missing)
+
+
+def seed_tenant_defaults(alias):
+    """
+    Insert whichever default meal slots and categories are missing: one read
+    and at most one insert per model. Returns the number created per model.
+    """
+    return {
+        'meal_slots': _seed_missing(MealSlot, alias, 'code', DEFAULT_SLOTS),
+        'categories': _seed_missing(Category, alias, 'name', DEFAULT_CATEGORIES),
+    }
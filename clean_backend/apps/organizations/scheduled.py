@@ -0,0 +1,16 @@
+"""Scheduled jobs for platform metrics (see apps/jobs/scheduler.py)."""
+from apps.jobs.scheduler import scheduled_job
+from apps.organizations.analytics import load_facts
+from apps.organizations.usage import sync_usage
+
+
+@scheduled_job('sync_saas_metrics', cron={'minute': 15}, min_gap=600)
+def sync_saas_metrics():
+    """Refresh this month's TenantUsage for every active tenant (hourly)."""
+    return {'tenants': sync_usage()}
+
+
+@scheduled_job('load_analytics_facts', cron={'minute': 45}, min_gap=600)
+def load_analytics_facts():
+    """Load the recent days of TenantDailyFact for every active tenant (hourly)."""
+    return {'tenants': load_facts()}
@@ -0,0 +1,162 @@
+import datetime
+import pytest
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, connections
+from django.utils import timezone
+from rest_framework.test import APIClient
+from apps.driver.models import DeliveryStatus
+from apps.main.models import (
+    CustomerProfile, MealPackage, MealSlot, Order, Subscription, WalletTransaction,
+)
+from apps.organizations.analytics import load_facts
+from apps.organizations.models_saas import TenantDailyFact, TenantFactWatermark
+from apps.users.models import Tenant
+
+User = get_user_model()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestLoadFacts:
+    """The tenant's database is the test database itself."""
+
+    @pytest.fixture(autouse=True)
+    def _windows(self, settings):
+        settings.ANALYTICS_BACKFILL_DAYS = 5
+        settings.ANALYTICS_SETTLE_DAYS = 1
+
+    def setup_method(self):
+        self.tenant = Tenant.objects.create(
+            name='Facts', subdomain='facts', schema_name='facts',
+            db_name=connection.settings_dict['NAME'], is_active=True,
+        )
+        self.today = timezone.localdate()
+        self.customer = CustomerProfile.objects.create(user=User.objects.create_user(username='facts_cust'), name='F')
+        self.subscription = Subscription.objects.create(
+            customer=self.customer,
+            meal_package=MealPackage.objects.create(name='Standard', price=100),
+            time_slot=MealSlot.objects.create(name='Lunch', code='lunch'),
+            start_date=self.today, end_date=self.today + datetime.timedelta(days=30), status='active',
+            selected_days=['Monday'],
+        )
+
+    def teardown_method(self):
+        alias = f'tenant_{self.tenant.id}'
+        if alias in connections:
+            connections[alias].close()
+        settings.DATABASES.pop(alias, None)
+
+    def _order(self, days_ago, status):
+        order = Order.objects.create(
+            subscription=self.subscription, order_date=self.today,
+            delivery_date=self.today - datetime.timedelta(days=days_ago),
+        )
+        Order.objects.filter(pk=order.pk).update(status=status)
+
+    def _fact(self, day):
+        return TenantDailyFact.objects.get(tenant=self.tenant, date=day)
+
+    def test_backfill_then_incremental(self):
+        yesterday = self.today - datetime.timedelta(days=1)
+        self._order(1, 'delivered')
+        self._order(1, 'cancelled')
+        self._order(0, 'pending')
+        DeliveryStatus.objects.update_or_create(
+            subscription=self.subscription, date=self.today, defaults={'status': 'delivered'},
+        )
+        DeliveryStatus.objects.create(subscription=self.subscription, date=yesterday, status='failed')
+        WalletTransaction.objects.bulk_create([
+            WalletTransaction(customer=self.customer, amount=Decimal('12.50'), transaction_type='debit',
+                              description='Delivery', reference_id='facts-1'),
+        ])
+
+        outcome, = load_facts()
+        assert outcome['result'] == {'from': (self.today - datetime.timedelta(days=5)).isoformat(), 'days': 6}
+        assert TenantDailyFact.objects.filter(tenant=self.tenant).count() == 6
+        assert TenantFactWatermark.objects.get(tenant=self.tenant).loaded_through == self.today
+
+        past, today = self._fact(yesterday), self._fact(self.today)
+        assert (past.orders_delivered, past.orders_cancelled, past.deliveries_failed) == (1, 1, 1)
+        assert (today.orders_pending, today.deliveries_delivered, today.deliveries_scheduled) == (1, 1, 1)
+        assert today.revenue == Decimal('12.50') and today.new_customers == 1
+        assert (today.active_subscriptions, today.subscriptions_started) == (1, 1)
+        assert past.active_subscriptions == 0
+
+        # The next day's run reloads only the settle window
+        tomorrow = self.today + datetime.timedelta(days=1)
+        TenantDailyFact.objects.filter(tenant=self.tenant, date=yesterday).update(orders_delivered=99)
+        self._order(0, 'delivered')
+        outcome, = load_facts(today=tomorrow)
+        assert outcome['result'] == {'from': yesterday.isoformat(), 'days': 3}
+        assert self._fact(yesterday).orders_delivered == 1
+        assert self._fact(self.today).orders_delivered == 1
+        assert self._fact(tomorrow).active_subscriptions == 1
+        assert TenantFactWatermark.objects.get(tenant=self.tenant).loaded_through == tomorrow
+
+    def test_failed_tenant_keeps_watermark(self):
+        broken = Tenant.objects.create(
+            name='Broken', subdomain='broken', schema_name='broken', db_name='zz_missing_db', is_active=True,
+        )
+        try:
+            outcomes = {outcome['tenant']: outcome for outcome in load_facts(max_workers=2)}
+        finally:
+            settings.DATABASES.pop(f'tenant_{broken.id}', None)
+        assert 'error' in outcomes['broken']
+        assert outcomes['facts']['result']['days'] == 6
+        assert not TenantFactWatermark.objects.filter(tenant=broken).exists()
+
+
+@pytest.mark.django_db
+class TestAnalyticsEndpoints:
+    def setup_method(self):
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.client.force_authenticate(user=User.objects.create_superuser(username='facts_admin', password='x'))
+        self.one = Tenant.objects.create(name='One', subdomain='one', schema_name='one')
+        self.two = Tenant.objects.create(name='Two', subdomain='two', schema_name='two')
+        self.start = datetime.date(2026, 3, 30)
+        for offset in range(4):  # Mon 30 Mar .. Thu 2 Apr
+            day = self.start + datetime.timedelta(days=offset)
+            TenantDailyFact.objects.create(
+                tenant=self.one, date=day, orders_delivered=2, orders_cancelled=1,
+                deliveries_delivered=3, deliveries_failed=1, revenue=Decimal('10.00'), active_subscriptions=4,
+            )
+            TenantDailyFact.objects.create(tenant=self.two, date=day, orders_pending=1, active_subscriptions=2)
+
+    def test_daily_series(self):
+        res = self.client.get('/api/saas/analytics/timeseries/', {'start': '2026-03-30', 'end': '2026-04-01'})
+        assert res.status_code == 200
+        assert [point['period'] for point in res.data['series']] == [
+            datetime.date(2026, 3, 30), datetime.date(2026, 3, 31), datetime.date(2026, 4, 1),
+        ]
+        point = res.data['series'][0]
+        assert (point['orders'], point['orders_pending'], point['revenue']) == (4, 1, Decimal('10.00'))
+        assert point['delivery_success_rate'] == 0.75
+        assert point['active_subscriptions'] == 6
+
+    def test_monthly_series_for_one_tenant(self):
+        res = self.client.get('/api/saas/analytics/timeseries/', {
+            'start': '2026-03-01', 'end': '2026-04-30', 'interval': 'month', 'tenant': self.one.id,
+        })
+        assert [(point['period'], point['orders']) for point in res.data['series']] == [
+            (datetime.date(2026, 3, 1), 6), (datetime.date(2026, 4, 1), 6),
+        ]
+        # A snapshot metric is averaged over the bucket, not summed
+        assert res.data['series'][0]['active_subscriptions'] == 4
+
+    def test_tenant_breakdown(self):
+        res = self.client.get('/api/saas/analytics/tenants/', {'start': '2026-03-30', 'end': '2026-04-02'})
+        assert res.status_code == 200
+        assert [(row['subdomain'], row['orders']) for row in res.data['tenants']] == [('one', 12), ('two', 4)]
+        assert res.data['tenants'][1]['delivery_success_rate'] is None
+
+    def test_invalid_params(self):
+        url = '/api/saas/analytics/timeseries/'
+        assert self.client.get(url, {'interval': 'hour'}).status_code == 400
+        assert self.client.get(url, {'start': '30-03-2026'}).status_code == 400
+        assert self.client.get(url, {'start': '2026-04-02', 'end': '2026-04-01'}).status_code == 400
+        assert self.client.get(url, {'tenant': 'one'}).status_code == 400
+
+    def test_superuser_only(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='facts_staff', is_staff=True))
+        assert self.client.get('/api/saas/analytics/tenants/').status_code == 403
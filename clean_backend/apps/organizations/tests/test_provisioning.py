@@ -0,0 +1,153 @@
+import pytest
+from io import StringIO
+from unittest.mock import patch, MagicMock
+from django.core.management import call_command
+from apps.main.models import Category, MealSlot
+from apps.organizations import provisioning
+from apps.organizations.provisioning import (
+    PhaseTimings, create_tenant_database, ensure_template_database,
+    migration_state, seed_tenant_defaults,
+)
+from apps.users.models import Tenant
+
+
+def _connection():
+    conn = MagicMock()
+    cursor = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cursor
+    return conn, cursor
+
+
+def _executed(cursor):
+    return [c.args[0] for c in cursor.execute.call_args_list]
+
+
+class TestPhaseTimings:
+    def test_phases_accumulate_in_order(self):
+        timings = PhaseTimings()
+        with timings.phase('create_db'):
+            pass
+        with timings.phase('migrate'):
+            pass
+        with timings.phase('create_db'):
+            pass
+        assert list(timings.phases) == ['create_db', 'migrate']
+        assert timings.total == sum(timings.phases.values())
+        assert timings.format().endswith(f"total {timings.total:.2f}s")
+
+
+class TestTemplateCloning:
+    def test_migration_state_is_stable(self):
+        assert migration_state() == migration_state()
+        assert len(migration_state()) == 16
+
+    @patch('apps.organizations.provisioning.ensure_template_database')
+    def test_clones_from_template(self, mock_ensure):
+        conn, cursor = _connection()
+        timings = PhaseTimings()
+
+        created = create_tenant_database('tenant_acme', from_template=True, timings=timings, connection=conn)
+
+        assert created == 'template'
+        mock_ensure.assert_called_once()
+        assert 'CREATE DATABASE "tenant_acme" TEMPLATE "tenant_template"' in _executed(cursor)
+        assert set(timings.phases) == {'template', 'create_db'}
+
+    @patch('apps.organizations.provisioning.ensure_template_database')
+    def test_falls_back_to_empty_database(self, mock_ensure):
+        conn, cursor = _connection()
+        mock_ensure.side_effect = Exception('source database "tenant_template" is being accessed by other users')
+
+        created = create_tenant_database('tenant_acme', from_template=True, connection=conn)
+
+        assert created == 'empty'
+        assert _executed(cursor)[-1] == 'CREATE DATABASE "tenant_acme"'
+
+    def test_existing_database_is_reused(self):
+        conn, cursor = _connection()
+        cursor.execute.side_effect = [None, Exception('database "tenant_acme" already exists')]
+        assert create_tenant_database('tenant_acme', connection=conn) == 'exists'
+
+    @patch('apps.organizations.provisioning.call_command')
+    @patch('apps.organizations.provisioning.template_state')
+    def test_current_template_is_left_alone(self, mock_state, mock_call_command):
+        mock_state.return_value = migration_state()
+        conn, cursor = _connection()
+
+        assert ensure_template_database(connection=conn) == 'current'
+        mock_call_command.assert_not_called()
+        cursor.execute.assert_not_called()
+
+    @patch('apps.organizations.provisioning.seed_tenant_defaults')
+    @patch('apps.organizations.provisioning.call_command')
+    @patch('apps.organizations.provisioning.template_state', return_value='0123456789abcdef')
+    def test_stale_template_is_migrated_and_restamped(self, mock_state, mock_call_command, mock_seed):
+        conn, cursor = _connection()
+
+        assert ensure_template_database(connection=conn) == 'refreshed'
+        mock_call_command.assert_called_once_with('migrate', database=provisioning.TEMPLATE_ALIAS, verbosity=0)
+        mock_seed.assert_called_once_with(provisioning.TEMPLATE_ALIAS)
+        assert _executed(cursor)[-1] == (
+            f"COMMENT ON DATABASE \"tenant_template\" IS 'migrations:{migration_state()}'"
+        )
+        from django.conf import settings
+        assert provisioning.TEMPLATE_ALIAS not in settings.DATABASES
+
+
+@pytest.mark.django_db
+class TestSeedTenantDefaults:
+    def test_seeds_in_bulk_and_is_idempotent(self, django_assert_num_queries):
+        MealSlot.objects.create(name='Lunch', code='lunch')
+
+        # One read and one insert per model with missing rows
+        with django_assert_num_queries(4):
+            created = seed_tenant_defaults('default')
+        assert created == {'meal_slots': 1, 'categories': 1}
+
+        with django_assert_num_queries(2):
+            assert seed_tenant_defaults('default') == {'meal_slots': 0, 'categories': 0}
+        assert MealSlot.objects.filter(code__in=['lunch', 'dinner']).count() == 2
+        assert Category.objects.filter(name='Inventory').count() == 1
+
+
+@pytest.mark.django_db(databases={'default': True})
+@patch('django.db.backends.postgresql.base.DatabaseWrapper.get_database_version', return_value=(14, 0, 0))
+class TestProvisionFromTemplate:
+    @patch('apps.organizations.provisioning.ensure_template_database')
+    @patch('apps.organizations.management.commands.provision_tenant.default_conn')
+    @patch('psycopg2.connect')
+    @patch('psycopg2.extras.register_default_jsonb')
+    @patch('apps.organizations.management.commands.provision_tenant.User')
+    def test_command_clones_and_reports_timings(self, mock_user, mock_register_jsonb, mock_connect,
+                                                 mock_default_conn, mock_ensure, mock_get_db_version):
+        mock_user.objects.filter.return_value.exists.return_value = False
+        mock_cursor = MagicMock()
+        mock_default_conn.cursor.return_value.__enter__.return_value = mock_cursor
+        out = StringIO()
+
+        call_command('provision_tenant', subdomain='tpl-kitchen', name='Template Kitchen',
+                     from_template=True, skip_migrate=True, stdout=out)
+
+        assert Tenant.objects.filter(subdomain='tpl-kitchen').exists()
+        mock_cursor.execute.assert_any_call('CREATE DATABASE "tenant_tpl-kitchen" TEMPLATE "tenant_template"')
+        output = out.getvalue()
+        assert 'Timings:' in output
+        assert 'create_db' in output and 'admin_user' in output
+
+    @patch('apps.organizations.provisioning.ensure_template_database')
+    @patch('apps.organizations.management.commands.provision_tenant.default_conn')
+    @patch('psycopg2.connect')
+    @patch('psycopg2.extras.register_default_jsonb')
+    @patch('apps.organizations.management.commands.provision_tenant.User')
+    def test_no_from_template_overrides_the_setting(self, mock_user, mock_register_jsonb, mock_connect,
+                                                    mock_default_conn, mock_ensure, mock_get_db_version, settings):
+        settings.TENANT_PROVISION_FROM_TEMPLATE = True
+        mock_user.objects.filter.return_value.exists.return_value = False
+        mock_cursor = MagicMock()
+        mock_default_conn.cursor.return_value.__enter__.return_value = mock_cursor
+
+        call_command('provision_tenant', '--no-from-template', subdomain='empty-kitchen', name='Empty Kitchen',
+                     skip_migrate=True, stdout=StringIO())
+
+        mock_cursor.execute.assert_any_call('CREATE DATABASE "tenant_empty-kitchen"')
+        mock_ensure.assert_not_called()
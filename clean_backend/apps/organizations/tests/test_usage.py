@@ -0,0 +1,108 @@
+import datetime
+import pytest
+from io import StringIO
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from apps.main.models import CustomerProfile, MealPackage, MealSlot, Order, Subscription
+from apps.organizations.models_saas import TenantUsage
+from apps.organizations.provisioning import ensure_tenant_alias
+from apps.organizations.usage import USAGE_WATERMARK_LAG, month_start, sync_usage
+from apps.users.models import Tenant
+
+User = get_user_model()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestSyncUsage:
+    """The tenant's database is the test database itself."""
+
+    def setup_method(self):
+        self.tenant = Tenant.objects.create(
+            name='Metrics', subdomain='metrics', schema_name='metrics',
+            db_name=connection.settings_dict['NAME'], is_active=True,
+        )
+        self.alias = ensure_tenant_alias(f'tenant_{self.tenant.id}', self.tenant)
+        today = timezone.localdate()
+        self.subscription = Subscription.objects.create(
+            customer=CustomerProfile.objects.create(user=User.objects.create_user(username='metrics_cust'), name='M'),
+            meal_package=MealPackage.objects.create(name='Standard', price=100),
+            time_slot=MealSlot.objects.create(name='Lunch', code='lunch'),
+            start_date=today, end_date=today + datetime.timedelta(days=30), status='active',
+            selected_days=['Monday'],
+        )
+        self.now = timezone.now() + USAGE_WATERMARK_LAG + datetime.timedelta(seconds=1)
+
+    def teardown_method(self):
+        for alias in [alias for alias in settings.DATABASES if alias.startswith('tenant_')]:
+            if alias in connections:
+                connections[alias].close()
+            settings.DATABASES.pop(alias, None)
+
+    def _orders(self, count, created_at=None):
+        orders = [
+            Order.objects.create(
+                subscription=self.subscription, order_date=timezone.localdate(),
+                delivery_date=timezone.localdate() + datetime.timedelta(days=i + 1), status='pending',
+            )
+            for i in range(count)
+        ]
+        if created_at:
+            Order.objects.filter(pk__in=[order.pk for order in orders]).update(created_at=created_at)
+        return orders
+
+    def test_one_statement_per_tenant(self):
+        self._orders(3)
+        with CaptureQueriesContext(connections[self.alias]) as queries:
+            outcome, = sync_usage(now=self.now)
+        assert len(queries) == 1
+        assert outcome['result'] == {'orders': 3, 'customers': 1}
+        usage = TenantUsage.objects.get(tenant=self.tenant)
+        assert (usage.order_count, usage.customer_count, usage.subscription_count) == (3, 1, 1)
+        assert usage.period == timezone.localdate().replace(day=1)
+        assert usage.orders_counted_until == self.now - USAGE_WATERMARK_LAG
+
+    def test_incremental_from_watermark(self):
+        self._orders(2)
+        sync_usage(now=self.now)
+        # Only orders after the watermark are counted, added to the stored total
+        TenantUsage.objects.filter(tenant=self.tenant).update(order_count=100)
+        self._orders(2, created_at=self.now - USAGE_WATERMARK_LAG + datetime.timedelta(seconds=30))
+        sync_usage(now=self.now + datetime.timedelta(minutes=1))
+        assert TenantUsage.objects.get(tenant=self.tenant).order_count == 102
+
+        sync_usage(now=self.now + datetime.timedelta(minutes=2), full=True)
+        assert TenantUsage.objects.get(tenant=self.tenant).order_count == 4
+
+    def test_month_rollover_finishes_previous_month(self):
+        start = month_start(timezone.now())
+        previous_start = month_start(start - datetime.timedelta(days=1))
+        TenantUsage.objects.create(
+            tenant=self.tenant, period=previous_start.date(), order_count=5,
+            orders_counted_until=start - datetime.timedelta(days=3),
+        )
+        self._orders(1, created_at=start - datetime.timedelta(days=1))
+        self._orders(2, created_at=start + datetime.timedelta(minutes=1))
+
+        sync_usage(now=start + datetime.timedelta(minutes=30))
+        previous = TenantUsage.objects.get(tenant=self.tenant, period=previous_start.date())
+        current = TenantUsage.objects.get(tenant=self.tenant, period=start.date())
+        assert (previous.order_count, previous.orders_counted_until) == (6, start)
+        assert current.order_count == 2
+
+    def test_failing_tenant_is_isolated(self):
+        broken = Tenant.objects.create(
+            name='Broken', subdomain='broken', schema_name='broken', db_name='zz_missing_db', is_active=True,
+        )
+        self._orders(1, created_at=timezone.now() - 2 * USAGE_WATERMARK_LAG)
+        out = StringIO()
+        call_command('sync_saas_metrics', '--workers', '2', stdout=out)
+        assert TenantUsage.objects.get(tenant=self.tenant).order_count == 1
+        assert not TenantUsage.objects.filter(tenant=broken).exists()
+        # The alias stays registered for the next run
+        assert f'tenant_{broken.id}' in settings.DATABASES
+        assert 'broken: failed' in out.getvalue()
+        assert '(1 failed)' in out.getvalue()
@@ -16,5 +16,7 @@ router.register(r'invoices', views.TenantInvoiceViewSet, basename='saas-invoice'
 
 urlpatterns = [
     path('analytics/', views.platform_analytics, name='saas-analytics'),
+    path('analytics/timeseries/', views.analytics_timeseries, name='saas-analytics-timeseries'),
+    path('analytics/tenants/', views.analytics_tenants, name='saas-analytics-tenants'),
     path('', include(router.urls)),
 ]
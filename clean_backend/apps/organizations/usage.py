@@ -0,0 +1,158 @@
+"""
+Per-tenant usage metrics stored in ``TenantUsage`` (default database).
+
+``sync_usage`` collects every tenant's metrics in parallel (bounded by
+``SCHEDULER_TENANT_CONCURRENCY``). It uses one round trip per tenant
+database: a single statement with all the aggregates. It then writes all
+``TenantUsage`` rows with one bulk upsert.
+
+``order_count`` is month-to-date and incremental. Each row keeps a
+watermark (``orders_counted_until``), and a run only counts the orders
+created since then (indexed on ``Order.created_at``). The watermark trails
+the clock by ``USAGE_WATERMARK_LAG`` so orders committed late are not
+skipped. When a month ends, the first run of the new month also counts the
+previous month's remaining orders into that month's row. The other metrics
+are current totals (customers, staff, menu items, active subscriptions
+and their value) and are recomputed on every run.
+
+Deleted orders are not subtracted from an open month's ``order_count``.
+Run with ``full=True`` to recount the current month from scratch.
+"""
+import datetime
+
+from django.db import connections
+from django.utils import timezone
+
+from apps.main.models import CustomerProfile, MenuItem, Order, Subscription
+from apps.organizations.models_saas import TenantUsage
+from apps.users.models import UserProfile
+
+USAGE_WATERMARK_LAG = datetime.timedelta(minutes=2)
+SNAPSHOT_FIELDS = ('customer_count', 'staff_count', 'menu_item_count', 'subscription_count', 'revenue')
+
+
+def month_start(value):
+    """Aware midnight on the first day of ``value``'s month (local time)."""
+    first = timezone.localtime(value).date().replace(day=1)
+    return timezone.make_aware(datetime.datetime.combine(first, datetime.time.min))
+
+
+def _tables(connection):
+    quote = connection.ops.quote_name
+    return {
+        name: quote(model._meta.db_table)
+        for name, model in (
+            ('order', Order), ('customer', CustomerProfile), ('staff', UserProfile),
+            ('menu_item', MenuItem), ('subscription', Subscription),
+        )
+    }
+
+
+def collect_metrics(alias, orders_window, tail_window=None):
+    """
+    All usage aggregates of the tenant database ``alias`` in one statement.
+    ``orders_window`` (and optional ``tail_window``) are ``(after, until)``
+    bounds on ``Order.created_at``; the matching counts come back as
+    ``new_orders`` and ``tail_orders``.
+    """
+    connection = connections[alias]
+    t = _tables(connection)
+    params = list(orders_window)
+    tail_sql = '0'
+    if tail_window:
+        tail_sql = f"(SELECT COUNT(*) FROM {t['order']} WHERE created_at > %s AND created_at < %s)"
+        params.extend(tail_window)
+    sql = f"""
+        SELECT
+            (SELECT COUNT(*) FROM {t['order']} WHERE created_at > %s AND created_at <= %s),
+            {tail_sql},
+            (SELECT COUNT(*) FROM {t['customer']}),
+            (SELECT COUNT(*) FROM {t['staff']}),
+            (SELECT COUNT(*) FROM {t['menu_item']}),
+            active.count,
+            active.revenue
+        FROM (
+            SELECT COUNT(*) AS count, COALESCE(SUM(total_cost), 0) AS revenue
+            FROM {t['subscription']} WHERE status = 'active'
+        ) AS active
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        row = cursor.fetchone()
+    return dict(zip(
+        ('new_orders', 'tail_orders', 'customer_count', 'staff_count',
+         'menu_item_count', 'subscription_count', 'revenue'),
+        row,
+    ))
+
+
+def _tenant_rows(tenant, alias, until, current, previous, full):
+    """Unsaved ``TenantUsage`` rows (this month, maybe last month) for one tenant."""
+    start = month_start(until)
+    resume = current is not None and current.orders_counted_until is not None and not full
+    after = current.orders_counted_until if resume else start - datetime.timedelta(microseconds=1)
+    # Last month's row stopped short of the month end: finish it
+    tail = None
+    if previous is not None and previous.orders_counted_until and previous.orders_counted_until < start:
+        tail = (previous.orders_counted_until, start)
+
+    metrics = collect_metrics(alias, (after, until), tail)
+    rows = [TenantUsage(
+        tenant=tenant, period=start.date(),
+        order_count=(current.order_count if resume else 0) + metrics['new_orders'],
+        orders_counted_until=until,
+        **{name: metrics[name] for name in SNAPSHOT_FIELDS},
+    )]
+    if tail:
+        rows.append(TenantUsage(
+            tenant=tenant, period=previous.period,
+            order_count=previous.order_count + metrics['tail_orders'], orders_counted_until=start,
+            **{name: getattr(previous, name) for name in SNAPSHOT_FIELDS},
+        ))
+    return rows
+
+
+def sync_usage(tenants=None, now=None, full=False, max_workers=None):
+    """
+    Collect and upsert this month's ``TenantUsage`` for ``tenants``
+    (default: every active tenant with a database). Returns the per-tenant
+    outcomes of ``for_each_tenant``; failed tenants are left untouched.
+    """
+    from apps.jobs.scheduler import for_each_tenant
+    from apps.users.models import Tenant
+
+    until = (now or timezone.now()) - USAGE_WATERMARK_LAG
+    start = month_start(until)
+    period = start.date()
+    previous_period = month_start(start - datetime.timedelta(days=1)).date()
+
+    if tenants is None:
+        tenants = Tenant.objects.using('default').filter(is_active=True).exclude(db_name='').order_by('id')
+    tenants = list(tenants)
+    existing = {
+        (usage.tenant_id, usage.period): usage
+        for usage in TenantUsage.objects.using('default').filter(
+            tenant__in=tenants, period__in=(period, previous_period),
+        )
+    }
+
+    def collect(tenant, alias):
+        return _tenant_rows(
+            tenant, alias, until,
+            existing.get((tenant.id, period)), existing.get((tenant.id, previous_period)), full,
+        )
+
+    outcomes = for_each_tenant(collect, tenants=tenants, max_workers=max_workers)
+    rows = [row for outcome in outcomes for row in outcome.pop('result', None) or []]
+    if rows:
+        TenantUsage.objects.using('default').bulk_create(
+            rows, update_conflicts=True, unique_fields=['tenant', 'period'],
+            update_fields=['order_count', 'orders_counted_until', *SNAPSHOT_FIELDS, 'updated_at'],
+        )
+    by_tenant = {row.tenant_id: row for row in rows if row.period == period}
+    for tenant, outcome in zip(tenants, outcomes):
+        if tenant.id in by_tenant:
+            outcome['result'] = {'orders': by_tenant[tenant.id].order_count,
+                                 'customers': by_tenant[tenant.id].customer_count}
+    return outcomes
+
@@ -9,6 +9,7 @@ These endpoints are for the platform admin / SaaS owner to:
 
 Access: Superuser only (platform admin).
 """
+import datetime
 import logging
 import secrets
 from decimal import Decimal
@@ -16,7 +17,8 @@ from datetime import timedelta
 
 from django.conf import settings
 from django.contrib.auth.models import User
-from django.db.models import Count, Sum, Q
+from django.db.models import Count, F, Sum, Q
+from django.db.models.functions import TruncMonth, TruncWeek
 from django.utils import timezone
 
 logger = logging.getLogger(__name__)
@@ -26,9 +28,16 @@ from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 
 from apps.users.models import Tenant, UserProfile
+from apps.jobs.views import job_accepted_response, wants_background
+from apps.organizations.analytics import FACT_FIELDS, ORDER_FIELDS
+from apps.organizations.jobs import provision_tenant
 from apps.organizations.models import ServicePlan
 from apps.organizations.models_saas import (
-    TenantSubscription, TenantInvoice, TenantUsage,
+    TenantSubscription, TenantInvoice, TenantUsage, TenantDailyFact,
+)
+from apps.organizations.provisioning import (
+    PhaseTimings, create_tenant_database, migrate_tenant_database,
+    register_tenant_database, seed_tenant_defaults,
 )
 from apps.organizations.serializers import (
     ServicePlanSerializer, TenantListSerializer, TenantDetailSerializer,
@@ -90,40 +99,27 @@ class TenantViewSet(viewsets.ModelViewSet):
     def _provision_tenant_db(self, subdomain):
         """Create the tenant's database. Isolated for mocking."""
         db_name = f"tenant_{subdomain}"
+        timings = PhaseTimings()
         try:
-            from django.db import connection as default_conn
-            with default_conn.cursor() as cursor:
-                # CREATE DATABASE cannot run inside a transaction
-                cursor.execute("COMMIT")
-                cursor.execute(f'CREATE DATABASE "{db_name}"')
+            created = create_tenant_database(
+                db_name,
+                from_template=settings.TENANT_PROVISION_FROM_TEMPLATE,
+                timings=timings,
+            )
+            logger.info("Database %s: %s (%s)", db_name, created, timings.format())
         except Exception as db_err:
-            # Database may already exist (e.g. re-provisioning)
             logger.warning("Could not create DB %s: %s", db_name, db_err)
         return db_name
 
     def _migrate_tenant_db(self, tenant, db_name):
-        """Run migrations on the tenant's database. Isolated for mocking."""
+        """Run migrations and seed defaults on the tenant's database. Isolated for mocking."""
         try:
-            import copy
-            from django.core.management import call_command
-            tenant_db_alias = f"tenant_{tenant.id}"
-            default_db = settings.DATABASES['default']
-            db_user = default_db.get('USER', '')
-            db_password = default_db.get('PASSWORD', '')
-            db_host = default_db.get('HOST', 'localhost')
-            db_port = default_db.get('PORT', '5432')
-
-            db_config = copy.deepcopy(default_db)
-            db_config.update({
-                'NAME': db_name,
-                'USER': db_user,
-                'PASSWORD': db_password,
-                'HOST': db_host,
-                'PORT': db_port,
-                'ATOMIC_REQUESTS': False,
-            })
-            settings.DATABASES[tenant_db_alias] = db_config
-            call_command('migrate', database=tenant_db_alias, verbosity=0)
+            tenant_db_alias = register_tenant_database(f"tenant_{tenant.id}", db_name)
+            timings = PhaseTimings()
+            migrate_tenant_database(tenant_db_alias, timings=timings)
+            with timings.phase('seed'):
+                seed_tenant_defaults(tenant_db_alias)
+            logger.info("Migrated %s (%s)", db_name, timings.format())
         except Exception as mig_err:
             logger.warning("Migration on %s failed: %s", db_name, mig_err)
 
@@ -131,15 +127,20 @@ class TenantViewSet(viewsets.ModelViewSet):
         """
         Provision a new tenant.
         Creates: tenant record, admin user, and subscription (if plan provided).
-        Note: Actual database provisioning would be handled by a Celery task
-        or management command in production.
+        With ``?background=1`` the database is created, migrated and seeded
+        by a background job; the tenant is inactive until it finishes and
+        the response is 202 with the job.
         """
         serializer = TenantCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
+        background = wants_background(request)
 
         # ── Create the PostgreSQL database for this tenant ──
-        db_name = self._provision_tenant_db(data['subdomain'])
+        if background:
+            db_name = f"tenant_{data['subdomain']}"
+        else:
+            db_name = self._provision_tenant_db(data['subdomain'])
         default_db = settings.DATABASES['default']
         db_user = default_db.get('USER', '')
         db_password = default_db.get('PASSWORD', '')
@@ -156,11 +157,12 @@ class TenantViewSet(viewsets.ModelViewSet):
             db_password=db_password,
             db_host=db_host,
             db_port=db_port,
-            is_active=True,
+            is_active=not background,
         )
 
         # Run migrations on the new tenant database
-        self._migrate_tenant_db(tenant, db_name)
+        if not background:
+            self._migrate_tenant_db(tenant, db_name)
 
         # ── Create tenant admin user ──
         admin_email = data.get('admin_email', '')
@@ -219,6 +221,10 @@ class TenantViewSet(viewsets.ModelViewSet):
         response_data = TenantDetailSerializer(tenant).data
         response_data['admin_info'] = admin_info
 
+        if background:
+            job = provision_tenant.enqueue(tenant.id, tenant_alias='default', created_by=request.user)
+            return job_accepted_response(job, response_data)
+
         return Response(
             response_data,
             status=drf_status.HTTP_201_CREATED,
@@ -350,3 +356,131 @@ def platform_analytics(request):
 
     serializer = PlatformAnalyticsSerializer(data)
     return Response(serializer.data)
+
+
+# ─── Platform Analytics: time series ─────────────────────────────────────────
+# Read only the TenantDailyFact rollups (see apps/organizations/analytics.py),
+# never the tenant databases.
+
+ANALYTICS_INTERVALS = {
+    'day': F('date'),
+    'week': TruncWeek('date'),
+    'month': TruncMonth('date'),
+}
+
+
+def _analytics_filters(request):
+    """
+    Parse ``start``/``end`` (default: the last 30 days) and an optional
+    ``tenant`` id. Returns ``(facts queryset, start, end, None)`` or
+    ``(None, None, None, error response)``.
+    """
+    try:
+        end = datetime.date.fromisoformat(request.query_params['end']) \
+            if request.query_params.get('end') else timezone.localdate()
+        start = datetime.date.fromisoformat(request.query_params['start']) \
+            if request.query_params.get('start') else end - timedelta(days=29)
+    except ValueError:
+        return None, None, None, Response(
+            {'error': 'Invalid date format. Use YYYY-MM-DD.'},
+            status=drf_status.HTTP_400_BAD_REQUEST,
+        )
+    if start > end:
+        return None, None, None, Response(
+            {'error': 'start must not be after end.'},
+            status=drf_status.HTTP_400_BAD_REQUEST,
+        )
+
+    facts = TenantDailyFact.objects.filter(date__range=(start, end))
+    tenant = request.query_params.get('tenant')
+    if tenant:
+        if not tenant.isdigit():
+            return None, None, None, Response(
+                {'error': 'tenant must be a tenant id.'},
+                status=drf_status.HTTP_400_BAD_REQUEST,
+            )
+        facts = facts.filter(tenant_id=int(tenant))
+    return facts, start, end, None
+
+
+def _fact_totals(facts):
+    """Aggregate ``facts`` (already grouped with ``values()``) into summed metrics."""
+    return facts.annotate(
+        days=Count('date', distinct=True),
+        **{f'total_{name}': Sum(name) for name in FACT_FIELDS},
+    )
+
+
+def _fact_point(row):
+    """One output point: summed counts, plus derived totals and rates."""
+    point = {name: row[f'total_{name}'] for name in FACT_FIELDS}
+    point['orders'] = sum(point[name] for name in ORDER_FIELDS)
+    finished = point['deliveries_delivered'] + point['deliveries_failed']
+    point['delivery_success_rate'] = (
+        round(point['deliveries_delivered'] / finished, 4) if finished else None
+    )
+    # A daily snapshot: report the average over the days in the bucket
+    point['active_subscriptions'] = round(point['active_subscriptions'] / row['days']) if row['days'] else 0
+    return point
+
+
+@api_view(['GET'])
+@permission_classes([IsSuperUser])
+def analytics_timeseries(request):
+    """
+    Platform-wide operational metrics over time, from the daily rollups.
+    Query params: ?start=2026-01-01&end=2026-01-31&interval=day|week|month&tenant=<id>
+    """
+    interval = request.query_params.get('interval', 'day')
+    if interval not in ANALYTICS_INTERVALS:
+        return Response(
+            {'error': f"interval must be one of: {', '.join(ANALYTICS_INTERVALS)}."},
+            status=drf_status.HTTP_400_BAD_REQUEST,
+        )
+    facts, start, end, error = _analytics_filters(request)
+    if error:
+        return error
+
+    facts = facts.annotate(period=ANALYTICS_INTERVALS[interval])
+    rows = _fact_totals(facts.values('period').order_by()).order_by('period')
+    series = [{'period': row['period'], **_fact_point(row)} for row in rows]
+
+    return Response({
+        'start': start,
+        'end': end,
+        'interval': interval,
+        'series': series,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsSuperUser])
+def analytics_tenants(request):
+    """
+    Per-tenant operational totals for a date range, from the daily rollups,
+    busiest tenants first.
+    Query params: ?start=2026-01-01&end=2026-01-31
+    """
+    facts, start, end, error = _analytics_filters(request)
+    if error:
+        return error
+
+    rows = _fact_totals(
+        facts.values('tenant_id', 'tenant__name', 'tenant__subdomain').order_by()
+    )
+    tenants = [
+        {
+            'tenant': row['tenant_id'],
+            'tenant_name': row['tenant__name'],
+            'subdomain': row['tenant__subdomain'],
+            **_fact_point(row),
+        }
+        for row in rows
+    ]
+    tenants.sort(key=lambda tenant: (-tenant['orders'], tenant['tenant_name']))
+
+    return Response({
+        'start': start,
+        'end': end,
+        'tenants': tenants,
+    })
@@ -6,7 +6,7 @@ from django.contrib.auth.models import User
 from django.utils.crypto import get_random_string
 from core.db.router import set_current_db_alias, get_current_db_alias
 from apps.users.models import Tenant
-from apps.main.models import Category
+from apps.organizations.provisioning import seed_tenant_defaults
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +15,7 @@ logger = logging.getLogger(__name__)
 def setup_tenant_defaults(sender, instance, created, **kwargs):
     """
     When a new Tenant is created, seed its dedicated database with
-    a default admin user and a default category.
+    a default admin user, the default meal slots and a default category.
 
     The router sends ``auth.User`` and ``main.Category`` to whichever
     DB alias is set in thread-local storage — so we temporarily switch
@@ -58,11 +58,8 @@ def setup_tenant_defaults(sender, instance, created, **kwargs):
                 db_alias,
             )
 
-        # 2. Create default 'Inventory' category (lives in the tenant DB)
-        Category.objects.get_or_create(
-            name='Inventory',
-            defaults={'description': 'Default category for inventory items'},
-        )
+        # 2. Default meal slots and 'Inventory' category, inserted in bulk
+        seed_tenant_defaults(db_alias)
 
     except Exception as e:
         logger.error("Error setting up tenant defaults for %s: %s", db_alias, e)
@@ -183,6 +183,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'corsheaders',
     'import_export',
     'rest_framework',
@@ -207,6 +208,7 @@ INSTALLED_APPS = [
     'apps.delivery',
     'apps.inventory',
     'apps.driver',
+    'apps.jobs',
 ]
 
 DATABASE_ROUTERS = (
@@ -242,6 +244,23 @@ SCHEDULER_AUTOSTART = True
 APSCHEDULER_RUN_NOW = True
 DELIVERY_AUTO_COMPLETE = True
 PAYMENT_AUTO_PROCESS = True
+# Jobs are registered from code (apps/*/scheduled.py, see apps/jobs/scheduler.py).
+# Override a schedule or switch a job on/off with
+# SCHEDULED_JOBS = {'<job id>': {'cron': {'hour': 9}, 'enabled': True}}
+SCHEDULED_JOBS = {}
+# Tenants processed in parallel by one scheduled job
+SCHEDULER_TENANT_CONCURRENCY = int(os.environ.get('SCHEDULER_TENANT_CONCURRENCY', '4'))
+# Per-statement cap (seconds, 0 = none) for work fanned out over tenant
+# databases (core/db/fanout.py): scheduled jobs and the tenant commands
+TENANT_STATEMENT_TIMEOUT = int(os.environ.get('TENANT_STATEMENT_TIMEOUT', '300'))
+# Platform analytics rollups (apps/organizations/analytics.py): days reloaded
+# behind the watermark, and days loaded for a tenant seen for the first time
+ANALYTICS_SETTLE_DAYS = int(os.environ.get('ANALYTICS_SETTLE_DAYS', '3'))
+ANALYTICS_BACKFILL_DAYS = int(os.environ.get('ANALYTICS_BACKFILL_DAYS', '90'))
+# History archival (apps/main/retention.py): records moved per transaction,
+# and where tenants with file storage get their gzipped JSONL batches
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', '1000'))
+RETENTION_ARCHIVE_DIR = os.environ.get('RETENTION_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
 
 # REST Framework Configuration
 REST_FRAMEWORK = {
@@ -532,6 +551,60 @@ if DEBUG:
 # Enable atomic requests for all database operations
 DATABASES['default']['ATOMIC_REQUESTS'] = True
 
+# New tenant databases can be cloned from a pre-migrated template database
+# (see apps/organizations/provisioning.py) instead of migrating from scratch
+TENANT_TEMPLATE_DB_NAME = os.environ.get('TENANT_TEMPLATE_DB_NAME', 'tenant_template')
+TENANT_PROVISION_FROM_TEMPLATE = os.environ.get('TENANT_PROVISION_FROM_TEMPLATE', 'False').lower() == 'true'
+
+# Worker processes used to hash passwords supplied in bulk customer imports
+# through the API (apps/main/utils/customer_import.py); 1 hashes in-process
+CUSTOMER_IMPORT_HASH_WORKERS = int(os.environ.get('CUSTOMER_IMPORT_HASH_WORKERS', '1'))
+
+# Background jobs (apps/jobs): executor class and its worker thread count
+BACKGROUND_JOBS = {
+    'EXECUTOR': os.environ.get('BACKGROUND_JOBS_EXECUTOR', 'apps.jobs.executor.ThreadPoolJobExecutor'),
+    'MAX_WORKERS': int(os.environ.get('BACKGROUND_JOBS_MAX_WORKERS', '4')),
+}
+
+# Customer notification dispatch (apps/main/notifications.py): a backend per
+# channel, per-process rate limits (messages/second, 0 = none) and retries
+NOTIFICATIONS = {
+    'BACKENDS': {
+        'email': 'apps.main.notification_backends.EmailBackend',
+        'sms': 'apps.main.notification_backends.LogBackend',
+        'whatsapp': 'apps.main.notification_backends.LogBackend',
+        'push': 'apps.main.notification_backends.ChannelLayerBackend',
+    },
+    'RATE_LIMITS': {'email': 10, 'sms': 5, 'whatsapp': 20, 'push': 0},
+    'BATCH_SIZE': 200,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 60,  # seconds, doubled after each failed attempt
+    'BROADCAST_CHUNK_SIZE': 1000,  # notifications per INSERT for segment broadcasts
+}
+
+# Dispatch planner (apps/driver/planner.py): travel assumptions for the
+# estimated times, where runs start, and the largest run still improved by 2-opt
+DISPATCH_PLANNER = {
+    'SPEED_KMH': 25,
+    'SERVICE_MINUTES': 4,  # per stop
+    'UNKNOWN_LEG_MINUTES': 6,  # legs without coordinates
+    'DEPOT': None,  # (lat, lng) of the kitchen, if runs should start there
+    'TWO_OPT_MAX_STOPS': 150,
+}
+
+# Zone resolution (apps/driver/zone_index.py): cell size of the in-memory grid
+# over zone polygons, in degrees (0.01 is about 1.1 km)
+ZONE_INDEX_CELL_DEGREES = float(os.environ.get('ZONE_INDEX_CELL_DEGREES', '0.01'))
+
+# Driver app offline sync (apps/driver/sync.py): rows per pull, changes per
+# upload, and how far a caught-up cursor stays behind the clock (seconds)
+DRIVER_SYNC = {
+    'PAGE_SIZE': 500,
+    'MAX_BATCH': 200,
+    'CURSOR_LAG': 10,
+    'DAYS_AHEAD': 1,  # pulls cover today and this many days after
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
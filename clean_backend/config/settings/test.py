@@ -46,6 +46,19 @@ SECURE_HSTS_SECONDS = 0
 # Disable axes for testing
 AXES_ENABLED = False
 
+# Run background jobs inline, in the enqueuing thread
+BACKGROUND_JOBS = {'EXECUTOR': 'apps.jobs.executor.LocalJobExecutor', 'MAX_WORKERS': 1}
+
+# Notifications go to the in-memory fake backend
+NOTIFICATIONS = {
+    **NOTIFICATIONS,
+    'BACKENDS': {channel: 'apps.main.notification_backends.FakeBackend' for channel in ('email', 'sms', 'whatsapp', 'push')},
+    'RATE_LIMITS': {},
+}
+
+# Never start the scheduler in tests
+SCHEDULER_AUTOSTART = False
+
 # Test API key
 SYNC_TOKEN = 'test_token'
 
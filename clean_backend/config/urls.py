@@ -37,6 +37,7 @@ urlpatterns = [
     path('api/v1/inventory/', include('apps.inventory.urls_api')),
     path('api/v1/users/', include('apps.users.urls_api')),
     path('api/v1/driver/', include('apps.driver.urls_api')),
+    path('api/v1/jobs/', include('apps.jobs.urls_api')),
 
     # API v1 — Customer-facing (Layer 3: B2C)
     path('api/v1/customer/', include('apps.main.urls_customer_api')),
@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def _clear_cache():
+    """Start every test with an empty cache; cached snapshots outlive the rolled-back DB."""
+    from django.core.cache import cache
+
+    cache.clear()
+    yield
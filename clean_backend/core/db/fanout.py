@@ -0,0 +1,271 @@
+"""
+Run a callable against many tenant databases at once.
+
+    fan_out = TenantFanOut(sync_one, max_workers=8, statement_timeout=60)
+    for result in fan_out.stream(tenants):
+        print(result.tenant.subdomain, result.status, result.seconds)
+    print(fan_out.stats.format())
+
+``func(tenant, alias)`` is called once per tenant. Each call runs with the
+tenant's database alias registered and set as the current alias (so
+unqualified queries route to it, see ``core.db.router``). Calls run at most
+``max_workers`` at a time, on threads or, with ``processes=True``, in worker
+processes; with one worker (or one tenant) they run inline. An exception
+fails only that tenant: it is logged and recorded on its ``TenantResult``.
+Tenants without a database are skipped.
+
+``statement_timeout`` (seconds) caps every statement a call sends to its
+tenant database (Postgres ``statement_timeout``). It is set on the first
+query, so a call that never touches the database never connects.
+
+``stream()`` yields results in completion order; ``run()`` returns them in
+tenant order. ``stats`` (throughput and latency) is updated as results
+arrive.
+"""
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.db import connections
+
+from core.db.router import get_current_db_alias, set_current_db_alias
+
+logger = logging.getLogger(__name__)
+
+# Database handles a forked worker inherited from the parent process
+_inherited_connections = []
+
+
+def active_tenants():
+    """Active tenants that have a database, in id order."""
+    from apps.users.models import Tenant
+
+    return Tenant.objects.using('default').filter(is_active=True).exclude(db_name='').order_by('id')
+
+
+@dataclass
+class TenantResult:
+    tenant: object
+    alias: str = None
+    status: str = 'ok'  # ok / failed / skipped
+    result: object = None
+    error: str = ''
+    seconds: float = 0.0
+
+    @property
+    def ok(self):
+        return self.status == 'ok'
+
+    def as_outcome(self):
+        """The JSON-friendly per-tenant outcome recorded by scheduled jobs."""
+        outcome = {'tenant': self.tenant.subdomain}
+        if self.status == 'ok':
+            outcome['result'] = self.result
+        elif self.status == 'failed':
+            outcome['error'] = self.error
+        else:
+            outcome['skipped'] = self.error
+        outcome['seconds'] = self.seconds
+        return outcome
+
+
+@dataclass
+class FanOutStats:
+    """Throughput and latency of one fan-out, updated as results arrive."""
+    started: float = field(default_factory=time.perf_counter)
+    finished: float = None
+    succeeded: int = 0
+    failed: int = 0
+    skipped: int = 0
+    latencies: list = field(default_factory=list)
+
+    def add(self, result):
+        if result.status == 'skipped':
+            self.skipped += 1
+            return
+        if result.ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        self.latencies.append(result.seconds)
+
+    @property
+    def completed(self):
+        return self.succeeded + self.failed + self.skipped
+
+    @property
+    def wall_seconds(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def throughput(self):
+        """Tenants completed per second of wall-clock time."""
+        return self.completed / self.wall_seconds if self.wall_seconds else 0.0
+
+    def percentile(self, fraction):
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def as_dict(self):
+        return {
+            'tenants': self.completed,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'wall_seconds': round(self.wall_seconds, 3),
+            'tenants_per_second': round(self.throughput, 2),
+            'latency_p50': round(self.percentile(0.5), 3),
+            'latency_p95': round(self.percentile(0.95), 3),
+            'latency_max': round(max(self.latencies, default=0.0), 3),
+        }
+
+    def format(self):
+        stats = self.as_dict()
+        return (
+            f"{stats['tenants']} tenants in {stats['wall_seconds']:.2f}s "
+            f"({stats['tenants_per_second']:.1f}/s; {stats['failed']} failed, {stats['skipped']} skipped), "
+            f"latency p50 {stats['latency_p50']:.2f}s p95 {stats['latency_p95']:.2f}s "
+            f"max {stats['latency_max']:.2f}s"
+        )
+
+
+@contextmanager
+def statement_timeout(alias, seconds):
+    """
+    Cap each statement on ``alias`` at ``seconds`` (Postgres only) while
+    the block runs in this thread. The setting is sent with the first
+    query and reset afterwards.
+    """
+    connection = connections[alias]
+    if not seconds or connection.vendor != 'postgresql':
+        yield
+        return
+    applied = []
+
+    def apply_timeout(execute, sql, params, many, context):
+        if not applied:
+            # On a plain driver cursor: not a query of the caller's, and the
+            # caller's may be a server-side one (``QuerySet.iterator()``)
+            with context['connection'].connection.cursor() as cursor:
+                cursor.execute('SET statement_timeout = %s', [int(seconds * 1000)])
+            applied.append(True)
+        return execute(sql, params, many, context)
+
+    try:
+        with connection.execute_wrapper(apply_timeout):
+            yield
+    finally:
+        if applied and connection.connection is not None and not connection.needs_rollback:
+            try:
+                with connection.connection.cursor() as cursor:
+                    cursor.execute('RESET statement_timeout')
+            except Exception:
+                # The session is unusable; drop it rather than leak the setting
+                connection.close()
+
+
+def run_for_tenant(func, tenant, timeout=None):
+    """Call ``func(tenant, alias)`` in the tenant's context; never raises."""
+    from apps.organizations.provisioning import ensure_tenant_alias
+
+    if not tenant.db_name:
+        return TenantResult(tenant, status='skipped', error='no db_name configured')
+    result = TenantResult(tenant)
+    previous_alias = get_current_db_alias()
+    start = time.perf_counter()
+    try:
+        result.alias = ensure_tenant_alias(f"tenant_{tenant.id}", tenant)
+        set_current_db_alias(result.alias)
+        with statement_timeout(result.alias, timeout):
+            result.result = func(tenant, result.alias)
+    except Exception as exc:
+        logger.exception("Work for tenant %s failed", tenant.subdomain)
+        result.status = 'failed'
+        result.error = f"{type(exc).__name__}: {exc}"
+    finally:
+        set_current_db_alias(previous_alias)
+    result.seconds = round(time.perf_counter() - start, 3)
+    return result
+
+
+def _run_in_worker(func, tenant, timeout):
+    try:
+        return run_for_tenant(func, tenant, timeout)
+    finally:
+        connections.close_all()
+
+
+def init_worker_process():
+    """
+    Process pool initializer. Spawned workers set Django up from scratch.
+    Forked workers inherit the parent's open database sockets: keep a
+    reference to them so they are never closed from here (which would end
+    the parent's sessions) and let the worker open its own connections.
+    """
+    import django
+    from django.apps import apps
+
+    if not apps.ready:
+        django.setup()
+        return
+    for conn in connections.all(initialized_only=True):
+        if conn.connection is not None:
+            _inherited_connections.append(conn.connection)
+            conn.connection = None
+
+
+class TenantFanOut:
+    """
+    Fan ``func(tenant, alias)`` out over tenants; see the module docstring.
+    With ``processes=True``, ``func`` must be picklable (a module-level
+    function) and so must its return value.
+    """
+
+    def __init__(self, func, max_workers=4, processes=False, statement_timeout=None):
+        self.func = func
+        self.max_workers = max_workers
+        self.processes = processes
+        self.statement_timeout = statement_timeout
+        self.stats = FanOutStats()
+
+    def stream(self, tenants=None):
+        """Yield a ``TenantResult`` per tenant as each one completes."""
+        tenants = list(active_tenants() if tenants is None else tenants)
+        self.stats = FanOutStats()
+        try:
+            for result in self._results(tenants):
+                self.stats.add(result)
+                yield result
+        finally:
+            self.stats.finished = time.perf_counter()
+
+    def run(self, tenants=None):
+        """All results, in the order of ``tenants``."""
+        tenants = list(active_tenants() if tenants is None else tenants)
+        # By pk: worker processes send back copies of the tenants
+        positions = {tenant.pk: index for index, tenant in enumerate(tenants)}
+        return sorted(self.stream(tenants), key=lambda result: positions[result.tenant.pk])
+
+    def _results(self, tenants):
+        if self.max_workers <= 1 or len(tenants) <= 1:
+            for tenant in tenants:
+                yield run_for_tenant(self.func, tenant, self.statement_timeout)
+            return
+        if self.processes:
+            pool = ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_worker_process)
+        else:
+            pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='tenant-fan-out')
+        with pool:
+            futures = {
+                pool.submit(_run_in_worker, self.func, tenant, self.statement_timeout): tenant
+                for tenant in tenants
+            }
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as exc:  # the worker process died
+                    yield TenantResult(futures[future], status='failed', error=f"{type(exc).__name__}: {exc}")
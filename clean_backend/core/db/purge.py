@@ -0,0 +1,143 @@
+"""
+Chunked bulk deletes that do not load rows into memory.
+
+``QuerySet.delete()`` collects every related object in Python before
+deleting, and sends ``IN (...)`` lists as long as the data. On a large
+tenant that exhausts memory and holds locks for the whole delete.
+``Purge`` deletes the same rows straight in SQL instead:
+
+    purge = Purge(Order.objects.using(alias).filter(status='cancelled'), chunk_size=5000)
+    purge.count()   # dry run: {'kitchen.KitchenOrder': 12, 'delivery.Delivery': 40, 'main.Order': 40}
+    purge.run()     # [PurgeStepResult(...), ...]
+
+The plan follows the reverse relations of the queryset's model, like the
+collector does. ``CASCADE`` children are deleted and ``SET_NULL``
+references are cleared, leaves first. Many-to-many rows are deleted too.
+``DO_NOTHING`` relations are ignored. ``PROTECT``, ``RESTRICT`` and the
+other handlers stop the plan with ``ValueError``. Each step repeats
+
+    DELETE FROM <table> WHERE <pk> IN (SELECT <pk> ... ORDER BY <pk> LIMIT n)
+
+where the subquery selects the step's rows through its path back to the
+original queryset. Each chunk commits on its own, so locks are short and a
+stopped purge keeps what it deleted; running it again continues. No model
+signals are sent.
+"""
+import time
+from dataclasses import dataclass
+
+from django.db import connections, models, transaction
+
+
+@dataclass
+class PurgeStep:
+    model: object
+    queryset: object
+    action: str  # delete / nullify
+    column: str = None  # the column cleared by a nullify step
+
+    @property
+    def label(self):
+        if self.action == 'nullify':
+            return f"{self.model._meta.label}.{self.column}"
+        return self.model._meta.label
+
+
+@dataclass
+class PurgeStepResult:
+    label: str
+    action: str
+    rows: int = 0
+    chunks: int = 0
+    seconds: float = 0.0
+
+
+class Purge:
+    """Chunked delete of ``queryset`` and everything that cascades from it."""
+
+    def __init__(self, queryset, chunk_size=5000, progress=None):
+        self.queryset = queryset
+        self.alias = queryset.db
+        self.chunk_size = chunk_size
+        self.progress = progress  # progress(step, rows_so_far) after each chunk
+        self.steps = []
+        self._plan(queryset.model, queryset, path=(queryset.model,))
+
+    def _plan(self, model, queryset, path):
+        """Append the steps for ``queryset`` of ``model``: its dependants, then itself."""
+        for relation in model._meta.related_objects:
+            if relation.many_to_many:
+                through = relation.through
+                fk = next(
+                    f for f in through._meta.fields
+                    if f.is_relation and f.related_model is model
+                )
+                self._add_through(through, fk, queryset)
+                continue
+            related = relation.related_model
+            on_delete = relation.on_delete
+            fk = relation.field
+            children = related._base_manager.using(self.alias).filter(
+                **{f"{fk.name}__in": queryset.values(fk.target_field.attname)}
+            )
+            if on_delete is models.DO_NOTHING:
+                continue
+            if on_delete is models.SET_NULL:
+                self.steps.append(PurgeStep(related, children, 'nullify', fk.column))
+            elif on_delete is models.CASCADE:
+                if related in path:
+                    raise ValueError(f"Cannot purge {model._meta.label}: cyclic cascade through {related._meta.label}")
+                self._plan(related, children, path + (related,))
+            else:
+                raise ValueError(
+                    f"Cannot purge {model._meta.label}: {related._meta.label}.{fk.name} "
+                    f"uses on_delete={getattr(on_delete, '__name__', on_delete)}"
+                )
+        for m2m in model._meta.local_many_to_many:
+            through = m2m.remote_field.through
+            self._add_through(through, through._meta.get_field(m2m.m2m_field_name()), queryset)
+        self.steps.append(PurgeStep(model, queryset, 'delete'))
+
+    def _add_through(self, through, fk, queryset):
+        rows = through._base_manager.using(self.alias).filter(
+            **{f"{fk.name}__in": queryset.values(fk.target_field.attname)}
+        )
+        self.steps.append(PurgeStep(through, rows, 'delete'))
+
+    def count(self):
+        """Dry run: rows each step would delete or clear, in plan order."""
+        return {step.label: step.queryset.count() for step in self.steps}
+
+    def _chunk_sql(self, step):
+        meta = step.model._meta
+        connection = connections[self.alias]
+        quote = connection.ops.quote_name
+        chunk = step.queryset.order_by('pk').values('pk')[:self.chunk_size]
+        subquery, params = chunk.query.get_compiler(using=self.alias).as_sql()
+        where = f"WHERE {quote(meta.pk.column)} IN ({subquery})"
+        if step.action == 'nullify':
+            return f"UPDATE {quote(meta.db_table)} SET {quote(step.column)} = NULL {where}", params
+        return f"DELETE FROM {quote(meta.db_table)} {where}", params
+
+    def run_step(self, step):
+        sql, params = self._chunk_sql(step)
+        result = PurgeStepResult(step.label, step.action)
+        start = time.perf_counter()
+        while True:
+            with transaction.atomic(using=self.alias):
+                with connections[self.alias].cursor() as cursor:
+                    cursor.execute(sql, params)
+                    rows = cursor.rowcount
+            if rows:
+                result.rows += rows
+                result.chunks += 1
+                if self.progress:
+                    self.progress(step, result.rows)
+            if rows < self.chunk_size:
+                break
+        result.seconds = round(time.perf_counter() - start, 3)
+        return result
+
+    def run(self):
+        """Delete everything in plan order. Returns one ``PurgeStepResult`` per step."""
+        return [self.run_step(step) for step in self.steps]
@@ -51,6 +51,7 @@ class TenantRouter:
         'sites',           # Django sites framework
         'axes',            # Login throttling (global)
         'django_apscheduler',  # Scheduled jobs (global)
+        'jobs',            # Background job records (tagged with their tenant alias)
     ])
 
     def db_for_read(self, model, **hints):
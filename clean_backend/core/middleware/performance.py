@@ -88,65 +88,49 @@ class PerformanceMonitoringMiddleware:
 
 
 class QueryOptimizationMiddleware:
-    """Monitor and optimize database queries."""
+    """
+    Detect N+1 queries and query-budget overruns (DEBUG only).
+
+    Uses ``core.monitoring.queries.QueryRecorder`` to fingerprint each
+    request's SQL and logs repeated fingerprints with the serializer field or
+    view that issued them, plus any declared ``query_budget`` that was
+    exceeded.
+    """
     
     def __init__(self, get_response):
         self.get_response = get_response
     
     def __call__(self, request):
-        # Clear query log at start (with error handling)
-        try:
-            if hasattr(connection, 'queries_log'):
-                connection.queries_log = []
-        except (AttributeError, TypeError):
-            pass
-        
-        # Process request
-        response = self.get_response(request)
-        
-        # Analyze queries in development
-        if settings.DEBUG:
-            self._analyze_queries(request)
-        
+        if not settings.DEBUG:
+            return self.get_response(request)
+
+        from core.monitoring.queries import QueryRecorder
+
+        with QueryRecorder() as recorder:
+            response = self.get_response(request)
+        self._analyze_queries(request, recorder.report())
         return response
     
-    def _analyze_queries(self, request):
-        """Analyze database queries for optimization opportunities."""
-        try:
-            queries = connection.queries if hasattr(connection, 'queries') else []
-        except (AttributeError, TypeError):
-            queries = []
-        
-        if not queries:
-            return
-        
-        # Check for N+1 queries
-        query_patterns = {}
-        for query in queries:
-            sql = query.get('sql', '').lower()
-            if 'select' in sql and 'from' in sql:
-                # Extract table name (simplified)
-                parts = sql.split('from')
-                if len(parts) > 1:
-                    table = parts[1].split()[0].strip()
-                    query_patterns[table] = query_patterns.get(table, 0) + 1
-        
-        # Log potential N+1 queries
-        for table, count in query_patterns.items():
-            if count > 5:  # Threshold for N+1 detection
-                logger.warning(
-                    f"Potential N+1 query detected: {count} queries on {table} "
-                    f"for request {request.path}"
-                )
-        
-        # Log duplicate queries
-        sql_queries = [q.get('sql', '') for q in queries]
-        duplicate_queries = [sql for sql in set(sql_queries) if sql_queries.count(sql) > 1]
-        
-        if duplicate_queries:
+    def _analyze_queries(self, request, report):
+        """Log N+1 candidates and budget overruns for this request."""
+        from core.monitoring.queries import get_query_budget
+
+        for finding in report.n_plus_one():
+            sources = ', '.join(
+                f"{source} x{count}" for source, count in finding['sources'].items()
+            )
+            logger.warning(
+                f"Potential N+1 query detected: {finding['count']} queries like "
+                f"'{finding['fingerprint'][:200]}' for request {request.path} "
+                f"(from {sources})"
+            )
+
+        match = getattr(request, 'resolver_match', None)
+        budget = get_query_budget(match.func, request.method) if match else None
+        if budget is not None and report.count > budget:
             logger.warning(
-                f"Duplicate queries detected in {request.path}: "
-                f"{len(duplicate_queries)} unique queries executed multiple times"
+                f"Query budget exceeded for {request.method} {request.path}: "
+                f"{report.count} queries (budget {budget})"
             )
 
 
@@ -244,8 +228,9 @@ class JSONResponseMiddleware:
     def __call__(self, request):
         response = self.get_response(request)
         
-        # Add JSON response headers for API requests
-        if request.path.startswith('/api/'):
+        # Add JSON response headers for API requests (streamed file
+        # exports keep their own content type)
+        if request.path.startswith('/api/') and not response.streaming:
             response['Content-Type'] = 'application/json'
         
         return response
@@ -0,0 +1,185 @@
+"""
+Pytest plugin: query budgets and N+1 detection for API tests.
+
+Enabled from ``pytest.ini`` (``-p core.monitoring.pytest_plugin``). Provides:
+
+- ``query_check`` fixture: ``query_check(client, path)`` performs a request
+  under a ``QueryRecorder``, fails if the view's declared ``query_budget``
+  is exceeded (or, with ``strict=True``, on any N+1 pattern), and returns
+  ``(response, report)``;
+- ``seeded_api_data`` fixture: a small but realistic tenant dataset with
+  several rows per list endpoint, so N+1 patterns actually repeat;
+- ``iter_api_routes()``: every parameter-free ``api/`` route registered in
+  ``config/urls.py``, used by ``core/tests/test_query_budgets.py``.
+
+N+1 candidates seen during the run are listed in the terminal summary.
+The route sweep always checks strictly; ``--query-budget-strict`` does so
+for every other test using ``query_check`` too.
+"""
+import re
+
+import pytest
+
+from core.monitoring.queries import QueryRecorder, get_query_budget
+
+_REGEX_CHARS = re.compile(r"[()\[\]\\?*+|{}]")
+_findings = {}
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('query budget')
+    group.addoption(
+        '--query-budget-strict',
+        action='store_true',
+        default=False,
+        help='Fail API tests that show N+1 query patterns, not just budget overruns.',
+    )
+
+
+def _clean_pattern(pattern):
+    text = str(pattern)
+    if text.startswith('^'):
+        text = text[1:]
+    if text.endswith('$'):
+        text = text[:-1]
+    return text
+
+
+def _walk(patterns, prefix=''):
+    from django.urls import URLPattern, URLResolver
+
+    for entry in patterns:
+        text = prefix + _clean_pattern(entry.pattern)
+        if isinstance(entry, URLResolver):
+            yield from _walk(entry.url_patterns, text)
+        elif isinstance(entry, URLPattern):
+            yield text, entry.callback
+
+
+def iter_api_routes(prefix='api/'):
+    """
+    Yield ``(path, view_func)`` for every DRF route under ``prefix`` that
+    takes no URL parameters and accepts GET. Detail routes are skipped.
+    """
+    from django.urls import get_resolver
+    from rest_framework.views import APIView
+
+    seen = set()
+    for route, callback in _walk(get_resolver().url_patterns):
+        if not route.startswith(prefix) or '<' in route or _REGEX_CHARS.search(route):
+            continue
+        view_class = getattr(callback, 'cls', None)
+        if not (isinstance(view_class, type) and issubclass(view_class, APIView)):
+            continue
+        actions = getattr(callback, 'actions', None)
+        if actions is not None and 'get' not in actions:
+            continue
+        path = '/' + route
+        if path not in seen:
+            seen.add(path)
+            yield path, callback
+
+
+@pytest.fixture
+def query_check(request):
+    """
+    Run ``client.<method>(path, ...)`` under a QueryRecorder and enforce the
+    view's query budget, and fail on N+1 patterns when ``strict`` (or
+    ``--query-budget-strict``). Returns ``(response, report)``.
+    """
+    strict_option = request.config.getoption('--query-budget-strict')
+
+    def check(client, path, method='get', strict=False, **kwargs):
+        from django.urls import resolve
+
+        with QueryRecorder() as recorder:
+            response = getattr(client, method)(path, **kwargs)
+        report = recorder.report()
+
+        findings = report.n_plus_one()
+        if findings:
+            _findings[f"{method.upper()} {path}"] = report.format()
+
+        budget = get_query_budget(resolve(path.split('?')[0]).func, method)
+        if budget is not None and report.count > budget:
+            pytest.fail(
+                f"{method.upper()} {path} ran {report.count} queries, "
+                f"budget is {budget}.\n{report.format()}"
+            )
+        if (strict or strict_option) and findings:
+            pytest.fail(f"N+1 queries in {method.upper()} {path}:\n{report.format()}")
+        return response, report
+
+    return check
+
+
+@pytest.fixture
+def seeded_api_data(db):
+    """
+    Seed a few customers with subscriptions, orders, kitchen orders,
+    deliveries, invoices, menus and notifications.
+    """
+    import datetime
+    from decimal import Decimal
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+    from apps.main.models import (
+        Address, Category, CustomerProfile, DailyMenu, Invoice, MealPackage,
+        MealSlot, Menu, MenuItem, Notification, Order, Subscription,
+    )
+    from apps.kitchen.models import KitchenOrder
+    from apps.delivery.models import Delivery
+    from apps.driver.models import DeliveryDriver, Zone
+
+    User = get_user_model()
+    today = timezone.now().date()
+    zone = Zone.objects.create(name='Seed Zone')
+    driver = DeliveryDriver.objects.create(name='Seed Driver', phone='900000')
+    driver.zones.add(zone)
+    slot = MealSlot.objects.create(name='Lunch', code='lunch')
+    package = MealPackage.objects.create(name='Seed Package', price=Decimal('100.00'))
+    category = Category.objects.create(name='Mains')
+    items = [
+        MenuItem.objects.create(name=f'Dish {i}', category=category, price=Decimal('10.00'))
+        for i in range(6)
+    ]
+    menu = Menu.objects.create(name='Seed Menu', price=Decimal('12.00'))
+    menu.menu_items.set(items)
+    DailyMenu.objects.create(menu_date=today, meal_slot=slot, status='published')
+
+    customers = []
+    for i in range(6):
+        user = User.objects.create_user(
+            username=f'seed_customer_{i}', first_name='Seed', last_name=str(i),
+        )
+        profile = CustomerProfile.objects.create(user=user, phone=f'50000{i}')
+        address = Address.objects.create(
+            customer=profile, zone=zone, street=f'{i} Seed St', status='active',
+        )
+        sub = Subscription.objects.create(
+            customer=profile, meal_package=package, time_slot=slot,
+            start_date=today, end_date=today + datetime.timedelta(days=13),
+            lunch_address=address, status='active',
+            selected_days=['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'],
+        )
+        sub.menus.add(menu)
+        order = Order.objects.create(
+            subscription=sub, order_date=today, delivery_date=today, status='preparing',
+        )
+        KitchenOrder.objects.create(order=order)
+        Delivery.objects.create(order=order, driver=driver, status='pending')
+        Invoice.objects.create(customer=profile, due_date=today, total=Decimal('100.00'))
+        Notification.objects.create(customer=profile, message=f'Hello {i}')
+        customers.append(profile)
+
+    admin = User.objects.create_superuser(username='seed_admin', password='password')
+    return {'admin': admin, 'customers': customers, 'driver': driver, 'zone': zone}
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _findings:
+        return
+    terminalreporter.section('N+1 query candidates')
+    for label, text in sorted(_findings.items()):
+        terminalreporter.write_line(label)
+        terminalreporter.write_line(text)
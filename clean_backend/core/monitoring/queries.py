@@ -0,0 +1,220 @@
+"""
+SQL query recording, fingerprinting and N+1 detection.
+
+``QueryRecorder`` hooks every database connection with an execute wrapper
+and records each statement together with a normalized fingerprint and the
+code that caused it (serializer field, view method or project frame).
+Repeated fingerprints within one recording are reported as N+1 candidates.
+
+Views declare how many queries a request may run with ``query_budget``:
+
+    class OrderViewSet(viewsets.ModelViewSet):
+        query_budget = {'list': 6, 'retrieve': 4}
+
+    @query_budget(5)
+    @api_view(['GET'])
+    def public_menu(request): ...
+
+An int applies to every action; a dict is keyed by viewset action (or
+lowercase HTTP method for plain views), with ``'*'`` as the fallback.
+The budgets are enforced by the pytest plugin in
+``core.monitoring.pytest_plugin`` and logged by ``QueryOptimizationMiddleware``.
+"""
+import re
+import sys
+import time
+from collections import Counter, OrderedDict
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.db import connections
+
+# Same threshold the old heuristic used
+N_PLUS_ONE_THRESHOLD = 5
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bin\s*\((?:\s*\?\s*,?)+\)", re.IGNORECASE)
+_SPACE_RE = re.compile(r"\s+")
+
+_PROJECT_ROOT = str(Path(__file__).resolve().parent.parent.parent)
+_THIS_FILE = __file__
+
+
+def fingerprint(sql):
+    """
+    Normalize a SQL statement so queries that differ only in literal values
+    compare equal: literals become ``?``, IN lists collapse to ``in (...)``.
+    """
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('in (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip().lower()
+
+
+def _attribute(frame):
+    """
+    Walk outwards from ``frame`` and name the code responsible for a query:
+    the innermost serializer field or project-defined serializer method,
+    else the innermost view method, else the innermost frame in project code.
+    """
+    from rest_framework.fields import Field
+    from rest_framework.serializers import BaseSerializer
+    from rest_framework.views import APIView
+
+    view_label = None
+    project_label = None
+    while frame is not None:
+        owner = frame.f_locals.get('self')
+        filename = frame.f_code.co_filename
+        if isinstance(owner, BaseSerializer):
+            # Project-defined serializer methods, e.g. get_customer_name()
+            if 'rest_framework' not in filename:
+                return f"{type(owner).__name__}.{frame.f_code.co_name}"
+        elif isinstance(owner, Field) and getattr(owner, 'parent', None) is not None:
+            return f"{type(owner.parent).__name__}.{owner.field_name}"
+        if view_label is None and isinstance(owner, APIView):
+            view_label = f"{type(owner).__name__}.{frame.f_code.co_name}"
+        if (
+            project_label is None
+            and filename.startswith(_PROJECT_ROOT)
+            and filename != _THIS_FILE
+            and 'site-packages' not in filename
+        ):
+            relative = filename[len(_PROJECT_ROOT):].lstrip('/')
+            project_label = f"{relative}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return view_label or project_label or 'unknown'
+
+
+class RecordedQuery:
+    __slots__ = ('alias', 'sql', 'fingerprint', 'duration', 'source')
+
+    def __init__(self, alias, sql, duration, source):
+        self.alias = alias
+        self.sql = sql
+        self.fingerprint = fingerprint(sql)
+        self.duration = duration
+        self.source = source
+
+
+class QueryReport:
+    """Summary of the queries captured by a ``QueryRecorder``."""
+
+    def __init__(self, queries, threshold=N_PLUS_ONE_THRESHOLD):
+        self.queries = queries
+        self.threshold = threshold
+
+    @property
+    def count(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(q.duration for q in self.queries)
+
+    def repeated(self):
+        """Fingerprints executed at least ``threshold`` times, most frequent first."""
+        counts = Counter(q.fingerprint for q in self.queries)
+        return [(fp, n) for fp, n in counts.most_common() if n >= self.threshold]
+
+    def n_plus_one(self):
+        """
+        List of dicts describing N+1 candidates: the fingerprint, how often it
+        ran, and which sources issued it (source -> count).
+        """
+        findings = []
+        for fp, n in self.repeated():
+            sources = Counter(q.source for q in self.queries if q.fingerprint == fp)
+            findings.append({
+                'fingerprint': fp,
+                'count': n,
+                'sources': OrderedDict(sources.most_common()),
+            })
+        return findings
+
+    def format(self, limit=120):
+        lines = [f"{self.count} queries ({self.duration * 1000:.1f} ms)"]
+        for finding in self.n_plus_one():
+            lines.append(f"  N+1 x{finding['count']}: {finding['fingerprint'][:limit]}")
+            for source, n in finding['sources'].items():
+                lines.append(f"      {n:>4} from {source}")
+        return '\n'.join(lines)
+
+
+class QueryRecorder:
+    """
+    Context manager that records every query on every configured connection.
+
+        with QueryRecorder() as recorder:
+            client.get('/api/v1/orders/')
+        print(recorder.report().format())
+    """
+
+    def __init__(self, aliases=None, attribute=True, threshold=N_PLUS_ONE_THRESHOLD):
+        self.aliases = aliases
+        self.attribute = attribute
+        self.threshold = threshold
+        self.queries = []
+        self._stack = None
+
+    def _wrapper_for(self, alias):
+        def wrapper(execute, sql, params, many, context):
+            source = _attribute(sys._getframe(1)) if self.attribute else None
+            start = time.monotonic()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                self.queries.append(
+                    RecordedQuery(alias, sql, time.monotonic() - start, source)
+                )
+        return wrapper
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in self.aliases or list(connections):
+            connection = connections[alias]
+            self._stack.enter_context(connection.execute_wrapper(self._wrapper_for(alias)))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stack.close()
+        self._stack = None
+        return False
+
+    def report(self):
+        return QueryReport(self.queries, threshold=self.threshold)
+
+
+def query_budget(limit):
+    """Declare the query budget of a function-based view (see module docs)."""
+    def decorator(view):
+        view.query_budget = limit
+        return view
+    return decorator
+
+
+def _select_budget(budget, key):
+    if isinstance(budget, dict):
+        if key in budget:
+            return budget[key]
+        return budget.get('*')
+    return budget
+
+
+def get_query_budget(view_func, method):
+    """
+    Return the budget declared for a resolved view and HTTP method, or None.
+    ``view_func`` is ``ResolverMatch.func``.
+    """
+    method = method.lower()
+    budget = getattr(view_func, 'query_budget', None)
+    if budget is not None:
+        return _select_budget(budget, method)
+
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    budget = getattr(view_class, 'query_budget', None)
+    if budget is None:
+        return None
+    actions = getattr(view_func, 'actions', None) or {}
+    return _select_budget(budget, actions.get(method, method))
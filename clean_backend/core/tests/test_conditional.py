@@ -0,0 +1,90 @@
+import pytest
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.utils.http import http_date
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.driver.models import DeliveryDriver, Zone
+from apps.main.models import Category, Menu, MenuItem
+from core.utils.conditional import invalidate_model, model_versions
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestModelVersions:
+    def test_bumped_now_and_on_commit(self, django_capture_on_commit_callbacks):
+        [start] = model_versions([Category], 'default')
+        with django_capture_on_commit_callbacks() as callbacks:
+            invalidate_model(Category, 'default')
+        [after_write] = model_versions([Category], 'default')
+        assert after_write > start
+
+        for callback in callbacks:
+            callback()
+        assert model_versions([Category], 'default')[0] > after_write
+
+    def test_m2m_change_bumps_owner(self):
+        menu = Menu.objects.create(name='Plan A', price=Decimal('10.00'))
+        category = Category.objects.create(name='Lentils')
+        item = MenuItem.objects.create(name='Dal', category=category, price=Decimal('4.00'))
+        [before] = model_versions([Menu], 'default')
+        menu.menu_items.add(item)
+        assert model_versions([Menu], 'default')[0] > before
+
+
+@pytest.mark.django_db
+class TestConditionalViews:
+    def setup_method(self):
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.admin = User.objects.create_superuser(username='admin_etag', password='password')
+        self.client.force_authenticate(user=self.admin)
+        Category.objects.create(name='Mains')
+
+    def test_list_304_without_queries(self, django_assert_num_queries):
+        first = self.client.get('/api/v1/categories/')
+        assert first.status_code == status.HTTP_200_OK
+        assert first['ETag'] and first['Last-Modified']
+
+        with django_assert_num_queries(0):
+            response = self.client.get('/api/v1/categories/', HTTP_IF_NONE_MATCH=first['ETag'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response['ETag'] == first['ETag']
+
+    def test_write_changes_validators(self):
+        first = self.client.get('/api/v1/categories/')
+        Category.objects.create(name='Desserts')
+        response = self.client.get('/api/v1/categories/', HTTP_IF_NONE_MATCH=first['ETag'])
+        assert response.status_code == status.HTTP_200_OK
+        assert response['ETag'] != first['ETag']
+
+    def test_if_modified_since(self):
+        first = self.client.get('/api/v1/categories/')
+        response = self.client.get('/api/v1/categories/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        response = self.client.get('/api/v1/categories/', HTTP_IF_MODIFIED_SINCE=http_date(0))
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_query_string_is_part_of_etag(self):
+        plain = self.client.get('/api/v1/menus/')
+        filtered = self.client.get('/api/v1/menus/?is_active=true')
+        assert plain['ETag'] != filtered['ETag']
+
+    def test_zone_driver_assignment_changes_etag(self):
+        zone = Zone.objects.create(name='North')
+        driver = DeliveryDriver.objects.create(name='Driver', phone='123')
+        first = self.client.get(f'/api/v1/driver/zones/{zone.id}/')
+        assert first.status_code == status.HTTP_200_OK
+
+        driver.zones.add(zone)
+        response = self.client.get(f'/api/v1/driver/zones/{zone.id}/', HTTP_IF_NONE_MATCH=first['ETag'])
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['assigned_driver_count'] == 1
+
+    def test_public_categories(self, django_assert_num_queries):
+        client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        first = client.get('/api/v1/customer/menu/categories/')
+        assert first.status_code == status.HTTP_200_OK
+        with django_assert_num_queries(0):
+            response = client.get('/api/v1/customer/menu/categories/', HTTP_IF_NONE_MATCH=first['ETag'])
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
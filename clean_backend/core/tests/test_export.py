@@ -0,0 +1,121 @@
+import csv
+import datetime
+import gzip
+import io
+import pytest
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from openpyxl import load_workbook
+from rest_framework.test import APIClient
+from rest_framework import status
+from apps.delivery.models import Delivery
+from apps.main.models import (
+    CustomerProfile, MealPackage, MealSlot, Order, Subscription, WalletTransaction,
+)
+from core.utils import export
+from core.utils.export import csv_chunks
+
+User = get_user_model()
+
+
+def _body(response):
+    assert isinstance(response, StreamingHttpResponse)
+    return b''.join(response.streaming_content)
+
+
+def _csv_rows(content):
+    return list(csv.reader(io.StringIO(content.decode('utf-8-sig'))))
+
+
+def test_csv_chunks_are_bounded(monkeypatch):
+    monkeypatch.setattr(export, 'STREAM_BUFFER_SIZE', 100)
+    chunks = list(csv_chunks(['n'], ([i] for i in range(1000))))
+    assert len(chunks) > 10
+    assert max(len(chunk) for chunk in chunks) < 200
+    assert _csv_rows(b''.join(chunks))[-1] == ['999']
+
+
+@pytest.mark.django_db
+class TestExports:
+    def setup_method(self):
+        self.client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        self.admin = User.objects.create_superuser(username='admin_export', password='password')
+        self.client.force_authenticate(user=self.admin)
+
+        self.today = timezone.now().date()
+        self.customer = CustomerProfile.objects.create(
+            user=User.objects.create_user(username='export_cust'), name='Huda Saleh', phone='0501234567',
+        )
+        self.sub = Subscription.objects.create(
+            customer=self.customer, meal_package=MealPackage.objects.create(name='Std', price=Decimal('100')),
+            time_slot=MealSlot.objects.create(name='Lunch', code='lunch'), start_date=self.today,
+            end_date=self.today + datetime.timedelta(days=30), selected_days=['Monday'],
+        )
+        self.pending = Order.objects.create(
+            subscription=self.sub, order_date=self.today, delivery_date=self.today, status='pending',
+        )
+        self.confirmed = Order.objects.create(
+            subscription=self.sub, order_date=self.today,
+            delivery_date=self.today + datetime.timedelta(days=1), status='confirmed',
+        )
+
+    def test_orders_csv_uses_list_filters(self):
+        response = self.client.get('/api/v1/orders/export/', {'status': 'pending'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'].startswith('text/csv')
+        assert 'attachment; filename="order-' in response['Content-Disposition']
+
+        rows = _csv_rows(_body(response))
+        assert rows[0][:4] == ['Order ID', 'Order date', 'Delivery date', 'Status']
+        assert [row[0] for row in rows[1:]] == [str(self.pending.id)]
+        assert rows[1][7:9] == ['Huda Saleh', '0501234567']
+
+    def test_orders_export_follows_search_and_ordering(self):
+        response = self.client.get('/api/v1/orders/export/', {'search': 'huda', 'ordering': 'delivery_date'})
+        rows = _csv_rows(_body(response))
+        assert [row[0] for row in rows[1:]] == [str(self.pending.id), str(self.confirmed.id)]
+
+    def test_gzip(self):
+        plain = _body(self.client.get('/api/v1/orders/export/'))
+        response = self.client.get('/api/v1/orders/export/', {'gzip': '1'})
+        assert response['Content-Type'] == 'application/gzip'
+        assert response['Content-Disposition'].endswith('.csv.gz"')
+        assert gzip.decompress(_body(response)) == plain
+
+    def test_xlsx(self):
+        response = self.client.get('/api/v1/orders/export/', {'format': 'xlsx'}, HTTP_ACCEPT='application/json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == export.CONTENT_TYPES['xlsx']
+        sheet = load_workbook(io.BytesIO(_body(response)), read_only=True).active
+        rows = list(sheet.iter_rows(values_only=True))
+        assert rows[0][0] == 'Order ID'
+        assert sorted(row[0] for row in rows[1:]) == sorted([self.pending.id, self.confirmed.id])
+
+    def test_unknown_format(self):
+        response = self.client.get('/api/v1/orders/export/', {'format': 'pdf'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_deliveries(self):
+        Delivery.objects.create(order=self.pending, status='pending')
+        response = self.client.get('/api/v1/delivery/deliveries/export/')
+        rows = _csv_rows(_body(response))
+        assert len(rows) == 2
+        assert rows[1][4] == 'Huda Saleh'
+
+    def test_invoices_and_wallet_ledger(self):
+        WalletTransaction.objects.create(
+            customer=self.customer, amount=Decimal('25.50'), transaction_type='credit', description='Top-up',
+        )
+        rows = _csv_rows(_body(self.client.get('/api/v1/wallet-transactions/export/', {'transaction_type': 'credit'})))
+        assert rows[1][3:6] == ['Huda Saleh', 'credit', '25.50']
+        assert self.client.get('/api/v1/wallet-transactions/').data['count'] == 1
+
+        rows = _csv_rows(_body(self.client.get('/api/v1/invoices/export/')))
+        assert rows == [['Invoice number', 'Date', 'Due date', 'Customer ID', 'Customer', 'Email', 'Total', 'Status', 'Notes']]
+
+    def test_requires_list_permissions(self):
+        client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+        client.force_authenticate(user=User.objects.create_user(username='not_staff'))
+        assert client.get('/api/v1/wallet-transactions/export/').status_code == status.HTTP_403_FORBIDDEN
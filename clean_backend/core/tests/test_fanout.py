@@ -0,0 +1,123 @@
+import os
+import threading
+import pytest
+from django.conf import settings
+from django.db import connection, connections
+from apps.users.models import Tenant
+from core.db.fanout import FanOutStats, TenantFanOut, TenantResult
+from core.db.router import get_current_db_alias
+
+
+def _pid(tenant, alias):
+    return os.getpid()
+
+
+@pytest.fixture
+def fake_tenants():
+    """Unsaved tenants; their aliases are registered but never connected to."""
+    tenants = [Tenant(id=9100 + index, subdomain=f'fan{index}', db_name=f'db_fan{index}') for index in range(4)]
+    yield tenants
+    for tenant in tenants:
+        settings.DATABASES.pop(f'tenant_{tenant.id}', None)
+
+
+def test_results_streamed_as_completed_and_run_in_tenant_order(fake_tenants):
+    release = threading.Event()
+
+    def work(tenant, alias):
+        if tenant.subdomain == 'fan0':
+            release.wait(5)
+        return get_current_db_alias()
+
+    streamed = []
+    for result in TenantFanOut(work, max_workers=4).stream(fake_tenants):
+        streamed.append(result.tenant.subdomain)
+        if len(streamed) == 3:
+            release.set()  # the other tenants arrived while fan0 was still running
+    assert streamed[-1] == 'fan0'
+
+    results = TenantFanOut(work, max_workers=4).run(fake_tenants)
+    assert [result.tenant.subdomain for result in results] == ['fan0', 'fan1', 'fan2', 'fan3']
+    assert all(result.result == f'tenant_{result.tenant.id}' for result in results)
+    assert get_current_db_alias() == 'default'
+
+
+def test_failures_and_skips_are_isolated(fake_tenants):
+    fake_tenants[3].db_name = ''
+
+    def work(tenant, alias):
+        if tenant.subdomain == 'fan1':
+            raise RuntimeError('tenant down')
+        return 'done'
+
+    fan_out = TenantFanOut(work, max_workers=2)
+    results = fan_out.run(fake_tenants)
+    assert [result.status for result in results] == ['ok', 'failed', 'ok', 'skipped']
+    assert results[1].error == 'RuntimeError: tenant down'
+    assert results[3].as_outcome() == {'tenant': 'fan3', 'skipped': 'no db_name configured', 'seconds': 0.0}
+    stats = fan_out.stats.as_dict()
+    assert (stats['tenants'], stats['succeeded'], stats['failed'], stats['skipped']) == (4, 2, 1, 1)
+    assert stats['tenants_per_second'] > 0
+
+
+def test_processes(fake_tenants):
+    results = TenantFanOut(_pid, max_workers=2, processes=True).run(fake_tenants)
+    assert [result.tenant.subdomain for result in results] == ['fan0', 'fan1', 'fan2', 'fan3']
+    assert all(result.ok and result.result != os.getpid() for result in results)
+
+
+def test_stats_percentiles():
+    stats = FanOutStats()
+    for seconds in (0.1, 0.2, 0.3, 0.4, 2.0):
+        stats.add(TenantResult(tenant=None, seconds=seconds))
+    assert (stats.percentile(0.5), stats.percentile(0.95)) == (0.3, 2.0)
+    assert '5 tenants' in stats.format()
+
+
+@pytest.mark.django_db(transaction=True)
+class TestStatementTimeout:
+    """The tenant's database is the test database itself."""
+
+    def setup_method(self):
+        self.tenant = Tenant.objects.create(
+            name='Timeout', subdomain='timeout', schema_name='timeout',
+            db_name=connection.settings_dict['NAME'], is_active=True,
+        )
+        self.alias = f'tenant_{self.tenant.id}'
+
+    def teardown_method(self):
+        if self.alias in connections:
+            connections[self.alias].close()
+        settings.DATABASES.pop(self.alias, None)
+
+    def test_slow_statement_is_cancelled_and_setting_reset(self):
+        def slow(tenant, alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SELECT pg_sleep(2)')
+
+        result, = TenantFanOut(slow, max_workers=1, statement_timeout=0.2).run([self.tenant])
+        assert result.status == 'failed'
+        assert 'statement timeout' in result.error
+        assert result.seconds < 2
+
+        def show(tenant, alias):
+            with connections[alias].cursor() as cursor:
+                cursor.execute('SHOW statement_timeout')
+                return cursor.fetchone()[0]
+
+        assert TenantFanOut(show, max_workers=1, statement_timeout=5).run([self.tenant])[0].result == '5s'
+        # Inline runs reuse this thread's connection: the setting must not linger
+        assert TenantFanOut(show, max_workers=1).run([self.tenant])[0].result == '0'
+
+    def test_first_query_on_a_server_side_cursor(self):
+        def pks(tenant, alias):
+            return list(Tenant.objects.using(alias).values_list('pk', flat=True).iterator(chunk_size=10))
+
+        # The second run reuses this thread's open connection
+        for _ in range(2):
+            result, = TenantFanOut(pks, max_workers=1, statement_timeout=5).run([self.tenant])
+            assert result.ok and result.result == [self.tenant.pk]
+
+    def test_no_connection_without_queries(self):
+        TenantFanOut(lambda tenant, alias: None, max_workers=1, statement_timeout=5).run([self.tenant])
+        assert connections[self.alias].connection is None
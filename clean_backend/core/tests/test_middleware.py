@@ -33,3 +33,20 @@ class TestMiddleware:
         assert response.status_code == 200
         assert response['X-Content-Type-Options'] == 'nosniff'
         assert response['X-Frame-Options'] == 'DENY'
+
+    @pytest.mark.django_db
+    def test_query_optimization_middleware_reports_n_plus_one(self, caplog):
+        from core.middleware.performance import QueryOptimizationMiddleware
+        from django.contrib.auth.models import Group
+
+        def n_plus_one_view(request):
+            for i in range(5):
+                Group.objects.filter(pk=i).exists()
+            return HttpResponse("OK")
+
+        middleware = QueryOptimizationMiddleware(n_plus_one_view)
+        request = RequestFactory().get('/')
+        with override_settings(DEBUG=True), caplog.at_level('WARNING'):
+            middleware(request)
+        assert 'Potential N+1 query detected: 5 queries' in caplog.text
+        assert 'n_plus_one_view' in caplog.text
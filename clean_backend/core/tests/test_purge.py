@@ -0,0 +1,98 @@
+import datetime
+import pytest
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from apps.delivery.models import Delivery
+from apps.driver.models import DeliveryStatus
+from apps.kitchen.models import KitchenOrder
+from apps.main.models import (
+    CustomerProfile, MealPackage, MealSlot, Menu, Order, Subscription, WalletTransaction,
+)
+from core.db.purge import Purge
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestPurge:
+
+    def setup_method(self):
+        self.today = timezone.localdate()
+        self.customer = CustomerProfile.objects.create(user=User.objects.create_user(username='purge_cust'), name='P')
+        self.package = MealPackage.objects.create(name='Standard', price=100)
+        self.slot = MealSlot.objects.create(name='Lunch', code='lunch')
+
+    def _subscription(self, status, orders=0):
+        subscription = Subscription.objects.create(
+            customer=self.customer, meal_package=self.package, time_slot=self.slot,
+            start_date=self.today, end_date=self.today + datetime.timedelta(days=30),
+            status=status, selected_days=['Monday'],
+        )
+        for day in range(orders):
+            order = Order.objects.create(
+                subscription=subscription, order_date=self.today,
+                delivery_date=self.today + datetime.timedelta(days=day),
+            )
+            Delivery.objects.create(order=order)
+            KitchenOrder.objects.create(order=order)
+        return subscription
+
+    def test_plan_deletes_dependants_first(self):
+        labels = [step.label for step in Purge(Subscription.objects.all()).steps]
+        assert labels.index('kitchen.KitchenOrder') < labels.index('main.Order') < labels.index('main.Subscription')
+        assert labels.index('delivery.Delivery') < labels.index('main.Order')
+        assert 'main.WalletTransaction.subscription_id' in labels
+        assert labels[-1] == 'main.Subscription'
+
+    def test_dry_run_counts_without_deleting(self):
+        self._subscription('expired', orders=3)
+        self._subscription('active', orders=1)
+        counts = Purge(Subscription.objects.filter(status='expired')).count()
+        assert counts['main.Subscription'] == 1
+        assert counts['main.Order'] == 3
+        assert counts['kitchen.KitchenOrder'] == 3
+        assert Order.objects.count() == 4
+
+    def test_scoped_purge_in_chunks(self):
+        expired = self._subscription('expired', orders=5)
+        active = self._subscription('active', orders=2)
+        WalletTransaction.objects.create(
+            customer=self.customer, subscription=expired, amount=Decimal('10'),
+            transaction_type='credit', description='Refund',
+        )
+        seen = []
+        purge = Purge(
+            Subscription.objects.filter(status='expired'), chunk_size=2,
+            progress=lambda step, rows: seen.append((step.label, rows)),
+        )
+        with CaptureQueriesContext(connection) as queries:
+            results = {result.label: result for result in purge.run()}
+
+        assert (results['main.Order'].rows, results['main.Order'].chunks) == (5, 3)
+        assert results['main.Subscription'].rows == 1
+        assert ('main.Order', 2) in seen and ('main.Order', 5) in seen
+        # No row is ever read back into Python
+        assert not any(query['sql'].lstrip().upper().startswith('SELECT') for query in queries.captured_queries)
+
+        assert not Subscription.objects.filter(pk=expired.pk).exists()
+        assert Order.objects.filter(subscription=active).count() == 2
+        assert Delivery.objects.count() == KitchenOrder.objects.count() == 2
+        assert not DeliveryStatus.objects.filter(subscription_id=expired.pk).exists()
+        assert WalletTransaction.objects.get(description='Refund').subscription_id is None
+
+    def test_rerun_is_a_no_op(self):
+        self._subscription('expired', orders=1)
+        purge = Purge(Subscription.objects.filter(status='expired'))
+        purge.run()
+        assert all(result.rows == 0 for result in purge.run())
+
+    def test_many_to_many_rows_removed(self):
+        subscription = self._subscription('expired')
+        menu = Menu.objects.create(name='Menu', price=10)
+        subscription.menus.add(menu)
+        Purge(Subscription.objects.filter(pk=subscription.pk)).run()
+        assert not Subscription.menus.through.objects.exists()
+        assert Menu.objects.filter(pk=menu.pk).exists()
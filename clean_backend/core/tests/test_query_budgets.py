@@ -0,0 +1,54 @@
+import pytest
+from rest_framework.test import APIClient
+
+from core.monitoring.pytest_plugin import iter_api_routes
+from core.monitoring.queries import QueryRecorder, fingerprint, get_query_budget, query_budget
+
+API_ROUTES = [path for path, _ in iter_api_routes()]
+
+
+class TestFingerprint:
+    def test_literals_and_in_lists_are_normalized(self):
+        a = fingerprint('SELECT * FROM "t" WHERE "id" IN (1, 2, 3) AND "name" = \'x\'')
+        b = fingerprint('SELECT *  FROM "t" WHERE "id" IN (7) AND "name" = \'other\'')
+        assert a == b
+        assert 'in (...)' in a
+
+    def test_budget_lookup(self):
+        @query_budget({'get': 3, '*': 10})
+        def view(request):
+            pass
+
+        assert get_query_budget(view, 'GET') == 3
+        assert get_query_budget(view, 'POST') == 10
+
+
+@pytest.mark.django_db
+class TestQueryRecorder:
+    def test_attributes_repeated_queries_to_source(self):
+        from apps.main.models import Category
+
+        for i in range(5):
+            Category.objects.create(name=f'C{i}')
+        with QueryRecorder() as recorder:
+            for category in Category.objects.all():
+                Category.objects.filter(pk=category.pk).exists()
+        findings = recorder.report().n_plus_one()
+        assert len(findings) == 1
+        assert findings[0]['count'] == 5
+        source = next(iter(findings[0]['sources']))
+        assert 'test_query_budgets.py' in source
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('path', API_ROUTES)
+def test_api_route_query_budget(path, seeded_api_data, query_check):
+    """Every parameter-free API route stays within its declared query budget and has no N+1 queries."""
+    client = APIClient(HTTP_USER_AGENT='Mozilla/5.0')
+    if path.startswith('/api/v1/customer/'):
+        user = seeded_api_data['customers'][0].user
+    else:
+        user = seeded_api_data['admin']
+    client.force_authenticate(user=user)
+    response, _ = query_check(client, path, strict=True)
+    assert response.status_code < 500, f"{path} -> {response.status_code}"
@@ -0,0 +1,219 @@
+"""
+Conditional GET (ETag / Last-Modified) for DRF views.
+
+Each tracked model has a per-tenant version stored in the cache. It is
+the timestamp of its last write, bumped by ``post_save``/``post_delete``
+and by changes to the model's many-to-many fields. Apps register the
+models they want tracked, usually in their ``signals`` module:
+
+    track_model_versions(Menu, MenuItem)
+
+Views then declare which models their responses are built from. A
+request whose validators are still current gets 304 Not Modified before
+any query or serialization runs.
+
+    class MenuViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
+        conditional_models = (Menu, MenuItem)
+
+    @api_view(['GET'])
+    @conditional_get(Category)
+    def public_categories(request): ...
+
+Versions are bumped when the write happens and again when its transaction
+commits, so a response built from pre-commit data never ends up with the
+newer validators.
+
+For content that is cached anyway (see ``apps.main.utils.menu_snapshots``),
+``etag_for(data)`` and ``conditional_response()`` work on the data itself.
+"""
+import functools
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from core.db.router import get_current_db_alias
+
+_tracked_models = set()
+
+
+def _version_key(model, alias):
+    return f"model_version:{alias}:{model._meta.label_lower}"
+
+
+# ─── Versions ─────────────────────────────────────────────────────────────────
+
+def model_versions(models, alias=None):
+    """
+    ``[version, ...]`` for ``models`` in one cache round trip. Versions are
+    nanosecond timestamps; a missing one starts at now.
+    """
+    alias = alias or get_current_db_alias()
+    keys = [_version_key(model, alias) for model in models]
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    for key, version in missing.items():
+        # add() so a concurrent bump is not overwritten
+        cache.add(key, version, timeout=None)
+    if missing:
+        found.update(cache.get_many(list(missing)))
+    return [found.get(key, missing.get(key)) for key in keys]
+
+
+def bump_model_version(model, alias=None):
+    alias = alias or get_current_db_alias()
+    cache.set(_version_key(model, alias), time.time_ns(), timeout=None)
+
+
+def invalidate_model(model, alias=None):
+    """Bump ``model``'s version now and again once the current write commits."""
+    alias = alias or get_current_db_alias()
+    bump_model_version(model, alias)
+    transaction.on_commit(lambda: bump_model_version(model, alias), using=alias)
+
+
+def _on_write(sender, using=None, **kwargs):
+    invalidate_model(sender, using)
+
+
+def _m2m_handler(model):
+    def handler(sender, action, using=None, **kwargs):
+        if action.startswith('post_'):
+            invalidate_model(model, using)
+    return handler
+
+
+def track_model_versions(*models):
+    """Keep versions of ``models`` current. Safe to call more than once."""
+    for model in models:
+        if model in _tracked_models:
+            continue
+        _tracked_models.add(model)
+        uid = f"model_version:{model._meta.label_lower}"
+        post_save.connect(_on_write, sender=model, dispatch_uid=uid)
+        post_delete.connect(_on_write, sender=model, dispatch_uid=uid)
+        for field in model._meta.local_many_to_many:
+            m2m_changed.connect(
+                _m2m_handler(model), sender=field.remote_field.through,
+                weak=False, dispatch_uid=f"{uid}:{field.name}",
+            )
+
+
+# ─── Validators ───────────────────────────────────────────────────────────────
+
+def make_etag(*parts):
+    """Strong ETag from arbitrary values (versions, request paths...)."""
+    digest = hashlib.sha1(':'.join(str(p) for p in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_for(data):
+    """Strong ETag from the JSON rendering of ``data``."""
+    return f'"{hashlib.sha1(JSONRenderer().render(data)).hexdigest()}"'
+
+
+def etag_matches(request, etag):
+    """True if the request's If-None-Match covers ``etag`` (weak comparison)."""
+    header = request.headers.get('If-None-Match')
+    if not header or not etag:
+        return False
+    etags = parse_etags(header)
+    if '*' in etags:
+        return True
+    bare = etag.removeprefix('W/')
+    return any(candidate.removeprefix('W/') == bare for candidate in etags)
+
+
+def is_not_modified(request, etag, last_modified=None):
+    """
+    Whether the client's copy is current. If-None-Match wins when present;
+    If-Modified-Since is only consulted without it (RFC 9110 13.2.2).
+    """
+    if request.headers.get('If-None-Match'):
+        return etag_matches(request, etag)
+    since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+    return since is not None and last_modified is not None and int(last_modified) <= since
+
+
+def not_modified_response(etag, last_modified=None):
+    response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    return set_validators(response, etag, last_modified)
+
+
+def set_validators(response, etag, last_modified=None):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def conditional_response(request, etag, data):
+    """304 if the client holds ``etag``, else ``data`` with the ETag."""
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    return set_validators(Response(data), etag)
+
+
+def request_validators(request, models):
+    """
+    ``(etag, last_modified)`` for a GET built from ``models``: the tenant's
+    model versions, the full path (filters, paging) and the user.
+    """
+    alias = get_current_db_alias()
+    versions = model_versions(models, alias)
+    etag = make_etag(
+        alias, request.get_full_path(), request.headers.get('Accept', ''),
+        getattr(request.user, 'pk', None), *versions,
+    )
+    return etag, max(versions) / 1e9
+
+
+def _conditional(request, models, handler):
+    etag, last_modified = request_validators(request, models)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified_response(etag, last_modified)
+    response = handler()
+    if response.status_code == status.HTTP_200_OK:
+        set_validators(response, etag, last_modified)
+    return response
+
+
+# ─── View integration ─────────────────────────────────────────────────────────
+
+class ConditionalGetMixin:
+    """
+    Adds ETag/Last-Modified to ``list`` and ``retrieve`` and answers
+    conditional requests with 304 before touching the database.
+    Set ``conditional_models`` to every model the responses are built from.
+    """
+    conditional_models = ()
+
+    def list(self, request, *args, **kwargs):
+        return _conditional(
+            request, self.conditional_models,
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return _conditional(
+            request, self.conditional_models,
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+        )
+
+
+def conditional_get(*models):
+    """``ConditionalGetMixin`` for function views; goes below ``@api_view``."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            return _conditional(request, models, lambda: view(request, *args, **kwargs))
+        return wrapper
+    return decorator
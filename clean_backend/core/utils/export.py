@@ -0,0 +1,168 @@
+"""
+Streaming CSV/XLSX exports for list endpoints.
+
+Viewsets mix in ``ExportMixin`` and declare their columns as
+``(values path, header)`` pairs:
+
+    class OrderViewSet(ExportMixin, viewsets.ModelViewSet):
+        export_columns = [('id', 'Order ID'), ('subscription__customer__name', 'Customer')]
+
+``GET <list url>/export/?format=csv|xlsx[&gzip=1]`` then streams every row
+of the viewset's filtered queryset (same filters, search and ordering as
+the list, no pagination). Rows come from ``values_list().iterator()``,
+which reads through a server-side cursor in ``EXPORT_CHUNK_SIZE`` batches.
+Memory stays flat however many rows there are.
+
+The response body is produced after the view returns, when the tenant
+middleware has already reset the thread's database alias. The queryset is
+therefore pinned to the request's alias up front.
+
+XLSX goes through openpyxl's write-only workbook, which spools rows to a
+temporary file. The file is streamed once it is complete.
+"""
+import csv
+import datetime
+import tempfile
+import zlib
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.negotiation import BaseContentNegotiation
+
+from core.db.router import get_current_db_alias
+
+EXPORT_CHUNK_SIZE = 2000
+STREAM_BUFFER_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+# ─── Writers ──────────────────────────────────────────────────────────────────
+
+class _Echo:
+    """File-like object whose ``write`` hands the value back (for ``csv.writer``)."""
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return value
+
+
+def _xlsx_value(value):
+    # Excel has no time zones; write local wall-clock times
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.make_naive(value)
+    return value
+
+
+def csv_chunks(header, rows):
+    """UTF-8 CSV (with BOM, so Excel detects the encoding) in ~64 KB chunks."""
+    writer = csv.writer(_Echo())
+    buffer = ['\ufeff', writer.writerow(header)]
+    size = 0
+    for row in rows:
+        line = writer.writerow([_csv_value(value) for value in row])
+        buffer.append(line)
+        size += len(line)
+        if size >= STREAM_BUFFER_SIZE:
+            yield ''.join(buffer).encode()
+            buffer, size = [], 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def xlsx_chunks(header, rows, title='Export'):
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=title[:31])
+    sheet.append(header)
+    for row in rows:
+        sheet.append([_xlsx_value(value) for value in row])
+
+    with tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024) as output:
+        workbook.save(output)
+        output.seek(0)
+        while chunk := output.read(STREAM_BUFFER_SIZE):
+            yield chunk
+
+
+def gzip_chunks(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+# ─── Responses ────────────────────────────────────────────────────────────────
+
+def export_response(queryset, columns, filename, file_format='csv', compress=False):
+    """
+    ``StreamingHttpResponse`` with ``columns`` of ``queryset`` as CSV or
+    XLSX, optionally gzipped. Nothing is queried until the body is read.
+    """
+    paths = [path for path, _ in columns]
+    header = [label for _, label in columns]
+    rows = queryset.prefetch_related(None).values_list(*paths).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+    if file_format == 'xlsx':
+        chunks = xlsx_chunks(header, rows, title=filename)
+    else:
+        chunks = csv_chunks(header, rows)
+
+    filename = f"{filename}.{file_format}"
+    content_type = CONTENT_TYPES[file_format]
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    """The export picks its own format; errors still render with the first renderer."""
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+
+class ExportMixin:
+    """Adds a streaming ``export`` list route; set ``export_columns``."""
+    export_columns = ()
+    export_filename = None
+
+    def get_export_filename(self):
+        name = self.export_filename or self.basename or 'export'
+        return f"{name}-{timezone.localdate().isoformat()}"
+
+    @action(detail=False, methods=['get'], content_negotiation_class=IgnoreClientContentNegotiation)
+    def export(self, request, *args, **kwargs):
+        file_format = request.query_params.get('format', 'csv').lower()
+        if file_format not in CONTENT_TYPES:
+            raise ValidationError({'format': f"Choose one of: {', '.join(CONTENT_TYPES)}."})
+        compress = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+        queryset = self.filter_queryset(self.get_queryset()).using(get_current_db_alias())
+        return export_response(
+            queryset, self.export_columns, self.get_export_filename(),
+            file_format=file_format, compress=compress,
+        )
@@ -0,0 +1,89 @@
+"""
+Read-only, plain-dict serialization for large list responses.
+
+``ValuesSerializer`` renders rows straight from ``QuerySet.values()``: no
+model instances, no per-row DRF field objects. Output values are formatted
+like the equivalent DRF fields (ISO datetimes in the current timezone,
+decimals as strings) so a ``ValuesSerializer`` can stand in for a
+``ModelSerializer`` on list endpoints.
+
+    class DeliveryValuesSerializer(ValuesSerializer):
+        fields = {'id': 'id', 'driver_id': 'driver_id', 'status': 'status'}
+        extra_lookups = ('driver__name',)
+        computed_fields = ('driver_name',)
+
+        def get_driver_name(self, row):
+            return row['driver__name'] or ''
+"""
+import datetime
+import decimal
+import uuid
+
+from rest_framework import serializers
+
+
+class ValuesSerializer:
+    """
+    Base class. Subclasses set:
+
+    - ``fields``: output name -> ORM lookup passed to ``values()``
+    - ``extra_lookups``: lookups only needed by computed fields
+    - ``computed_fields``: output names filled by ``get_<name>(row)``
+    - ``field_order``: optional explicit output key order
+    - ``omit_if_none``: keys dropped when their value is None, matching DRF
+      fields whose dotted ``source`` crosses a null relation
+    """
+    fields = {}
+    extra_lookups = ()
+    computed_fields = ()
+    field_order = None
+    omit_if_none = ()
+
+    def __init__(self):
+        # One shared field per type instead of one per row and column
+        self._datetime = serializers.DateTimeField()
+        self._date = serializers.DateField()
+        self._time = serializers.TimeField()
+        self._decimal = serializers.DecimalField(max_digits=None, decimal_places=None)
+        self._order = self.field_order or list(self.fields) + list(self.computed_fields)
+        self._getters = {name: getattr(self, f'get_{name}') for name in self.computed_fields}
+
+    def lookups(self):
+        return list(dict.fromkeys([*self.fields.values(), *self.extra_lookups]))
+
+    def values_queryset(self, queryset):
+        return queryset.values(*self.lookups())
+
+    def format_value(self, value):
+        if value is None or isinstance(value, (str, int, float, bool)):
+            return value
+        if isinstance(value, datetime.datetime):
+            return self._datetime.to_representation(value)
+        if isinstance(value, datetime.date):
+            return self._date.to_representation(value)
+        if isinstance(value, datetime.time):
+            return self._time.to_representation(value)
+        if isinstance(value, decimal.Decimal):
+            return self._decimal.to_representation(value)
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return value
+
+    def to_representation(self, row):
+        fields = self.fields
+        getters = self._getters
+        fmt = self.format_value
+        data = {}
+        for name in self._order:
+            if name in getters:
+                data[name] = getters[name](row)
+            else:
+                data[name] = fmt(row[fields[name]])
+        for name in self.omit_if_none:
+            if data.get(name) is None:
+                data.pop(name, None)
+        return data
+
+    def serialize(self, rows):
+        """Serialize an iterable of ``values()`` rows into a list of dicts."""
+        return [self.to_representation(row) for row in rows]